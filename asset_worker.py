@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Build queued thumbnails, previews and renditions in worker processes."""
+
+import argparse
+import os
+import signal
+import threading
+
+from backend.config import load_config
+from backend.repositories import init_repository
+from backend.services.asset_service import AssetQueue
+from backend.services.asset_worker_service import AssetWorkerPool
+from backend.services.project_service import ProjectService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        help="Worker processes (default: assets.workers, or one per core if 0)",
+    )
+    parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="First queue the assets of existing images that aren't built",
+    )
+    parser.add_argument("--project", type=int, help="Only queue this project ID")
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="With --enqueue, also queue assets that are already built",
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="First requeue failed assets"
+    )
+    parser.add_argument(
+        "--drain", action="store_true", help="Exit once the queue is empty"
+    )
+    parser.add_argument(
+        "--status", action="store_true", help="Print the queue's status and exit"
+    )
+    args = parser.parse_args()
+
+    config = load_config()
+    init_repository(config.database)
+    queue = AssetQueue()
+
+    if args.status:
+        print(queue.status(args.project).model_dump_json(indent=2))
+        return
+
+    if args.enqueue:
+        project_ids = (
+            [args.project]
+            if args.project
+            else [project.id for project in ProjectService().list_projects()]
+        )
+        queued = sum(
+            queue.enqueue_project(project_id, rebuild=args.rebuild)
+            for project_id in project_ids
+        )
+        print(f"Queued {queued} asset(s)")
+    if args.retry_failed:
+        print(f"Requeued {queue.retry_failed()} failed asset(s)")
+
+    processes = args.processes or config.assets.workers or os.cpu_count() or 1
+    pool = AssetWorkerPool(processes)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    pool.start()
+    if not pool.running:
+        print("Waiting for the server's asset workers to stop")
+    print(f"Building assets in {processes} process(es); Ctrl-C to stop")
+
+    try:
+        while not stop.wait(config.assets.poll_interval):
+            if args.drain and pool.running and not queue.pending():
+                break
+    except KeyboardInterrupt:
+        pass
+
+    print("Stopping after the assets being built")
+    pool.stop()
+    status = queue.status(args.project)
+    for count in status.assets:
+        print(
+            f"  {count.asset:<13} {count.done:7} built {count.queued:7} queued "
+            f"{count.failed:7} failed"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from contextlib import contextmanager
 from typing import Optional
 
 from backend.migrations.migration_manager import MigrationManager
+from backend.utils.file_lock import FileLock
 
 
 class Database:
@@ -17,13 +18,36 @@ class Database:
     def _init_db(self):
         """Initialize database with migrations."""
         migration_manager = MigrationManager(str(self.db_path))
-        applied = migration_manager.apply_migrations()
+        if migration_manager.is_up_to_date():
+            print("Database schema is up to date")
+            return
+
+        # Workers of a multi-process server start together: one migrates
+        # while the others wait, then find the schema current
+        with FileLock(self.lock_path("migrations")):
+            if migration_manager.is_up_to_date():
+                print("Database schema is up to date")
+                return
+
+            # WAL lets readers proceed during writes. auto_vacuum only takes
+            # effect on a new file; maintenance converts existing ones on
+            # request
+            with sqlite3.connect(str(self.db_path)) as conn:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("PRAGMA journal_mode = WAL")
+            conn.close()
+
+            applied = migration_manager.apply_migrations()
 
         if applied:
             print(f"Applied {len(applied)} migration(s): {', '.join(applied)}")
         else:
             print("Database schema is up to date")
 
+    def lock_path(self, name: str) -> Path:
+        """Path of a lock file coordinating processes that share this database."""
+        return self.db_path.with_name(f"{self.db_path.name}.{name}.lock")
+
     @contextmanager
     def get_connection(self):
         """Context manager for database connections."""
@@ -57,19 +81,34 @@ class Database:
             return cursor.fetchall()
 
 
+class UnsupportedBackendError(RuntimeError):
+    """Raised by SQLite-only features when another storage backend is used."""
+
+
 # Global database instance
 _db: Optional[Database] = None
+_unsupported_reason: Optional[str] = None
 
 
 def init_database(db_path: str):
     """Initialize the global database instance."""
-    global _db
+    global _db, _unsupported_reason
     _db = Database(db_path)
+    _unsupported_reason = None
     return _db
 
 
+def disable_database(reason: str) -> None:
+    """Make get_db() fail with reason, for a non-SQLite storage backend."""
+    global _db, _unsupported_reason
+    _db = None
+    _unsupported_reason = reason
+
+
 def get_db() -> Database:
     """Get the global database instance."""
+    if _unsupported_reason is not None:
+        raise UnsupportedBackendError(_unsupported_reason)
     if _db is None:
         raise RuntimeError("Database not initialized. Call init_database() first.")
     return _db
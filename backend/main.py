@@ -1,11 +1,25 @@
+import os
 from contextlib import asynccontextmanager
+from typing import Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from backend.config import load_config
-from backend.database import init_database
-from backend.routes import annotations, projects
+from backend.config import Config, load_config
+from backend.database import UnsupportedBackendError
+from backend.repositories import close_repository, init_repository
+from backend.routes import annotations, assets, maintenance, projects, search
+from backend.services.annotation_service import flush_pending_writes, init_write_buffer
+from backend.services.asset_worker_service import AssetWorkerPool
+from backend.services.cleanup_service import get_file_cleaner
+from backend.services.job_service import init_image_jobs
+from backend.services.live_service import get_live_hub
+from backend.services.prefetch_service import init_prefetcher
+from backend.services.maintenance_service import MaintenanceScheduler
+
+# Worker processes of the server, set by this module's launcher for them
+WORKERS_ENV = "SPHEREMARK_WORKERS"
 
 
 @asynccontextmanager
@@ -13,13 +27,50 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
     config = load_config()
-    init_database(config.database.path)
-    print(f"Database initialized at: {config.database.path}")
+    repository = init_repository(config.database)
+    image_jobs = init_image_jobs(config.server.image_jobs)
+    if buffers_updates(config, server_workers()):
+        init_write_buffer(
+            config.writes.flush_interval_ms / 1000, on_flush=get_live_hub().notify
+        )
+    prefetcher = None
+    if config.prefetch.enabled:
+        prefetcher = init_prefetcher(config.prefetch.depth)
+    scheduler = None
+    # Maintenance covers SQLite's files; PostgreSQL runs its own autovacuum
+    if config.maintenance.enabled and repository.name == "sqlite":
+        scheduler = MaintenanceScheduler(config.maintenance.interval_hours * 3600)
+        scheduler.start()
+    asset_workers = None
+    # The asset queue is in the SQLite database
+    if (
+        config.assets.enabled
+        and config.assets.workers > 0
+        and repository.name == "sqlite"
+    ):
+        asset_workers = AssetWorkerPool(config.assets.workers)
+        asset_workers.start()
+    if repository.name == "sqlite":
+        print(f"Database initialized at: {config.database.path}")
+    else:
+        print(f"Using the {repository.name} database backend")
     print(f"Server starting on {config.server.host}:{config.server.port}")
 
     yield
 
     # Shutdown
+    if prefetcher is not None:
+        prefetcher.stop(config.server.shutdown_timeout)
+    if not image_jobs.drain(config.server.shutdown_timeout):
+        print(f"Shutting down with {image_jobs.pending} image job(s) unfinished")
+    if scheduler is not None:
+        scheduler.stop()
+    if asset_workers is not None:
+        asset_workers.stop(config.server.shutdown_timeout)
+    flush_pending_writes()
+    await get_live_hub().close()
+    get_file_cleaner().join()
+    close_repository()
     print("Server shutting down")
 
 
@@ -39,9 +90,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(UnsupportedBackendError)
+async def unsupported_backend(request: Request, exc: UnsupportedBackendError):
+    """SQLite-only features answer 501 on other storage backends."""
+    return JSONResponse(status_code=501, content={"detail": str(exc)})
+
+
 # Include routers
 app.include_router(projects.router)  # New project-scoped routes
 app.include_router(annotations.router)
+app.include_router(search.router)
+app.include_router(maintenance.router)
+app.include_router(assets.router)
 
 
 @app.get("/")
@@ -56,13 +117,87 @@ async def health():
     return {"status": "ok"}
 
 
+def server_workers() -> Optional[int]:
+    """Number of worker processes serving this app, None if not launched here."""
+    workers = os.environ.get(WORKERS_ENV)
+    return int(workers) if workers else None
+
+
+def buffers_updates(config: Config, workers: Optional[int]) -> bool:
+    """
+    Whether annotation updates are buffered in this process.
+
+    The buffer is per process: other workers would read stale rows until
+    it flushes, and a later flush could overwrite a newer update made
+    through another worker. Updates are only buffered when the launcher
+    started a single worker. Under uvicorn --workers, gunicorn or any other
+    entrypoint the worker count is unknown, so updates are written through,
+    as they are on PostgreSQL, whose API nodes share the database.
+    """
+    return (
+        config.writes.buffer_updates
+        and workers == 1
+        and config.database.backend == "sqlite"
+    )
+
+
+def server_options(
+    config: Config, production: bool = False, workers: Optional[int] = None
+) -> dict:
+    """
+    Keyword arguments for uvicorn.run.
+
+    Development runs one auto-reloading process. Production runs
+    server.workers processes, or workers if given, each applying the
+    per-worker limits from the config.
+    """
+    options = {
+        "host": config.server.host,
+        "port": config.server.port,
+        "timeout_graceful_shutdown": config.server.shutdown_timeout,
+    }
+    if not production:
+        return {**options, "reload": True}
+
+    return {
+        **options,
+        "workers": workers or config.server.workers,
+        "limit_concurrency": config.server.limit_concurrency,
+        "limit_max_requests": config.server.max_requests,
+    }
+
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the SphereMark API server")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print an import-time breakdown of the app and exit",
+    )
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="run server.workers processes without auto-reload",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="worker processes in production mode, overriding server.workers",
+    )
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from backend.utils.import_profile import profile_startup
+
+        profile_startup()
+        raise SystemExit
+
     import uvicorn
 
     config = load_config()
-    uvicorn.run(
-        "backend.main:app",
-        host=config.server.host,
-        port=config.server.port,
-        reload=True,
-    )
+    options = server_options(config, args.production, args.workers)
+    # Inherited by the worker processes
+    os.environ[WORKERS_ENV] = str(options.get("workers", 1))
+    uvicorn.run("backend.main:app", **options)
@@ -0,0 +1,74 @@
+"""Helpers for migrations that rebuild large tables."""
+
+import sqlite3
+import time
+from typing import Optional
+
+# Rows copied per statement by copy_rows
+COPY_CHUNK_SIZE = 50000
+
+
+def copy_rows(
+    conn: sqlite3.Connection,
+    source: str,
+    target: str,
+    columns: list[str],
+    expressions: Optional[list[str]] = None,
+    chunk_size: int = COPY_CHUNK_SIZE,
+) -> int:
+    """
+    Copy a table into a rebuilt one in rowid ranges, reporting progress.
+
+    Each chunk is a separate INSERT ... SELECT over a rowid range found by
+    seeking chunk_size rows ahead, so sparse rowids cost nothing, and a
+    multi-GB copy reports progress instead of running as one opaque
+    statement. The migration manager wraps the whole migration in one
+    transaction, so an interrupted copy is rolled back, never half-done.
+
+    Args:
+        conn: Connection the migration runs on
+        source: Table to copy from
+        target: Table to copy into
+        columns: Target columns
+        expressions: Source expressions per target column, defaults to the
+            column names
+        chunk_size: Rows per chunk
+
+    Returns:
+        Number of copied rows
+    """
+    expressions = expressions or columns
+    cursor = conn.cursor()
+    low, high, total = cursor.execute(
+        f"SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM {source}"
+    ).fetchone()
+    if not total:
+        return 0
+
+    insert = f"""
+        INSERT INTO {target} ({', '.join(columns)})
+        SELECT {', '.join(expressions)} FROM {source}
+        WHERE rowid > ? AND rowid <= ?
+    """
+
+    start = time.perf_counter()
+    copied = 0
+    last = low - 1
+    while last < high:
+        boundary = cursor.execute(
+            f"SELECT rowid FROM {source} WHERE rowid > ? ORDER BY rowid "
+            "LIMIT 1 OFFSET ?",
+            (last, chunk_size - 1),
+        ).fetchone()
+        upper = boundary[0] if boundary else high
+        copied += cursor.execute(insert, (last, upper)).rowcount
+        last = upper
+
+        if total > chunk_size:
+            elapsed = time.perf_counter() - start
+            print(
+                f"  {source} -> {target}: {copied}/{total} rows "
+                f"({copied * 100 // total}%) in {elapsed:.1f}s"
+            )
+
+    return copied
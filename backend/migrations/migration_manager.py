@@ -1,15 +1,50 @@
+import functools
 import importlib
 import sqlite3
+import time
 from pathlib import Path
 from typing import List, Optional
 
 
+@functools.cache
+def _migration_manifest(migrations_dir: Path) -> tuple[str, ...]:
+    """Migration versions in a directory, listed once per process."""
+    versions = [
+        file_path.stem
+        for file_path in migrations_dir.glob("*.py")
+        if file_path.name != "__init__.py"
+    ]
+    # Sort by numeric prefix
+    return tuple(sorted(versions, key=lambda x: int(x.split("_")[0])))
+
+
+class _MigrationConnection:
+    """
+    Connection handed to a migration's upgrade().
+
+    Migrations call commit() when they're done; the manager commits instead,
+    together with the migrations table entry, so each migration is applied
+    completely or not at all.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def commit(self) -> None:
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
 class MigrationManager:
     """Simple migration manager for SQLite database."""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, backup: bool = True):
         self.db_path = Path(db_path)
         self.migrations_dir = Path(__file__).parent / "versions"
+        # Copy an existing database aside before applying migrations to it
+        self.backup = backup
 
     def ensure_migrations_table(self, conn: sqlite3.Connection) -> None:
         """Create migrations table if it doesn't exist."""
@@ -37,14 +72,32 @@ class MigrationManager:
 
     def get_available_migrations(self) -> List[str]:
         """Get list of available migration files in order."""
-        migration_files = []
-        for file_path in self.migrations_dir.glob("*.py"):
-            if file_path.name != "__init__.py":
-                migration_files.append(file_path.stem)
-
-        # Sort by numeric prefix
-        migration_files.sort(key=lambda x: int(x.split("_")[0]))
-        return migration_files
+        return list(_migration_manifest(self.migrations_dir))
+
+    def is_up_to_date(self) -> bool:
+        """
+        Check with a single query whether every migration has been applied.
+
+        Compares the number of applied migrations and the latest one against
+        the cached manifest, without creating the migrations table or
+        importing any migration module.
+        """
+        available = self.get_available_migrations()
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            count, latest = conn.execute("""
+                SELECT COUNT(*),
+                       (SELECT version FROM migrations ORDER BY id DESC LIMIT 1)
+                FROM migrations
+                """).fetchone()
+        except sqlite3.OperationalError:
+            # No migrations table yet
+            return False
+        finally:
+            conn.close()
+        return count == len(available) and latest == (
+            available[-1] if available else None
+        )
 
     def load_migration_module(self, version: str):
         """Load migration module by version name."""
@@ -52,33 +105,87 @@ class MigrationManager:
         return importlib.import_module(module_name)
 
     def apply_migrations(self) -> List[str]:
-        """Apply all pending migrations."""
+        """
+        Apply all pending migrations.
+
+        Each migration and its migrations table entry commit in a single
+        transaction, so an interrupted or failed migration leaves nothing
+        behind and is simply run again next time. Before migrating a
+        database that already has data, an online backup is written next to
+        it.
+        """
         applied = []
 
-        with sqlite3.connect(str(self.db_path)) as conn:
+        # Autocommit mode, so transactions are exactly the BEGIN/COMMIT below
+        conn = sqlite3.connect(str(self.db_path), isolation_level=None)
+        try:
             conn.row_factory = sqlite3.Row
             self.ensure_migrations_table(conn)
             applied_migrations = self.get_applied_migrations(conn)
-
-            for version in self.get_available_migrations():
-                if version not in applied_migrations:
-                    print(f"Applying migration: {version}")
-
-                    module = self.load_migration_module(version)
-
-                    # Find and call upgrade function
-                    if hasattr(module, "upgrade"):
-                        module.upgrade(conn)
-                        self.mark_migration_applied(conn, version)
-                        applied.append(version)
-                    else:
-                        raise ValueError(f"Migration {version} has no upgrade function")
+            pending = [
+                version
+                for version in self.get_available_migrations()
+                if version not in applied_migrations
+            ]
+
+            if pending and applied_migrations and self.backup:
+                self.backup_database(conn, pending[0])
+
+            for version in pending:
+                print(f"Applying migration: {version}")
+                start = time.perf_counter()
+
+                module = self.load_migration_module(version)
+
+                # Find and call upgrade function
+                if not hasattr(module, "upgrade"):
+                    raise ValueError(f"Migration {version} has no upgrade function")
+
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    migration_conn = _MigrationConnection(conn)
+                    module.upgrade(migration_conn)
+                    self.mark_migration_applied(migration_conn, version)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+
+                applied.append(version)
+                print(f"Applied {version} in {time.perf_counter() - start:.2f}s")
 
             if not applied:
                 print("Database is up to date")
+        finally:
+            conn.close()
 
         return applied
 
+    def backup_database(self, conn: sqlite3.Connection, next_version: str) -> Path:
+        """
+        Copy the database with SQLite's online backup API.
+
+        Returns:
+            Path of the backup, named after the first migration to apply
+        """
+        backup_path = self.db_path.with_name(
+            f"{self.db_path.name}.before-{next_version}.bak"
+        )
+        print(f"Backing up database to {backup_path}")
+        start = time.perf_counter()
+
+        def progress(status, remaining, total):
+            done = total - remaining
+            print(f"  backup: {done}/{total} pages ({done * 100 // max(total, 1)}%)")
+
+        with sqlite3.connect(str(backup_path)) as target:
+            conn.backup(target, pages=16384, progress=progress)
+        target.close()
+
+        print(f"Backup finished in {time.perf_counter() - start:.2f}s")
+        return backup_path
+
     def get_current_version(self) -> Optional[str]:
         """Get the latest applied migration version."""
         with sqlite3.connect(str(self.db_path)) as conn:
@@ -3,6 +3,8 @@
 import sqlite3
 import os
 
+from backend.migrations.helpers import copy_rows
+
 
 def upgrade(conn: sqlite3.Connection) -> None:
     """Apply migration to add projects and label schemas."""
@@ -93,16 +95,31 @@ def upgrade(conn: sqlite3.Connection) -> None:
 
     # Copy data with default project_id
     if default_project_id:
-        cursor.execute(f"""
-            INSERT INTO images_new (
-                id, project_id, filename, filepath, width, height,
-                thumbnail_path, created_at
-            )
-            SELECT
-                id, {default_project_id}, filename, filepath, width, height,
-                thumbnail_path, created_at
-            FROM images
-        """)
+        copy_rows(
+            conn,
+            "images",
+            "images_new",
+            [
+                "id",
+                "project_id",
+                "filename",
+                "filepath",
+                "width",
+                "height",
+                "thumbnail_path",
+                "created_at",
+            ],
+            [
+                "id",
+                str(default_project_id),
+                "filename",
+                "filepath",
+                "width",
+                "height",
+                "thumbnail_path",
+                "created_at",
+            ],
+        )
 
     cursor.execute("DROP TABLE images")
     cursor.execute("ALTER TABLE images_new RENAME TO images")
@@ -2,6 +2,8 @@
 
 import sqlite3
 
+from backend.migrations.helpers import copy_rows
+
 
 def upgrade(conn: sqlite3.Connection) -> None:
     """Rename UV coordinate columns to geographic and convert data."""
@@ -32,21 +34,35 @@ def upgrade(conn: sqlite3.Connection) -> None:
     #
     # Note: uv_min_v (top) -> higher altitude (alt_max)
     #       uv_max_v (bottom) -> lower altitude (alt_min)
-    cursor.execute("""
-        INSERT INTO annotations_new (
-            id, image_id, label,
-            az_min, alt_min, az_max, alt_max,
-            color, created_at, updated_at
-        )
-        SELECT
-            id, image_id, label,
-            uv_min_u * 360.0,
-            90.0 - (uv_max_v * 180.0),
-            uv_max_u * 360.0,
-            90.0 - (uv_min_v * 180.0),
-            color, created_at, updated_at
-        FROM annotations
-    """)
+    copy_rows(
+        conn,
+        "annotations",
+        "annotations_new",
+        [
+            "id",
+            "image_id",
+            "label",
+            "az_min",
+            "alt_min",
+            "az_max",
+            "alt_max",
+            "color",
+            "created_at",
+            "updated_at",
+        ],
+        [
+            "id",
+            "image_id",
+            "label",
+            "uv_min_u * 360.0",
+            "90.0 - (uv_max_v * 180.0)",
+            "uv_max_u * 360.0",
+            "90.0 - (uv_min_v * 180.0)",
+            "color",
+            "created_at",
+            "updated_at",
+        ],
+    )
 
     # Drop old table and rename new one
     cursor.execute("DROP TABLE annotations")
@@ -0,0 +1,94 @@
+"""Add revision tracking and tombstones for incremental annotation sync."""
+
+import sqlite3
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    """Add a global revision counter, per-annotation revisions and tombstones."""
+    cursor = conn.cursor()
+
+    # 1. Key/value table holding the global revision counter and the oldest
+    #    revision for which tombstones are still retained
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+
+    # 2. Revision column, backfilled in id order for existing annotations
+    cursor.execute(
+        "ALTER TABLE annotations ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"
+    )
+    cursor.execute("UPDATE annotations SET revision = id")
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM annotations")
+    current_revision = cursor.fetchone()[0]
+
+    cursor.execute(
+        "INSERT OR IGNORE INTO sync_state (key, value) VALUES ('revision', ?)",
+        (current_revision,),
+    )
+    cursor.execute(
+        "INSERT OR IGNORE INTO sync_state (key, value) VALUES ('tombstone_floor', 0)"
+    )
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_annotations_revision
+        ON annotations(revision)
+    """)
+
+    # 3. Tombstones for deleted annotations
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS annotation_tombstones (
+            annotation_id INTEGER PRIMARY KEY,
+            image_id INTEGER NOT NULL,
+            project_id INTEGER,
+            revision INTEGER NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_annotation_tombstones_project_revision
+        ON annotation_tombstones(project_id, revision)
+    """)
+
+    # 4. Triggers stamping every write with the next revision. The WHEN
+    #    clause keeps the revision stamp itself from re-triggering.
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS annotations_revision_insert
+        AFTER INSERT ON annotations
+        BEGIN
+            UPDATE sync_state SET value = value + 1 WHERE key = 'revision';
+            UPDATE annotations
+            SET revision = (SELECT value FROM sync_state WHERE key = 'revision')
+            WHERE id = NEW.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS annotations_revision_update
+        AFTER UPDATE ON annotations
+        WHEN NEW.revision = OLD.revision
+        BEGIN
+            UPDATE sync_state SET value = value + 1 WHERE key = 'revision';
+            UPDATE annotations
+            SET revision = (SELECT value FROM sync_state WHERE key = 'revision')
+            WHERE id = NEW.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS annotations_revision_delete
+        AFTER DELETE ON annotations
+        BEGIN
+            UPDATE sync_state SET value = value + 1 WHERE key = 'revision';
+            INSERT OR REPLACE INTO annotation_tombstones (
+                annotation_id, image_id, project_id, revision
+            ) VALUES (
+                OLD.id,
+                OLD.image_id,
+                (SELECT project_id FROM images WHERE id = OLD.image_id),
+                (SELECT value FROM sync_state WHERE key = 'revision')
+            );
+        END
+    """)
+
+    conn.commit()
@@ -0,0 +1,17 @@
+"""Add covering index for per-image annotation revisions."""
+
+import sqlite3
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    """Index annotations by (image_id, revision) for per-image change checks."""
+    cursor = conn.cursor()
+
+    # Lets MAX(revision) per image be answered from the index alone, which
+    # materialized exports use to detect which images changed
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_annotations_image_revision
+        ON annotations(image_id, revision)
+    """)
+
+    conn.commit()
@@ -0,0 +1,156 @@
+"""Add project and image revisions for conditional requests."""
+
+import sqlite3
+
+NEXT_REVISION = """
+    UPDATE sync_state SET value = value + 1 WHERE key = 'revision';
+"""
+
+CURRENT_REVISION = "(SELECT value FROM sync_state WHERE key = 'revision')"
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    """Stamp projects and images with the global revision on every write."""
+    cursor = conn.cursor()
+
+    # 1. Revision columns, backfilled from the current global revision
+    cursor.execute(
+        "ALTER TABLE projects ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"
+    )
+    cursor.execute("ALTER TABLE images ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+    cursor.execute(f"UPDATE projects SET revision = {CURRENT_REVISION}")
+    cursor.execute(f"UPDATE images SET revision = {CURRENT_REVISION}")
+
+    # 2. Annotation writes also touch their image and project. Recreate the
+    #    triggers from 004 so the bump and the stamps happen in one body.
+    cursor.execute("DROP TRIGGER IF EXISTS annotations_revision_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS annotations_revision_update")
+    cursor.execute("DROP TRIGGER IF EXISTS annotations_revision_delete")
+
+    cursor.execute(f"""
+        CREATE TRIGGER annotations_revision_insert
+        AFTER INSERT ON annotations
+        BEGIN
+            {NEXT_REVISION}
+            UPDATE annotations SET revision = {CURRENT_REVISION}
+            WHERE id = NEW.id;
+            UPDATE images SET revision = {CURRENT_REVISION}
+            WHERE id = NEW.image_id;
+            UPDATE projects SET revision = {CURRENT_REVISION}
+            WHERE id = (SELECT project_id FROM images WHERE id = NEW.image_id);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER annotations_revision_update
+        AFTER UPDATE ON annotations
+        WHEN NEW.revision = OLD.revision
+        BEGIN
+            {NEXT_REVISION}
+            UPDATE annotations SET revision = {CURRENT_REVISION}
+            WHERE id = NEW.id;
+            UPDATE images SET revision = {CURRENT_REVISION}
+            WHERE id IN (OLD.image_id, NEW.image_id);
+            UPDATE projects SET revision = {CURRENT_REVISION}
+            WHERE id IN (
+                SELECT project_id FROM images
+                WHERE id IN (OLD.image_id, NEW.image_id)
+            );
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER annotations_revision_delete
+        AFTER DELETE ON annotations
+        BEGIN
+            {NEXT_REVISION}
+            INSERT OR REPLACE INTO annotation_tombstones (
+                annotation_id, image_id, project_id, revision
+            ) VALUES (
+                OLD.id,
+                OLD.image_id,
+                (SELECT project_id FROM images WHERE id = OLD.image_id),
+                {CURRENT_REVISION}
+            );
+            UPDATE images SET revision = {CURRENT_REVISION}
+            WHERE id = OLD.image_id;
+            UPDATE projects SET revision = {CURRENT_REVISION}
+            WHERE id = (SELECT project_id FROM images WHERE id = OLD.image_id);
+        END
+    """)
+
+    # 3. Image writes touch the image and its project. The WHEN clause skips
+    #    the revision stamps issued by the annotation triggers above.
+    cursor.execute(f"""
+        CREATE TRIGGER images_revision_insert
+        AFTER INSERT ON images
+        BEGIN
+            {NEXT_REVISION}
+            UPDATE images SET revision = {CURRENT_REVISION}
+            WHERE id = NEW.id;
+            UPDATE projects SET revision = {CURRENT_REVISION}
+            WHERE id = NEW.project_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER images_revision_update
+        AFTER UPDATE ON images
+        WHEN NEW.revision = OLD.revision
+        BEGIN
+            {NEXT_REVISION}
+            UPDATE images SET revision = {CURRENT_REVISION}
+            WHERE id = NEW.id;
+            UPDATE projects SET revision = {CURRENT_REVISION}
+            WHERE id IN (OLD.project_id, NEW.project_id);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER images_revision_delete
+        AFTER DELETE ON images
+        BEGIN
+            {NEXT_REVISION}
+            UPDATE projects SET revision = {CURRENT_REVISION}
+            WHERE id = OLD.project_id;
+        END
+    """)
+
+    # 4. Label schema writes touch their project
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        cursor.execute(f"""
+            CREATE TRIGGER label_schemas_revision_{event.lower()}
+            AFTER {event} ON label_schemas
+            BEGIN
+                {NEXT_REVISION}
+                UPDATE projects SET revision = {CURRENT_REVISION}
+                WHERE id = {row}.project_id;
+            END
+        """)
+
+    # 5. Project writes touch the project itself; deletes only bump the
+    #    global revision, which versions the project list
+    cursor.execute(f"""
+        CREATE TRIGGER projects_revision_insert
+        AFTER INSERT ON projects
+        BEGIN
+            {NEXT_REVISION}
+            UPDATE projects SET revision = {CURRENT_REVISION}
+            WHERE id = NEW.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER projects_revision_update
+        AFTER UPDATE ON projects
+        WHEN NEW.revision = OLD.revision
+        BEGIN
+            {NEXT_REVISION}
+            UPDATE projects SET revision = {CURRENT_REVISION}
+            WHERE id = NEW.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER projects_revision_delete
+        AFTER DELETE ON projects
+        BEGIN
+            {NEXT_REVISION}
+        END
+    """)
+
+    conn.commit()
@@ -0,0 +1,71 @@
+"""Add FTS5 full-text indexes over labels, filenames and projects."""
+
+import sqlite3
+
+
+def _create_fts_index(
+    cursor: sqlite3.Cursor, table: str, columns: list[str], tokenize: str
+) -> None:
+    """Create an external-content FTS5 index over a table, kept in sync by triggers."""
+    fts = f"{table}_fts"
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"NEW.{c}" for c in columns)
+    old_values = ", ".join(f"OLD.{c}" for c in columns)
+
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {column_list},
+            content='{table}',
+            content_rowid='id',
+            tokenize='{tokenize}',
+            prefix='2 3'
+        )
+    """)
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {column_list})
+            VALUES ('delete', OLD.id, {old_values});
+        END
+    """)
+    # Restricted to the indexed columns so revision stamps don't reindex
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_update
+        AFTER UPDATE OF {column_list} ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {column_list})
+            VALUES ('delete', OLD.id, {old_values});
+            INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+        END
+    """)
+
+    # Index existing rows
+    cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    """Create search indexes for annotation labels, image filenames and projects."""
+    cursor = conn.cursor()
+
+    # Underscores, dashes and dots separate tokens, so "cam3_*" matches
+    # cam3_001.jpg and "traffic" matches traffic_sign
+    tokenize = "unicode61 remove_diacritics 2"
+
+    _create_fts_index(cursor, "annotations", ["label"], tokenize)
+    _create_fts_index(cursor, "images", ["filename"], tokenize)
+    _create_fts_index(cursor, "projects", ["name", "description"], tokenize)
+
+    # Facet counts group matching annotations by label
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_annotations_label
+        ON annotations(label)
+    """)
+
+    conn.commit()
@@ -0,0 +1,20 @@
+"""Add perceptual hashes for duplicate image detection."""
+
+import sqlite3
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    """Add a perceptual hash column to images."""
+    cursor = conn.cursor()
+
+    # 64-bit DCT hash stored as a signed integer; NULL until the image is
+    # (re)scanned
+    cursor.execute("ALTER TABLE images ADD COLUMN phash INTEGER")
+
+    # Exact duplicates can be found from the index alone
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_images_phash
+        ON images(phash)
+    """)
+
+    conn.commit()
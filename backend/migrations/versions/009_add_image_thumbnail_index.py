@@ -0,0 +1,16 @@
+"""Index thumbnail paths, which clones of a project share."""
+
+import sqlite3
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    """Add an index for finding the images that use a thumbnail."""
+    cursor = conn.cursor()
+
+    # Deletes only remove thumbnails no remaining image refers to
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_images_thumbnail_path
+        ON images(thumbnail_path)
+    """)
+
+    conn.commit()
@@ -0,0 +1,39 @@
+"""Add the queue of derived assets built by worker processes."""
+
+import sqlite3
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    """Create the asset_jobs table."""
+    cursor = conn.cursor()
+
+    # One row per image and asset ("thumbnail", "preview", "display:webp",
+    # "texture"), kept once built so requeueing is deduplicated. run_after
+    # and lease_expires are Unix times.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS asset_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image_id INTEGER NOT NULL,
+            asset TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'queued'
+                CHECK (status IN ('queued', 'running', 'done', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_after REAL NOT NULL DEFAULT 0,
+            worker TEXT,
+            lease_expires REAL,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (image_id, asset),
+            FOREIGN KEY (image_id) REFERENCES images(id) ON DELETE CASCADE
+        )
+    """)
+
+    # Workers claim the highest priority queued job, oldest first
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_asset_jobs_claim
+        ON asset_jobs(status, priority DESC, id)
+    """)
+
+    conn.commit()
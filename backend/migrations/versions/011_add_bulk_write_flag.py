@@ -0,0 +1,61 @@
+"""Let set-based bulk writes skip the per-row revision triggers."""
+
+import sqlite3
+
+NEXT_REVISION = """
+    UPDATE sync_state SET value = value + 1 WHERE key = 'revision';
+"""
+
+CURRENT_REVISION = "(SELECT value FROM sync_state WHERE key = 'revision')"
+
+# Set by the bulk helpers for the length of their transaction, which stamps
+# revisions and tombstones for all rows at once
+NOT_BULK = "(SELECT value FROM sync_state WHERE key = 'bulk') = 0"
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    """Guard the annotation insert and delete revision triggers with a flag."""
+    cursor = conn.cursor()
+
+    cursor.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('bulk', 0)")
+
+    # Same bodies as in 006, plus the WHEN clause
+    cursor.execute("DROP TRIGGER IF EXISTS annotations_revision_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS annotations_revision_delete")
+
+    cursor.execute(f"""
+        CREATE TRIGGER annotations_revision_insert
+        AFTER INSERT ON annotations
+        WHEN {NOT_BULK}
+        BEGIN
+            {NEXT_REVISION}
+            UPDATE annotations SET revision = {CURRENT_REVISION}
+            WHERE id = NEW.id;
+            UPDATE images SET revision = {CURRENT_REVISION}
+            WHERE id = NEW.image_id;
+            UPDATE projects SET revision = {CURRENT_REVISION}
+            WHERE id = (SELECT project_id FROM images WHERE id = NEW.image_id);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER annotations_revision_delete
+        AFTER DELETE ON annotations
+        WHEN {NOT_BULK}
+        BEGIN
+            {NEXT_REVISION}
+            INSERT OR REPLACE INTO annotation_tombstones (
+                annotation_id, image_id, project_id, revision
+            ) VALUES (
+                OLD.id,
+                OLD.image_id,
+                (SELECT project_id FROM images WHERE id = OLD.image_id),
+                {CURRENT_REVISION}
+            );
+            UPDATE images SET revision = {CURRENT_REVISION}
+            WHERE id = OLD.image_id;
+            UPDATE projects SET revision = {CURRENT_REVISION}
+            WHERE id = (SELECT project_id FROM images WHERE id = OLD.image_id);
+        END
+    """)
+
+    conn.commit()
@@ -2,7 +2,6 @@ from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, Field, field_validator
 
-
 # =============================================================================
 # Project Models
 # =============================================================================
@@ -33,6 +32,27 @@ class ProjectResponse(ProjectBase):
         from_attributes = True
 
 
+class ProjectClone(BaseModel):
+    # Defaults to "<source name> (copy)" and the source's description
+    name: Optional[str] = None
+    description: Optional[str] = None
+    include_annotations: bool = True
+
+
+class ProjectMerge(BaseModel):
+    source_project_id: int
+    # Skip source boxes identical to one already on the matching image
+    skip_duplicates: bool = True
+
+
+class MergeResult(BaseModel):
+    images_added: int = 0
+    images_matched: int = 0
+    labels_added: int = 0
+    annotations_added: int = 0
+    annotations_skipped: int = 0
+
+
 class ProjectListResponse(ProjectBase):
     id: int
     images_path: str
@@ -160,6 +180,7 @@ class AnnotationUpdate(BaseModel):
 class AnnotationResponse(AnnotationBase):
     id: int
     image_id: int
+    revision: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -167,8 +188,249 @@ class AnnotationResponse(AnnotationBase):
         from_attributes = True
 
 
+class AnnotationTombstone(BaseModel):
+    id: int
+    image_id: int
+    revision: int
+
+
+class AnnotationChangesResponse(BaseModel):
+    """Annotation changes in a project since a given revision."""
+
+    # Pass as `since` on the next request
+    revision: int
+    has_more: bool = False
+    # The requested revision predates retained tombstones; reload everything
+    reset: bool = False
+    upserts: list[AnnotationResponse] = []
+    deletes: list[AnnotationTombstone] = []
+
+
+class DuplicateBox(BaseModel):
+    image_id: int
+    annotation_id: int
+    duplicate_id: int
+    label: Optional[str] = None
+    duplicate_label: Optional[str] = None
+    # Spherical intersection over union of the two boxes
+    iou: float
+
+
+class ImageLevel(BaseModel):
+    # "preview", "display" or "full"
+    name: str
+    width: int
+    height: int
+    # API path serving the level
+    url: str
+
+
+class ImageLevelsResponse(BaseModel):
+    # Smallest first; viewers show each level as it arrives
+    levels: list[ImageLevel]
+    # The display level as a GPU-compressed KTX2 texture, when the server
+    # can encode them
+    texture: Optional[ImageLevel] = None
+
+
+class ImageViewRequest(BaseModel):
+    # Image the client had open before this one, which gives the direction
+    # it is stepping through the image list in
+    previous_image_id: Optional[int] = None
+    # Image formats the client decodes besides JPEG ("avif", "webp"), so
+    # images are warmed in the format its image requests will negotiate;
+    # "ktx2" when it loads textures instead
+    formats: list[str] = Field([], max_length=8)
+
+
+class ImageViewResponse(BaseModel):
+    # Images being warmed in the background, nearest first
+    prefetching: list[int] = []
+
+
 class ScanResult(BaseModel):
     scanned: int
     added: int
     skipped: int
     errors: list[str] = []
+    # Files skipped as near-duplicates of images already in the project
+    duplicates: list[str] = []
+
+
+class ImportResult(BaseModel):
+    dry_run: bool = False
+    images_in_file: int = 0
+    images_matched: int = 0
+    # First filenames from the file with no image of that name in the project
+    unmatched_images: list[str] = []
+    annotations_in_file: int = 0
+    # Annotations written, or that would be written on a dry run
+    imported: int = 0
+    skipped_unmatched: int = 0
+    skipped_invalid: int = 0
+    # Labels not yet in the project's label schema
+    new_labels: list[str] = []
+
+
+class DuplicateImage(BaseModel):
+    id: int
+    project_id: int
+    filename: str
+    # Hamming distance between perceptual hashes, 0 for identical hashes
+    distance: int
+
+
+class DuplicateImageGroup(BaseModel):
+    image: DuplicateImage
+    duplicates: list[DuplicateImage]
+
+
+# =============================================================================
+# Statistics Models
+# =============================================================================
+
+
+class LabelCount(BaseModel):
+    label: str
+    count: int
+
+
+class BoxesPerImageStats(BaseModel):
+    mean: float
+    median: float
+    max: int
+    # histogram[n] = number of images with exactly n boxes
+    histogram: list[int]
+
+
+class AltitudeBin(BaseModel):
+    alt_min: float
+    alt_max: float
+    count: int
+    # Box centers per steradian in this band
+    density: float
+
+
+class SphericalHistogram(BaseModel):
+    bin_deg: float
+    az_bins: int
+    alt_bins: int
+    # Box centers per steradian; rows run from +90 (top) to -90 altitude,
+    # columns from 0 to 360 azimuth, matching the equirectangular image
+    density: list[list[float]]
+
+
+class ProjectStatsResponse(BaseModel):
+    project_id: int
+    revision: int
+    image_count: int
+    annotation_count: int
+    label_histogram: list[LabelCount]
+    boxes_per_image: BoxesPerImageStats
+    altitude_profile: list[AltitudeBin]
+    heatmap: SphericalHistogram
+
+
+# =============================================================================
+# Search Models
+# =============================================================================
+
+
+class SearchHit(BaseModel):
+    kind: str
+    id: int
+    project_id: int
+    image_id: Optional[int] = None
+    title: str
+    label: Optional[str] = None
+
+
+class SearchFacet(BaseModel):
+    value: Optional[str] = None
+    id: Optional[int] = None
+    count: int
+
+
+class SearchResponse(BaseModel):
+    query: str
+    kind: str
+    total: int
+    limit: int
+    offset: int
+    results: list[SearchHit] = []
+    facets: dict[str, list[SearchFacet]] = {}
+
+
+# =============================================================================
+# Maintenance Models
+# =============================================================================
+
+
+class MaintenanceReport(BaseModel):
+    started_at: datetime
+    duration_ms: float = 0
+    steps: list[str] = []
+    # Rows whose parent no longer exists
+    orphan_annotations: int = 0
+    orphan_images: int = 0
+    orphan_labels: int = 0
+    orphan_tombstones: int = 0
+    # Tombstones older than the retention period
+    pruned_tombstones: int = 0
+    # Thumbnails and export directories no row refers to
+    orphan_files: int = 0
+    reclaimed_file_bytes: int = 0
+    # Database plus WAL file size before and after
+    db_bytes_before: int = 0
+    db_bytes_after: int = 0
+    reclaimed_db_bytes: int = 0
+    # Pages returned to the filesystem by (incremental) vacuum
+    vacuumed_pages: int = 0
+    auto_vacuum: str = "none"
+
+
+# =============================================================================
+# Asset Queue Models
+# =============================================================================
+
+
+class AssetEnqueueRequest(BaseModel):
+    # Asset names ("thumbnail", "preview", "display:webp", "texture"); by
+    # default the ones assets.precompute builds for new images
+    assets: Optional[list[str]] = Field(None, max_length=16)
+    # Build again assets already built, e.g. after a quality change
+    rebuild: bool = False
+    # Higher runs first; defaults to the asset's own priority
+    priority: Optional[int] = None
+
+
+class AssetEnqueueResult(BaseModel):
+    queued: int
+
+
+class AssetCount(BaseModel):
+    asset: str
+    queued: int = 0
+    running: int = 0
+    done: int = 0
+    failed: int = 0
+
+
+class AssetJobResponse(BaseModel):
+    image_id: int
+    asset: str
+    priority: int
+    status: str
+    attempts: int
+    worker: Optional[str] = None
+    error: Optional[str] = None
+    updated_at: datetime
+
+
+class AssetQueueStatus(BaseModel):
+    # Jobs by asset and status
+    assets: list[AssetCount] = []
+    # What each worker is building
+    running: list[AssetJobResponse] = []
+    # Most recent jobs that ran out of attempts
+    failed: list[AssetJobResponse] = []
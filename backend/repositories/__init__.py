@@ -0,0 +1,56 @@
+"""Storage backends for projects, images, labels and annotations."""
+
+from typing import Optional
+
+from backend.config import DatabaseConfig
+from backend.database import disable_database, init_database
+from backend.repositories.base import Repository
+
+_repository: Optional[Repository] = None
+
+
+def init_repository(config: DatabaseConfig) -> Repository:
+    """Open the storage backend selected by the database config."""
+    global _repository
+    close_repository()
+
+    if config.backend == "postgres":
+        from backend.repositories.postgres import PostgresRepository
+
+        if not config.url:
+            raise ValueError("database.url is required for the postgres backend")
+        _repository = PostgresRepository(
+            config.url, min_size=config.pool_min_size, max_size=config.pool_max_size
+        )
+        disable_database(
+            "This feature needs the sqlite database backend "
+            "(database.backend is postgres)"
+        )
+    else:
+        from backend.repositories.sqlite import SQLiteRepository
+
+        init_database(config.path)
+        _repository = SQLiteRepository()
+
+    return _repository
+
+
+def get_repository() -> Repository:
+    """Get the storage backend, SQLite over init_database() by default."""
+    global _repository
+    if _repository is None:
+        from backend.repositories.sqlite import SQLiteRepository
+
+        _repository = SQLiteRepository()
+    return _repository
+
+
+def close_repository() -> None:
+    """Close the storage backend's connections."""
+    global _repository
+    if _repository is not None:
+        _repository.close()
+        _repository = None
+
+
+__all__ = ["Repository", "close_repository", "get_repository", "init_repository"]
@@ -0,0 +1,240 @@
+"""Storage contract for projects, images, labels and annotations."""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Mapping, Optional, Sequence
+
+# A result row; columns are read by name, as with sqlite3.Row
+Row = Mapping[str, Any]
+
+# Columns the update methods may set, per table
+UPDATABLE_COLUMNS = {
+    "projects": ("name", "description", "images_path"),
+    "label_schemas": ("label_name", "color", "sort_order"),
+    "annotations": ("label", "az_min", "alt_min", "az_max", "alt_max", "color"),
+}
+
+
+def check_columns(table: str, changes: dict[str, Any]) -> list[str]:
+    """
+    Get the changed columns in table order, rejecting any others.
+
+    Column names end up in SQL, so only known ones get through.
+
+    Raises:
+        ValueError: If a column can't be updated
+    """
+    allowed = UPDATABLE_COLUMNS[table]
+    unknown = set(changes) - set(allowed)
+    if unknown:
+        raise ValueError(f"Cannot update {table}: {', '.join(sorted(unknown))}")
+    return [column for column in allowed if column in changes]
+
+
+class Repository(ABC):
+    """
+    Reads and writes the core annotation data.
+
+    Every write bumps the global revision and stamps it on the changed row
+    and on its image and project, and deleting an annotation leaves a
+    tombstone, so ETags and the changes feed work the same on every
+    backend. Methods return rows with the columns of the SQLite schema.
+    """
+
+    name: str
+
+    def close(self) -> None:
+        """Release connections; the repository isn't used afterwards."""
+
+    # Revisions
+
+    @abstractmethod
+    def get_revision(self) -> int:
+        """Get the global revision, which changes on any write."""
+
+    @abstractmethod
+    def get_sync_state(self) -> dict[str, int]:
+        """Get the revision and the tombstone floor of the changes feed."""
+
+    # Projects
+
+    @abstractmethod
+    def create_project(
+        self, name: str, description: Optional[str], images_path: str
+    ) -> int:
+        """Insert a project and return its ID."""
+
+    @abstractmethod
+    def get_project(self, project_id: int) -> Optional[Row]:
+        """Get a project row."""
+
+    @abstractmethod
+    def get_project_revision(self, project_id: int) -> Optional[int]:
+        """Get a project's revision, or None if it doesn't exist."""
+
+    @abstractmethod
+    def list_projects(self) -> list[Row]:
+        """List projects, newest first, with image_count and annotation_count."""
+
+    @abstractmethod
+    def update_project(self, project_id: int, changes: dict[str, Any]) -> None:
+        """Set columns of a project and its updated_at."""
+
+    @abstractmethod
+    def delete_project(self, project_id: int) -> Optional[list[str]]:
+        """
+        Delete a project with its labels, images, annotations and tombstones.
+
+        Returns:
+            Thumbnail paths no remaining image uses, or None if the project
+            doesn't exist
+        """
+
+    # Label schemas
+
+    @abstractmethod
+    def list_labels(self, project_id: int) -> list[Row]:
+        """List a project's labels by sort order and name."""
+
+    @abstractmethod
+    def get_label(self, label_id: int) -> Optional[Row]:
+        """Get a label row."""
+
+    @abstractmethod
+    def create_label(
+        self,
+        project_id: int,
+        label_name: str,
+        color: Optional[str],
+        sort_order: int,
+    ) -> int:
+        """Insert a label and return its ID."""
+
+    @abstractmethod
+    def update_label(self, label_id: int, changes: dict[str, Any]) -> None:
+        """Set columns of a label."""
+
+    @abstractmethod
+    def delete_label(self, label_id: int) -> bool:
+        """Delete a label; False if it doesn't exist."""
+
+    # Images
+
+    @abstractmethod
+    def list_images(self, project_id: int) -> list[Row]:
+        """List a project's images, newest first, with annotation_count."""
+
+    @abstractmethod
+    def list_image_ids(self, project_id: int) -> list[int]:
+        """List a project's image IDs in the order of list_images."""
+
+    @abstractmethod
+    def get_image(self, image_id: int) -> Optional[Row]:
+        """Get an image row."""
+
+    @abstractmethod
+    def get_image_revision(self, image_id: int) -> Optional[int]:
+        """Get an image's revision, or None if it doesn't exist."""
+
+    @abstractmethod
+    def image_in_project(self, project_id: int, image_id: int) -> bool:
+        """Check that an image belongs to a project."""
+
+    @abstractmethod
+    def find_image(self, project_id: int, filename: str) -> Optional[Row]:
+        """Get the id and phash of a project's image by filename."""
+
+    @abstractmethod
+    def add_image(self, values: dict[str, Any]) -> int:
+        """
+        Insert an image and return its ID.
+
+        Args:
+            values: project_id, filename, filepath, width, height,
+                thumbnail_path and phash
+        """
+
+    @abstractmethod
+    def set_image_hash(self, image_id: int, phash: int) -> None:
+        """Store an image's perceptual hash."""
+
+    @abstractmethod
+    def list_image_hashes(self, project_id: int) -> list[Row]:
+        """List filename and phash of a project's hashed images."""
+
+    @abstractmethod
+    def delete_image(self, image_id: int) -> Optional[list[str]]:
+        """
+        Delete an image and its annotations, leaving tombstones.
+
+        Returns:
+            Its thumbnail path if no other image uses it, or None if the
+            image doesn't exist
+        """
+
+    # Annotations
+
+    @abstractmethod
+    def create_annotation(self, values: dict[str, Any]) -> int:
+        """
+        Insert an annotation and return its ID.
+
+        Args:
+            values: image_id, label, az_min, alt_min, az_max, alt_max, color
+        """
+
+    @abstractmethod
+    def get_annotation(self, annotation_id: int) -> Optional[Row]:
+        """Get an annotation row."""
+
+    @abstractmethod
+    def list_image_annotations(self, image_id: int) -> list[Row]:
+        """List an image's annotations in creation order."""
+
+    @abstractmethod
+    def list_project_annotations(self, project_id: int) -> list[Row]:
+        """List a project's annotations by image, then creation order."""
+
+    @abstractmethod
+    def packed_image_annotations(self, image_id: int) -> list[Sequence]:
+        """An image's annotations in the column order of pack_annotations."""
+
+    @abstractmethod
+    def packed_project_annotations(self, project_id: int) -> list[Sequence]:
+        """A project's annotations in the column order of pack_annotations."""
+
+    @abstractmethod
+    def changed_annotations(self, project_id: int, since: int, limit: int) -> list[Row]:
+        """A project's annotations with a revision after since, in order."""
+
+    @abstractmethod
+    def deleted_annotations(self, project_id: int, since: int, limit: int) -> list[Row]:
+        """
+        A project's tombstones with a revision after since, in order.
+
+        Rows have annotation_id, image_id and revision.
+        """
+
+    @abstractmethod
+    def update_annotation(self, annotation_id: int, changes: dict[str, Any]) -> None:
+        """Set columns of an annotation and its updated_at to now."""
+
+    @abstractmethod
+    def update_annotations(
+        self, updates: Sequence[tuple[int, dict[str, Any], datetime]]
+    ) -> None:
+        """
+        Write several annotations' changes in one transaction.
+
+        Args:
+            updates: (annotation_id, changed columns, updated_at) per
+                annotation
+        """
+
+    @abstractmethod
+    def delete_annotation(self, annotation_id: int) -> bool:
+        """Delete an annotation, leaving a tombstone; False if it doesn't exist."""
+
+    @abstractmethod
+    def delete_image_annotations(self, image_id: int) -> int:
+        """Delete an image's annotations, leaving tombstones; returns the count."""
@@ -0,0 +1,219 @@
+"""
+Set-based writes of many annotations and images in the SQLite database.
+
+The helpers run inside the caller's transaction, so imports, clones,
+merges and deletes can combine them with statements of their own.
+"""
+
+_BULK_COLUMNS = (
+    "image_id, label, az_min, alt_min, az_max, alt_max, color, created_at, updated_at"
+)
+
+
+def _set_bulk(conn, active: bool) -> None:
+    """Switch the per-row annotation revision triggers off or back on."""
+    conn.execute(
+        "UPDATE sync_state SET value = ? WHERE key = 'bulk'", (1 if active else 0,)
+    )
+
+
+def bulk_insert_annotations(conn, source_sql: str, params: tuple = ()) -> int:
+    """
+    Insert many annotations with one INSERT ... SELECT.
+
+    The per-row revision trigger, four updates per inserted row, dominates
+    bulk inserts. It is skipped while the sync_state "bulk" flag is set, so
+    the flag is set inside the caller's transaction and the revision stamps
+    are applied set-based. Each row still gets its own revision, so the
+    changes feed can page through the inserted rows. The label index is
+    kept up to date by its trigger. The caller commits or rolls back.
+
+    Args:
+        conn: Connection with an open transaction
+        source_sql: SELECT yielding image_id, label, az_min, alt_min,
+            az_max, alt_max, color, created_at and updated_at columns
+        params: Parameters for source_sql
+
+    Returns:
+        Number of inserted annotations
+    """
+    # New ids must also stay above deleted ones (AUTOINCREMENT)
+    last_id = conn.execute("""
+        SELECT MAX(
+            (SELECT COALESCE(MAX(id), 0) FROM annotations),
+            (SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence
+             WHERE name = 'annotations')
+        )
+        """).fetchone()[0]
+    base = conn.execute(
+        "SELECT value FROM sync_state WHERE key = 'revision'"
+    ).fetchone()[0]
+
+    # Ids and revisions are assigned in the insert itself, one per row
+    _set_bulk(conn, True)
+    cursor = conn.execute(
+        f"""
+        INSERT INTO annotations (id, revision, {_BULK_COLUMNS})
+        SELECT ? + ROW_NUMBER() OVER (ORDER BY image_id, created_at),
+               ? + ROW_NUMBER() OVER (ORDER BY image_id, created_at),
+               {_BULK_COLUMNS}
+        FROM ({source_sql})
+        """,
+        (last_id, base, *params),
+    )
+    inserted = cursor.rowcount
+    _set_bulk(conn, False)
+
+    if inserted:
+        revision = base + inserted
+        conn.execute(
+            "UPDATE sync_state SET value = ? WHERE key = 'revision'", (revision,)
+        )
+        conn.execute(
+            """
+            UPDATE images SET revision = ?
+            WHERE id IN (SELECT DISTINCT image_id FROM annotations WHERE id > ?)
+            """,
+            (revision, last_id),
+        )
+        conn.execute(
+            """
+            UPDATE projects SET revision = ?
+            WHERE id IN (
+                SELECT DISTINCT i.project_id FROM annotations a
+                JOIN images i ON i.id = a.image_id
+                WHERE a.id > ?
+            )
+            """,
+            (revision, last_id),
+        )
+
+    return inserted
+
+
+def bulk_delete_annotations(
+    conn, image_ids_sql: str, params: tuple = (), tombstones: bool = True
+) -> int:
+    """
+    Delete all annotations of a set of images set-based.
+
+    Like bulk_insert_annotations, the per-row revision trigger is skipped
+    while the "bulk" flag is set, and the tombstones and revision stamps
+    are written with a few set-based statements instead.
+
+    Args:
+        conn: Connection with an open transaction
+        image_ids_sql: SELECT yielding the ids of the images
+        params: Parameters for image_ids_sql
+        tombstones: Record tombstones for the changes feed; not needed
+            when the whole project is being deleted
+
+    Returns:
+        Number of deleted annotations
+    """
+    conn.execute(
+        f"""
+        CREATE TEMP TABLE bulk_deleted AS
+        SELECT a.id, a.image_id, i.project_id
+        FROM annotations a LEFT JOIN images i ON i.id = a.image_id
+        WHERE a.image_id IN ({image_ids_sql})
+        """,
+        params,
+    )
+    _set_bulk(conn, True)
+    deleted = conn.execute(
+        "DELETE FROM annotations WHERE id IN (SELECT id FROM bulk_deleted)"
+    ).rowcount
+    _set_bulk(conn, False)
+
+    if deleted and tombstones:
+        base = conn.execute(
+            "SELECT value FROM sync_state WHERE key = 'revision'"
+        ).fetchone()[0]
+        # One revision per tombstone, so the changes feed can page through them
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO annotation_tombstones
+                (annotation_id, image_id, project_id, revision)
+            SELECT id, image_id, project_id, ? + ROW_NUMBER() OVER (ORDER BY id)
+            FROM bulk_deleted
+            """,
+            (base,),
+        )
+        revision = base + deleted
+        conn.execute(
+            "UPDATE sync_state SET value = ? WHERE key = 'revision'", (revision,)
+        )
+        conn.execute(
+            """
+            UPDATE images SET revision = ?
+            WHERE id IN (SELECT DISTINCT image_id FROM bulk_deleted)
+            """,
+            (revision,),
+        )
+        conn.execute(
+            """
+            UPDATE projects SET revision = ?
+            WHERE id IN (SELECT DISTINCT project_id FROM bulk_deleted)
+            """,
+            (revision,),
+        )
+
+    conn.execute("DROP TABLE bulk_deleted")
+    return deleted
+
+
+def bulk_delete_images(
+    conn,
+    where_sql: str,
+    params: tuple = (),
+    tombstones: bool = True,
+    row_triggers: bool = False,
+) -> list[str]:
+    """
+    Delete the images matching a WHERE clause along with their annotations.
+
+    Runs inside the caller's transaction; the foreign keys aren't enforced,
+    so annotations are deleted explicitly first.
+
+    Args:
+        row_triggers: Delete the annotations with a plain DELETE and let
+            the row triggers record them, cheaper for a single image
+
+    Returns:
+        Thumbnail paths no remaining image uses (clones share thumbnails),
+        for the caller to hand to the file cleaner after committing
+    """
+    image_ids_sql = f"SELECT id FROM images WHERE {where_sql}"
+    if row_triggers:
+        conn.execute(
+            f"DELETE FROM annotations WHERE image_id IN ({image_ids_sql})", params
+        )
+    else:
+        bulk_delete_annotations(conn, image_ids_sql, params, tombstones)
+    thumbnails = [
+        row[0]
+        for row in conn.execute(
+            f"""
+            SELECT DISTINCT thumbnail_path FROM images
+            WHERE {where_sql} AND thumbnail_path IS NOT NULL
+            """,
+            params,
+        )
+    ]
+    conn.execute(
+        f"""
+        DELETE FROM asset_jobs
+        WHERE image_id IN (SELECT id FROM images WHERE {where_sql})
+        """,
+        params,
+    )
+    conn.execute(f"DELETE FROM images WHERE {where_sql}", params)
+
+    return [
+        path
+        for path in thumbnails
+        if not conn.execute(
+            "SELECT 1 FROM images WHERE thumbnail_path = ? LIMIT 1", (path,)
+        ).fetchone()
+    ]
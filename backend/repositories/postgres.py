@@ -0,0 +1,492 @@
+"""Repository backed by PostgreSQL, shared by several API nodes."""
+
+import asyncio
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from backend.repositories.base import Repository, Row, check_columns
+
+SCHEMA_PATH = Path(__file__).with_name("postgres_schema.sql")
+
+# Held while applying the schema, so nodes starting together apply it once
+_SCHEMA_LOCK_KEY = 0x5350484552454D4B
+
+PACKED_COLUMNS = """
+    a.id, a.image_id, a.label, a.color,
+    EXTRACT(EPOCH FROM a.created_at)::bigint,
+    EXTRACT(EPOCH FROM a.updated_at)::bigint,
+    a.az_min, a.alt_min, a.az_max, a.alt_max
+"""
+
+
+def _rowcount(status: str) -> int:
+    """Rows affected, from a command status such as "DELETE 3"."""
+    return int(status.rsplit(" ", 1)[-1])
+
+
+class PostgresRepository(Repository):
+    """
+    Repository over an asyncpg connection pool.
+
+    Services are synchronous and called from the event loop, from request
+    threads and from background threads alike, so the pool lives on a
+    private event loop thread and each method waits for its query there.
+    Revisions, stamps and tombstones are maintained by the triggers in
+    postgres_schema.sql.
+    """
+
+    name = "postgres"
+
+    def __init__(self, url: str, min_size: int = 1, max_size: int = 10):
+        try:
+            import asyncpg
+        except ImportError as e:
+            raise ImportError(
+                "The postgres backend requires asyncpg "
+                "(install spheremark[postgres])"
+            ) from e
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="postgres", daemon=True
+        )
+        self._thread.start()
+        try:
+            self._pool = self._run(self._open_pool(asyncpg, url, min_size, max_size))
+        except BaseException:
+            self._stop_loop()
+            raise
+
+    @staticmethod
+    async def _open_pool(asyncpg, url: str, min_size: int, max_size: int):
+        # The pool binds to the loop it's created on, so it's made there
+        pool = await asyncpg.create_pool(url, min_size=min_size, max_size=max_size)
+        try:
+            await PostgresRepository._apply_schema(pool)
+        except BaseException:
+            await pool.close()
+            raise
+        return pool
+
+    @staticmethod
+    async def _apply_schema(pool) -> None:
+        async with pool.acquire() as conn:
+            await conn.execute("SELECT pg_advisory_lock($1)", _SCHEMA_LOCK_KEY)
+            try:
+                await conn.execute(SCHEMA_PATH.read_text())
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", _SCHEMA_LOCK_KEY)
+
+    def close(self) -> None:
+        self._run(self._pool.close())
+        self._stop_loop()
+
+    def _stop_loop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _run(self, coro) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _fetch(self, query: str, *args) -> list[Row]:
+        return self._run(self._pool.fetch(query, *args))
+
+    def _fetchrow(self, query: str, *args) -> Optional[Row]:
+        return self._run(self._pool.fetchrow(query, *args))
+
+    def _fetchval(self, query: str, *args) -> Any:
+        return self._run(self._pool.fetchval(query, *args))
+
+    def _execute(self, query: str, *args) -> str:
+        return self._run(self._pool.execute(query, *args))
+
+    def _transaction(self, work) -> Any:
+        """Run an async work(conn) in one transaction."""
+
+        async def run():
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    return await work(conn)
+
+        return self._run(run())
+
+    @staticmethod
+    async def _unused_thumbnails(conn, paths: list[str]) -> list[str]:
+        """Thumbnail paths no image refers to anymore; clones share them."""
+        if not paths:
+            return []
+        used = await conn.fetch(
+            "SELECT DISTINCT thumbnail_path FROM images WHERE thumbnail_path = ANY($1)",
+            paths,
+        )
+        return sorted(set(paths) - {row["thumbnail_path"] for row in used})
+
+    # Revisions
+
+    def get_revision(self) -> int:
+        value = self._fetchval("SELECT value FROM sync_state WHERE key = 'revision'")
+        return value or 0
+
+    def get_sync_state(self) -> dict[str, int]:
+        return {
+            row["key"]: row["value"]
+            for row in self._fetch("SELECT key, value FROM sync_state")
+        }
+
+    # Projects
+
+    def create_project(
+        self, name: str, description: Optional[str], images_path: str
+    ) -> int:
+        return self._fetchval(
+            """
+            INSERT INTO projects (name, description, images_path)
+            VALUES ($1, $2, $3)
+            RETURNING id
+            """,
+            name,
+            description,
+            images_path,
+        )
+
+    def get_project(self, project_id: int) -> Optional[Row]:
+        return self._fetchrow("SELECT * FROM projects WHERE id = $1", project_id)
+
+    def get_project_revision(self, project_id: int) -> Optional[int]:
+        return self._fetchval("SELECT revision FROM projects WHERE id = $1", project_id)
+
+    def list_projects(self) -> list[Row]:
+        # Counted per table rather than over a join of both
+        return self._fetch("""
+            SELECT
+                p.id,
+                p.name,
+                p.description,
+                p.images_path,
+                p.created_at,
+                (SELECT COUNT(*) FROM images i WHERE i.project_id = p.id)
+                    AS image_count,
+                (
+                    SELECT COUNT(*) FROM annotations a
+                    JOIN images i ON i.id = a.image_id
+                    WHERE i.project_id = p.id
+                ) AS annotation_count
+            FROM projects p
+            ORDER BY p.created_at DESC, p.id DESC
+        """)
+
+    def update_project(self, project_id: int, changes: dict[str, Any]) -> None:
+        columns = check_columns("projects", changes)
+        assignments = "".join(f"{c} = ${i}, " for i, c in enumerate(columns, 2))
+        self._execute(
+            f"UPDATE projects SET {assignments}"
+            "updated_at = date_trunc('second', now() AT TIME ZONE 'utc') WHERE id = $1",
+            project_id,
+            *(changes[column] for column in columns),
+        )
+
+    def delete_project(self, project_id: int) -> Optional[list[str]]:
+        async def delete(conn):
+            await conn.execute("SET LOCAL spheremark.skip_tombstones = 'on'")
+            thumbnails = [
+                row["thumbnail_path"]
+                for row in await conn.fetch(
+                    """
+                    SELECT DISTINCT thumbnail_path FROM images
+                    WHERE project_id = $1 AND thumbnail_path IS NOT NULL
+                    """,
+                    project_id,
+                )
+            ]
+            # Labels, images and annotations go with it by cascade
+            status = await conn.execute(
+                "DELETE FROM projects WHERE id = $1", project_id
+            )
+            if not _rowcount(status):
+                return None
+            await conn.execute(
+                "DELETE FROM annotation_tombstones WHERE project_id = $1", project_id
+            )
+            return await self._unused_thumbnails(conn, thumbnails)
+
+        return self._transaction(delete)
+
+    # Label schemas
+
+    def list_labels(self, project_id: int) -> list[Row]:
+        return self._fetch(
+            """
+            SELECT * FROM label_schemas
+            WHERE project_id = $1
+            ORDER BY sort_order, label_name
+            """,
+            project_id,
+        )
+
+    def get_label(self, label_id: int) -> Optional[Row]:
+        return self._fetchrow("SELECT * FROM label_schemas WHERE id = $1", label_id)
+
+    def create_label(
+        self,
+        project_id: int,
+        label_name: str,
+        color: Optional[str],
+        sort_order: int,
+    ) -> int:
+        return self._fetchval(
+            """
+            INSERT INTO label_schemas (project_id, label_name, color, sort_order)
+            VALUES ($1, $2, $3, $4)
+            RETURNING id
+            """,
+            project_id,
+            label_name,
+            color,
+            sort_order,
+        )
+
+    def update_label(self, label_id: int, changes: dict[str, Any]) -> None:
+        columns = check_columns("label_schemas", changes)
+        if not columns:
+            return
+        assignments = ", ".join(f"{c} = ${i}" for i, c in enumerate(columns, 2))
+        self._execute(
+            f"UPDATE label_schemas SET {assignments} WHERE id = $1",
+            label_id,
+            *(changes[column] for column in columns),
+        )
+
+    def delete_label(self, label_id: int) -> bool:
+        status = self._execute("DELETE FROM label_schemas WHERE id = $1", label_id)
+        return _rowcount(status) > 0
+
+    # Images
+
+    def list_images(self, project_id: int) -> list[Row]:
+        return self._fetch(
+            """
+            SELECT
+                i.id,
+                i.project_id,
+                i.filename,
+                i.width,
+                i.height,
+                i.thumbnail_path,
+                COUNT(a.id) AS annotation_count
+            FROM images i
+            LEFT JOIN annotations a ON i.id = a.image_id
+            WHERE i.project_id = $1
+            GROUP BY i.id
+            ORDER BY i.created_at DESC, i.id DESC
+            """,
+            project_id,
+        )
+
+    def list_image_ids(self, project_id: int) -> list[int]:
+        rows = self._fetch(
+            """
+            SELECT id FROM images
+            WHERE project_id = $1
+            ORDER BY created_at DESC, id DESC
+            """,
+            project_id,
+        )
+        return [row["id"] for row in rows]
+
+    def get_image(self, image_id: int) -> Optional[Row]:
+        return self._fetchrow("SELECT * FROM images WHERE id = $1", image_id)
+
+    def get_image_revision(self, image_id: int) -> Optional[int]:
+        return self._fetchval("SELECT revision FROM images WHERE id = $1", image_id)
+
+    def image_in_project(self, project_id: int, image_id: int) -> bool:
+        row = self._fetchrow(
+            "SELECT 1 FROM images WHERE id = $1 AND project_id = $2",
+            image_id,
+            project_id,
+        )
+        return row is not None
+
+    def find_image(self, project_id: int, filename: str) -> Optional[Row]:
+        return self._fetchrow(
+            "SELECT id, phash FROM images WHERE project_id = $1 AND filename = $2",
+            project_id,
+            filename,
+        )
+
+    def add_image(self, values: dict[str, Any]) -> int:
+        return self._fetchval(
+            """
+            INSERT INTO images (
+                project_id, filename, filepath, width, height,
+                thumbnail_path, phash
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+            RETURNING id
+            """,
+            values["project_id"],
+            values["filename"],
+            values["filepath"],
+            values["width"],
+            values["height"],
+            values["thumbnail_path"],
+            values["phash"],
+        )
+
+    def set_image_hash(self, image_id: int, phash: int) -> None:
+        self._execute("UPDATE images SET phash = $1 WHERE id = $2", phash, image_id)
+
+    def list_image_hashes(self, project_id: int) -> list[Row]:
+        return self._fetch(
+            "SELECT filename, phash FROM images "
+            "WHERE project_id = $1 AND phash IS NOT NULL",
+            project_id,
+        )
+
+    def delete_image(self, image_id: int) -> Optional[list[str]]:
+        async def delete(conn):
+            thumbnail = await conn.fetchrow(
+                "SELECT thumbnail_path FROM images WHERE id = $1", image_id
+            )
+            if thumbnail is None:
+                return None
+            # Annotations first, while their tombstones can still look up
+            # the image's project
+            await conn.execute("DELETE FROM annotations WHERE image_id = $1", image_id)
+            await conn.execute("DELETE FROM images WHERE id = $1", image_id)
+            paths = [thumbnail["thumbnail_path"]] if thumbnail["thumbnail_path"] else []
+            return await self._unused_thumbnails(conn, paths)
+
+        return self._transaction(delete)
+
+    # Annotations
+
+    def create_annotation(self, values: dict[str, Any]) -> int:
+        return self._fetchval(
+            """
+            INSERT INTO annotations (
+                image_id, label, az_min, alt_min, az_max, alt_max, color
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+            RETURNING id
+            """,
+            values["image_id"],
+            values["label"],
+            values["az_min"],
+            values["alt_min"],
+            values["az_max"],
+            values["alt_max"],
+            values["color"],
+        )
+
+    def get_annotation(self, annotation_id: int) -> Optional[Row]:
+        return self._fetchrow("SELECT * FROM annotations WHERE id = $1", annotation_id)
+
+    def list_image_annotations(self, image_id: int) -> list[Row]:
+        return self._fetch(
+            "SELECT * FROM annotations WHERE image_id = $1 ORDER BY created_at, id",
+            image_id,
+        )
+
+    def list_project_annotations(self, project_id: int) -> list[Row]:
+        return self._fetch(
+            """
+            SELECT a.* FROM annotations a
+            JOIN images i ON i.id = a.image_id
+            WHERE i.project_id = $1
+            ORDER BY a.image_id, a.created_at, a.id
+            """,
+            project_id,
+        )
+
+    def packed_image_annotations(self, image_id: int) -> list[Sequence]:
+        return self._fetch(
+            f"""
+            SELECT {PACKED_COLUMNS} FROM annotations a
+            WHERE a.image_id = $1
+            ORDER BY a.created_at, a.id
+            """,
+            image_id,
+        )
+
+    def packed_project_annotations(self, project_id: int) -> list[Sequence]:
+        return self._fetch(
+            f"""
+            SELECT {PACKED_COLUMNS} FROM annotations a
+            JOIN images i ON i.id = a.image_id
+            WHERE i.project_id = $1
+            ORDER BY a.image_id, a.created_at, a.id
+            """,
+            project_id,
+        )
+
+    def changed_annotations(self, project_id: int, since: int, limit: int) -> list[Row]:
+        return self._fetch(
+            """
+            SELECT a.* FROM annotations a
+            JOIN images i ON i.id = a.image_id
+            WHERE i.project_id = $1 AND a.revision > $2
+            ORDER BY a.revision
+            LIMIT $3
+            """,
+            project_id,
+            since,
+            limit,
+        )
+
+    def deleted_annotations(self, project_id: int, since: int, limit: int) -> list[Row]:
+        return self._fetch(
+            """
+            SELECT annotation_id, image_id, revision FROM annotation_tombstones
+            WHERE project_id = $1 AND revision > $2
+            ORDER BY revision
+            LIMIT $3
+            """,
+            project_id,
+            since,
+            limit,
+        )
+
+    def update_annotation(self, annotation_id: int, changes: dict[str, Any]) -> None:
+        columns = check_columns("annotations", changes)
+        assignments = "".join(f"{c} = ${i}, " for i, c in enumerate(columns, 2))
+        self._execute(
+            f"UPDATE annotations SET {assignments}"
+            "updated_at = date_trunc('second', now() AT TIME ZONE 'utc') WHERE id = $1",
+            annotation_id,
+            *(changes[column] for column in columns),
+        )
+
+    def update_annotations(
+        self, updates: Sequence[tuple[int, dict[str, Any], datetime]]
+    ) -> None:
+        # One executemany per distinct set of changed columns
+        groups: dict[tuple, list] = {}
+        for annotation_id, changes, updated_at in updates:
+            columns = tuple(check_columns("annotations", changes))
+            groups.setdefault(columns, []).append(
+                (annotation_id, updated_at)
+                + tuple(changes[column] for column in columns)
+            )
+
+        async def write(conn):
+            for columns, rows in groups.items():
+                assignments = "".join(f"{c} = ${i}, " for i, c in enumerate(columns, 3))
+                await conn.executemany(
+                    f"UPDATE annotations SET {assignments}updated_at = $2 "
+                    "WHERE id = $1",
+                    rows,
+                )
+
+        self._transaction(write)
+
+    def delete_annotation(self, annotation_id: int) -> bool:
+        status = self._execute("DELETE FROM annotations WHERE id = $1", annotation_id)
+        return _rowcount(status) > 0
+
+    def delete_image_annotations(self, image_id: int) -> int:
+        status = self._execute("DELETE FROM annotations WHERE image_id = $1", image_id)
+        return _rowcount(status)
@@ -0,0 +1,228 @@
+-- Schema of the postgres storage backend (PostgreSQL 14 or newer).
+--
+-- Mirrors the SQLite schema after all migrations. Applied at startup under
+-- an advisory lock, so every statement is idempotent. Timestamps are UTC
+-- whole seconds, like SQLite's CURRENT_TIMESTAMP.
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value BIGINT NOT NULL
+);
+
+INSERT INTO sync_state (key, value)
+VALUES ('revision', 0), ('tombstone_floor', 0)
+ON CONFLICT (key) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS projects (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    images_path TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT date_trunc('second', now() AT TIME ZONE 'utc'),
+    updated_at TIMESTAMP NOT NULL DEFAULT date_trunc('second', now() AT TIME ZONE 'utc'),
+    revision BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_projects_name ON projects (name);
+
+CREATE TABLE IF NOT EXISTS label_schemas (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    project_id BIGINT NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+    label_name TEXT NOT NULL,
+    color TEXT,
+    sort_order INTEGER DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT date_trunc('second', now() AT TIME ZONE 'utc'),
+    UNIQUE (project_id, label_name)
+);
+
+CREATE TABLE IF NOT EXISTS images (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    project_id BIGINT NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    filepath TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    thumbnail_path TEXT,
+    phash BIGINT,
+    created_at TIMESTAMP NOT NULL DEFAULT date_trunc('second', now() AT TIME ZONE 'utc'),
+    revision BIGINT NOT NULL DEFAULT 0,
+    UNIQUE (project_id, filename)
+);
+
+CREATE INDEX IF NOT EXISTS idx_images_thumbnail_path ON images (thumbnail_path);
+
+CREATE TABLE IF NOT EXISTS annotations (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    image_id BIGINT NOT NULL REFERENCES images (id) ON DELETE CASCADE,
+    label TEXT,
+    az_min DOUBLE PRECISION NOT NULL,
+    alt_min DOUBLE PRECISION NOT NULL,
+    az_max DOUBLE PRECISION NOT NULL,
+    alt_max DOUBLE PRECISION NOT NULL,
+    color TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT date_trunc('second', now() AT TIME ZONE 'utc'),
+    updated_at TIMESTAMP NOT NULL DEFAULT date_trunc('second', now() AT TIME ZONE 'utc'),
+    revision BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_annotations_image_revision
+    ON annotations (image_id, revision);
+CREATE INDEX IF NOT EXISTS idx_annotations_revision ON annotations (revision);
+
+CREATE TABLE IF NOT EXISTS annotation_tombstones (
+    annotation_id BIGINT PRIMARY KEY,
+    image_id BIGINT NOT NULL,
+    project_id BIGINT,
+    revision BIGINT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT date_trunc('second', now() AT TIME ZONE 'utc')
+);
+
+CREATE INDEX IF NOT EXISTS idx_annotation_tombstones_project_revision
+    ON annotation_tombstones (project_id, revision);
+
+-- The row lock on the revision counter is held until commit, so writers
+-- commit in revision order and a changes feed reader never sees a revision
+-- before all lower ones are visible
+CREATE OR REPLACE FUNCTION spheremark_next_revision() RETURNS BIGINT
+LANGUAGE sql AS $$
+    UPDATE sync_state SET value = value + 1 WHERE key = 'revision'
+    RETURNING value
+$$;
+
+-- Revision stamping. Stamping a parent row sets its revision explicitly,
+-- which the WHEN clauses below skip, as the SQLite triggers do
+
+CREATE OR REPLACE FUNCTION spheremark_project_written() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.revision := spheremark_next_revision();
+    RETURN NEW;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION spheremark_project_deleted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM spheremark_next_revision();
+    RETURN OLD;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION spheremark_image_written() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    rev BIGINT := spheremark_next_revision();
+BEGIN
+    NEW.revision := rev;
+    UPDATE projects SET revision = rev WHERE id = NEW.project_id;
+    IF TG_OP = 'UPDATE' AND OLD.project_id <> NEW.project_id THEN
+        UPDATE projects SET revision = rev WHERE id = OLD.project_id;
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION spheremark_image_deleted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    rev BIGINT := spheremark_next_revision();
+BEGIN
+    UPDATE projects SET revision = rev WHERE id = OLD.project_id;
+    RETURN OLD;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION spheremark_label_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    rev BIGINT := spheremark_next_revision();
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE projects SET revision = rev WHERE id = OLD.project_id;
+        RETURN OLD;
+    END IF;
+    UPDATE projects SET revision = rev WHERE id = NEW.project_id;
+    RETURN NEW;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION spheremark_annotation_written() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    rev BIGINT := spheremark_next_revision();
+BEGIN
+    NEW.revision := rev;
+    UPDATE images SET revision = rev WHERE id = NEW.image_id;
+    UPDATE projects SET revision = rev
+    WHERE id = (SELECT project_id FROM images WHERE id = NEW.image_id);
+    IF TG_OP = 'UPDATE' AND OLD.image_id <> NEW.image_id THEN
+        UPDATE images SET revision = rev WHERE id = OLD.image_id;
+        UPDATE projects SET revision = rev
+        WHERE id = (SELECT project_id FROM images WHERE id = OLD.image_id);
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+-- Deleting a whole project sets spheremark.skip_tombstones for its
+-- transaction: its tombstones would be dropped with it anyway
+CREATE OR REPLACE FUNCTION spheremark_annotation_deleted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    rev BIGINT;
+    project BIGINT;
+BEGIN
+    IF current_setting('spheremark.skip_tombstones', true) = 'on' THEN
+        RETURN OLD;
+    END IF;
+    rev := spheremark_next_revision();
+    SELECT project_id INTO project FROM images WHERE id = OLD.image_id;
+    INSERT INTO annotation_tombstones (annotation_id, image_id, project_id, revision)
+    VALUES (OLD.id, OLD.image_id, project, rev)
+    ON CONFLICT (annotation_id) DO UPDATE SET
+        image_id = EXCLUDED.image_id,
+        project_id = EXCLUDED.project_id,
+        revision = EXCLUDED.revision,
+        deleted_at = EXCLUDED.deleted_at;
+    UPDATE images SET revision = rev WHERE id = OLD.image_id;
+    UPDATE projects SET revision = rev WHERE id = project;
+    RETURN OLD;
+END
+$$;
+
+CREATE OR REPLACE TRIGGER projects_revision_insert
+    BEFORE INSERT ON projects
+    FOR EACH ROW EXECUTE FUNCTION spheremark_project_written();
+CREATE OR REPLACE TRIGGER projects_revision_update
+    BEFORE UPDATE ON projects
+    FOR EACH ROW WHEN (NEW.revision = OLD.revision)
+    EXECUTE FUNCTION spheremark_project_written();
+CREATE OR REPLACE TRIGGER projects_revision_delete
+    AFTER DELETE ON projects
+    FOR EACH ROW EXECUTE FUNCTION spheremark_project_deleted();
+
+CREATE OR REPLACE TRIGGER images_revision_insert
+    BEFORE INSERT ON images
+    FOR EACH ROW EXECUTE FUNCTION spheremark_image_written();
+CREATE OR REPLACE TRIGGER images_revision_update
+    BEFORE UPDATE ON images
+    FOR EACH ROW WHEN (NEW.revision = OLD.revision)
+    EXECUTE FUNCTION spheremark_image_written();
+CREATE OR REPLACE TRIGGER images_revision_delete
+    AFTER DELETE ON images
+    FOR EACH ROW EXECUTE FUNCTION spheremark_image_deleted();
+
+CREATE OR REPLACE TRIGGER label_schemas_revision
+    AFTER INSERT OR UPDATE OR DELETE ON label_schemas
+    FOR EACH ROW EXECUTE FUNCTION spheremark_label_changed();
+
+CREATE OR REPLACE TRIGGER annotations_revision_insert
+    BEFORE INSERT ON annotations
+    FOR EACH ROW EXECUTE FUNCTION spheremark_annotation_written();
+CREATE OR REPLACE TRIGGER annotations_revision_update
+    BEFORE UPDATE ON annotations
+    FOR EACH ROW WHEN (NEW.revision = OLD.revision)
+    EXECUTE FUNCTION spheremark_annotation_written();
+CREATE OR REPLACE TRIGGER annotations_revision_delete
+    AFTER DELETE ON annotations
+    FOR EACH ROW EXECUTE FUNCTION spheremark_annotation_deleted();
@@ -0,0 +1,385 @@
+"""Repository backed by the local SQLite database."""
+
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from backend.database import Database, get_db
+from backend.repositories.base import Repository, Row, check_columns
+from backend.repositories.bulk import bulk_delete_images
+
+# Column order expected by pack_annotations, timestamps as unix seconds
+PACKED_COLUMNS = """
+    a.id, a.image_id, a.label, a.color,
+    CAST(strftime('%s', a.created_at) AS INTEGER),
+    CAST(strftime('%s', a.updated_at) AS INTEGER),
+    a.az_min, a.alt_min, a.az_max, a.alt_max
+"""
+
+
+class SQLiteRepository(Repository):
+    """
+    Repository over the database from init_database().
+
+    Revisions, image and project stamps and tombstones are maintained by
+    the schema's triggers; deleting a project's rows goes through the
+    set-based bulk helpers instead.
+    """
+
+    name = "sqlite"
+
+    @property
+    def db(self) -> Database:
+        # Looked up per call, so re-initializing the database (as tests do)
+        # needs no new repository
+        return get_db()
+
+    def _transaction(self, work) -> Any:
+        with self.db.get_connection() as conn:
+            try:
+                conn.execute("BEGIN")
+                result = work(conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return result
+
+    # Revisions
+
+    def get_revision(self) -> int:
+        row = self.db.fetchone("SELECT value FROM sync_state WHERE key = 'revision'")
+        return row["value"] if row else 0
+
+    def get_sync_state(self) -> dict[str, int]:
+        return {
+            row["key"]: row["value"]
+            for row in self.db.fetchall("SELECT key, value FROM sync_state")
+        }
+
+    # Projects
+
+    def create_project(
+        self, name: str, description: Optional[str], images_path: str
+    ) -> int:
+        cursor = self.db.execute(
+            """
+            INSERT INTO projects (name, description, images_path)
+            VALUES (?, ?, ?)
+            """,
+            (name, description, images_path),
+        )
+        return cursor.lastrowid
+
+    def get_project(self, project_id: int) -> Optional[Row]:
+        return self.db.fetchone("SELECT * FROM projects WHERE id = ?", (project_id,))
+
+    def get_project_revision(self, project_id: int) -> Optional[int]:
+        row = self.db.fetchone(
+            "SELECT revision FROM projects WHERE id = ?", (project_id,)
+        )
+        return row["revision"] if row else None
+
+    def list_projects(self) -> list[Row]:
+        return self.db.fetchall("""
+            SELECT
+                p.id,
+                p.name,
+                p.description,
+                p.images_path,
+                p.created_at,
+                COUNT(DISTINCT i.id) as image_count,
+                COUNT(a.id) as annotation_count
+            FROM projects p
+            LEFT JOIN images i ON p.id = i.project_id
+            LEFT JOIN annotations a ON i.id = a.image_id
+            GROUP BY p.id
+            ORDER BY p.created_at DESC
+        """)
+
+    def update_project(self, project_id: int, changes: dict[str, Any]) -> None:
+        columns = check_columns("projects", changes)
+        assignments = "".join(f"{column} = ?, " for column in columns)
+        self.db.execute(
+            f"UPDATE projects SET {assignments}updated_at = CURRENT_TIMESTAMP "
+            "WHERE id = ?",
+            tuple(changes[column] for column in columns) + (project_id,),
+        )
+
+    def delete_project(self, project_id: int) -> Optional[list[str]]:
+        if not self.get_project(project_id):
+            return None
+
+        # Connections don't enforce the foreign key cascades, so rows are
+        # deleted child-first with set-based statements
+        def delete(conn):
+            thumbnails = bulk_delete_images(
+                conn, "project_id = ?", (project_id,), tombstones=False
+            )
+            conn.execute(
+                "DELETE FROM annotation_tombstones WHERE project_id = ?",
+                (project_id,),
+            )
+            conn.execute(
+                "DELETE FROM label_schemas WHERE project_id = ?", (project_id,)
+            )
+            conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+            return thumbnails
+
+        return self._transaction(delete)
+
+    # Label schemas
+
+    def list_labels(self, project_id: int) -> list[Row]:
+        return self.db.fetchall(
+            """
+            SELECT * FROM label_schemas
+            WHERE project_id = ?
+            ORDER BY sort_order, label_name
+            """,
+            (project_id,),
+        )
+
+    def get_label(self, label_id: int) -> Optional[Row]:
+        return self.db.fetchone("SELECT * FROM label_schemas WHERE id = ?", (label_id,))
+
+    def create_label(
+        self,
+        project_id: int,
+        label_name: str,
+        color: Optional[str],
+        sort_order: int,
+    ) -> int:
+        cursor = self.db.execute(
+            """
+            INSERT INTO label_schemas (project_id, label_name, color, sort_order)
+            VALUES (?, ?, ?, ?)
+            """,
+            (project_id, label_name, color, sort_order),
+        )
+        return cursor.lastrowid
+
+    def update_label(self, label_id: int, changes: dict[str, Any]) -> None:
+        columns = check_columns("label_schemas", changes)
+        if not columns:
+            return
+        self.db.execute(
+            f"UPDATE label_schemas SET {', '.join(f'{c} = ?' for c in columns)} "
+            "WHERE id = ?",
+            tuple(changes[column] for column in columns) + (label_id,),
+        )
+
+    def delete_label(self, label_id: int) -> bool:
+        cursor = self.db.execute("DELETE FROM label_schemas WHERE id = ?", (label_id,))
+        return cursor.rowcount > 0
+
+    # Images
+
+    def list_images(self, project_id: int) -> list[Row]:
+        return self.db.fetchall(
+            """
+            SELECT
+                i.id,
+                i.project_id,
+                i.filename,
+                i.width,
+                i.height,
+                i.thumbnail_path,
+                COUNT(a.id) as annotation_count
+            FROM images i
+            LEFT JOIN annotations a ON i.id = a.image_id
+            WHERE i.project_id = ?
+            GROUP BY i.id
+            ORDER BY i.created_at DESC, i.id DESC
+            """,
+            (project_id,),
+        )
+
+    def list_image_ids(self, project_id: int) -> list[int]:
+        rows = self.db.fetchall(
+            """
+            SELECT id FROM images
+            WHERE project_id = ?
+            ORDER BY created_at DESC, id DESC
+            """,
+            (project_id,),
+        )
+        return [row["id"] for row in rows]
+
+    def get_image(self, image_id: int) -> Optional[Row]:
+        return self.db.fetchone("SELECT * FROM images WHERE id = ?", (image_id,))
+
+    def get_image_revision(self, image_id: int) -> Optional[int]:
+        row = self.db.fetchone("SELECT revision FROM images WHERE id = ?", (image_id,))
+        return row["revision"] if row else None
+
+    def image_in_project(self, project_id: int, image_id: int) -> bool:
+        row = self.db.fetchone(
+            "SELECT id FROM images WHERE id = ? AND project_id = ?",
+            (image_id, project_id),
+        )
+        return row is not None
+
+    def find_image(self, project_id: int, filename: str) -> Optional[Row]:
+        return self.db.fetchone(
+            "SELECT id, phash FROM images WHERE project_id = ? AND filename = ?",
+            (project_id, filename),
+        )
+
+    def add_image(self, values: dict[str, Any]) -> int:
+        cursor = self.db.execute(
+            """
+            INSERT INTO images (
+                project_id, filename, filepath, width, height,
+                thumbnail_path, phash
+            )
+            VALUES (
+                :project_id, :filename, :filepath, :width, :height,
+                :thumbnail_path, :phash
+            )
+            """,
+            values,
+        )
+        return cursor.lastrowid
+
+    def set_image_hash(self, image_id: int, phash: int) -> None:
+        self.db.execute("UPDATE images SET phash = ? WHERE id = ?", (phash, image_id))
+
+    def list_image_hashes(self, project_id: int) -> list[Row]:
+        return self.db.fetchall(
+            "SELECT filename, phash FROM images WHERE project_id = ? AND phash IS NOT NULL",
+            (project_id,),
+        )
+
+    def delete_image(self, image_id: int) -> Optional[list[str]]:
+        if not self.get_image(image_id):
+            return None
+        return self._transaction(
+            lambda conn: bulk_delete_images(
+                conn, "id = ?", (image_id,), row_triggers=True
+            )
+        )
+
+    # Annotations
+
+    def create_annotation(self, values: dict[str, Any]) -> int:
+        cursor = self.db.execute(
+            """
+            INSERT INTO annotations (
+                image_id, label, az_min, alt_min, az_max, alt_max, color
+            ) VALUES (
+                :image_id, :label, :az_min, :alt_min, :az_max, :alt_max, :color
+            )
+            """,
+            values,
+        )
+        return cursor.lastrowid
+
+    def get_annotation(self, annotation_id: int) -> Optional[Row]:
+        return self.db.fetchone(
+            "SELECT * FROM annotations WHERE id = ?", (annotation_id,)
+        )
+
+    def list_image_annotations(self, image_id: int) -> list[Row]:
+        return self.db.fetchall(
+            "SELECT * FROM annotations WHERE image_id = ? ORDER BY created_at, id",
+            (image_id,),
+        )
+
+    def list_project_annotations(self, project_id: int) -> list[Row]:
+        return self.db.fetchall(
+            """
+            SELECT a.* FROM annotations a
+            JOIN images i ON i.id = a.image_id
+            WHERE i.project_id = ?
+            ORDER BY a.image_id, a.created_at
+            """,
+            (project_id,),
+        )
+
+    def packed_image_annotations(self, image_id: int) -> list[Sequence]:
+        return self.db.fetchall(
+            f"""
+            SELECT {PACKED_COLUMNS} FROM annotations a
+            WHERE a.image_id = ?
+            ORDER BY a.created_at
+            """,
+            (image_id,),
+        )
+
+    def packed_project_annotations(self, project_id: int) -> list[Sequence]:
+        return self.db.fetchall(
+            f"""
+            SELECT {PACKED_COLUMNS} FROM annotations a
+            JOIN images i ON i.id = a.image_id
+            WHERE i.project_id = ?
+            ORDER BY a.image_id, a.created_at
+            """,
+            (project_id,),
+        )
+
+    def changed_annotations(self, project_id: int, since: int, limit: int) -> list[Row]:
+        return self.db.fetchall(
+            """
+            SELECT a.* FROM annotations a
+            JOIN images i ON i.id = a.image_id
+            WHERE i.project_id = ? AND a.revision > ?
+            ORDER BY a.revision
+            LIMIT ?
+            """,
+            (project_id, since, limit),
+        )
+
+    def deleted_annotations(self, project_id: int, since: int, limit: int) -> list[Row]:
+        return self.db.fetchall(
+            """
+            SELECT annotation_id, image_id, revision FROM annotation_tombstones
+            WHERE project_id = ? AND revision > ?
+            ORDER BY revision
+            LIMIT ?
+            """,
+            (project_id, since, limit),
+        )
+
+    def update_annotation(self, annotation_id: int, changes: dict[str, Any]) -> None:
+        columns = check_columns("annotations", changes)
+        assignments = "".join(f"{column} = ?, " for column in columns)
+        self.db.execute(
+            f"UPDATE annotations SET {assignments}updated_at = CURRENT_TIMESTAMP "
+            "WHERE id = ?",
+            tuple(changes[column] for column in columns) + (annotation_id,),
+        )
+
+    def update_annotations(
+        self, updates: Sequence[tuple[int, dict[str, Any], datetime]]
+    ) -> None:
+        # One executemany per distinct set of changed columns
+        groups: dict[tuple, list] = {}
+        for annotation_id, changes, updated_at in updates:
+            columns = tuple(check_columns("annotations", changes))
+            groups.setdefault(columns, []).append(
+                tuple(changes[column] for column in columns)
+                + (updated_at.strftime("%Y-%m-%d %H:%M:%S"), annotation_id)
+            )
+
+        def write(conn):
+            for columns, rows in groups.items():
+                assignments = "".join(f"{column} = ?, " for column in columns)
+                conn.executemany(
+                    f"UPDATE annotations SET {assignments}updated_at = ? "
+                    "WHERE id = ?",
+                    rows,
+                )
+
+        self._transaction(write)
+
+    def delete_annotation(self, annotation_id: int) -> bool:
+        cursor = self.db.execute(
+            "DELETE FROM annotations WHERE id = ?", (annotation_id,)
+        )
+        return cursor.rowcount > 0
+
+    def delete_image_annotations(self, image_id: int) -> int:
+        cursor = self.db.execute(
+            "DELETE FROM annotations WHERE image_id = ?", (image_id,)
+        )
+        return cursor.rowcount
@@ -1,22 +1,46 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from typing import List
 
 from backend.services.annotation_service import AnnotationService
+from backend.services.image_service import ImageService
+from backend.services.live_service import get_live_hub
 from backend.models import (
     AnnotationCreate,
     AnnotationCreateRequest,
     AnnotationUpdate,
     AnnotationResponse,
 )
+from backend.utils.etag import etag_matches, make_etag, not_modified
+from backend.utils.packing import PACKED_ANNOTATIONS_MEDIA_TYPE, accepts_packed
 
 router = APIRouter(prefix="/api", tags=["annotations"])
 
 
 @router.get("/images/{image_id}/annotations", response_model=List[AnnotationResponse])
-async def get_annotations_for_image(image_id: int):
-    """Get all annotations for a specific image."""
-    service = AnnotationService()
-    return service.get_annotations_for_image(image_id)
+async def get_annotations_for_image(image_id: int, request: Request):
+    """Get all annotations for a specific image.
+
+    Clients sending ``Accept: application/x-spheremark-annotations`` receive
+    the packed columnar binary representation instead of JSON.
+    """
+    packed = accepts_packed(request.headers.get("accept"))
+    headers = {"Vary": "Accept"}
+
+    revision = ImageService().get_revision(image_id)
+    if revision is not None:
+        etag = make_etag(
+            "image-annotations", image_id, revision, "packed" if packed else "json"
+        )
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+
+    # Encoded once per revision; prefetching may already have done it
+    return Response(
+        content=AnnotationService().get_image_payload(image_id, revision, packed),
+        media_type=PACKED_ANNOTATIONS_MEDIA_TYPE if packed else "application/json",
+        headers=headers,
+    )
 
 
 @router.post(
@@ -37,10 +61,13 @@ async def create_annotation(image_id: int, annotation_req: AnnotationCreateReque
 
     service = AnnotationService()
     try:
-        return service.create_annotation(annotation)
+        created = service.create_annotation(annotation)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    get_live_hub().notify()
+    return created
+
 
 @router.get("/annotations/{annotation_id}", response_model=AnnotationResponse)
 async def get_annotation(annotation_id: int):
@@ -63,6 +90,7 @@ async def update_annotation(annotation_id: int, update: AnnotationUpdate):
     if not annotation:
         raise HTTPException(status_code=404, detail="Annotation not found")
 
+    get_live_hub().notify()
     return annotation
 
 
@@ -75,6 +103,7 @@ async def delete_annotation(annotation_id: int):
     if not success:
         raise HTTPException(status_code=404, detail="Annotation not found")
 
+    get_live_hub().notify()
     return None
 
 
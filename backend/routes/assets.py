@@ -0,0 +1,22 @@
+"""Derived asset queue routes."""
+
+from typing import Optional
+
+from fastapi import APIRouter
+
+from backend.models import AssetEnqueueResult, AssetQueueStatus
+from backend.services.asset_service import AssetQueue
+
+router = APIRouter(prefix="/api/assets", tags=["assets"])
+
+
+@router.get("", response_model=AssetQueueStatus)
+def get_asset_queue_status(project_id: Optional[int] = None):
+    """Count assets by status, and list the running and failed jobs."""
+    return AssetQueue().status(project_id)
+
+
+@router.post("/retry", response_model=AssetEnqueueResult)
+def retry_failed_assets():
+    """Queue every failed asset again with its attempts reset."""
+    return AssetEnqueueResult(queued=AssetQueue().retry_failed())
@@ -0,0 +1,41 @@
+"""Database maintenance routes."""
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from backend.models import MaintenanceReport
+from backend.services.maintenance_service import (
+    MaintenanceBusyError,
+    MaintenanceService,
+)
+
+router = APIRouter(prefix="/api/maintenance", tags=["maintenance"])
+
+
+@router.get("", response_model=Optional[MaintenanceReport])
+async def get_last_maintenance():
+    """Get the report of the last maintenance run, if any."""
+    return MaintenanceService().get_last_report()
+
+
+@router.post("", response_model=MaintenanceReport)
+def run_maintenance(
+    steps: Optional[str] = Query(
+        None, description="Comma-separated subset of steps, all by default"
+    ),
+    full_vacuum: bool = False,
+):
+    """Run maintenance now: orphan GC, tombstone pruning, ANALYZE, vacuum, checkpoint.
+
+    ``full_vacuum`` converts databases created without incremental
+    auto-vacuum with one full ``VACUUM``, which blocks writers while it runs.
+    """
+    selected = [s.strip() for s in steps.split(",") if s.strip()] if steps else None
+
+    try:
+        return MaintenanceService().run(selected, full_vacuum=full_vacuum)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except MaintenanceBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -1,26 +1,81 @@
 """Project management routes."""
 
-from io import BytesIO
-
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
-from PIL import Image
+import asyncio
+import io
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Literal, Optional
+
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.background import BackgroundTask
 
 from backend.models import (
+    AnnotationChangesResponse,
+    AnnotationResponse,
+    AssetEnqueueRequest,
+    AssetEnqueueResult,
+    DuplicateBox,
+    DuplicateImageGroup,
     ImageListResponse,
     ImageResponse,
+    ImageLevel,
+    ImageLevelsResponse,
+    ImageViewRequest,
+    ImageViewResponse,
+    ImportResult,
     LabelSchemaCreate,
     LabelSchemaResponse,
     LabelSchemaUpdate,
+    MergeResult,
+    ProjectClone,
     ProjectCreate,
     ProjectListResponse,
+    ProjectMerge,
     ProjectResponse,
+    ProjectStatsResponse,
     ProjectUpdate,
     ScanResult,
 )
+from backend.services.annotation_service import AnnotationService
+from backend.services.asset_service import AssetQueue
 from backend.services.export_service import ExportService
 from backend.services.image_service import ImageService
+from backend.services.import_service import ImportService
+from backend.services.job_service import get_image_jobs
+from backend.services.live_service import build_message, get_live_hub
+from backend.services.prefetch_service import get_prefetcher
 from backend.services.project_service import ProjectService
+from backend.services.rendition_service import (
+    FORMATS,
+    accepted_formats,
+    get_rendition,
+    has_preview,
+    image_levels,
+    media_type_of,
+    negotiate_format,
+    uses_rendition,
+)
+from backend.services.stats_service import MIN_BIN_DEG, StatsService
+from backend.services.texture_service import (
+    TEXTURE_MEDIA_TYPE,
+    get_texture,
+    textures_available,
+)
+from backend.utils.etag import etag_matches, make_etag, not_modified
+from backend.utils.packing import PACKED_ANNOTATIONS_MEDIA_TYPE, accepts_packed
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
@@ -31,9 +86,16 @@ router = APIRouter(prefix="/api/projects", tags=["projects"])
 
 
 @router.get("", response_model=list[ProjectListResponse])
-async def list_projects():
+async def list_projects(request: Request, response: Response):
     """List all projects with image and annotation counts."""
     service = ProjectService()
+
+    etag = make_etag("projects", service.get_projects_revision())
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
     return service.list_projects()
 
 
@@ -45,14 +107,25 @@ async def create_project(project: ProjectCreate):
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
-async def get_project(project_id: int):
+async def get_project(project_id: int, request: Request, response: Response):
     """Get project details by ID."""
     service = ProjectService()
+    revision = service.get_revision(project_id)
+
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    etag = make_etag("project", project_id, revision)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
     project = service.get_project(project_id)
 
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
     return project
 
 
@@ -80,20 +153,57 @@ async def delete_project(project_id: int):
     return None
 
 
+@router.post("/{project_id}/clone", response_model=ProjectResponse, status_code=201)
+def clone_project(project_id: int, clone: ProjectClone):
+    """Copy a project with its labels, images and annotations, without rescanning."""
+    service = ProjectService()
+    project = service.clone_project(project_id, clone)
+
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    get_live_hub().notify()
+    return project
+
+
+@router.post("/{project_id}/merge", response_model=MergeResult)
+def merge_project(project_id: int, merge: ProjectMerge):
+    """Merge another project's labels, images and annotations into this one."""
+    service = ProjectService()
+
+    try:
+        result = service.merge_project(project_id, merge)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    get_live_hub().notify()
+    return result
+
+
 # =============================================================================
 # Label Schema Management
 # =============================================================================
 
 
 @router.get("/{project_id}/labels", response_model=list[LabelSchemaResponse])
-async def get_label_schema(project_id: int):
+async def get_label_schema(project_id: int, request: Request, response: Response):
     """Get all labels for a project."""
     project_service = ProjectService()
 
     # Verify project exists
-    if not project_service.get_project(project_id):
+    revision = project_service.get_revision(project_id)
+    if revision is None:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    etag = make_etag("labels", project_id, revision)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
     return project_service.get_label_schema(project_id)
 
 
@@ -159,21 +269,69 @@ async def scan_project_images(project_id: int):
         raise HTTPException(status_code=404, detail="Project not found")
 
     image_service = ImageService()
-    return image_service.scan_images(project_id)
+    return await get_image_jobs().run(image_service.scan_images, project_id)
+
+
+@router.post("/{project_id}/assets", response_model=AssetEnqueueResult)
+def enqueue_project_assets(project_id: int, enqueue: AssetEnqueueRequest):
+    """Queue thumbnails, previews and renditions of every image in a project.
+
+    Assets already queued or built are skipped unless ``rebuild`` is set.
+    """
+    project_service = ProjectService()
+
+    if not project_service.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    try:
+        queued = AssetQueue().enqueue_project(
+            project_id,
+            enqueue.assets,
+            priority=enqueue.priority,
+            rebuild=enqueue.rebuild,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return AssetEnqueueResult(queued=queued)
 
 
 @router.get("/{project_id}/images", response_model=list[ImageListResponse])
-async def list_project_images(project_id: int):
+async def list_project_images(project_id: int, request: Request, response: Response):
     """List all images in a project with annotation counts."""
     project_service = ProjectService()
 
-    if not project_service.get_project(project_id):
+    revision = project_service.get_revision(project_id)
+    if revision is None:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    etag = make_etag("images", project_id, revision)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
     image_service = ImageService()
     return image_service.list_images(project_id)
 
 
+@router.get("/{project_id}/duplicate-images", response_model=list[DuplicateImageGroup])
+async def list_duplicate_images(
+    project_id: int,
+    max_distance: int = Query(4, ge=0, le=32),
+    across_projects: bool = False,
+):
+    """List duplicate and near-duplicate images by perceptual hash."""
+    project_service = ProjectService()
+
+    if not project_service.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    image_service = ImageService()
+    return image_service.find_duplicate_images(
+        project_id, max_distance=max_distance, across_projects=across_projects
+    )
+
+
 @router.get("/{project_id}/images/{image_id}", response_model=ImageResponse)
 async def get_project_image(project_id: int, image_id: int):
     """Get image details by ID."""
@@ -186,67 +344,154 @@ async def get_project_image(project_id: int, image_id: int):
     return image
 
 
-MAX_IMAGE_WIDTH = 8192
-MAX_IMAGE_HEIGHT = 4096
+@router.delete("/{project_id}/images/{image_id}", status_code=204)
+def delete_project_image(project_id: int, image_id: int):
+    """Delete an image and its annotations; the image file is kept."""
+    image_service = ImageService()
+
+    if not image_service.validate_image_in_project(project_id, image_id):
+        raise HTTPException(status_code=404, detail="Image not found in this project")
+
+    image_service.delete_image(image_id)
+    get_live_hub().notify()
+    return None
+
+
+@router.post(
+    "/{project_id}/images/{image_id}/view",
+    response_model=ImageViewResponse,
+    status_code=202,
+)
+def view_project_image(project_id: int, image_id: int, view: ImageViewRequest):
+    """Report that a client opened an image, so the next ones are warmed."""
+    image_service = ImageService()
+
+    if not image_service.validate_image_in_project(project_id, image_id):
+        raise HTTPException(status_code=404, detail="Image not found in this project")
+
+    prefetcher = get_prefetcher()
+    if prefetcher is None:
+        return ImageViewResponse()
+    if "ktx2" in view.formats and textures_available():
+        fmt = "ktx2"
+    else:
+        fmt = negotiate_format(view.formats)
+    return ImageViewResponse(
+        prefetching=prefetcher.visit(project_id, image_id, view.previous_image_id, fmt)
+    )
+
+
+@router.get(
+    "/{project_id}/images/{image_id}/levels", response_model=ImageLevelsResponse
+)
+async def get_project_image_levels(project_id: int, image_id: int):
+    """List the resolutions an image can be loaded at, smallest first."""
+    image_service = ImageService()
+
+    if not image_service.validate_image_in_project(project_id, image_id):
+        raise HTTPException(status_code=404, detail="Image not found in this project")
+
+    image = image_service.get_image(image_id)
+    path = f"/api/projects/{project_id}/images/{image_id}/file"
+    urls = {
+        "preview": f"{path}?level=preview",
+        "display": path,
+        "full": f"{path}?full_size=true",
+    }
+    levels = [
+        ImageLevel(name=name, width=width, height=height, url=urls[name])
+        for name, width, height in image_levels(image.width, image.height)
+    ]
+    texture = None
+    if textures_available():
+        display = next(level for level in levels if level.name == "display")
+        texture = display.model_copy(
+            update={"url": f"/api/projects/{project_id}/images/{image_id}/texture"}
+        )
+    return ImageLevelsResponse(levels=levels, texture=texture)
 
 
 @router.get("/{project_id}/images/{image_id}/file")
 async def get_project_image_file(
     project_id: int,
     image_id: int,
+    request: Request,
     full_size=False,
+    level: Literal["preview", "display"] = "display",
 ):
-    """Serve the image file, scaled down by default (max 8192x4096)."""
+    """Serve the image for display, or the original with full_size.
+
+    Display images are scaled down to at most 8192x4096, progressive JPEGs,
+    or re-encoded as AVIF or WebP for clients whose Accept header lists
+    them. level=preview serves a small JPEG to show while those load.
+    """
     image_service = ImageService()
 
     if not image_service.validate_image_in_project(project_id, image_id):
         raise HTTPException(status_code=404, detail="Image not found in this project")
 
-    file_path = image_service.get_image_file_path(image_id)
+    image = image_service.get_image(image_id)
+    # Remote originals may be downloaded first
+    file_path = await run_in_threadpool(image_service.get_image_file_path, image_id)
 
-    if not file_path or not file_path.exists():
+    if not file_path:
         raise HTTPException(status_code=404, detail="Image file not found")
 
+    headers = {"Cache-Control": "public, max-age=3600"}
     if full_size:
-        print("Returning full-size image")
         return FileResponse(
-            file_path,
-            media_type="image/jpeg",
-            headers={"Cache-Control": "public, max-age=3600"},
+            file_path, media_type=media_type_of(file_path), headers=headers
+        )
+
+    if level == "preview" and has_preview(image.width, image.height):
+        preview_path = await get_image_jobs().run(
+            get_rendition, image_id, image.filepath, file_path, "jpeg", "preview"
         )
+        return FileResponse(preview_path, media_type="image/jpeg", headers=headers)
 
-    # Scale down image if larger than max dimensions
-    with Image.open(file_path) as img:
-        print("Resizing")
-        width, height = img.size
-
-        if width <= MAX_IMAGE_WIDTH and height <= MAX_IMAGE_HEIGHT:
-            # Image is already small enough, return original
-            return FileResponse(
-                file_path,
-                media_type="image/jpeg",
-                headers={"Cache-Control": "public, max-age=3600"},
-            )
-
-        # Calculate scale factor to fit within max dimensions
-        scale = min(MAX_IMAGE_WIDTH / width, MAX_IMAGE_HEIGHT / height)
-        new_width = int(width * scale)
-        new_height = int(height * scale)
-
-        # Resize using high-quality Lanczos filter
-        resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-        # Save to buffer
-        buffer = BytesIO()
-        resized.save(buffer, format="JPEG", quality=90)
-        buffer.seek(0)
-
-        return StreamingResponse(
-            buffer,
-            media_type="image/jpeg",
-            headers={"Cache-Control": "public, max-age=3600"},
+    headers["Vary"] = "Accept"
+    fmt = negotiate_format(accepted_formats(request.headers.get("accept")))
+    if not uses_rendition(image.width, image.height, fmt):
+        return FileResponse(
+            file_path, media_type=media_type_of(file_path), headers=headers
         )
 
+    # Encoded on first request, then served from the rendition cache
+    rendition_path = await get_image_jobs().run(
+        get_rendition, image_id, image.filepath, file_path, fmt
+    )
+    return FileResponse(rendition_path, media_type=FORMATS[fmt][0], headers=headers)
+
+
+@router.get("/{project_id}/images/{image_id}/texture")
+async def get_project_image_texture(project_id: int, image_id: int):
+    """Serve the display image as a KTX2 texture (Basis Universal)."""
+    image_service = ImageService()
+
+    if not image_service.validate_image_in_project(project_id, image_id):
+        raise HTTPException(status_code=404, detail="Image not found in this project")
+
+    if not textures_available():
+        raise HTTPException(
+            status_code=501, detail="KTX2 textures need the basisu tool on the server"
+        )
+
+    image = image_service.get_image(image_id)
+    file_path = await run_in_threadpool(image_service.get_image_file_path, image_id)
+
+    if not file_path:
+        raise HTTPException(status_code=404, detail="Image file not found")
+
+    # Encoded on first request, then served from the rendition cache
+    texture_path = await get_image_jobs().run(
+        get_texture, image_id, image.filepath, file_path
+    )
+    return FileResponse(
+        texture_path,
+        media_type=TEXTURE_MEDIA_TYPE,
+        headers={"Cache-Control": "public, max-age=3600"},
+    )
+
 
 @router.get("/{project_id}/images/{image_id}/thumbnail")
 async def get_project_image_thumbnail(project_id: int, image_id: int):
@@ -257,6 +502,11 @@ async def get_project_image_thumbnail(project_id: int, image_id: int):
         raise HTTPException(status_code=404, detail="Image not found in this project")
 
     thumbnail_path = image_service.get_thumbnail_path(image_id)
+    if thumbnail_path and not thumbnail_path.exists():
+        # Queued but not built yet, or removed since
+        thumbnail_path = await get_image_jobs().run(
+            image_service.build_thumbnail, image_id
+        )
 
     if not thumbnail_path or not thumbnail_path.exists():
         raise HTTPException(status_code=404, detail="Thumbnail not found")
@@ -268,14 +518,261 @@ async def get_project_image_thumbnail(project_id: int, image_id: int):
     )
 
 
+# =============================================================================
+# Project Annotations
+# =============================================================================
+
+
+@router.get("/{project_id}/annotations", response_model=list[AnnotationResponse])
+async def list_project_annotations(
+    project_id: int, request: Request, response: Response
+):
+    """List all annotations in a project.
+
+    Clients sending ``Accept: application/x-spheremark-annotations`` receive
+    the packed columnar binary representation instead of JSON.
+    """
+    project_service = ProjectService()
+
+    revision = project_service.get_revision(project_id)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    packed = accepts_packed(request.headers.get("accept"))
+    etag = make_etag(
+        "annotations", project_id, revision, "packed" if packed else "json"
+    )
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    annotation_service = AnnotationService()
+
+    if packed:
+        return Response(
+            content=annotation_service.get_packed_annotations_for_project(project_id),
+            media_type=PACKED_ANNOTATIONS_MEDIA_TYPE,
+            headers=headers,
+        )
+
+    response.headers.update(headers)
+    return annotation_service.get_annotations_for_project(project_id)
+
+
+@router.get("/{project_id}/changes", response_model=AnnotationChangesResponse)
+async def get_project_changes(
+    project_id: int,
+    since: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+):
+    """Get annotation creates, updates and deletes since a revision."""
+    project_service = ProjectService()
+
+    if not project_service.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    annotation_service = AnnotationService()
+    return annotation_service.get_changes(project_id, since=since, limit=limit)
+
+
+@router.get("/{project_id}/duplicate-boxes", response_model=list[DuplicateBox])
+async def list_duplicate_boxes(
+    project_id: int,
+    iou_threshold: float = Query(0.8, gt=0, le=1),
+    same_label: bool = True,
+):
+    """List pairs of boxes on the same image that likely duplicate each other."""
+    project_service = ProjectService()
+
+    if not project_service.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    annotation_service = AnnotationService()
+    return annotation_service.find_duplicate_boxes(
+        project_id, iou_threshold=iou_threshold, same_label=same_label
+    )
+
+
+# =============================================================================
+# Project Statistics
+# =============================================================================
+
+
+def _check_bin_deg(bin_deg: float) -> None:
+    """Reject bin sizes that don't tile the sphere evenly."""
+    if (180.0 / bin_deg) % 1 != 0:
+        raise HTTPException(status_code=400, detail="bin_deg must divide 180 evenly")
+
+
+@router.get("/{project_id}/stats", response_model=ProjectStatsResponse)
+async def get_project_stats(
+    project_id: int,
+    request: Request,
+    response: Response,
+    bin_deg: float = Query(5.0, ge=MIN_BIN_DEG, le=90),
+):
+    """Get label histograms, boxes per image and spherical coverage."""
+    _check_bin_deg(bin_deg)
+    service = StatsService()
+
+    revision = service.get_project_revision(project_id)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    etag = make_etag("stats", project_id, revision, bin_deg)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return service.get_stats(project_id, bin_deg=bin_deg)
+
+
+@router.get("/{project_id}/stats/heatmap.png")
+async def get_project_heatmap(
+    project_id: int,
+    request: Request,
+    bin_deg: float = Query(1.0, ge=MIN_BIN_DEG, le=90),
+):
+    """Get an equirectangular PNG of where annotations concentrate."""
+    _check_bin_deg(bin_deg)
+    service = StatsService()
+
+    revision = service.get_project_revision(project_id)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    etag = make_etag("heatmap", project_id, revision, bin_deg)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    return Response(
+        content=await get_image_jobs().run(
+            service.get_heatmap_png, project_id, bin_deg=bin_deg
+        ),
+        media_type="image/png",
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
+@router.websocket("/{project_id}/live")
+async def project_live_updates(
+    websocket: WebSocket,
+    project_id: int,
+    image_id: Optional[int] = None,
+    since: Optional[int] = None,
+):
+    """Push annotation changes of a project, or one of its images, as they happen.
+
+    Each message has the shape of the changes feed with a ``type`` of
+    ``changes``. With ``since``, the changes after that revision are sent
+    first, a page per message. A ``resync`` message means updates were
+    dropped for a slow connection; fetch ``/changes`` since the last
+    revision seen.
+    """
+    project_service = ProjectService()
+
+    if not await asyncio.to_thread(project_service.get_project, project_id):
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+
+    hub = get_live_hub()
+    subscriber = hub.subscribe(project_id, image_id)
+
+    async def forward():
+        if since is not None:
+            # Subscribed first, so every change after the catch-up is queued
+            annotation_service = AnnotationService()
+            revision = since
+            while True:
+                changes = await asyncio.to_thread(
+                    annotation_service.get_changes, project_id, since=revision
+                )
+                message = build_message(changes, image_id)
+                if message is not None:
+                    await websocket.send_text(message)
+                revision = changes.revision
+                if not changes.has_more:
+                    break
+            subscriber.skip_through(revision)
+
+        while True:
+            item = await subscriber.queue.get()
+            if item is None:
+                await websocket.close()
+                return
+            await websocket.send_text(item[1])
+
+    sender = asyncio.create_task(forward())
+    try:
+        # Clients don't send anything; this only waits for the disconnect
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        hub.unsubscribe(subscriber)
+
+
+# =============================================================================
+# Project Imports
+# =============================================================================
+
+
+@router.post("/{project_id}/import", response_model=ImportResult)
+def import_project_annotations(
+    project_id: int,
+    file: UploadFile,
+    file_format: Optional[Literal["coco", "csv"]] = Query(None, alias="format"),
+    dry_run: bool = False,
+    create_labels: bool = True,
+):
+    """Bulk import annotations from a COCO JSON or CSV file.
+
+    Images are matched by filename. The format defaults to the upload's
+    extension. With ``dry_run`` nothing is written and the report shows
+    what would be imported.
+    """
+    project_service = ProjectService()
+
+    if not project_service.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if file_format is None:
+        file_format = (
+            "csv" if (file.filename or "").lower().endswith(".csv") else "coco"
+        )
+
+    fp = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    service = ImportService()
+    importer = service.import_csv if file_format == "csv" else service.import_coco
+
+    try:
+        result = importer(project_id, fp, dry_run=dry_run, create_labels=create_labels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not dry_run:
+        get_live_hub().notify()
+    return result
+
+
 # =============================================================================
 # Project Exports
 # =============================================================================
 
 
 @router.get("/{project_id}/export/coco")
-async def export_project_coco(project_id: int):
-    """Export all project annotations in COCO format."""
+async def export_project_coco(project_id: int, request: Request):
+    """Export all project annotations in COCO format.
+
+    The export is materialized on disk and rebuilt only for images whose
+    annotations changed. Responses carry an ETag, so unchanged exports can
+    be revalidated with If-None-Match and answered with 304.
+    """
     project_service = ProjectService()
 
     if not project_service.get_project(project_id):
@@ -283,11 +780,20 @@ async def export_project_coco(project_id: int):
 
     export_service = ExportService()
     try:
-        coco_data = export_service.export_coco(project_id)
-        return JSONResponse(content=coco_data)
+        key = export_service.get_current_coco_key(project_id)
+        if key and etag_matches(request.headers.get("if-none-match"), f'"{key}"'):
+            return Response(status_code=304, headers={"ETag": f'"{key}"'})
+
+        path, key = export_service.materialize_coco(project_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    return FileResponse(
+        path,
+        media_type="application/json",
+        headers={"ETag": f'"{key}"', "Cache-Control": "no-cache"},
+    )
+
 
 @router.get("/{project_id}/export/coco/{image_id}")
 async def export_project_image_coco(project_id: int, image_id: int):
@@ -302,3 +808,50 @@ async def export_project_image_coco(project_id: int, image_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{project_id}/export/parquet")
+async def export_project_parquet(project_id: int, pixel_bounds: bool = False):
+    """Export project images, annotations and categories as zipped Parquet files."""
+    return _export_project_columnar(project_id, "parquet", pixel_bounds)
+
+
+@router.get("/{project_id}/export/arrow")
+async def export_project_arrow(project_id: int, pixel_bounds: bool = False):
+    """Export project images, annotations and categories as zipped Arrow IPC files."""
+    return _export_project_columnar(project_id, "arrow", pixel_bounds)
+
+
+def _export_project_columnar(project_id: int, file_format: str, pixel_bounds: bool):
+    """Write a columnar export to a temporary directory and serve it as a zip."""
+    project_service = ProjectService()
+
+    if not project_service.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    work_dir = Path(tempfile.mkdtemp(prefix="spheremark_export_"))
+    export_service = ExportService()
+    try:
+        paths = export_service.export_columnar(
+            project_id,
+            work_dir / "tables",
+            file_format=file_format,
+            include_pixel_bounds=pixel_bounds,
+        )
+
+        # Both formats compress their buffers with zstd, so store them as-is
+        archive_path = work_dir / f"project_{project_id}_{file_format}.zip"
+        with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_STORED) as zf:
+            for path in paths.values():
+                zf.write(path, arcname=path.name)
+    except ImportError as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return FileResponse(
+        archive_path,
+        media_type="application/zip",
+        filename=archive_path.name,
+        background=BackgroundTask(shutil.rmtree, work_dir, ignore_errors=True),
+    )
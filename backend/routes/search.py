@@ -0,0 +1,38 @@
+"""Search routes."""
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from backend.models import SearchResponse
+from backend.services.search_service import SearchService
+
+router = APIRouter(prefix="/api", tags=["search"])
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search(
+    q: str,
+    kind: str = Query("images", pattern="^(images|annotations|projects)$"),
+    project_id: Optional[int] = None,
+    label: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """Search images, annotations or projects.
+
+    Terms are ANDed; append ``*`` for prefix matches (e.g. ``cam3_*``).
+    Responses include per-project and per-label facet counts.
+    """
+    service = SearchService()
+    try:
+        return service.search(
+            q,
+            kind=kind,
+            project_id=project_id,
+            label=label,
+            limit=limit,
+            offset=offset,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
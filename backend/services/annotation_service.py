@@ -1,46 +1,238 @@
-from typing import Optional, List
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Optional, List
 
-from backend.database import get_db
-from backend.models import AnnotationCreate, AnnotationUpdate, AnnotationResponse
+from pydantic import TypeAdapter
+
+from backend.database import Database, get_db
+from backend.models import (
+    AnnotationChangesResponse,
+    AnnotationCreate,
+    AnnotationResponse,
+    AnnotationTombstone,
+    AnnotationUpdate,
+    DuplicateBox,
+)
+from backend.repositories import get_repository
+from backend.repositories.base import UPDATABLE_COLUMNS as REPOSITORY_COLUMNS
+from backend.utils.packing import pack_annotations
+
+# Columns an update may change, in the order they're written
+UPDATABLE_COLUMNS = REPOSITORY_COLUMNS["annotations"]
+
+_ANNOTATION_LIST = TypeAdapter(List[AnnotationResponse])
+
+
+class AnnotationWriteBuffer:
+    """
+    Write-behind buffer for annotation updates.
+
+    Updates are merged per annotation in memory and acknowledged at once;
+    the latest value of each changed column is written in a single
+    transaction when the flush interval elapses, on flush() or on shutdown.
+
+    Durability: an acknowledged update is only in memory until the next
+    flush, at most flush_interval seconds. A graceful shutdown flushes, but
+    a crash or kill -9 loses updates from that window. Creates and deletes
+    are never buffered, and reads through AnnotationService and exports
+    flush first, so they always see acknowledged updates.
+    """
+
+    def __init__(
+        self, flush_interval: float, on_flush: Optional[Callable[[], None]] = None
+    ):
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        # annotation_id -> (changed columns, acknowledged state)
+        self._pending: dict[int, tuple[dict, AnnotationResponse]] = {}
+        # Batch being written, still read by get() until it commits
+        self._flushing: dict[int, tuple[dict, AnnotationResponse]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def get(self, annotation_id: int) -> Optional[AnnotationResponse]:
+        """Get the acknowledged state of an annotation with pending updates."""
+        with self._lock:
+            entry = self._pending.get(annotation_id) or self._flushing.get(
+                annotation_id
+            )
+        return entry[1] if entry else None
+
+    def add(self, current: AnnotationResponse, changes: dict) -> AnnotationResponse:
+        """Merge changed columns into the buffer and return the new state."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        updated = current.model_copy(update={**changes, "updated_at": now})
+
+        with self._lock:
+            entry = self._pending.get(current.id)
+            columns = {**entry[0], **changes} if entry else dict(changes)
+            self._pending[current.id] = (columns, updated)
+
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+        return updated
+
+    def discard(self, annotation_id: int) -> None:
+        """Drop pending updates of an annotation about to be deleted."""
+        with self._lock:
+            self._pending.pop(annotation_id, None)
+            self._flushing.pop(annotation_id, None)
+
+    def flush(self) -> int:
+        """
+        Write all pending updates in one transaction.
+
+        Returns:
+            Number of annotations written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                rows = [
+                    (annotation_id, columns, state.updated_at)
+                    for annotation_id, (columns, state) in batch.items()
+                ]
+
+            if not batch:
+                return 0
+
+            try:
+                get_repository().update_annotations(rows)
+            except Exception:
+                self._restore(batch)
+                raise
+            with self._lock:
+                self._flushing = {}
+
+        if self.on_flush:
+            self.on_flush()
+        return len(batch)
+
+    def _restore(self, batch: dict) -> None:
+        """Put a failed batch back without overwriting newer updates."""
+        with self._lock:
+            self._flushing = {}
+            for annotation_id, (columns, state) in batch.items():
+                newer = self._pending.get(annotation_id)
+                if newer:
+                    self._pending[annotation_id] = ({**columns, **newer[0]}, newer[1])
+                else:
+                    self._pending[annotation_id] = (columns, state)
+
+    def _flush_on_timer(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Failed to flush buffered annotation updates: {e}")
+
+
+_write_buffer: Optional[AnnotationWriteBuffer] = None
+
+
+def init_write_buffer(
+    flush_interval: float, on_flush: Optional[Callable[[], None]] = None
+) -> AnnotationWriteBuffer:
+    """Buffer annotation updates, flushing them every flush_interval seconds."""
+    global _write_buffer
+    _write_buffer = AnnotationWriteBuffer(flush_interval, on_flush)
+    return _write_buffer
+
+
+def get_write_buffer() -> Optional[AnnotationWriteBuffer]:
+    """Get the global write buffer, or None if updates are written through."""
+    return _write_buffer
+
+
+def flush_pending_writes() -> int:
+    """Write buffered annotation updates, if any, before reading them."""
+    if _write_buffer is None:
+        return 0
+    return _write_buffer.flush()
+
+
+class PayloadCache:
+    """
+    Encoded annotation responses of recently viewed images.
+
+    Entries are keyed by the image's revision, which every annotation write
+    bumps, so a stale entry is never looked up again and just ages out.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key: tuple, payload: bytes) -> None:
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_payloads = PayloadCache()
 
 
 class AnnotationService:
     """Service for managing annotations."""
 
     def __init__(self):
-        self.db = get_db()
+        self.repo = get_repository()
+
+    @property
+    def db(self) -> Database:
+        # Listing every annotation and duplicate search are SQLite-only
+        return get_db()
 
     def create_annotation(self, annotation: AnnotationCreate) -> AnnotationResponse:
         """Create a new annotation."""
-        cursor = self.db.execute(
-            """
-            INSERT INTO annotations (
-                image_id, label, az_min, alt_min, az_max, alt_max, color
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                annotation.image_id,
-                annotation.label,
-                annotation.az_min,
-                annotation.alt_min,
-                annotation.az_max,
-                annotation.alt_max,
-                annotation.color,
-            ),
+        annotation_id = self.repo.create_annotation(
+            annotation.model_dump(
+                include={
+                    "image_id",
+                    "label",
+                    "az_min",
+                    "alt_min",
+                    "az_max",
+                    "alt_max",
+                    "color",
+                }
+            )
         )
-
-        annotation_id = cursor.lastrowid
         return self.get_annotation(annotation_id)
 
     def get_annotation(self, annotation_id: int) -> Optional[AnnotationResponse]:
         """Get annotation by ID."""
-        row = self.db.fetchone(
-            "SELECT * FROM annotations WHERE id = ?", (annotation_id,)
-        )
+        flush_pending_writes()
+        row = self.repo.get_annotation(annotation_id)
 
         if not row:
             return None
 
+        return self._row_to_response(row)
+
+    def _row_to_response(self, row) -> AnnotationResponse:
+        """Convert a database row to an annotation response."""
         return AnnotationResponse(
             id=row["id"],
             image_id=row["image_id"],
@@ -50,117 +242,246 @@ class AnnotationService:
             az_max=row["az_max"],
             alt_max=row["alt_max"],
             color=row["color"],
+            revision=row["revision"],
             created_at=row["created_at"],
             updated_at=row["updated_at"],
         )
 
     def get_annotations_for_image(self, image_id: int) -> List[AnnotationResponse]:
         """Get all annotations for a specific image."""
-        rows = self.db.fetchall(
-            "SELECT * FROM annotations WHERE image_id = ? ORDER BY created_at",
-            (image_id,),
-        )
+        flush_pending_writes()
+        rows = self.repo.list_image_annotations(image_id)
 
-        return [
-            AnnotationResponse(
-                id=row["id"],
-                image_id=row["image_id"],
-                label=row["label"],
-                az_min=row["az_min"],
-                alt_min=row["alt_min"],
-                az_max=row["az_max"],
-                alt_max=row["alt_max"],
-                color=row["color"],
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-            )
-            for row in rows
-        ]
+        return [self._row_to_response(row) for row in rows]
 
     def get_all_annotations(self) -> List[AnnotationResponse]:
         """Get all annotations across all images."""
+        flush_pending_writes()
         rows = self.db.fetchall(
             "SELECT * FROM annotations ORDER BY image_id, created_at"
         )
 
-        return [
-            AnnotationResponse(
-                id=row["id"],
-                image_id=row["image_id"],
-                label=row["label"],
-                az_min=row["az_min"],
-                alt_min=row["alt_min"],
-                az_max=row["az_max"],
-                alt_max=row["alt_max"],
-                color=row["color"],
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-            )
-            for row in rows
-        ]
+        return [self._row_to_response(row) for row in rows]
+
+    def get_annotations_for_project(self, project_id: int) -> List[AnnotationResponse]:
+        """Get all annotations for all images in a project."""
+        flush_pending_writes()
+        rows = self.repo.list_project_annotations(project_id)
+
+        return [self._row_to_response(row) for row in rows]
+
+    def get_packed_annotations_for_image(self, image_id: int) -> bytes:
+        """Get annotations for an image in the packed binary format."""
+        flush_pending_writes()
+        return pack_annotations(self.repo.packed_image_annotations(image_id))
+
+    def get_packed_annotations_for_project(self, project_id: int) -> bytes:
+        """Get annotations for all images in a project in the packed binary format."""
+        flush_pending_writes()
+        return pack_annotations(self.repo.packed_project_annotations(project_id))
+
+    def get_image_payload(
+        self, image_id: int, revision: Optional[int], packed: bool
+    ) -> bytes:
+        """
+        Get an image's annotations encoded as a response body.
+
+        Args:
+            revision: The image's current revision, read after flushing
+                pending writes (None if the image doesn't exist)
+            packed: Packed binary format instead of JSON
+        """
+        key = (image_id, revision, packed)
+        payload = _payloads.get(key)
+        if payload is None:
+            if packed:
+                payload = self.get_packed_annotations_for_image(image_id)
+            else:
+                payload = _ANNOTATION_LIST.dump_json(
+                    self.get_annotations_for_image(image_id)
+                )
+            _payloads.put(key, payload)
+        return payload
+
+    def get_changes(
+        self, project_id: int, since: int = 0, limit: int = 1000
+    ) -> AnnotationChangesResponse:
+        """
+        Get annotations changed or deleted in a project after a revision.
+
+        Args:
+            project_id: Project ID
+            since: Revision the client has already seen (0 for a full sync)
+            limit: Maximum number of changes to return
+
+        Returns:
+            Upserts and deletes ordered by revision, plus the revision to
+            pass as ``since`` on the next call
+        """
+        flush_pending_writes()
+        state = self.repo.get_sync_state()
+        current_revision = state.get("revision", 0)
+
+        if 0 < since < state.get("tombstone_floor", 0):
+            return AnnotationChangesResponse(revision=current_revision, reset=True)
+
+        upsert_rows = self.repo.changed_annotations(project_id, since, limit + 1)
+        delete_rows = self.repo.deleted_annotations(project_id, since, limit + 1)
+
+        # Merge both revision-ordered streams and cut at the limit
+        changes = sorted(
+            [(row["revision"], True, row) for row in upsert_rows]
+            + [(row["revision"], False, row) for row in delete_rows],
+            key=lambda change: change[0],
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        response = AnnotationChangesResponse(
+            revision=changes[-1][0] if has_more else current_revision,
+            has_more=has_more,
+        )
+        for _, is_upsert, row in changes:
+            if is_upsert:
+                response.upserts.append(self._row_to_response(row))
+            else:
+                response.deletes.append(
+                    AnnotationTombstone(
+                        id=row["annotation_id"],
+                        image_id=row["image_id"],
+                        revision=row["revision"],
+                    )
+                )
+
+        return response
+
+    def find_duplicate_boxes(
+        self, project_id: int, iou_threshold: float = 0.8, same_label: bool = True
+    ) -> List[DuplicateBox]:
+        """
+        Find pairs of boxes on the same image that likely duplicate each other.
+
+        Args:
+            project_id: Project to check
+            iou_threshold: Minimum spherical IoU for a pair to be reported
+            same_label: Only pair boxes with the same label
+
+        Returns:
+            Pairs ordered by image, highest IoU first
+        """
+        import numpy as np
+
+        from backend.utils.spherical import overlapping_pairs
+
+        flush_pending_writes()
+        rows = self.db.fetchall(
+            """
+            SELECT a.id, a.image_id, a.label, a.az_min, a.alt_min, a.az_max, a.alt_max
+            FROM annotations a
+            JOIN images i ON i.id = a.image_id
+            WHERE i.project_id = ?
+            ORDER BY a.image_id, a.id
+            """,
+            (project_id,),
+        )
+        if not rows:
+            return []
+
+        ids = np.array([row["id"] for row in rows], dtype=np.int64)
+        image_ids = np.array([row["image_id"] for row in rows], dtype=np.int64)
+        labels = [row["label"] for row in rows]
+        boxes = np.array([tuple(row)[3:] for row in rows], dtype=np.float64)
+
+        duplicates = []
+        # Rows are grouped by image; compare boxes within each group
+        starts = np.flatnonzero(np.r_[True, image_ids[1:] != image_ids[:-1]])
+        ends = np.r_[starts[1:], len(rows)]
+
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+
+            i, j, iou = overlapping_pairs(boxes[start:end], iou_threshold)
+            for k in np.argsort(-iou, kind="stable"):
+                first, second = start + i[k], start + j[k]
+                if same_label and labels[first] != labels[second]:
+                    continue
+                duplicates.append(
+                    DuplicateBox(
+                        image_id=int(image_ids[first]),
+                        annotation_id=int(ids[first]),
+                        duplicate_id=int(ids[second]),
+                        label=labels[first],
+                        duplicate_label=labels[second],
+                        iou=round(float(iou[k]), 6),
+                    )
+                )
+
+        return duplicates
 
     def update_annotation(
         self, annotation_id: int, update: AnnotationUpdate
     ) -> Optional[AnnotationResponse]:
-        """Update an existing annotation."""
+        """Update an existing annotation.
+
+        With a write buffer configured, the update is merged in memory and
+        the new state is returned before it's written; see
+        AnnotationWriteBuffer for the durability trade-off.
+        """
+        buffer = get_write_buffer()
+        if buffer is not None:
+            return self._buffer_update(buffer, annotation_id, update)
+
         # Get current annotation
         current = self.get_annotation(annotation_id)
         if not current:
             return None
 
-        # Build update query dynamically based on provided fields
-        update_fields = []
-        update_values = []
-
-        if update.label is not None:
-            update_fields.append("label = ?")
-            update_values.append(update.label)
-
-        if update.az_min is not None:
-            update_fields.append("az_min = ?")
-            update_values.append(update.az_min)
-
-        if update.alt_min is not None:
-            update_fields.append("alt_min = ?")
-            update_values.append(update.alt_min)
+        changes = {
+            column: getattr(update, column)
+            for column in UPDATABLE_COLUMNS
+            if getattr(update, column) is not None
+        }
+        if not changes:
+            return current
 
-        if update.az_max is not None:
-            update_fields.append("az_max = ?")
-            update_values.append(update.az_max)
+        self.repo.update_annotation(annotation_id, changes)
 
-        if update.alt_max is not None:
-            update_fields.append("alt_max = ?")
-            update_values.append(update.alt_max)
+        return self.get_annotation(annotation_id)
 
-        if update.color is not None:
-            update_fields.append("color = ?")
-            update_values.append(update.color)
+    def _buffer_update(
+        self,
+        buffer: AnnotationWriteBuffer,
+        annotation_id: int,
+        update: AnnotationUpdate,
+    ) -> Optional[AnnotationResponse]:
+        """Merge an update into the write buffer."""
+        current = buffer.get(annotation_id)
+        if current is None:
+            row = self.repo.get_annotation(annotation_id)
+            if not row:
+                return None
+            current = self._row_to_response(row)
 
-        if not update_fields:
+        changes = {
+            column: getattr(update, column)
+            for column in UPDATABLE_COLUMNS
+            if getattr(update, column) is not None
+        }
+        if not changes:
             return current
 
-        # Always update the updated_at timestamp
-        update_fields.append("updated_at = CURRENT_TIMESTAMP")
-
-        query = f"UPDATE annotations SET {', '.join(update_fields)} WHERE id = ?"
-        update_values.append(annotation_id)
-
-        self.db.execute(query, tuple(update_values))
-
-        return self.get_annotation(annotation_id)
+        return buffer.add(current, changes)
 
     def delete_annotation(self, annotation_id: int) -> bool:
         """Delete an annotation."""
-        cursor = self.db.execute(
-            "DELETE FROM annotations WHERE id = ?", (annotation_id,)
-        )
+        buffer = get_write_buffer()
+        if buffer is not None:
+            buffer.discard(annotation_id)
 
-        return cursor.rowcount > 0
+        return self.repo.delete_annotation(annotation_id)
 
     def delete_annotations_for_image(self, image_id: int) -> int:
         """Delete all annotations for a specific image. Returns count of deleted annotations."""
-        cursor = self.db.execute(
-            "DELETE FROM annotations WHERE image_id = ?", (image_id,)
-        )
-
-        return cursor.rowcount
+        flush_pending_writes()
+        return self.repo.delete_image_annotations(image_id)
@@ -0,0 +1,372 @@
+"""Queue of derived assets: thumbnails, previews, renditions and textures.
+
+Building an asset takes a decode of the original, which scans and first
+requests used to pay for inline. With the queue enabled, scans record what
+each new image needs in the asset_jobs table and worker processes build it
+ahead of the first request (see asset_worker_service).
+
+Jobs are deduplicated by image and asset: queueing an asset that is queued
+again only raises its priority, and one that is built is left alone unless
+rebuilt on purpose. Workers claim the highest priority job in one UPDATE,
+so any number of them share the queue. A failed job is retried with
+exponential backoff until it runs out of attempts, and a job whose worker
+died is taken over once its lease expires.
+
+The queue lives in the SQLite database; other backends build assets
+inline as before.
+"""
+
+import time
+from typing import Iterable, NamedTuple, Optional
+
+from backend.config import get_config
+from backend.database import get_db
+from backend.models import AssetCount, AssetJobResponse, AssetQueueStatus
+from backend.repositories import get_repository
+from backend.services.rendition_service import (
+    FORMATS,
+    available_formats,
+    has_preview,
+    uses_rendition,
+)
+from backend.services.texture_service import textures_available
+
+# Default priority of each kind of asset, higher first: thumbnails fill the
+# image list, previews are the first thing the viewer shows
+ASSET_PRIORITIES = {"thumbnail": 30, "preview": 20, "display": 10, "texture": 0}
+
+ASSETS = (
+    "thumbnail",
+    "preview",
+    *(f"display:{fmt}" for fmt in FORMATS),
+    "texture",
+)
+
+# Failed jobs listed by status()
+STATUS_FAILURES = 20
+
+
+class AssetJob(NamedTuple):
+    id: int
+    image_id: int
+    asset: str
+    attempts: int
+
+
+def asset_queue_enabled() -> bool:
+    """Check whether scans queue assets instead of building them inline."""
+    return get_config().assets.enabled and get_repository().name == "sqlite"
+
+
+def assets_for_image(width: int, height: int) -> list[str]:
+    """Get the assets assets.precompute builds for an image, thumbnail first."""
+    config = get_config()
+    precompute = config.assets.precompute
+    assets = ["thumbnail"]
+    if "preview" in precompute and has_preview(width, height):
+        assets.append("preview")
+    if "display" in precompute:
+        assets += [
+            f"display:{fmt}"
+            for fmt in ("jpeg", *config.images.renditions.formats)
+            if fmt in available_formats() and uses_rendition(width, height, fmt)
+        ]
+    if "texture" in precompute and textures_available():
+        assets.append("texture")
+    return assets
+
+
+def asset_priority(asset: str) -> int:
+    """Get the default priority of an asset."""
+    return ASSET_PRIORITIES[asset.partition(":")[0]]
+
+
+class AssetQueue:
+    """Persistent queue of asset jobs in the SQLite database."""
+
+    def __init__(self):
+        self.db = get_db()
+        self.config = get_config().assets
+
+    def enqueue(
+        self,
+        jobs: Iterable[tuple[int, str]],
+        priority: Optional[int] = None,
+        rebuild: bool = False,
+    ) -> int:
+        """
+        Queue assets of images.
+
+        Args:
+            jobs: (image ID, asset) pairs
+            priority: Higher runs first; each asset's default if None
+            rebuild: Also queue assets that are already built
+
+        Returns:
+            Jobs queued or requeued
+
+        Raises:
+            ValueError: If an asset is unknown
+        """
+        rows = []
+        for image_id, asset in jobs:
+            if asset not in ASSETS:
+                raise ValueError(f"Unknown asset: {asset}")
+            rows.append(
+                (
+                    image_id,
+                    asset,
+                    asset_priority(asset) if priority is None else priority,
+                    rebuild,
+                )
+            )
+        if not rows:
+            return 0
+
+        with self.db.get_connection() as conn:
+            # Queued jobs keep their place and attempts; built or failed
+            # ones start over
+            cursor = conn.executemany(
+                """
+                INSERT INTO asset_jobs (image_id, asset, priority)
+                VALUES (?1, ?2, ?3)
+                ON CONFLICT (image_id, asset) DO UPDATE SET
+                    priority = MAX(priority, excluded.priority),
+                    status = CASE WHEN status = 'running'
+                        THEN 'running' ELSE 'queued' END,
+                    attempts = CASE WHEN status IN ('done', 'failed')
+                        THEN 0 ELSE attempts END,
+                    run_after = CASE WHEN status IN ('done', 'failed')
+                        THEN 0 ELSE run_after END,
+                    error = CASE WHEN status IN ('done', 'failed')
+                        THEN NULL ELSE error END,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE status != 'done' OR ?4
+                """,
+                rows,
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def enqueue_project(
+        self,
+        project_id: int,
+        assets: Optional[list[str]] = None,
+        priority: Optional[int] = None,
+        rebuild: bool = False,
+    ) -> int:
+        """
+        Queue assets of every image in a project.
+
+        Args:
+            assets: Assets to queue; by default the ones assets_for_image()
+                gives for each image
+
+        Returns:
+            Jobs queued or requeued
+        """
+        rows = self.db.fetchall(
+            "SELECT id, width, height FROM images WHERE project_id = ?",
+            (project_id,),
+        )
+        return self.enqueue(
+            (
+                (row["id"], asset)
+                for row in rows
+                for asset in (assets or assets_for_image(row["width"], row["height"]))
+            ),
+            priority=priority,
+            rebuild=rebuild,
+        )
+
+    def claim(self, worker: str) -> Optional[AssetJob]:
+        """
+        Take the highest priority job that is due, oldest first.
+
+        Args:
+            worker: Name of the claiming worker, shown in status()
+
+        Returns:
+            The job, now running under a lease, or None if none is due
+        """
+        now = time.time()
+        with self.db.get_connection() as conn:
+            self._expire_leases(conn, now)
+            row = conn.execute(
+                """
+                UPDATE asset_jobs SET
+                    status = 'running',
+                    attempts = attempts + 1,
+                    worker = ?,
+                    lease_expires = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = (
+                    SELECT id FROM asset_jobs
+                    WHERE status = 'queued' AND run_after <= ?
+                    ORDER BY priority DESC, id
+                    LIMIT 1
+                )
+                RETURNING id, image_id, asset, attempts
+                """,
+                (worker, now + self.config.lease_seconds, now),
+            ).fetchone()
+            conn.commit()
+        return AssetJob(*row) if row else None
+
+    def complete(self, job: AssetJob) -> None:
+        """Mark a job built."""
+        self.db.execute(
+            """
+            UPDATE asset_jobs SET
+                status = 'done',
+                worker = NULL,
+                lease_expires = NULL,
+                error = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'running'
+            """,
+            (job.id,),
+        )
+
+    def fail(self, job: AssetJob, error: str) -> bool:
+        """
+        Record a failed attempt, retrying the job after a backoff.
+
+        Returns:
+            True if the job will be retried, False if it ran out of attempts
+        """
+        retry = job.attempts < self.config.max_attempts
+        delay = self.config.retry_delay * 2 ** (job.attempts - 1)
+        self.db.execute(
+            """
+            UPDATE asset_jobs SET
+                status = ?,
+                run_after = ?,
+                worker = NULL,
+                lease_expires = NULL,
+                error = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'running'
+            """,
+            ("queued" if retry else "failed", time.time() + delay, error, job.id),
+        )
+        return retry
+
+    def discard(self, job: AssetJob) -> None:
+        """Drop a job whose image no longer exists."""
+        self.db.execute("DELETE FROM asset_jobs WHERE id = ?", (job.id,))
+
+    def release(self, worker: str, error: Optional[str] = None) -> int:
+        """
+        Put the jobs a stopped worker was running back in the queue.
+
+        Args:
+            error: Why the worker died, if it wasn't stopped on purpose.
+                The interrupted attempts then count against the jobs, in
+                case a job is what killed it.
+
+        Returns:
+            Jobs released
+        """
+        with self.db.get_connection() as conn:
+            if error is None:
+                count = conn.execute(
+                    """
+                    UPDATE asset_jobs SET
+                        status = 'queued',
+                        attempts = MAX(attempts - 1, 0),
+                        worker = NULL,
+                        lease_expires = NULL,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE status = 'running' AND worker = ?
+                    """,
+                    (worker,),
+                ).rowcount
+            else:
+                count = self._requeue(conn, "worker = ?", (worker,), error)
+            conn.commit()
+        return count
+
+    def retry_failed(self) -> int:
+        """
+        Queue every failed job again with its attempts reset.
+
+        Returns:
+            Jobs requeued
+        """
+        return self.db.execute("""
+            UPDATE asset_jobs SET
+                status = 'queued',
+                attempts = 0,
+                run_after = 0,
+                error = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'failed'
+            """).rowcount
+
+    def pending(self) -> int:
+        """Count jobs queued or running."""
+        return self.db.fetchone(
+            "SELECT COUNT(*) FROM asset_jobs WHERE status IN ('queued', 'running')"
+        )[0]
+
+    def status(self, project_id: Optional[int] = None) -> AssetQueueStatus:
+        """
+        Count jobs by asset and status, and list running and failed jobs.
+
+        Args:
+            project_id: Only count the jobs of this project's images
+        """
+        where, params = "1", ()
+        if project_id is not None:
+            where = "image_id IN (SELECT id FROM images WHERE project_id = ?)"
+            params = (project_id,)
+
+        counts: dict[str, AssetCount] = {}
+        for row in self.db.fetchall(
+            f"""
+            SELECT asset, status, COUNT(*) AS count FROM asset_jobs
+            WHERE {where}
+            GROUP BY asset, status
+            """,
+            params,
+        ):
+            count = counts.setdefault(row["asset"], AssetCount(asset=row["asset"]))
+            setattr(count, row["status"], row["count"])
+
+        def jobs(status: str, limit: int) -> list[AssetJobResponse]:
+            rows = self.db.fetchall(
+                f"""
+                SELECT * FROM asset_jobs
+                WHERE status = ? AND {where}
+                ORDER BY updated_at DESC, id DESC
+                LIMIT ?
+                """,
+                (status, *params, limit),
+            )
+            return [AssetJobResponse(**dict(row)) for row in rows]
+
+        return AssetQueueStatus(
+            assets=sorted(counts.values(), key=lambda count: ASSETS.index(count.asset)),
+            running=jobs("running", -1),
+            failed=jobs("failed", STATUS_FAILURES),
+        )
+
+    def _expire_leases(self, conn, now: float) -> None:
+        """Requeue jobs whose worker didn't finish them within the lease."""
+        self._requeue(conn, "lease_expires < ?", (now,), "Worker stopped responding")
+
+    def _requeue(self, conn, where_sql: str, params: tuple, error: str) -> int:
+        """Requeue running jobs whose worker died, failing the last attempts."""
+        return conn.execute(
+            f"""
+            UPDATE asset_jobs SET
+                status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END,
+                error = ?,
+                worker = NULL,
+                lease_expires = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'running' AND {where_sql}
+            """,
+            (self.config.max_attempts, error, *params),
+        ).rowcount
@@ -0,0 +1,212 @@
+"""Worker processes building the jobs of the asset queue."""
+
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from typing import Optional
+
+from backend.config import get_config, load_config
+from backend.database import get_db
+from backend.repositories import close_repository, get_repository, init_repository
+from backend.services.asset_service import AssetJob, AssetQueue
+from backend.services.image_service import ImageService
+from backend.services.rendition_service import (
+    available_formats,
+    get_rendition,
+    has_preview,
+    uses_rendition,
+)
+from backend.services.source_service import local_image_file
+from backend.services.texture_service import get_texture, textures_available
+from backend.utils.file_lock import FileLock
+
+# How often the pool checks on its processes, and tries to take the lease
+_SUPERVISE_SECONDS = 2.0
+
+
+def build_asset(image_id: int, asset: str) -> bool:
+    """
+    Build an asset of an image, unless it's already built.
+
+    Returns:
+        False if the image no longer exists
+
+    Raises:
+        FileNotFoundError: If the image's original is missing
+        RuntimeError: If the asset can't be built on this server
+    """
+    row = get_repository().get_image(image_id)
+    if not row:
+        return False
+
+    if asset == "thumbnail":
+        if ImageService().build_thumbnail(image_id) is None:
+            raise FileNotFoundError(f"Image file not found: {row['filepath']}")
+        return True
+
+    file_path = local_image_file(row["filepath"])
+    if file_path is None:
+        raise FileNotFoundError(f"Image file not found: {row['filepath']}")
+
+    kind, _, fmt = asset.partition(":")
+    if kind == "preview":
+        if has_preview(row["width"], row["height"]):
+            get_rendition(image_id, row["filepath"], file_path, level="preview")
+    elif kind == "display":
+        if fmt not in available_formats():
+            raise RuntimeError(f"Pillow can't encode {fmt} on this server")
+        if uses_rendition(row["width"], row["height"], fmt):
+            get_rendition(image_id, row["filepath"], file_path, fmt)
+    elif kind == "texture":
+        if not textures_available():
+            raise RuntimeError("KTX2 textures need the basisu tool on the server")
+        get_texture(image_id, row["filepath"], file_path)
+    return True
+
+
+class AssetWorker:
+    """Claims and builds asset jobs one at a time."""
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.queue = AssetQueue()
+
+    def run_next(self) -> Optional[AssetJob]:
+        """
+        Build the next job that is due.
+
+        Returns:
+            The job, or None if the queue had nothing due
+        """
+        job = self.queue.claim(self.name)
+        if job is None:
+            return None
+
+        try:
+            built = build_asset(job.image_id, job.asset)
+        except Exception as e:
+            if not self.queue.fail(job, f"{type(e).__name__}: {e}"):
+                print(f"Giving up on {job.asset} of image {job.image_id}: {e}")
+            return job
+
+        if built:
+            self.queue.complete(job)
+        else:
+            self.queue.discard(job)
+        return job
+
+    def run(self, stop) -> None:
+        """Build jobs until stop is set, polling the queue while it's empty."""
+        poll_interval = get_config().assets.poll_interval
+        while not stop.is_set():
+            if self.run_next() is None:
+                stop.wait(poll_interval)
+
+
+def _worker_main(config_path: str, stop, name: str) -> None:
+    """Entry point of a worker process."""
+    # Ctrl-C reaches the whole process group; the pool decides when its
+    # workers stop, letting them finish the job at hand
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    config = load_config(config_path)
+    init_repository(config.database)
+    try:
+        AssetWorker(name).run(stop)
+    finally:
+        close_repository()
+
+
+class AssetWorkerPool:
+    """
+    A fixed number of processes building queued assets.
+
+    Decoding and encoding panoramas holds the GIL for long stretches and a
+    crash in a codec takes its process down, so assets are built in
+    processes of their own rather than in the server's threads. A process
+    that dies is replaced, and the job it was running is queued again.
+
+    Every server worker process starts a pool, but only the one holding the
+    database's "assets" lock runs its processes. The others keep trying and
+    take over if that server worker exits. A pool started by asset_worker.py
+    takes the same lock.
+    """
+
+    def __init__(self, processes: int, config_path: str = "config.yaml"):
+        self.processes = processes
+        self.config_path = config_path
+        # Spawned rather than forked: the server has threads running
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._workers: list[Optional[multiprocessing.Process]] = [None] * processes
+        # Numbers the processes, so the jobs of a dead one are told apart
+        self._started = 0
+        self._supervisor_stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lease = FileLock(get_db().lock_path("assets"))
+
+    @property
+    def running(self) -> bool:
+        """Whether this pool holds the lease and runs its processes."""
+        return self._lease.held
+
+    def start(self) -> None:
+        self._supervise()
+        self._thread = threading.Thread(
+            target=self._run, name="asset-workers", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the processes, letting them finish their jobs for timeout seconds.
+
+        Jobs still running after that are killed and put back in the queue.
+        """
+        self._supervisor_stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self._stop.set()
+        stopped = [process for process in self._workers if process is not None]
+        for process in stopped:
+            process.join(timeout)
+        queue = AssetQueue()
+        for process in stopped:
+            if process.is_alive():
+                process.kill()
+                process.join()
+                queue.release(process.name)
+        self._workers = [None] * self.processes
+        self._lease.release()
+
+    def _run(self) -> None:
+        while not self._supervisor_stop.wait(_SUPERVISE_SECONDS):
+            try:
+                self._supervise()
+            except Exception as e:
+                print(f"Asset workers failed to start: {e}")
+
+    def _supervise(self) -> None:
+        """Start missing processes, once the lease is held."""
+        if not self._lease.acquire(blocking=False):
+            return
+        for i, process in enumerate(self._workers):
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                error = f"Worker exited with code {process.exitcode}"
+                print(f"Asset worker {process.name}: {error}")
+                AssetQueue().release(process.name, error)
+            self._started += 1
+            name = f"{socket.gethostname()}:{os.getpid()}:assets-{self._started}"
+            process = self._context.Process(
+                target=_worker_main,
+                args=(self.config_path, self._stop, name),
+                name=name,
+                daemon=True,
+            )
+            process.start()
+            self._workers[i] = process
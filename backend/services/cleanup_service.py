@@ -0,0 +1,81 @@
+"""Background removal of files derived from deleted rows."""
+
+import queue
+import shutil
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+class FileCleaner:
+    """
+    Removes files and directories on a background thread.
+
+    Deletes commit their rows and hand the files they leave behind
+    (thumbnails, materialized exports) to the cleaner, so requests return
+    without waiting on the filesystem. Directories emptied by removing a
+    file are removed as well.
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def remove(self, files: Iterable = (), trees: Iterable = ()) -> None:
+        """Queue files, and directory trees removed with their contents."""
+        job = ([Path(f) for f in files], [Path(t) for t in trees])
+        if not job[0] and not job[1]:
+            return
+
+        self._queue.put(job)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="file-cleaner", daemon=True
+                )
+                self._thread.start()
+
+    def join(self) -> None:
+        """Wait until all queued removals are done."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            files, trees = self._queue.get()
+            try:
+                _remove(files, trees)
+            except Exception as e:
+                print(f"File cleanup failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+def _remove(files: list[Path], trees: list[Path]) -> None:
+    parents = set()
+    for path in files:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Could not remove {path}: {e}")
+        parents.add(path.parent)
+
+    for tree in trees:
+        shutil.rmtree(tree, ignore_errors=True)
+
+    for parent in parents:
+        try:
+            parent.rmdir()
+        except OSError:
+            pass
+
+
+_cleaner: Optional[FileCleaner] = None
+
+
+def get_file_cleaner() -> FileCleaner:
+    """Get the global file cleaner."""
+    global _cleaner
+    if _cleaner is None:
+        _cleaner = FileCleaner()
+    return _cleaner
@@ -1,10 +1,44 @@
+import hashlib
+import json
+import os
+import threading
 from datetime import datetime
+from pathlib import Path
 from typing import Optional
 
 from backend.config import get_config
 from backend.database import get_db
-from backend.services.annotation_service import AnnotationService
+from backend.services.annotation_service import (
+    AnnotationService,
+    flush_pending_writes,
+)
 from backend.services.image_service import ImageService
+from backend.utils.file_lock import FileLock
+
+# Serialize materialization per project within a process; a lock file in the
+# export directory does the same across worker processes
+_materialize_locks: dict[int, threading.Lock] = {}
+_materialize_locks_guard = threading.Lock()
+
+
+def _get_materialize_lock(project_id: int) -> threading.Lock:
+    with _materialize_locks_guard:
+        return _materialize_locks.setdefault(project_id, threading.Lock())
+
+
+def _part_path(path: Path) -> Path:
+    """Temporary path a file is written to before replacing path."""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.part")
+
+
+def _dump_json(value) -> str:
+    """Serialize like the JSON export endpoints do."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def get_project_cache_dir(project_id: int) -> Path:
+    """Directory holding all of a project's materialized exports."""
+    return Path(get_config().export.cache_dir) / f"project_{project_id}"
 
 
 class ExportService:
@@ -38,6 +72,24 @@ class ExportService:
         # Use schema IDs as category IDs for consistency
         return {row["label_name"]: row["id"] for row in rows}
 
+    def _coco_info(self, project_info: dict) -> dict:
+        """Build the COCO info block for a project."""
+        return {
+            "description": f"SphereMark - {project_info['name']}",
+            "project_name": project_info["name"],
+            "project_description": project_info["description"],
+            "version": "1.0",
+            "year": datetime.now().year,
+            "date_created": datetime.now().isoformat(),
+            "coordinate_system": "geographic",
+            "coordinate_units": "degrees",
+            "coordinate_description": {
+                "azimuth": "0-360 degrees, 0=north",
+                "altitude": "-90 to 90 degrees, 0=horizon",
+            },
+            "contributor": "SphereMark",
+        }
+
     def export_coco(self, project_id: int, image_id: Optional[int] = None) -> dict:
         """
         Export annotations in COCO format with spherical coordinates.
@@ -49,6 +101,7 @@ class ExportService:
         Returns:
             COCO format dictionary
         """
+        flush_pending_writes()
         precision = self.config.export.coordinate_precision
 
         # Get project info
@@ -72,21 +125,7 @@ class ExportService:
 
         # Build COCO structure
         coco_output = {
-            "info": {
-                "description": f"SphereMark - {project_info['name']}",
-                "project_name": project_info["name"],
-                "project_description": project_info["description"],
-                "version": "1.0",
-                "year": datetime.now().year,
-                "date_created": datetime.now().isoformat(),
-                "coordinate_system": "geographic",
-                "coordinate_units": "degrees",
-                "coordinate_description": {
-                    "azimuth": "0-360 degrees, 0=north",
-                    "altitude": "-90 to 90 degrees, 0=horizon",
-                },
-                "contributor": "SphereMark",
-            },
+            "info": self._coco_info(project_info),
             "images": [],
             "annotations": [],
             "categories": [],
@@ -145,3 +184,525 @@ class ExportService:
             )
 
         return coco_output
+
+    # =========================================================================
+    # Materialized COCO Export
+    # =========================================================================
+
+    def materialize_coco(self, project_id: int) -> tuple[Path, str]:
+        """
+        Get the project's COCO export from disk, rebuilding only what changed.
+
+        The export is kept under ``export.cache_dir`` as one JSON fragment per
+        image plus the stitched artifact. Fragments are regenerated only for
+        images whose annotation revision changed; the artifact is re-stitched
+        only when the project's export key (images, their revisions, label
+        schema and project metadata) changed.
+
+        Args:
+            project_id: Project ID to export
+
+        Returns:
+            Tuple of (path to the COCO JSON file, export key usable as ETag)
+        """
+        flush_pending_writes()
+        export_dir = self._coco_export_dir(project_id)
+        artifact_path = export_dir / "export.json"
+        manifest_path = export_dir / "manifest.json"
+        fragments_dir = export_dir / "images"
+
+        with (
+            _get_materialize_lock(project_id),
+            FileLock(export_dir / "materialize.lock"),
+        ):
+            # Read the revision first so writes racing with the rebuild bump
+            # it past what the manifest records
+            project_revision = self._get_project_revision(project_id)
+            if project_revision is None:
+                raise ValueError(f"Project {project_id} not found")
+
+            manifest = self._read_coco_manifest(project_id)
+            if self._is_manifest_current(project_id, manifest, project_revision):
+                return artifact_path, manifest["key"]
+
+            project_info = self._get_project_info(project_id)
+            images = self._get_image_signatures(project_id)
+            label_schema = self._get_label_schema_mapping(project_id)
+            key = self.get_coco_export_key(
+                project_id, project_info, images, label_schema
+            )
+
+            if manifest.get("key") == key and artifact_path.exists():
+                manifest["project_revision"] = project_revision
+                self._write_coco_manifest(manifest_path, manifest)
+                return artifact_path, key
+
+            fragments_dir.mkdir(parents=True, exist_ok=True)
+            known = manifest.get("fragments", {})
+
+            stale = [
+                img
+                for img in images
+                if known.get(str(img["id"])) != img["signature"]
+                or not (fragments_dir / f"{img['id']}.json").exists()
+            ]
+            self._write_coco_fragments(stale, fragments_dir)
+
+            # Drop fragments of images that left the project
+            current_ids = {str(img["id"]) for img in images}
+            for fragment in fragments_dir.glob("*.json"):
+                if fragment.stem not in current_ids:
+                    fragment.unlink(missing_ok=True)
+
+            self._stitch_coco(
+                project_info, images, label_schema, fragments_dir, artifact_path
+            )
+
+            manifest = {
+                "key": key,
+                "project_revision": project_revision,
+                "coordinate_precision": self.config.export.coordinate_precision,
+                "generated_at": datetime.now().isoformat(),
+                "fragments": {str(img["id"]): img["signature"] for img in images},
+            }
+            self._write_coco_manifest(manifest_path, manifest)
+
+        return artifact_path, key
+
+    def get_current_coco_key(self, project_id: int) -> Optional[str]:
+        """
+        Get the key of the materialized COCO export if it is still current.
+
+        Costs one revision lookup and a manifest read, so conditional
+        requests can be answered without touching images or annotations.
+        """
+        flush_pending_writes()
+        project_revision = self._get_project_revision(project_id)
+        if project_revision is None:
+            return None
+
+        manifest = self._read_coco_manifest(project_id)
+        if self._is_manifest_current(project_id, manifest, project_revision):
+            return manifest["key"]
+        return None
+
+    def _coco_export_dir(self, project_id: int) -> Path:
+        """Directory holding a project's materialized COCO export."""
+        return get_project_cache_dir(project_id) / "coco"
+
+    def _get_project_revision(self, project_id: int) -> Optional[int]:
+        """Get the project's revision, bumped by any write to its data."""
+        row = self.db.fetchone(
+            "SELECT revision FROM projects WHERE id = ?", (project_id,)
+        )
+        return row["revision"] if row else None
+
+    def _read_coco_manifest(self, project_id: int) -> dict:
+        """Read the materialization manifest, or an empty one."""
+        manifest_path = self._coco_export_dir(project_id) / "manifest.json"
+        if not manifest_path.exists():
+            return {}
+        return json.loads(manifest_path.read_text())
+
+    def _write_coco_manifest(self, manifest_path: Path, manifest: dict) -> None:
+        """Atomically replace the materialization manifest."""
+        tmp_path = _part_path(manifest_path)
+        tmp_path.write_text(json.dumps(manifest))
+        os.replace(tmp_path, manifest_path)
+
+    def _is_manifest_current(
+        self, project_id: int, manifest: dict, project_revision: int
+    ) -> bool:
+        """Check whether the manifest describes the project at this revision."""
+        return (
+            manifest.get("project_revision") == project_revision
+            and manifest.get("coordinate_precision")
+            == self.config.export.coordinate_precision
+            and (self._coco_export_dir(project_id) / "export.json").exists()
+        )
+
+    def get_coco_export_key(
+        self,
+        project_id: int,
+        project_info: Optional[dict] = None,
+        images: Optional[list[dict]] = None,
+        label_schema: Optional[dict[str, int]] = None,
+    ) -> Optional[str]:
+        """Compute the key identifying the current content of a COCO export."""
+        if project_info is None:
+            project_info = self._get_project_info(project_id)
+            if not project_info:
+                return None
+        if images is None:
+            images = self._get_image_signatures(project_id)
+        if label_schema is None:
+            label_schema = self._get_label_schema_mapping(project_id)
+
+        digest = hashlib.sha1(
+            _dump_json(
+                [
+                    project_info,
+                    self.config.export.coordinate_precision,
+                    sorted(label_schema.items()),
+                    [(img["id"], img["signature"]) for img in images],
+                ]
+            ).encode("utf-8")
+        )
+        return digest.hexdigest()
+
+    def _get_image_signatures(self, project_id: int) -> list[dict]:
+        """
+        List project images in export order with a signature of their content.
+
+        The signature combines image metadata with the newest annotation or
+        tombstone revision, so it changes whenever the image's fragment would.
+        """
+        rows = self.db.fetchall(
+            """
+            SELECT
+                i.id, i.filename, i.width, i.height,
+                (
+                    SELECT MAX(a.revision) FROM annotations a
+                    WHERE a.image_id = i.id
+                ) AS revision
+            FROM images i
+            WHERE i.project_id = ?
+            ORDER BY i.created_at DESC, i.id DESC
+            """,
+            (project_id,),
+        )
+        tombstone_revisions = {
+            row["image_id"]: row["revision"]
+            for row in self.db.fetchall(
+                """
+                SELECT image_id, MAX(revision) AS revision
+                FROM annotation_tombstones
+                WHERE project_id = ?
+                GROUP BY image_id
+                """,
+                (project_id,),
+            )
+        }
+
+        images = []
+        for row in rows:
+            revision = max(row["revision"] or 0, tombstone_revisions.get(row["id"], 0))
+            images.append(
+                {
+                    "id": row["id"],
+                    "filename": row["filename"],
+                    "width": row["width"],
+                    "height": row["height"],
+                    "signature": (
+                        f"{revision}:{row['filename']}:{row['width']}x{row['height']}"
+                    ),
+                }
+            )
+        return images
+
+    def _write_coco_fragments(self, images: list[dict], fragments_dir: Path) -> None:
+        """Write the COCO image entry and annotations of each image to a fragment."""
+        precision = self.config.export.coordinate_precision
+
+        # Bound the IN list size for SQLite's variable limit
+        chunk_size = 500
+        for start in range(0, len(images), chunk_size):
+            chunk = images[start : start + chunk_size]
+            by_image: dict[int, list] = {img["id"]: [] for img in chunk}
+
+            rows = self.db.fetchall(
+                f"""
+                SELECT image_id, label, az_min, alt_min, az_max, alt_max, color
+                FROM annotations
+                WHERE image_id IN ({", ".join("?" * len(chunk))})
+                ORDER BY image_id, created_at, id
+                """,
+                tuple(by_image),
+            )
+            for row in rows:
+                by_image[row["image_id"]].append(
+                    {
+                        "label": row["label"] or "unlabeled",
+                        "bbox_geo": {
+                            "az_min": round(row["az_min"], precision),
+                            "alt_min": round(row["alt_min"], precision),
+                            "az_max": round(row["az_max"], precision),
+                            "alt_max": round(row["alt_max"], precision),
+                        },
+                        "color": row["color"],
+                    }
+                )
+
+            for img in chunk:
+                fragment = {
+                    "image": {
+                        "id": img["id"],
+                        "file_name": img["filename"],
+                        "width": img["width"],
+                        "height": img["height"],
+                        "projection": "equirectangular",
+                    },
+                    "annotations": by_image[img["id"]],
+                }
+                (fragments_dir / f"{img['id']}.json").write_text(
+                    _dump_json(fragment), encoding="utf-8"
+                )
+
+    def _stitch_coco(
+        self,
+        project_info: dict,
+        images: list[dict],
+        label_schema: dict[str, int],
+        fragments_dir: Path,
+        artifact_path: Path,
+    ) -> None:
+        """
+        Stitch per-image fragments into the final COCO file.
+
+        Annotation and category IDs are assigned here, exactly as export_coco
+        does, so the output matches a from-scratch export.
+        """
+        label_to_id = dict(label_schema)
+        next_category_id = max(label_to_id.values(), default=0) + 1
+        annotation_id_counter = 1
+
+        tmp_path = _part_path(artifact_path)
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            out.write('{"info":')
+            out.write(_dump_json(self._coco_info(project_info)))
+
+            out.write(',"images":[')
+            for index, img in enumerate(images):
+                fragment = json.loads(
+                    (fragments_dir / f"{img['id']}.json").read_text(encoding="utf-8")
+                )
+                if index:
+                    out.write(",")
+                out.write(_dump_json(fragment["image"]))
+
+            # Second pass keeps only one fragment in memory at a time
+            out.write('],"annotations":[')
+            first = True
+            for img in images:
+                fragment = json.loads(
+                    (fragments_dir / f"{img['id']}.json").read_text(encoding="utf-8")
+                )
+                for ann in fragment["annotations"]:
+                    label = ann["label"]
+                    if label not in label_to_id:
+                        label_to_id[label] = next_category_id
+                        next_category_id += 1
+
+                    if not first:
+                        out.write(",")
+                    first = False
+                    out.write(
+                        _dump_json(
+                            {
+                                "id": annotation_id_counter,
+                                "image_id": img["id"],
+                                "category_id": label_to_id[label],
+                                "bbox_geo": ann["bbox_geo"],
+                                "color": ann["color"],
+                            }
+                        )
+                    )
+                    annotation_id_counter += 1
+
+            out.write('],"categories":')
+            out.write(
+                _dump_json(
+                    [
+                        {"id": cat_id, "name": label, "supercategory": "object"}
+                        for label, cat_id in sorted(
+                            label_to_id.items(), key=lambda x: x[1]
+                        )
+                    ]
+                )
+            )
+            out.write("}")
+
+        os.replace(tmp_path, artifact_path)
+
+    # =========================================================================
+    # Columnar (Arrow / Parquet) Export
+    # =========================================================================
+
+    def export_columnar(
+        self,
+        project_id: int,
+        output_dir: Path,
+        file_format: str = "parquet",
+        include_pixel_bounds: bool = False,
+    ) -> dict[str, Path]:
+        """
+        Export project images, annotations and categories as columnar tables.
+
+        Rows are streamed from SQLite cursors and written one batch (one
+        Parquet row group / Arrow record batch) at a time, so memory use is
+        bounded by ``export.batch_size`` regardless of project size.
+
+        Args:
+            project_id: Project ID to export
+            output_dir: Directory to write the table files into
+            file_format: "parquet" or "arrow" (Arrow IPC file)
+            include_pixel_bounds: Also emit equirectangular pixel bounds
+
+        Returns:
+            Mapping of table name to written file path
+        """
+        flush_pending_writes()
+        pa, open_writer = self._columnar_writer(file_format)
+
+        if not self._get_project_info(project_id):
+            raise ValueError(f"Project {project_id} not found")
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        suffix = ".parquet" if file_format == "parquet" else ".arrow"
+        batch_size = self.config.export.batch_size
+        paths = {
+            name: output_dir / f"{name}{suffix}"
+            for name in ("images", "annotations", "categories")
+        }
+
+        image_schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("file_name", pa.string()),
+                ("width", pa.int32()),
+                ("height", pa.int32()),
+            ]
+        )
+        annotation_fields = [
+            ("id", pa.int64()),
+            ("image_id", pa.int64()),
+            ("category_id", pa.int32()),
+            ("label", pa.string()),
+            ("az_min", pa.float64()),
+            ("alt_min", pa.float64()),
+            ("az_max", pa.float64()),
+            ("alt_max", pa.float64()),
+            ("color", pa.string()),
+        ]
+        if include_pixel_bounds:
+            annotation_fields += [
+                ("x_min", pa.float64()),
+                ("y_min", pa.float64()),
+                ("x_max", pa.float64()),
+                ("y_max", pa.float64()),
+            ]
+        annotation_schema = pa.schema(annotation_fields)
+
+        label_to_id = self._get_label_schema_mapping(project_id)
+        next_category_id = max(label_to_id.values(), default=0) + 1
+
+        with self.db.get_connection() as conn:
+            cursor = conn.execute(
+                """
+                SELECT id, filename, width, height FROM images
+                WHERE project_id = ?
+                ORDER BY id
+                """,
+                (project_id,),
+            )
+            with open_writer(paths["images"], image_schema) as writer:
+                while rows := cursor.fetchmany(batch_size):
+                    columns = list(zip(*rows))
+                    writer.write_batch(
+                        pa.RecordBatch.from_arrays(
+                            [
+                                pa.array(c, type=f.type)
+                                for c, f in zip(columns, image_schema)
+                            ],
+                            schema=image_schema,
+                        )
+                    )
+
+            # Pixel bounds follow the equirectangular mapping used by the
+            # viewer: x = az / 360 * width, y = (90 - alt) / 180 * height
+            pixel_columns = (
+                """,
+                a.az_min / 360.0 * i.width,
+                (90.0 - a.alt_max) / 180.0 * i.height,
+                a.az_max / 360.0 * i.width,
+                (90.0 - a.alt_min) / 180.0 * i.height
+                """
+                if include_pixel_bounds
+                else ""
+            )
+            cursor = conn.execute(
+                f"""
+                SELECT
+                    a.id, a.image_id, a.label,
+                    a.az_min, a.alt_min, a.az_max, a.alt_max, a.color
+                    {pixel_columns}
+                FROM annotations a
+                JOIN images i ON i.id = a.image_id
+                WHERE i.project_id = ?
+                ORDER BY a.image_id, a.id
+                """,
+                (project_id,),
+            )
+            with open_writer(paths["annotations"], annotation_schema) as writer:
+                while rows := cursor.fetchmany(batch_size):
+                    columns = list(zip(*rows))
+                    category_ids = []
+                    for label in columns[2]:
+                        label = label or "unlabeled"
+                        if label not in label_to_id:
+                            label_to_id[label] = next_category_id
+                            next_category_id += 1
+                        category_ids.append(label_to_id[label])
+                    columns.insert(2, category_ids)
+                    writer.write_batch(
+                        pa.RecordBatch.from_arrays(
+                            [
+                                pa.array(c, type=f.type)
+                                for c, f in zip(columns, annotation_schema)
+                            ],
+                            schema=annotation_schema,
+                        )
+                    )
+
+        category_schema = pa.schema([("id", pa.int32()), ("name", pa.string())])
+        categories = sorted(label_to_id.items(), key=lambda x: x[1])
+        with open_writer(paths["categories"], category_schema) as writer:
+            writer.write_batch(
+                pa.RecordBatch.from_arrays(
+                    [
+                        pa.array([cat_id for _, cat_id in categories], type=pa.int32()),
+                        pa.array([label for label, _ in categories], type=pa.string()),
+                    ],
+                    schema=category_schema,
+                )
+            )
+
+        return paths
+
+    def _columnar_writer(self, file_format: str):
+        """Resolve pyarrow and a writer factory for the requested format."""
+        if file_format not in ("parquet", "arrow"):
+            raise ValueError(f"Unsupported columnar format: {file_format}")
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Columnar export requires pyarrow (install spheremark[analytics])"
+            ) from e
+
+        if file_format == "parquet":
+
+            def open_writer(path: Path, schema):
+                return pq.ParquetWriter(str(path), schema, compression="zstd")
+
+        else:
+
+            def open_writer(path: Path, schema):
+                # Buffers compressed like the Parquet pages, readable by
+                # Arrow 0.17 and later
+                options = pa.ipc.IpcWriteOptions(compression="zstd")
+                return pa.ipc.new_file(str(path), schema, options=options)
+
+        return pa, open_writer
@@ -1,136 +1,311 @@
+import os
+import threading
 from pathlib import Path
 from typing import Optional
 
-from PIL import Image
-
 from backend.config import get_config
-from backend.database import get_db
-from backend.models import ImageListResponse, ImageResponse, ScanResult
-
-# Disable decompression bomb warning for large panoramic images
-Image.MAX_IMAGE_PIXELS = None
+from backend.database import Database, get_db
+from backend.models import (
+    DuplicateImage,
+    DuplicateImageGroup,
+    ImageListResponse,
+    ImageResponse,
+    ScanResult,
+)
+from backend.repositories import get_repository
+from backend.services.annotation_service import flush_pending_writes
+from backend.services.asset_service import (
+    AssetQueue,
+    asset_queue_enabled,
+    assets_for_image,
+)
+from backend.services.cleanup_service import get_file_cleaner
+from backend.services.rendition_service import (
+    fit_for_level,
+    get_rendition,
+    has_preview,
+)
+from backend.services.source_service import local_image_file, open_image_source
+from backend.utils.imaging import pil_image
+from backend.utils.phash import BKTree, hash_from_db, hash_to_db, perceptual_hash
+from backend.utils.s3 import S3Error
+
+# Thumbnails are kept in one subdirectory per project
+THUMBNAILS_DIR = Path("data/thumbnails")
 
 
 class ImageService:
     """Service for managing panoramic images."""
 
     def __init__(self):
-        self.db = get_db()
+        self.repo = get_repository()
         self.config = get_config()
 
+    @property
+    def db(self) -> Database:
+        # Duplicate search is SQLite-only
+        return get_db()
+
     def scan_images(self, project_id: int) -> ScanResult:
         """Scan project's image directory for new images and add to database."""
         result = ScanResult(scanned=0, added=0, skipped=0, errors=[])
 
         # Get project's images_path
-        project = self.db.fetchone(
-            "SELECT images_path FROM projects WHERE id = ?", (project_id,)
-        )
+        project = self.repo.get_project(project_id)
 
         if not project:
             result.errors.append(f"Project {project_id} not found")
             return result
 
-        remote_path = Path(project["images_path"])
-        if not remote_path.exists():
-            result.errors.append(f"Remote path does not exist: {remote_path}")
+        source = open_image_source(project["images_path"])
+        try:
+            found = source.exists()
+        except S3Error as e:
+            result.errors.append(f"Cannot read {source.uri}: {e}")
+            return result
+        if not found:
+            result.errors.append(f"Remote path does not exist: {source.uri}")
             return result
 
         allowed_exts = tuple(self.config.images.allowed_extensions)
 
-        for image_path in remote_path.iterdir():
-            if not image_path.is_file():
-                continue
+        skip_duplicates = self.config.images.skip_duplicates
+        max_distance = self.config.images.duplicate_distance
+        hash_index = self._build_hash_index(project_id) if skip_duplicates else None
+        queue_assets = asset_queue_enabled()
+        asset_queue = AssetQueue() if queue_assets else None
 
-            if image_path.suffix.lower() not in allowed_exts:
+        for file in source.list_files():
+            if Path(file.name).suffix.lower() not in allowed_exts:
                 continue
 
             result.scanned += 1
 
             try:
                 # Check if already in database for this project
-                existing = self.db.fetchone(
-                    "SELECT id FROM images WHERE project_id = ? AND filename = ?",
-                    (project_id, image_path.name),
-                )
+                existing = self.repo.find_image(project_id, file.name)
 
                 if existing:
+                    # Backfill hashes for images scanned before hashing existed
+                    if existing["phash"] is None:
+                        self._store_hash(existing["id"], source.fetch(file))
                     result.skipped += 1
                     continue
 
-                # Open image to get dimensions
-                with Image.open(image_path) as img:
-                    width, height = img.size
-
-                # Generate thumbnail
-                thumbnail_path = self._generate_thumbnail(image_path, project_id)
+                # Dimensions come from the header alone, so remote files that
+                # aren't images are rejected before being downloaded
+                width, height = source.read_dimensions(file)
+                image_path = source.fetch(file)
+
+                with pil_image().open(image_path) as img:
+                    phash = perceptual_hash(img)
+
+                if hash_index is not None:
+                    matches = hash_index.search(phash, max_distance)
+                    if matches:
+                        result.skipped += 1
+                        result.duplicates.append(
+                            f"{file.name}: duplicate of {matches[0][1]}"
+                        )
+                        continue
+
+                # Queued assets are built by the asset workers; the
+                # thumbnail's path is known ahead of its file
+                thumbnail_path = self._thumbnail_path(project_id, file.name)
+                preview = None
+                if not queue_assets:
+                    # One decode makes the preview, shown first while the
+                    # viewer loads the display image, and the thumbnail
+                    with pil_image().open(image_path) as img:
+                        if has_preview(width, height):
+                            preview = fit_for_level(img, "preview")
+                            self._save_thumbnail(preview.copy(), thumbnail_path)
+                        else:
+                            self._save_thumbnail(img, thumbnail_path)
 
                 # Add to database
-                self.db.execute(
-                    """
-                    INSERT INTO images (project_id, filename, filepath, width, height, thumbnail_path)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        project_id,
-                        image_path.name,
-                        str(image_path),
-                        width,
-                        height,
-                        thumbnail_path,
-                    ),
+                image_id = self.repo.add_image(
+                    {
+                        "project_id": project_id,
+                        "filename": file.name,
+                        "filepath": file.uri,
+                        "width": width,
+                        "height": height,
+                        "thumbnail_path": str(thumbnail_path),
+                        "phash": hash_to_db(phash),
+                    }
                 )
 
+                if queue_assets:
+                    asset_queue.enqueue(
+                        [(image_id, asset) for asset in assets_for_image(width, height)]
+                    )
+                elif preview is not None:
+                    # The image is added either way; a missing preview is
+                    # built on its first request
+                    try:
+                        get_rendition(
+                            image_id, file.uri, image_path, level="preview", img=preview
+                        )
+                    except Exception as e:
+                        print(f"Preview of {file.name} not built: {e}")
+
+                if hash_index is not None:
+                    hash_index.add(phash, file.name)
+
                 result.added += 1
 
             except Exception as e:
-                result.errors.append(f"{image_path.name}: {str(e)}")
+                result.errors.append(f"{file.name}: {str(e)}")
 
         return result
 
-    def _generate_thumbnail(self, image_path: Path, project_id: int) -> str:
-        """Generate thumbnail for an image."""
-        # Use project-specific thumbnail directory
-        thumbnails_dir = Path(f"data/thumbnails/project_{project_id}")
-        thumbnails_dir.mkdir(parents=True, exist_ok=True)
+    def _build_hash_index(self, project_id: int) -> BKTree:
+        """Index the filenames of a project's images by perceptual hash."""
+        index = BKTree()
+        for row in self.repo.list_image_hashes(project_id):
+            index.add(hash_from_db(row["phash"]), row["filename"])
+        return index
+
+    def _store_hash(self, image_id: int, image_path: Path) -> None:
+        """Compute and store the perceptual hash of an existing image."""
+        with pil_image().open(image_path) as img:
+            phash = perceptual_hash(img)
+        self.repo.set_image_hash(image_id, hash_to_db(phash))
+
+    def find_duplicate_images(
+        self, project_id: int, max_distance: int = 4, across_projects: bool = False
+    ) -> list[DuplicateImageGroup]:
+        """
+        Find duplicate and near-duplicate images by perceptual hash.
+
+        Args:
+            project_id: Project whose images are checked
+            max_distance: Maximum number of differing hash bits
+            across_projects: Also match images in other projects
+
+        Returns:
+            One group per image with duplicates. Images already listed as a
+            duplicate within the project don't start a group of their own.
+        """
+        if across_projects:
+            rows = self.db.fetchall(
+                "SELECT id, project_id, filename, phash FROM images "
+                "WHERE phash IS NOT NULL ORDER BY id"
+            )
+        else:
+            rows = self.db.fetchall(
+                "SELECT id, project_id, filename, phash FROM images "
+                "WHERE project_id = ? AND phash IS NOT NULL ORDER BY id",
+                (project_id,),
+            )
 
-        thumbnail_filename = f"thumb_{image_path.stem}.jpg"
-        thumbnail_path = thumbnails_dir / thumbnail_filename
+        index = BKTree()
+        for row in rows:
+            index.add(hash_from_db(row["phash"]), row)
 
-        with Image.open(image_path) as img:
-            # Calculate thumbnail size maintaining aspect ratio
-            max_width = self.config.thumbnails.max_width
-            aspect_ratio = img.height / img.width
-            thumbnail_size = (max_width, int(max_width * aspect_ratio))
+        groups = []
+        reported: set[int] = set()
 
-            # Create thumbnail
-            img.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
-            img.convert("RGB").save(
-                thumbnail_path, "JPEG", quality=self.config.thumbnails.quality
+        for row in rows:
+            if row["project_id"] != project_id or row["id"] in reported:
+                continue
+
+            matches = [
+                (distance, match)
+                for distance, match in index.search(
+                    hash_from_db(row["phash"]), max_distance
+                )
+                if match["id"] != row["id"]
+            ]
+            if not matches:
+                continue
+
+            reported.update(
+                match["id"] for _, match in matches if match["project_id"] == project_id
+            )
+            groups.append(
+                DuplicateImageGroup(
+                    image=self._to_duplicate(row, 0),
+                    duplicates=[
+                        self._to_duplicate(match, distance)
+                        for distance, match in matches
+                    ],
+                )
             )
 
-        return str(thumbnail_path)
+        return groups
+
+    @staticmethod
+    def _to_duplicate(row, distance: int) -> DuplicateImage:
+        return DuplicateImage(
+            id=row["id"],
+            project_id=row["project_id"],
+            filename=row["filename"],
+            distance=distance,
+        )
+
+    def build_thumbnail(self, image_id: int) -> Optional[Path]:
+        """
+        Write an image's thumbnail unless its file exists.
+
+        Returns:
+            The thumbnail's path, or None if the image or its original
+            doesn't exist
+        """
+        row = self.repo.get_image(image_id)
+        if not row or not row["thumbnail_path"]:
+            return None
+
+        thumbnail_path = Path(row["thumbnail_path"])
+        if not thumbnail_path.exists():
+            image_path = local_image_file(row["filepath"])
+            if image_path is None:
+                return None
+            self._write_thumbnail(image_path, thumbnail_path)
+        return thumbnail_path
+
+    def _thumbnail_path(self, project_id: int, filename: str) -> Path:
+        """Path of a new image's thumbnail."""
+        # Use project-specific thumbnail directory
+        return (
+            THUMBNAILS_DIR
+            / f"project_{project_id}"
+            / f"thumb_{Path(filename).stem}.jpg"
+        )
+
+    def _write_thumbnail(self, image_path: Path, thumbnail_path: Path) -> None:
+        """Generate thumbnail for an image."""
+        with pil_image().open(image_path) as img:
+            self._save_thumbnail(img, thumbnail_path)
+
+    def _save_thumbnail(self, img, thumbnail_path: Path) -> None:
+        """Save a thumbnail of an opened image, scaling the image in place."""
+        thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Calculate thumbnail size maintaining aspect ratio
+        max_width = self.config.thumbnails.max_width
+        aspect_ratio = img.height / img.width
+        thumbnail_size = (max_width, int(max_width * aspect_ratio))
+
+        # Create thumbnail
+        img.thumbnail(thumbnail_size, pil_image().Resampling.LANCZOS)
+        # Written aside and renamed, since the thumbnail route and an
+        # asset worker may build the same one at once
+        partial = thumbnail_path.with_name(
+            f"{thumbnail_path.name}.{os.getpid()}.{threading.get_ident()}.part"
+        )
+        try:
+            img.convert("RGB").save(
+                partial, "JPEG", quality=self.config.thumbnails.quality
+            )
+            os.replace(partial, thumbnail_path)
+        finally:
+            partial.unlink(missing_ok=True)
 
     def list_images(self, project_id: int) -> list[ImageListResponse]:
         """List all images in a project with annotation counts."""
-        rows = self.db.fetchall(
-            """
-            SELECT
-                i.id,
-                i.project_id,
-                i.filename,
-                i.width,
-                i.height,
-                i.thumbnail_path,
-                COUNT(a.id) as annotation_count
-            FROM images i
-            LEFT JOIN annotations a ON i.id = a.image_id
-            WHERE i.project_id = ?
-            GROUP BY i.id
-            ORDER BY i.created_at DESC
-            """,
-            (project_id,),
-        )
+        rows = self.repo.list_images(project_id)
 
         return [
             ImageListResponse(
@@ -147,7 +322,7 @@ class ImageService:
 
     def get_image(self, image_id: int) -> Optional[ImageResponse]:
         """Get image by ID."""
-        row = self.db.fetchone("SELECT * FROM images WHERE id = ?", (image_id,))
+        row = self.repo.get_image(image_id)
 
         if not row:
             return None
@@ -163,28 +338,49 @@ class ImageService:
             created_at=row["created_at"],
         )
 
+    def delete_image(self, image_id: int) -> bool:
+        """
+        Delete an image and its annotations.
+
+        The image file itself is left alone; its thumbnail is removed in the
+        background unless another image still uses it.
+        """
+        flush_pending_writes()
+        thumbnails = self.repo.delete_image(image_id)
+        if thumbnails is None:
+            return False
+
+        get_file_cleaner().remove(files=thumbnails)
+        return True
+
+    def get_revision(self, image_id: int) -> Optional[int]:
+        """Get an image's revision, or None if it doesn't exist."""
+        # Buffered updates bump the revision once written
+        flush_pending_writes()
+        return self.repo.get_image_revision(image_id)
+
     def validate_image_in_project(self, project_id: int, image_id: int) -> bool:
         """Validate that an image belongs to a project."""
-        row = self.db.fetchone(
-            "SELECT id FROM images WHERE id = ? AND project_id = ?",
-            (image_id, project_id),
-        )
-        return row is not None
+        return self.repo.image_in_project(project_id, image_id)
 
     def get_image_file_path(self, image_id: int) -> Optional[Path]:
-        """Get file path for an image."""
-        row = self.db.fetchone("SELECT filepath FROM images WHERE id = ?", (image_id,))
+        """
+        Get a local path to an image's original.
+
+        Originals in object storage are downloaded into the image cache on
+        first use, so call this off the event loop. None if the image or
+        its file doesn't exist.
+        """
+        row = self.repo.get_image(image_id)
 
         if not row:
             return None
 
-        return Path(row["filepath"])
+        return local_image_file(row["filepath"])
 
     def get_thumbnail_path(self, image_id: int) -> Optional[Path]:
         """Get thumbnail path for an image."""
-        row = self.db.fetchone(
-            "SELECT thumbnail_path FROM images WHERE id = ?", (image_id,)
-        )
+        row = self.repo.get_image(image_id)
 
         if not row or not row["thumbnail_path"]:
             return None
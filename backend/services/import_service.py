@@ -0,0 +1,345 @@
+"""Service for bulk importing annotations from COCO and CSV files."""
+
+import csv
+from itertools import islice
+from typing import Iterable, Iterator, Optional, TextIO
+
+from backend.database import get_db
+from backend.models import ImportResult
+from backend.repositories.bulk import bulk_insert_annotations
+from backend.services.annotation_service import flush_pending_writes
+from backend.utils.json_stream import iter_object_members
+
+# Rows per executemany call while staging
+IMPORT_BATCH_SIZE = 10000
+# Unmatched filenames listed in the report
+MAX_REPORTED_FILENAMES = 100
+
+# Staging rows: (image_ref, category_ref, label, az_min, alt_min, az_max,
+# alt_max, color, x, y, w, h); either the geographic or the pixel bounds
+# are set
+_STAGE_ANNOTATION = """
+    INSERT INTO import_annotations (
+        image_ref, category_ref, label, az_min, alt_min, az_max, alt_max,
+        color, x, y, w, h
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Pixel boxes are converted with the dimensions of the matched image, or
+# those given in the file when the database doesn't have them
+_RESOLVE = """
+    CREATE TEMP TABLE import_resolved AS
+    SELECT
+        i.id AS image_id,
+        COALESCE(a.label, c.name, 'unlabeled') AS label,
+        a.color AS color,
+        COALESCE(a.az_min, a.x * 360.0 / COALESCE(i.width, ii.width)) AS az_min,
+        COALESCE(a.alt_min, 90.0 - (a.y + a.h) * 180.0 / COALESCE(i.height, ii.height))
+            AS alt_min,
+        COALESCE(a.az_max, (a.x + a.w) * 360.0 / COALESCE(i.width, ii.width)) AS az_max,
+        COALESCE(a.alt_max, 90.0 - a.y * 180.0 / COALESCE(i.height, ii.height))
+            AS alt_max
+    FROM import_annotations a
+    JOIN import_images ii ON ii.ref = a.image_ref
+    JOIN images i ON i.project_id = ? AND i.filename = ii.file_name
+    LEFT JOIN import_categories c ON c.ref = a.category_ref
+"""
+
+# Same bounds the API enforces on created annotations
+_VALID = """
+    az_min >= 0 AND az_max <= 360 AND az_min < az_max
+    AND alt_min >= -90 AND alt_max <= 90 AND alt_min < alt_max
+"""
+
+
+def _batched(rows: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _number(value) -> Optional[float]:
+    return None if value in (None, "") else float(value)
+
+
+class ImportService:
+    """Service for importing annotations into a project."""
+
+    def __init__(self):
+        self.db = get_db()
+
+    def import_coco(
+        self,
+        project_id: int,
+        fp: TextIO,
+        dry_run: bool = False,
+        create_labels: bool = True,
+    ) -> ImportResult:
+        """
+        Import a COCO file, streaming it instead of loading it whole.
+
+        Annotations may carry SphereMark's ``bbox_geo`` (degrees) or a
+        standard pixel ``bbox`` ([x, y, width, height] on the
+        equirectangular image). Images are matched to the project's images
+        by ``file_name``.
+        """
+
+        def stage(conn) -> None:
+            def annotations(items):
+                for item in items:
+                    geo = item.get("bbox_geo")
+                    if geo:
+                        bounds = (
+                            geo["az_min"],
+                            geo["alt_min"],
+                            geo["az_max"],
+                            geo["alt_max"],
+                        )
+                        pixels = (None, None, None, None)
+                    else:
+                        bounds = (None, None, None, None)
+                        pixels = tuple(item["bbox"])
+                    category_id = item.get("category_id")
+                    yield (
+                        str(item["image_id"]),
+                        None if category_id is None else str(category_id),
+                        item.get("label"),
+                        *bounds,
+                        item.get("color"),
+                        *pixels,
+                    )
+
+            # Members arrive in document order; buffer each section's items
+            # into batches so they're staged with executemany
+            pending: dict[str, list] = {
+                "images": [],
+                "annotations": [],
+                "categories": [],
+            }
+
+            def stage_section(section: str) -> None:
+                items = pending[section]
+                if not items:
+                    return
+                if section == "images":
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO import_images VALUES (?, ?, ?, ?)",
+                        [
+                            (
+                                str(item["id"]),
+                                item["file_name"],
+                                item.get("width"),
+                                item.get("height"),
+                            )
+                            for item in items
+                        ],
+                    )
+                elif section == "categories":
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO import_categories VALUES (?, ?)",
+                        [(str(item["id"]), item["name"]) for item in items],
+                    )
+                else:
+                    conn.executemany(_STAGE_ANNOTATION, list(annotations(items)))
+                items.clear()
+
+            for key, item in iter_object_members(fp):
+                if key in pending and isinstance(item, dict):
+                    pending[key].append(item)
+                    if len(pending[key]) >= IMPORT_BATCH_SIZE:
+                        stage_section(key)
+
+            for section in pending:
+                stage_section(section)
+
+        return self._import(project_id, stage, dry_run, create_labels)
+
+    def import_csv(
+        self,
+        project_id: int,
+        fp: TextIO,
+        dry_run: bool = False,
+        create_labels: bool = True,
+    ) -> ImportResult:
+        """
+        Import a CSV file with a header row.
+
+        Required columns are ``filename`` and either ``az_min``, ``alt_min``,
+        ``az_max``, ``alt_max`` (degrees) or ``x``, ``y``, ``width``,
+        ``height`` (pixels). ``label`` and ``color`` are optional.
+        """
+
+        def stage(conn) -> None:
+            reader = csv.DictReader(fp)
+            filenames = set()
+
+            def rows():
+                for row in reader:
+                    filenames.add(row["filename"])
+                    yield (
+                        row["filename"],
+                        None,
+                        row.get("label") or None,
+                        _number(row.get("az_min")),
+                        _number(row.get("alt_min")),
+                        _number(row.get("az_max")),
+                        _number(row.get("alt_max")),
+                        row.get("color") or None,
+                        _number(row.get("x")),
+                        _number(row.get("y")),
+                        _number(row.get("width")),
+                        _number(row.get("height")),
+                    )
+
+            for batch in _batched(rows(), IMPORT_BATCH_SIZE):
+                conn.executemany(_STAGE_ANNOTATION, batch)
+
+            conn.executemany(
+                "INSERT INTO import_images VALUES (?, ?, NULL, NULL)",
+                [(name, name) for name in filenames],
+            )
+
+        return self._import(project_id, stage, dry_run, create_labels)
+
+    def _import(
+        self, project_id: int, stage, dry_run: bool, create_labels: bool
+    ) -> ImportResult:
+        """
+        Stage a file into temporary tables, then resolve and insert set-based.
+
+        Everything runs in one transaction, which is rolled back for dry
+        runs, so the report always reflects exactly what would be written.
+        """
+        if not self.db.fetchone("SELECT id FROM projects WHERE id = ?", (project_id,)):
+            raise ValueError(f"Project {project_id} not found")
+
+        flush_pending_writes()
+        result = ImportResult(dry_run=dry_run)
+
+        with self.db.get_connection() as conn:
+            try:
+                conn.execute("BEGIN")
+                self._create_staging_tables(conn)
+                try:
+                    stage(conn)
+                except (KeyError, TypeError, ValueError) as e:
+                    raise ValueError(f"Malformed import file: {e!r}") from e
+
+                conn.execute(_RESOLVE, (project_id,))
+                self._fill_report(conn, project_id, result)
+
+                if dry_run:
+                    conn.rollback()
+                    return result
+
+                if create_labels:
+                    conn.execute(
+                        """
+                        INSERT OR IGNORE INTO label_schemas
+                            (project_id, label_name, sort_order)
+                        SELECT ?, label, 0 FROM import_resolved
+                        WHERE label <> 'unlabeled'
+                        GROUP BY label
+                        """,
+                        (project_id,),
+                    )
+
+                bulk_insert_annotations(
+                    conn,
+                    f"""
+                    SELECT image_id, NULLIF(label, 'unlabeled') AS label,
+                           az_min, alt_min, az_max, alt_max, color,
+                           CURRENT_TIMESTAMP AS created_at,
+                           CURRENT_TIMESTAMP AS updated_at
+                    FROM import_resolved
+                    WHERE {_VALID}
+                    """,
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        return result
+
+    def _create_staging_tables(self, conn) -> None:
+        conn.execute("""
+            CREATE TEMP TABLE import_images (
+                ref TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                width INTEGER,
+                height INTEGER
+            )
+            """)
+        conn.execute("""
+            CREATE TEMP TABLE import_categories (
+                ref TEXT PRIMARY KEY,
+                name TEXT NOT NULL
+            )
+            """)
+        conn.execute("""
+            CREATE TEMP TABLE import_annotations (
+                image_ref TEXT,
+                category_ref TEXT,
+                label TEXT,
+                az_min REAL, alt_min REAL, az_max REAL, alt_max REAL,
+                color TEXT,
+                x REAL, y REAL, w REAL, h REAL
+            )
+            """)
+
+    def _fill_report(self, conn, project_id: int, result: ImportResult) -> None:
+        """Count what the resolved import would write and what it skips."""
+        result.images_in_file = conn.execute(
+            "SELECT COUNT(*) FROM import_images"
+        ).fetchone()[0]
+        result.annotations_in_file = conn.execute(
+            "SELECT COUNT(*) FROM import_annotations"
+        ).fetchone()[0]
+
+        result.unmatched_images = [
+            row[0]
+            for row in conn.execute(
+                """
+                SELECT ii.file_name FROM import_images ii
+                LEFT JOIN images i
+                    ON i.project_id = ? AND i.filename = ii.file_name
+                WHERE i.id IS NULL
+                ORDER BY ii.file_name
+                LIMIT ?
+                """,
+                (project_id, MAX_REPORTED_FILENAMES),
+            )
+        ]
+        result.images_matched = (
+            result.images_in_file
+            - conn.execute(
+                """
+            SELECT COUNT(*) FROM import_images ii
+            LEFT JOIN images i ON i.project_id = ? AND i.filename = ii.file_name
+            WHERE i.id IS NULL
+            """,
+                (project_id,),
+            ).fetchone()[0]
+        )
+
+        resolved, valid = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM({_VALID}), 0) FROM import_resolved"
+        ).fetchone()
+        result.imported = valid
+        result.skipped_unmatched = result.annotations_in_file - resolved
+        result.skipped_invalid = resolved - valid
+
+        result.new_labels = [
+            row[0]
+            for row in conn.execute(
+                """
+                SELECT DISTINCT r.label FROM import_resolved r
+                LEFT JOIN label_schemas ls
+                    ON ls.project_id = ? AND ls.label_name = r.label
+                WHERE ls.id IS NULL AND r.label <> 'unlabeled'
+                ORDER BY r.label
+                """,
+                (project_id,),
+            )
+        ]
@@ -0,0 +1,93 @@
+"""Bounded execution of CPU-heavy image work off the event loop."""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Jobs per worker process when init_image_jobs() wasn't called
+DEFAULT_IMAGE_JOBS = 2
+
+
+class ImageJobPool:
+    """
+    Runs image decoding, resizing and scans on a fixed number of threads.
+
+    Pillow and NumPy release the GIL for most of their work, so a few
+    threads keep a worker's cores busy while the event loop keeps serving
+    other requests. The bound is per worker process, which caps the memory
+    held by decoded panoramas. On shutdown, drain() waits for jobs that
+    are queued or running, since a job may outlive a request cancelled by
+    the server's shutdown timeout and be halfway through writing a file.
+    """
+
+    def __init__(self, max_jobs: int = DEFAULT_IMAGE_JOBS):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_jobs, thread_name_prefix="image-job"
+        )
+        self._pending = 0
+        self._idle = threading.Condition()
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or running."""
+        return self._pending
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run fn in the pool and wait for its result."""
+        with self._idle:
+            self._pending += 1
+        try:
+            future = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except RuntimeError:
+            # Pool already drained
+            self._done()
+            raise
+        future.add_done_callback(lambda _: self._done())
+        return await asyncio.wrap_future(future)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop accepting jobs and wait for the pending ones.
+
+        Returns:
+            False if jobs were still pending after timeout seconds
+        """
+        self._executor.shutdown(wait=False)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def _done(self) -> None:
+        with self._idle:
+            self._pending -= 1
+            if not self._pending:
+                self._idle.notify_all()
+
+
+_pool: Optional[ImageJobPool] = None
+
+
+def init_image_jobs(max_jobs: int) -> ImageJobPool:
+    """Create this process's image job pool."""
+    global _pool
+    _pool = ImageJobPool(max_jobs)
+    return _pool
+
+
+def get_image_jobs() -> ImageJobPool:
+    """Get the image job pool, creating a default one if needed."""
+    global _pool
+    if _pool is None:
+        _pool = ImageJobPool()
+    return _pool
@@ -0,0 +1,225 @@
+"""Fan-out of annotation changes to connected WebSocket viewers."""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Optional
+
+from backend.repositories import get_repository
+from backend.services.annotation_service import AnnotationService
+
+# Writes arriving within this window are published as one delta
+COALESCE_WINDOW = 0.05
+# How often to look for writes made without a notify() call, e.g. by
+# another process sharing the database
+POLL_INTERVAL = 2.0
+# Messages queued per client before it's told to resync instead
+MAX_QUEUED_MESSAGES = 64
+
+
+@dataclass(eq=False)
+class Subscriber:
+    """
+    A connected client, optionally watching a single image.
+
+    The queue holds (revision, message) pairs, with no revision for a
+    resync, and None once the client should be disconnected.
+    """
+
+    project_id: int
+    image_id: Optional[int]
+    queue: asyncio.Queue = field(
+        default_factory=lambda: asyncio.Queue(MAX_QUEUED_MESSAGES)
+    )
+    # Revision the client was brought up to; deltas up to it aren't sent
+    revision: int = 0
+
+    def skip_through(self, revision: int) -> None:
+        """Drop queued deltas up to a revision the client caught up to."""
+        self.revision = revision
+        queued = []
+        while not self.queue.empty():
+            queued.append(self.queue.get_nowait())
+        for item in queued:
+            if item is None or item[0] is None or item[0] > revision:
+                self.queue.put_nowait(item)
+
+
+@dataclass(eq=False)
+class _Channel:
+    """Subscribers of one project and the last revision published to them."""
+
+    revision: int
+    subscribers: set[Subscriber] = field(default_factory=set)
+
+
+class LiveUpdateHub:
+    """
+    Publishes annotation deltas to subscribers, per project or image.
+
+    Writers call notify(); a single background task waits briefly so bursts
+    of writes coalesce, reads the change feed once per subscribed project
+    and serializes each delta once per image filter before fanning it out.
+    Messages use the change feed's shape, so a client that misses messages
+    can always catch up with GET /api/projects/{id}/changes?since=.
+    """
+
+    def __init__(self):
+        self._channels: dict[int, _Channel] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._seen_revision = 0
+
+    def subscribe(self, project_id: int, image_id: Optional[int] = None) -> Subscriber:
+        """Register a subscriber; must be called from the event loop."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._seen_revision = _current_revision()
+            self._task = self._loop.create_task(self._run())
+
+        channel = self._channels.get(project_id)
+        if channel is None:
+            channel = self._channels[project_id] = _Channel(
+                revision=_current_revision()
+            )
+
+        subscriber = Subscriber(project_id=project_id, image_id=image_id)
+        channel.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Remove a subscriber, dropping its project channel when empty."""
+        channel = self._channels.get(subscriber.project_id)
+        if channel is None:
+            return
+
+        channel.subscribers.discard(subscriber)
+        if not channel.subscribers:
+            del self._channels[subscriber.project_id]
+
+    def notify(self) -> None:
+        """Signal that annotations changed; safe to call from any thread."""
+        if self._loop is None or self._wake is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def close(self) -> None:
+        """Stop the publishing task and disconnect all subscribers."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for channel in self._channels.values():
+            for subscriber in channel.subscribers:
+                _offer(subscriber, None)
+        self._channels.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_INTERVAL)
+                await asyncio.sleep(COALESCE_WINDOW)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            if not self._channels:
+                continue
+
+            revision = await asyncio.to_thread(_current_revision)
+            if revision == self._seen_revision:
+                continue
+            self._seen_revision = revision
+
+            for project_id, channel in list(self._channels.items()):
+                try:
+                    await self._publish(project_id, channel)
+                except Exception as e:
+                    print(f"Live update for project {project_id} failed: {e}")
+
+    async def _publish(self, project_id: int, channel: _Channel) -> None:
+        service = AnnotationService()
+
+        while True:
+            changes = await asyncio.to_thread(
+                service.get_changes, project_id, since=channel.revision
+            )
+            if changes.revision == channel.revision:
+                return
+            channel.revision = changes.revision
+
+            # Serialize once per distinct image filter, not once per client
+            messages: dict[Optional[int], Optional[str]] = {}
+            for subscriber in list(channel.subscribers):
+                if subscriber.image_id not in messages:
+                    messages[subscriber.image_id] = build_message(
+                        changes, subscriber.image_id
+                    )
+                message = messages[subscriber.image_id]
+                if message is not None and changes.revision > subscriber.revision:
+                    _offer(subscriber, (changes.revision, message))
+
+            if not changes.has_more:
+                return
+
+
+def build_message(changes, image_id: Optional[int] = None) -> Optional[str]:
+    """
+    Serialize a change feed page as a live update message.
+
+    Returns:
+        JSON text, or None if an image filter leaves nothing to send
+    """
+    upserts = changes.upserts
+    deletes = changes.deletes
+    if image_id is not None:
+        upserts = [a for a in upserts if a.image_id == image_id]
+        deletes = [d for d in deletes if d.image_id == image_id]
+        if not upserts and not deletes and not changes.reset:
+            return None
+
+    return json.dumps(
+        {
+            "type": "changes",
+            "revision": changes.revision,
+            "has_more": changes.has_more,
+            "reset": changes.reset,
+            "upserts": [a.model_dump(mode="json") for a in upserts],
+            "deletes": [d.model_dump(mode="json") for d in deletes],
+        },
+        separators=(",", ":"),
+    )
+
+
+def _offer(subscriber: Subscriber, item: Optional[tuple[int, str]]) -> None:
+    """Queue a message, replacing a slow client's backlog with a resync."""
+    try:
+        subscriber.queue.put_nowait(item)
+    except asyncio.QueueFull:
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(
+            None if item is None else (None, json.dumps({"type": "resync"}))
+        )
+
+
+def _current_revision() -> int:
+    return get_repository().get_revision()
+
+
+_hub: Optional[LiveUpdateHub] = None
+
+
+def get_live_hub() -> LiveUpdateHub:
+    """Get the global live update hub."""
+    global _hub
+    if _hub is None:
+        _hub = LiveUpdateHub()
+    return _hub
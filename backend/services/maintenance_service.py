@@ -0,0 +1,315 @@
+"""Database maintenance: planner statistics, garbage collection and vacuum."""
+
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from backend.config import get_config
+from backend.database import get_db
+from backend.models import MaintenanceReport
+from backend.repositories.bulk import bulk_delete_annotations, bulk_delete_images
+from backend.services.annotation_service import flush_pending_writes
+from backend.services.image_service import THUMBNAILS_DIR
+from backend.utils.file_lock import FileLock
+
+# In the order they run; GC first so ANALYZE and vacuum see the result
+MAINTENANCE_STEPS = (
+    "orphans",
+    "tombstones",
+    "files",
+    "analyze",
+    "vacuum",
+    "checkpoint",
+)
+
+# Rows sampled per index by ANALYZE, keeping it fast on large tables
+ANALYSIS_LIMIT = 1000
+
+_AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+# Only one run at a time, scheduled or on demand; the database's
+# "maintenance" lock file extends this across worker processes
+_run_lock = threading.Lock()
+_last_report: Optional[MaintenanceReport] = None
+
+
+class MaintenanceBusyError(RuntimeError):
+    """Raised when maintenance is already running."""
+
+
+class MaintenanceService:
+    """Service for keeping the database and derived files compact."""
+
+    def __init__(self):
+        self.db = get_db()
+        self.config = get_config()
+
+    def run(
+        self, steps: Optional[list[str]] = None, full_vacuum: bool = False
+    ) -> MaintenanceReport:
+        """
+        Run maintenance steps and report what was reclaimed.
+
+        Args:
+            steps: Subset of MAINTENANCE_STEPS, all of them by default
+            full_vacuum: Rewrite the whole file if it wasn't created with
+                incremental auto-vacuum, converting it; blocks writers while
+                it runs
+
+        Raises:
+            ValueError: If a step is unknown
+            MaintenanceBusyError: If another run is in progress
+        """
+        global _last_report
+
+        steps = list(MAINTENANCE_STEPS) if steps is None else steps
+        unknown = set(steps) - set(MAINTENANCE_STEPS)
+        if unknown:
+            raise ValueError(f"Unknown maintenance steps: {', '.join(sorted(unknown))}")
+
+        if not _run_lock.acquire(blocking=False):
+            raise MaintenanceBusyError("Maintenance is already running")
+        process_lock = FileLock(self.db.lock_path("maintenance"))
+        if not process_lock.acquire(blocking=False):
+            _run_lock.release()
+            raise MaintenanceBusyError("Maintenance is running in another worker")
+
+        try:
+            start = time.perf_counter()
+            report = MaintenanceReport(
+                started_at=datetime.now(timezone.utc).replace(tzinfo=None),
+                steps=[step for step in MAINTENANCE_STEPS if step in steps],
+                db_bytes_before=self._db_bytes(),
+            )
+
+            flush_pending_writes()
+            for step in report.steps:
+                if step == "vacuum":
+                    self._vacuum(report, full_vacuum)
+                else:
+                    getattr(self, f"_{step}")(report)
+
+            report.db_bytes_after = self._db_bytes()
+            report.reclaimed_db_bytes = max(
+                report.db_bytes_before - report.db_bytes_after, 0
+            )
+            report.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            _last_report = report
+            return report
+        finally:
+            process_lock.release()
+            _run_lock.release()
+
+    def get_last_report(self) -> Optional[MaintenanceReport]:
+        """Get the report of the most recent run in this process."""
+        return _last_report
+
+    def _orphans(self, report: MaintenanceReport) -> None:
+        """Delete rows whose project or image no longer exists."""
+        with self.db.get_connection() as conn:
+            try:
+                conn.execute("BEGIN")
+                before = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+                # Their thumbnails are left to the files step and its grace
+                # period
+                bulk_delete_images(
+                    conn,
+                    "project_id NOT IN (SELECT id FROM projects)",
+                    tombstones=False,
+                )
+                report.orphan_images = (
+                    before - conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+                )
+                report.orphan_annotations = bulk_delete_annotations(
+                    conn,
+                    """
+                    SELECT DISTINCT image_id FROM annotations
+                    WHERE image_id NOT IN (SELECT id FROM images)
+                    """,
+                    tombstones=False,
+                )
+                report.orphan_labels = conn.execute("""
+                    DELETE FROM label_schemas
+                    WHERE project_id NOT IN (SELECT id FROM projects)
+                    """).rowcount
+                report.orphan_tombstones = conn.execute("""
+                    DELETE FROM annotation_tombstones
+                    WHERE project_id IS NULL
+                       OR project_id NOT IN (SELECT id FROM projects)
+                    """).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _tombstones(self, report: MaintenanceReport) -> None:
+        """Drop tombstones past the retention period and raise the floor."""
+        retention_days = self.config.maintenance.tombstone_retention_days
+
+        with self.db.get_connection() as conn:
+            try:
+                conn.execute("BEGIN")
+                cutoff = f"-{retention_days} days"
+                floor = conn.execute(
+                    """
+                    SELECT MAX(revision) FROM annotation_tombstones
+                    WHERE deleted_at < datetime('now', ?)
+                    """,
+                    (cutoff,),
+                ).fetchone()[0]
+                if floor is not None:
+                    # Clients that synced before the floor may have missed
+                    # pruned deletes, so the changes feed resets them
+                    conn.execute(
+                        """
+                        UPDATE sync_state SET value = MAX(value, ?)
+                        WHERE key = 'tombstone_floor'
+                        """,
+                        (floor,),
+                    )
+                    report.pruned_tombstones = conn.execute(
+                        "DELETE FROM annotation_tombstones WHERE revision <= ?",
+                        (floor,),
+                    ).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _files(self, report: MaintenanceReport) -> None:
+        """Remove thumbnails and export caches no row refers to."""
+        grace = self.config.maintenance.orphan_file_grace_minutes * 60
+        cutoff = time.time() - grace
+
+        if THUMBNAILS_DIR.is_dir():
+            referenced = {
+                Path(row[0]).resolve()
+                for row in self.db.fetchall(
+                    "SELECT DISTINCT thumbnail_path FROM images "
+                    "WHERE thumbnail_path IS NOT NULL"
+                )
+            }
+            for project_dir in THUMBNAILS_DIR.iterdir():
+                if not project_dir.is_dir():
+                    continue
+                for path in project_dir.iterdir():
+                    if not path.is_file():
+                        continue
+                    stat = path.stat()
+                    if stat.st_mtime < cutoff and path.resolve() not in referenced:
+                        path.unlink(missing_ok=True)
+                        report.orphan_files += 1
+                        report.reclaimed_file_bytes += stat.st_size
+                try:
+                    project_dir.rmdir()
+                except OSError:
+                    pass
+
+        export_dir = Path(self.config.export.cache_dir)
+        if export_dir.is_dir():
+            project_ids = {
+                row[0] for row in self.db.fetchall("SELECT id FROM projects")
+            }
+            for path in export_dir.glob("project_*"):
+                suffix = path.name.removeprefix("project_")
+                if not path.is_dir() or not suffix.isdigit():
+                    continue
+                if int(suffix) in project_ids:
+                    continue
+                stats = [f.stat() for f in path.rglob("*") if f.is_file()]
+                if any(stat.st_mtime >= cutoff for stat in stats):
+                    continue
+                report.reclaimed_file_bytes += sum(stat.st_size for stat in stats)
+                report.orphan_files += len(stats)
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _analyze(self, report: MaintenanceReport) -> None:
+        """Refresh the statistics the query planner chooses indexes by."""
+        with self.db.get_connection() as conn:
+            conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+            conn.execute("ANALYZE")
+            conn.commit()
+
+    def _vacuum(self, report: MaintenanceReport, full: bool) -> None:
+        """Return free pages to the filesystem."""
+        with self.db.get_connection() as conn:
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+            if mode == 2:
+                # execute() steps the pragma once, freeing a single page;
+                # executescript() runs it to completion
+                conn.executescript("PRAGMA incremental_vacuum")
+            elif full:
+                # Databases created before auto-vacuum need one full rewrite
+                # for the mode to take effect
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+            report.vacuumed_pages = (
+                free_before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            )
+            report.auto_vacuum = _AUTO_VACUUM_MODES.get(mode, str(mode))
+
+    def _checkpoint(self, report: MaintenanceReport) -> None:
+        """Copy the WAL into the database file and truncate it."""
+        with self.db.get_connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _db_bytes(self) -> int:
+        """Size of the database file and its WAL."""
+        path = Path(self.db.db_path)
+        return sum(
+            candidate.stat().st_size
+            for candidate in (path, path.with_name(path.name + "-wal"))
+            if candidate.exists()
+        )
+
+
+class MaintenanceScheduler:
+    """
+    Runs all maintenance steps periodically on a background thread.
+
+    Every worker process starts a scheduler, but only the one holding the
+    database's "scheduler" lock runs maintenance. The others keep trying it
+    each interval and take over if that worker exits.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lease = FileLock(get_db().lock_path("scheduler"))
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="db-maintenance", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._lease.release()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if not self._lease.acquire(blocking=False):
+                continue
+            try:
+                report = MaintenanceService().run()
+                print(
+                    f"Maintenance reclaimed {report.reclaimed_db_bytes} database "
+                    f"bytes and {report.reclaimed_file_bytes} file bytes "
+                    f"in {report.duration_ms:.0f} ms"
+                )
+            except MaintenanceBusyError:
+                pass
+            except Exception as e:
+                print(f"Maintenance failed: {e}")
@@ -0,0 +1,265 @@
+"""Background warming of the images an annotator is likely to open next."""
+
+import itertools
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from backend.repositories import get_repository
+from backend.services.annotation_service import (
+    AnnotationService,
+    flush_pending_writes,
+)
+from backend.services.job_service import get_image_jobs
+from backend.services.rendition_service import (
+    get_rendition,
+    has_preview,
+    uses_rendition,
+)
+from backend.services.source_service import local_image_file
+from backend.services.texture_service import get_texture
+
+# How often a waiting prefetch checks whether requests are still busy
+_IDLE_POLL_SECONDS = 0.05
+
+
+# Projects whose ordered image list is kept, least recently used dropped
+_IMAGE_LIST_CACHE_SIZE = 32
+
+
+class Prefetcher:
+    """
+    Warms the images an annotator is likely to open next on a background
+    thread.
+
+    Annotators mostly step through a project's images one at a time, in the
+    order of the image list. After each step the next `depth` images in the
+    direction of travel are warmed:
+    - the original is fetched into the image cache when remote
+    - the preview and display renditions are encoded, the display one in
+      the client's format or as a KTX2 texture
+    - the annotation payloads are encoded
+    Switching to one of them then needs no decoding.
+
+    Clients report the image they came from with each step, so the
+    direction of travel needs no session state and any worker can take the
+    report. A jump elsewhere in the list cancels the work this worker still
+    has queued around the image jumped from.
+
+    Prefetching is low priority. The thread runs at the lowest CPU priority
+    where threads can have their own (Linux), and it waits while requests
+    have image jobs queued or running. Nearer images are warmed first,
+    across all clients.
+    """
+
+    def __init__(self, depth: int = 3):
+        self.depth = depth
+        # project_id -> (revision, image IDs in list order, their positions)
+        self._image_lists: OrderedDict[int, tuple[int, list[int], dict[int, int]]] = (
+            OrderedDict()
+        )
+        # (image_id, fmt) of the queued work; work dropped from here is
+        # skipped when it comes up
+        self._queued: set[tuple[int, str]] = set()
+        self._lock = threading.Lock()
+        # (distance, sequence, image_id, fmt)
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def visit(
+        self,
+        project_id: int,
+        image_id: int,
+        previous_image_id: Optional[int] = None,
+        fmt: str = "jpeg",
+    ) -> list[int]:
+        """
+        Record that a client opened an image and queue the images after it.
+
+        Args:
+            previous_image_id: Image the client had open before, if any
+            fmt: Rendition format the client's image requests negotiate,
+                or "ktx2" for textures
+
+        Returns:
+            The images being warmed, nearest first
+        """
+        image_ids, positions = self._image_list(project_id)
+        index = positions.get(image_id)
+        if index is None:
+            return []
+
+        direction = 1
+        stale: list[int] = []
+        previous = positions.get(previous_image_id)
+        if previous is not None:
+            step = index - previous
+            if step in (1, -1):
+                direction = step
+            elif step:
+                stale = [
+                    image_ids[i]
+                    for i in range(previous - self.depth, previous + self.depth + 1)
+                    if 0 <= i < len(image_ids)
+                ]
+
+        targets = [
+            image_ids[i]
+            for i in (
+                index + direction * distance for distance in range(1, self.depth + 1)
+            )
+            if 0 <= i < len(image_ids)
+        ]
+
+        with self._lock:
+            for target in stale:
+                if target not in targets:
+                    self._queued.discard((target, fmt))
+            for distance, target in enumerate(targets, 1):
+                if (target, fmt) not in self._queued:
+                    self._queued.add((target, fmt))
+                    self._queue.put((distance, next(self._sequence), target, fmt))
+
+        self._start()
+        return targets
+
+    def _image_list(self, project_id: int) -> tuple[list[int], dict[int, int]]:
+        """A project's image IDs in list order, read again when it changes."""
+        repo = get_repository()
+        revision = repo.get_project_revision(project_id)
+        if revision is None:
+            return [], {}
+
+        with self._lock:
+            cached = self._image_lists.get(project_id)
+            if cached is not None and cached[0] == revision:
+                self._image_lists.move_to_end(project_id)
+                return cached[1], cached[2]
+
+        image_ids = repo.list_image_ids(project_id)
+        positions = {id_: i for i, id_ in enumerate(image_ids)}
+        with self._lock:
+            self._image_lists[project_id] = (revision, image_ids, positions)
+            self._image_lists.move_to_end(project_id)
+            while len(self._image_lists) > _IMAGE_LIST_CACHE_SIZE:
+                self._image_lists.popitem(last=False)
+        return image_ids, positions
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Drop queued work and wait for the image being warmed, if any."""
+        self._stopped.set()
+        self._queue.put((math.inf, next(self._sequence), None, ""))
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def join(self) -> None:
+        """Wait until the queued work is done."""
+        self._queue.join()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._stopped.is_set():
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="prefetch", daemon=True
+                )
+                self._thread.start()
+
+    def _wanted(self, image_id: int, fmt: str) -> bool:
+        with self._lock:
+            return (image_id, fmt) in self._queued
+
+    def _run(self) -> None:
+        _lower_thread_priority()
+        while True:
+            _, _, image_id, fmt = self._queue.get()
+            try:
+                if image_id is None:
+                    return
+                if self._stopped.is_set() or not self._wanted(image_id, fmt):
+                    continue
+
+                # Requests come first
+                while get_image_jobs().pending and not self._stopped.is_set():
+                    time.sleep(_IDLE_POLL_SECONDS)
+                if self._stopped.is_set() or not self._wanted(image_id, fmt):
+                    continue
+
+                try:
+                    warm_image(image_id, fmt)
+                except Exception as e:
+                    print(f"Prefetching image {image_id} failed: {e}")
+                with self._lock:
+                    self._queued.discard((image_id, fmt))
+            finally:
+                self._queue.task_done()
+
+
+def warm_image(image_id: int, fmt: str = "jpeg") -> None:
+    """Do the work of opening an image ahead of its requests."""
+    repo = get_repository()
+    row = repo.get_image(image_id)
+    if not row:
+        return
+
+    file_path = local_image_file(row["filepath"])
+    if file_path is not None:
+        if has_preview(row["width"], row["height"]):
+            get_rendition(image_id, row["filepath"], file_path, level="preview")
+        if fmt == "ktx2":
+            get_texture(image_id, row["filepath"], file_path)
+        elif uses_rendition(row["width"], row["height"], fmt):
+            get_rendition(image_id, row["filepath"], file_path, fmt)
+        else:
+            _read_ahead(file_path)
+
+    flush_pending_writes()
+    revision = repo.get_image_revision(image_id)
+    service = AnnotationService()
+    for packed in (True, False):
+        service.get_image_payload(image_id, revision, packed)
+
+
+def _read_ahead(path) -> None:
+    """Ask the OS to page a file in, for originals served as they are."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+def _lower_thread_priority() -> None:
+    """Give the calling thread the lowest CPU priority, on Linux."""
+    if not sys.platform.startswith("linux"):
+        # Elsewhere this would lower the whole process
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except OSError:
+        pass
+
+
+_prefetcher: Optional[Prefetcher] = None
+
+
+def init_prefetcher(depth: int) -> Prefetcher:
+    """Start prefetching for this process."""
+    global _prefetcher
+    _prefetcher = Prefetcher(depth)
+    return _prefetcher
+
+
+def get_prefetcher() -> Optional[Prefetcher]:
+    """Get the prefetcher, or None if prefetching is off."""
+    return _prefetcher
@@ -1,11 +1,13 @@
 """Service for managing projects and label schemas."""
 
-from datetime import datetime
 from typing import Optional
 
-from backend.database import get_db
+from backend.database import Database, get_db
 from backend.models import (
+    MergeResult,
+    ProjectClone,
     ProjectCreate,
+    ProjectMerge,
     ProjectUpdate,
     ProjectResponse,
     ProjectListResponse,
@@ -13,33 +15,71 @@ from backend.models import (
     LabelSchemaUpdate,
     LabelSchemaResponse,
 )
+from backend.repositories import get_repository
+from backend.repositories.bulk import bulk_insert_annotations
+from backend.services.annotation_service import flush_pending_writes
+from backend.services.cleanup_service import get_file_cleaner
+from backend.services.export_service import get_project_cache_dir
+
+# Annotations of one project's images, retargeted at the images of the same
+# filename in another project
+_COPY_ANNOTATIONS = """
+    SELECT t.id AS image_id, a.label, a.az_min, a.alt_min, a.az_max, a.alt_max,
+           a.color, a.created_at, a.updated_at
+    FROM images s
+    JOIN images t ON t.project_id = ? AND t.filename = s.filename
+    JOIN annotations a ON a.image_id = s.id
+    WHERE s.project_id = ?
+"""
+
+# Appended to _COPY_ANNOTATIONS to leave out boxes the target already has
+_NOT_ON_TARGET = """
+    AND NOT EXISTS (
+        SELECT 1 FROM annotations d
+        WHERE d.image_id = t.id AND d.label IS a.label
+          AND d.az_min = a.az_min AND d.alt_min = a.alt_min
+          AND d.az_max = a.az_max AND d.alt_max = a.alt_max
+    )
+"""
+
+# Image rows are copied with their thumbnails and hashes, so nothing is
+# decoded again
+_COPY_IMAGES = """
+    INSERT INTO images (
+        project_id, filename, filepath, width, height, thumbnail_path, phash
+    )
+    SELECT ?, s.filename, s.filepath, s.width, s.height, s.thumbnail_path, s.phash
+    FROM images s
+    WHERE s.project_id = ?
+      AND NOT EXISTS (
+          SELECT 1 FROM images t WHERE t.project_id = ? AND t.filename = s.filename
+      )
+    ORDER BY s.id
+"""
 
 
 class ProjectService:
     """Service for managing projects."""
 
     def __init__(self):
-        self.db = get_db()
+        self.repo = get_repository()
+
+    @property
+    def db(self) -> Database:
+        # Clone and merge are SQLite-only
+        return get_db()
 
     def create_project(self, project: ProjectCreate) -> ProjectResponse:
         """Create a new project."""
-        cursor = self.db.execute(
-            """
-            INSERT INTO projects (name, description, images_path)
-            VALUES (?, ?, ?)
-            """,
-            (project.name, project.description, project.images_path),
+        project_id = self.repo.create_project(
+            project.name, project.description, project.images_path
         )
-        project_id = cursor.lastrowid
 
         return self.get_project(project_id)
 
     def get_project(self, project_id: int) -> Optional[ProjectResponse]:
         """Get a project by ID."""
-        row = self.db.fetchone(
-            "SELECT * FROM projects WHERE id = ?",
-            (project_id,),
-        )
+        row = self.repo.get_project(project_id)
 
         if not row:
             return None
@@ -53,23 +93,20 @@ class ProjectService:
             updated_at=row["updated_at"],
         )
 
+    def get_revision(self, project_id: int) -> Optional[int]:
+        """Get a project's revision, or None if it doesn't exist."""
+        # Buffered updates bump the revision once written
+        flush_pending_writes()
+        return self.repo.get_project_revision(project_id)
+
+    def get_projects_revision(self) -> int:
+        """Get the global revision, which changes on any project-visible write."""
+        flush_pending_writes()
+        return self.repo.get_revision()
+
     def list_projects(self) -> list[ProjectListResponse]:
         """List all projects with image and annotation counts."""
-        rows = self.db.fetchall("""
-            SELECT
-                p.id,
-                p.name,
-                p.description,
-                p.images_path,
-                p.created_at,
-                COUNT(DISTINCT i.id) as image_count,
-                COUNT(a.id) as annotation_count
-            FROM projects p
-            LEFT JOIN images i ON p.id = i.project_id
-            LEFT JOIN annotations a ON i.id = a.image_id
-            GROUP BY p.id
-            ORDER BY p.created_at DESC
-        """)
+        rows = self.repo.list_projects()
 
         return [
             ProjectListResponse(
@@ -93,73 +130,166 @@ class ProjectService:
         if not existing:
             return None
 
-        # Build update query dynamically based on provided fields
-        updates = []
-        params = []
-
-        if update.name is not None:
-            updates.append("name = ?")
-            params.append(update.name)
-
-        if update.description is not None:
-            updates.append("description = ?")
-            params.append(update.description)
-
-        if update.images_path is not None:
-            updates.append("images_path = ?")
-            params.append(update.images_path)
-
-        if not updates:
+        changes = update.model_dump(
+            include={"name", "description", "images_path"}, exclude_none=True
+        )
+        if not changes:
             return existing
 
-        # Always update the updated_at timestamp
-        updates.append("updated_at = CURRENT_TIMESTAMP")
-        params.append(project_id)
-
-        self.db.execute(
-            f"UPDATE projects SET {', '.join(updates)} WHERE id = ?",
-            tuple(params),
-        )
+        self.repo.update_project(project_id, changes)
 
         return self.get_project(project_id)
 
     def delete_project(self, project_id: int) -> bool:
-        """Delete a project and all associated data."""
-        # Check if project exists
-        existing = self.get_project(project_id)
-        if not existing:
+        """
+        Delete a project and all associated data.
+
+        Rows are deleted in one transaction. Thumbnails and materialized
+        exports are removed in the background afterwards.
+        """
+        flush_pending_writes()
+        thumbnails = self.repo.delete_project(project_id)
+        if thumbnails is None:
             return False
 
-        # Delete project (cascades to images and annotations)
-        self.db.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+        get_file_cleaner().remove(
+            files=thumbnails, trees=[get_project_cache_dir(project_id)]
+        )
         return True
 
+    def clone_project(
+        self, project_id: int, clone: ProjectClone
+    ) -> Optional[ProjectResponse]:
+        """
+        Copy a project with its label schema, images and annotations.
+
+        Rows are copied with INSERT ... SELECT in one transaction. Images
+        keep their file paths, thumbnails and perceptual hashes, so the
+        clone needs no rescan.
+
+        Returns:
+            The new project, or None if the source doesn't exist
+        """
+        source = self.get_project(project_id)
+        if not source:
+            return None
+
+        flush_pending_writes()
+
+        with self.db.get_connection() as conn:
+            try:
+                conn.execute("BEGIN")
+                new_id = conn.execute(
+                    """
+                    INSERT INTO projects (name, description, images_path)
+                    VALUES (?, ?, ?)
+                    """,
+                    (
+                        clone.name or f"{source.name} (copy)",
+                        (
+                            clone.description
+                            if clone.description is not None
+                            else source.description
+                        ),
+                        source.images_path,
+                    ),
+                ).lastrowid
+                conn.execute(
+                    """
+                    INSERT INTO label_schemas
+                        (project_id, label_name, color, sort_order)
+                    SELECT ?, label_name, color, sort_order
+                    FROM label_schemas WHERE project_id = ?
+                    ORDER BY id
+                    """,
+                    (new_id, project_id),
+                )
+                conn.execute(_COPY_IMAGES, (new_id, project_id, new_id))
+                if clone.include_annotations:
+                    bulk_insert_annotations(
+                        conn, _COPY_ANNOTATIONS, (new_id, project_id)
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        return self.get_project(new_id)
+
+    def merge_project(
+        self, project_id: int, merge: ProjectMerge
+    ) -> Optional[MergeResult]:
+        """
+        Merge another project's labels, images and annotations into this one.
+
+        Images are matched by filename; source images missing from the
+        target are copied like in clone_project. Annotations are added to
+        the matching target images, optionally skipping boxes the target
+        image already has. The source project is left unchanged.
+
+        Returns:
+            Merge counts, or None if the target project doesn't exist
+
+        Raises:
+            ValueError: If the source project doesn't exist or is the target
+        """
+        if not self.get_project(project_id):
+            return None
+        source_id = merge.source_project_id
+        if source_id == project_id:
+            raise ValueError("Cannot merge a project into itself")
+        if not self.get_project(source_id):
+            raise ValueError(f"Project {source_id} not found")
+
+        flush_pending_writes()
+        result = MergeResult()
+        select = _COPY_ANNOTATIONS + (_NOT_ON_TARGET if merge.skip_duplicates else "")
+
+        with self.db.get_connection() as conn:
+            try:
+                conn.execute("BEGIN")
+                result.labels_added = conn.execute(
+                    """
+                    INSERT OR IGNORE INTO label_schemas
+                        (project_id, label_name, color, sort_order)
+                    SELECT ?, label_name, color, sort_order
+                    FROM label_schemas WHERE project_id = ?
+                    ORDER BY id
+                    """,
+                    (project_id, source_id),
+                ).rowcount
+                result.images_added = conn.execute(
+                    _COPY_IMAGES, (project_id, source_id, project_id)
+                ).rowcount
+                source_images, source_annotations = conn.execute(
+                    """
+                    SELECT COUNT(DISTINCT i.id), COUNT(a.id)
+                    FROM images i LEFT JOIN annotations a ON a.image_id = i.id
+                    WHERE i.project_id = ?
+                    """,
+                    (source_id,),
+                ).fetchone()
+                result.images_matched = source_images - result.images_added
+                result.annotations_added = bulk_insert_annotations(
+                    conn, select, (project_id, source_id)
+                )
+                result.annotations_skipped = (
+                    source_annotations - result.annotations_added
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        return result
+
     # =========================================================================
     # Label Schema Management
     # =========================================================================
 
     def get_label_schema(self, project_id: int) -> list[LabelSchemaResponse]:
         """Get all labels for a project."""
-        rows = self.db.fetchall(
-            """
-            SELECT * FROM label_schemas
-            WHERE project_id = ?
-            ORDER BY sort_order, label_name
-            """,
-            (project_id,),
-        )
-
-        return [
-            LabelSchemaResponse(
-                id=row["id"],
-                project_id=row["project_id"],
-                label_name=row["label_name"],
-                color=row["color"],
-                sort_order=row["sort_order"],
-                created_at=row["created_at"],
-            )
-            for row in rows
-        ]
+        return [self._label_response(row) for row in self.repo.list_labels(project_id)]
 
     def add_label(
         self, project_id: int, label: LabelSchemaCreate
@@ -170,27 +300,23 @@ class ProjectService:
         if not project:
             return None
 
-        cursor = self.db.execute(
-            """
-            INSERT INTO label_schemas (project_id, label_name, color, sort_order)
-            VALUES (?, ?, ?, ?)
-            """,
-            (project_id, label.label_name, label.color, label.sort_order),
+        label_id = self.repo.create_label(
+            project_id, label.label_name, label.color, label.sort_order
         )
-        label_id = cursor.lastrowid
 
         return self.get_label(label_id)
 
     def get_label(self, label_id: int) -> Optional[LabelSchemaResponse]:
         """Get a label by ID."""
-        row = self.db.fetchone(
-            "SELECT * FROM label_schemas WHERE id = ?",
-            (label_id,),
-        )
+        row = self.repo.get_label(label_id)
 
         if not row:
             return None
 
+        return self._label_response(row)
+
+    @staticmethod
+    def _label_response(row) -> LabelSchemaResponse:
         return LabelSchemaResponse(
             id=row["id"],
             project_id=row["project_id"],
@@ -208,38 +334,16 @@ class ProjectService:
         if not existing:
             return None
 
-        updates = []
-        params = []
-
-        if update.label_name is not None:
-            updates.append("label_name = ?")
-            params.append(update.label_name)
-
-        if update.color is not None:
-            updates.append("color = ?")
-            params.append(update.color)
-
-        if update.sort_order is not None:
-            updates.append("sort_order = ?")
-            params.append(update.sort_order)
-
-        if not updates:
+        changes = update.model_dump(
+            include={"label_name", "color", "sort_order"}, exclude_none=True
+        )
+        if not changes:
             return existing
 
-        params.append(label_id)
-
-        self.db.execute(
-            f"UPDATE label_schemas SET {', '.join(updates)} WHERE id = ?",
-            tuple(params),
-        )
+        self.repo.update_label(label_id, changes)
 
         return self.get_label(label_id)
 
     def delete_label(self, label_id: int) -> bool:
         """Delete a label from a project's schema."""
-        existing = self.get_label(label_id)
-        if not existing:
-            return False
-
-        self.db.execute("DELETE FROM label_schemas WHERE id = ?", (label_id,))
-        return True
+        return self.repo.delete_label(label_id)
@@ -0,0 +1,250 @@
+"""Display renditions of panoramas.
+
+Browsers and GPUs cap texture sizes, so originals above MAX_IMAGE_WIDTH x
+MAX_IMAGE_HEIGHT are served resized. Clients that accept AVIF or WebP get
+every image re-encoded in that format, which is typically a third to half
+the size of the JPEG; other clients get a progressive JPEG when the
+original is too large, and the original itself otherwise.
+
+Each image also has a small JPEG preview level, created at scan time, that
+the viewer shows while the display level loads.
+
+Encoding a rendition takes a decode of the original, so renditions are
+kept in an on-disk LRU cache that all workers share, and prefetching can
+create them ahead of time.
+"""
+
+import functools
+import mimetypes
+from pathlib import Path
+from typing import BinaryIO, Collection, Optional
+
+from backend.config import get_config
+from backend.services.source_service import ImageCache
+from backend.utils.imaging import pil_image
+
+MAX_IMAGE_WIDTH = 8192
+MAX_IMAGE_HEIGHT = 4096
+
+# Rendition formats by name: (media type, file extension, Pillow format)
+FORMATS = {
+    "jpeg": ("image/jpeg", ".jpg", "JPEG"),
+    "webp": ("image/webp", ".webp", "WEBP"),
+    "avif": ("image/avif", ".avif", "AVIF"),
+}
+_FORMATS_BY_MEDIA_TYPE = {
+    media_type: name for name, (media_type, _, _) in FORMATS.items()
+}
+
+_rendition_cache: Optional[ImageCache] = None
+
+
+def needs_rendition(width: int, height: int) -> bool:
+    """Check whether an image is too large to be served as is."""
+    return width > MAX_IMAGE_WIDTH or height > MAX_IMAGE_HEIGHT
+
+
+def has_preview(width: int, height: int) -> bool:
+    """Check whether an image is larger than its preview level."""
+    max_width, max_height = _level_bounds("preview")
+    return width > max_width or height > max_height
+
+
+def image_levels(width: int, height: int) -> list[tuple[str, int, int]]:
+    """
+    Get the resolution levels of an image, smallest first.
+
+    Returns:
+        (name, width, height) of "preview" when the image is larger than a
+        preview, "display", and "full" when the display level is scaled
+    """
+    levels = []
+    if has_preview(width, height):
+        levels.append(("preview", *fit_size(width, height, *_level_bounds("preview"))))
+    levels.append(
+        ("display", *fit_size(width, height, MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT))
+    )
+    if needs_rendition(width, height):
+        levels.append(("full", width, height))
+    return levels
+
+
+def fit_size(
+    width: int, height: int, max_width: int, max_height: int
+) -> tuple[int, int]:
+    """Scale a size down to fit within max dimensions."""
+    scale = min(max_width / width, max_height / height)
+    if scale >= 1:
+        return width, height
+    return int(width * scale), int(height * scale)
+
+
+def uses_rendition(width: int, height: int, fmt: str) -> bool:
+    """Check whether an image is displayed from a rendition in a format."""
+    return fmt != "jpeg" or needs_rendition(width, height)
+
+
+@functools.cache
+def available_formats() -> frozenset[str]:
+    """Get the rendition formats this Pillow build can encode."""
+    Image = pil_image()
+    try:
+        # Registers AVIF with Pillow versions that lack it
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    Image.init()
+    return frozenset(
+        name for name, (_, _, pil_format) in FORMATS.items() if pil_format in Image.SAVE
+    )
+
+
+def accepted_formats(accept_header: Optional[str]) -> set[str]:
+    """
+    Get the rendition formats an Accept header lists by media type.
+
+    Wildcards don't count: clients sending */* (curl, older browsers) may
+    not decode the newer formats.
+    """
+    if not accept_header:
+        return set()
+    formats = set()
+    for part in accept_header.split(","):
+        media_type, *params = (p.strip() for p in part.split(";"))
+        fmt = _FORMATS_BY_MEDIA_TYPE.get(media_type.lower())
+        if fmt is None:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if quality > 0:
+            formats.add(fmt)
+    return formats
+
+
+def negotiate_format(accepted: Collection[str]) -> str:
+    """Pick the preferred configured format a client accepts, or JPEG."""
+    for fmt in get_config().images.renditions.formats:
+        if fmt in accepted and fmt in available_formats():
+            return fmt
+    return "jpeg"
+
+
+def media_type_of(path: Path) -> str:
+    """Get the media type to serve an original with."""
+    return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+
+def get_rendition_cache() -> ImageCache:
+    """Get the cache of renditions configured under images."""
+    global _rendition_cache
+    config = get_config().images
+    directory = Path(config.rendition_dir)
+    if _rendition_cache is None or _rendition_cache.directory != directory:
+        _rendition_cache = ImageCache(
+            directory, config.rendition_cache_mb * 1024 * 1024
+        )
+    return _rendition_cache
+
+
+def get_rendition(
+    image_id: int,
+    filepath: str,
+    file_path: Path,
+    fmt: str = "jpeg",
+    level: str = "display",
+    img=None,
+) -> Path:
+    """
+    Get a rendition of an image, encoding it on a miss.
+
+    Args:
+        image_id: Image ID
+        filepath: The image's stored filepath, part of the cache key so a
+            reused ID never serves another image's rendition
+        file_path: Local path to the original
+        fmt: Rendition format, a key of FORMATS
+        level: "display", or "preview" (always JPEG)
+        img: The image already decoded by the caller, whole or fitted to
+            the level, encoded instead of reading file_path
+    """
+    max_width, max_height = _level_bounds(level)
+    options = rendition_options(fmt, level)
+    settings = ",".join(f"{name}={value}" for name, value in sorted(options.items()))
+    key = f"rendition:{image_id}:{max_width}x{max_height}:{fmt}:{settings}:{filepath}"
+
+    def encode(out: BinaryIO) -> None:
+        if img is None:
+            encode_rendition(file_path, out, fmt, options, level)
+        else:
+            save_rendition(fit_for_level(img, level), out, fmt, options)
+
+    return get_rendition_cache().get(key + FORMATS[fmt][1], encode)
+
+
+def rendition_options(fmt: str, level: str = "display") -> dict:
+    """Get the configured encoder options of a format, for Pillow's save."""
+    config = get_config().images.renditions
+    if level == "preview":
+        return {"quality": config.preview_quality}
+    if fmt == "jpeg":
+        return {"quality": config.jpeg_quality, "progressive": config.progressive_jpeg}
+    if fmt == "avif":
+        return {"quality": config.avif_quality, "speed": config.avif_speed}
+    return {"quality": config.webp_quality}
+
+
+def encode_rendition(
+    file_path: Path,
+    out: BinaryIO,
+    fmt: str = "jpeg",
+    options: Optional[dict] = None,
+    level: str = "display",
+) -> None:
+    """Write the image fitted to a level's max dimensions in a format."""
+    with pil_image().open(file_path) as img:
+        resized = fit_for_level(img, level)
+        save_rendition(resized, out, fmt, options or rendition_options(fmt, level))
+
+
+def fit_for_level(img, level: str = "display"):
+    """Scale a PIL image down to fit within a level's max dimensions."""
+    return fit_for_display(img, *_level_bounds(level))
+
+
+def fit_for_display(
+    img, max_width: int = MAX_IMAGE_WIDTH, max_height: int = MAX_IMAGE_HEIGHT
+):
+    """Scale a PIL image down to fit within max dimensions."""
+    size = fit_size(img.width, img.height, max_width, max_height)
+    if size == img.size:
+        return img
+
+    # JPEGs can be decoded at 1/2 to 1/8 scale, which makes a preview of a
+    # large panorama an order of magnitude faster to decode
+    img.draft("RGB", size)
+
+    # Resize using high-quality Lanczos filter
+    return img.resize(size, pil_image().Resampling.LANCZOS)
+
+
+def save_rendition(img, out: BinaryIO, fmt: str, options: dict) -> None:
+    """Encode a PIL image in a rendition format with encoder options."""
+    # JPEG has no alpha; the other formats keep it
+    if img.mode != "RGB" and (fmt == "jpeg" or "A" not in img.getbands()):
+        img = img.convert("RGB")
+    img.save(out, format=FORMATS[fmt][2], **options)
+
+
+def _level_bounds(level: str) -> tuple[int, int]:
+    """Max width and height of a level."""
+    if level == "preview":
+        width = get_config().images.renditions.preview_width
+        # Panoramas are 2:1
+        return width, width // 2
+    return MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT
@@ -0,0 +1,294 @@
+"""Service for full-text search over labels, filenames and projects."""
+
+import re
+from typing import Optional
+
+from backend.database import get_db
+from backend.models import SearchFacet, SearchHit, SearchResponse
+
+SEARCH_KINDS = ("images", "annotations", "projects")
+
+_TERM_RE = re.compile(r'[^\s"]+\*?')
+
+
+def build_fts_query(query: str) -> str:
+    """
+    Turn user input into a safe FTS5 query.
+
+    Every whitespace-separated term is quoted so FTS5 operators and
+    punctuation in the input are taken literally; a trailing ``*`` keeps its
+    prefix meaning. Terms are combined with AND.
+
+    Raises:
+        ValueError: If the query contains no searchable terms
+    """
+    terms = []
+    for term in _TERM_RE.findall(query):
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if not term:
+            continue
+        terms.append(f'"{term}"' + ("*" if prefix else ""))
+
+    if not terms:
+        raise ValueError("Search query is empty")
+
+    return " ".join(terms)
+
+
+class SearchService:
+    """Service for searching projects, images and annotations."""
+
+    def __init__(self):
+        self.db = get_db()
+
+    def search(
+        self,
+        query: str,
+        kind: str = "images",
+        project_id: Optional[int] = None,
+        label: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> SearchResponse:
+        """
+        Search the FTS5 indexes.
+
+        Args:
+            query: Search terms; ``term*`` matches by prefix
+            kind: "images" (filename or any annotation label matches),
+                "annotations" (label matches) or "projects" (name or
+                description matches)
+            project_id: Only return hits in this project
+            label: Only return annotations (or images with annotations)
+                with exactly this label
+            limit: Page size
+            offset: Page offset
+
+        Returns:
+            A page of hits, the total hit count and facet counts
+        """
+        if kind not in SEARCH_KINDS:
+            raise ValueError(f"Unknown search kind: {kind}")
+
+        fts_query = build_fts_query(query)
+        response = SearchResponse(
+            query=query, kind=kind, total=0, limit=limit, offset=offset
+        )
+
+        if kind == "images":
+            self._search_images(response, fts_query, project_id, label)
+        elif kind == "annotations":
+            self._search_annotations(response, fts_query, project_id, label)
+        else:
+            self._search_projects(response, fts_query)
+
+        return response
+
+    def _search_images(
+        self,
+        response: SearchResponse,
+        fts_query: str,
+        project_id: Optional[int],
+        label: Optional[str],
+    ) -> None:
+        """Find images by filename or by the labels of their annotations."""
+        label_filter = ""
+        label_params: tuple = ()
+        if label is not None:
+            label_filter = """
+                AND EXISTS (
+                    SELECT 1 FROM annotations la
+                    WHERE la.image_id = i.id AND la.label = ?
+                )
+            """
+            label_params = (label,)
+
+        hits = """
+            WITH hits AS (
+                SELECT rowid AS image_id FROM images_fts
+                WHERE images_fts MATCH ?
+                UNION
+                SELECT a.image_id FROM annotations_fts f
+                JOIN annotations a ON a.id = f.rowid
+                WHERE annotations_fts MATCH ?
+            )
+        """
+
+        # Project facet counts ignore the project filter so clients can
+        # show where else the query matches
+        facet_rows = self.db.fetchall(
+            f"""
+            {hits}
+            SELECT p.id, p.name, COUNT(*) AS count
+            FROM hits
+            JOIN images i ON i.id = hits.image_id
+            JOIN projects p ON p.id = i.project_id
+            WHERE 1 = 1 {label_filter}
+            GROUP BY p.id
+            ORDER BY count DESC, p.name
+            """,
+            (fts_query, fts_query) + label_params,
+        )
+        response.facets["projects"] = [
+            SearchFacet(id=row["id"], value=row["name"], count=row["count"])
+            for row in facet_rows
+        ]
+        response.facets["labels"] = self._label_facets(fts_query, project_id)
+
+        project_filter = ""
+        project_params: tuple = ()
+        if project_id is not None:
+            project_filter = "AND i.project_id = ?"
+            project_params = (project_id,)
+
+        if project_id is None:
+            response.total = sum(facet.count for facet in response.facets["projects"])
+        else:
+            response.total = next(
+                (f.count for f in response.facets["projects"] if f.id == project_id),
+                0,
+            )
+
+        rows = self.db.fetchall(
+            f"""
+            {hits}
+            SELECT i.id, i.project_id, i.filename
+            FROM hits
+            JOIN images i ON i.id = hits.image_id
+            WHERE 1 = 1 {project_filter} {label_filter}
+            ORDER BY i.project_id, i.filename
+            LIMIT ? OFFSET ?
+            """,
+            (fts_query, fts_query)
+            + project_params
+            + label_params
+            + (response.limit, response.offset),
+        )
+        response.results = [
+            SearchHit(
+                kind="image",
+                id=row["id"],
+                project_id=row["project_id"],
+                image_id=row["id"],
+                title=row["filename"],
+            )
+            for row in rows
+        ]
+
+    def _search_annotations(
+        self,
+        response: SearchResponse,
+        fts_query: str,
+        project_id: Optional[int],
+        label: Optional[str],
+    ) -> None:
+        """Find annotations by label."""
+        filters = ""
+        params: tuple = ()
+        if label is not None:
+            filters += " AND a.label = ?"
+            params += (label,)
+
+        facet_rows = self.db.fetchall(
+            f"""
+            SELECT p.id, p.name, COUNT(*) AS count
+            FROM annotations_fts f
+            JOIN annotations a ON a.id = f.rowid
+            JOIN images i ON i.id = a.image_id
+            JOIN projects p ON p.id = i.project_id
+            WHERE annotations_fts MATCH ? {filters}
+            GROUP BY p.id
+            ORDER BY count DESC, p.name
+            """,
+            (fts_query,) + params,
+        )
+        response.facets["projects"] = [
+            SearchFacet(id=row["id"], value=row["name"], count=row["count"])
+            for row in facet_rows
+        ]
+        response.facets["labels"] = self._label_facets(fts_query, project_id)
+
+        if project_id is not None:
+            filters += " AND i.project_id = ?"
+            params += (project_id,)
+            response.total = next(
+                (f.count for f in response.facets["projects"] if f.id == project_id),
+                0,
+            )
+        else:
+            response.total = sum(facet.count for facet in response.facets["projects"])
+
+        rows = self.db.fetchall(
+            f"""
+            SELECT a.id, a.image_id, a.label, i.project_id, i.filename
+            FROM annotations_fts f
+            JOIN annotations a ON a.id = f.rowid
+            JOIN images i ON i.id = a.image_id
+            WHERE annotations_fts MATCH ? {filters}
+            ORDER BY f.rank, a.id
+            LIMIT ? OFFSET ?
+            """,
+            (fts_query,) + params + (response.limit, response.offset),
+        )
+        response.results = [
+            SearchHit(
+                kind="annotation",
+                id=row["id"],
+                project_id=row["project_id"],
+                image_id=row["image_id"],
+                title=row["filename"],
+                label=row["label"],
+            )
+            for row in rows
+        ]
+
+    def _search_projects(self, response: SearchResponse, fts_query: str) -> None:
+        """Find projects by name or description."""
+        row = self.db.fetchone(
+            "SELECT COUNT(*) AS count FROM projects_fts WHERE projects_fts MATCH ?",
+            (fts_query,),
+        )
+        response.total = row["count"]
+
+        rows = self.db.fetchall(
+            """
+            SELECT p.id, p.name
+            FROM projects_fts f
+            JOIN projects p ON p.id = f.rowid
+            WHERE projects_fts MATCH ?
+            ORDER BY f.rank, p.id
+            LIMIT ? OFFSET ?
+            """,
+            (fts_query, response.limit, response.offset),
+        )
+        response.results = [
+            SearchHit(
+                kind="project", id=row["id"], project_id=row["id"], title=row["name"]
+            )
+            for row in rows
+        ]
+
+    def _label_facets(
+        self, fts_query: str, project_id: Optional[int]
+    ) -> list[SearchFacet]:
+        """Count matching annotations per label."""
+        project_filter = ""
+        params: tuple = (fts_query,)
+        if project_id is not None:
+            project_filter = "AND i.project_id = ?"
+            params += (project_id,)
+
+        rows = self.db.fetchall(
+            f"""
+            SELECT a.label, COUNT(*) AS count
+            FROM annotations_fts f
+            JOIN annotations a ON a.id = f.rowid
+            JOIN images i ON i.id = a.image_id
+            WHERE annotations_fts MATCH ? {project_filter}
+            GROUP BY a.label
+            ORDER BY count DESC, a.label
+            """,
+            params,
+        )
+        return [SearchFacet(value=row["label"], count=row["count"]) for row in rows]
@@ -0,0 +1,279 @@
+"""Where a project's original images are read from.
+
+A project's images_path is either a local directory or an s3://bucket/prefix
+URI on an S3-compatible store. Remote originals are downloaded on first use
+into a size-bounded local cache, so decoding, thumbnails and serving work on
+local files either way.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, NamedTuple, Optional
+
+from backend.config import S3Config, get_config
+from backend.utils.imaging import pil_image
+from backend.utils.s3 import RangedReader, S3Client, S3Error, parse_s3_uri
+
+
+class SourceFile(NamedTuple):
+    # File name within the source, stored as the image's filename
+    name: str
+    # Local path or s3:// URI, stored as the image's filepath
+    uri: str
+    size: int
+
+
+class ImageSource(ABC):
+    """A directory of original images."""
+
+    def __init__(self, uri: str):
+        self.uri = uri
+
+    @abstractmethod
+    def exists(self) -> bool:
+        """Check that the directory exists."""
+
+    @abstractmethod
+    def list_files(self) -> Iterator[SourceFile]:
+        """List the files directly in the directory."""
+
+    @abstractmethod
+    def read_dimensions(self, file: SourceFile) -> tuple[int, int]:
+        """
+        Get an image's width and height from its header.
+
+        Raises:
+            PIL.UnidentifiedImageError: If the file isn't a readable image
+        """
+
+    @abstractmethod
+    def fetch(self, file: SourceFile) -> Path:
+        """Get a local path to the whole file."""
+
+
+class LocalSource(ImageSource):
+    """Images in a local (or mounted) directory."""
+
+    def __init__(self, uri: str):
+        super().__init__(uri)
+        self.directory = Path(uri)
+
+    def exists(self) -> bool:
+        return self.directory.exists()
+
+    def list_files(self) -> Iterator[SourceFile]:
+        for path in self.directory.iterdir():
+            if path.is_file():
+                yield SourceFile(path.name, str(path), path.stat().st_size)
+
+    def read_dimensions(self, file: SourceFile) -> tuple[int, int]:
+        with pil_image().open(file.uri) as img:
+            return img.size
+
+    def fetch(self, file: SourceFile) -> Path:
+        return Path(file.uri)
+
+
+class S3Source(ImageSource):
+    """
+    Images under a prefix of an S3-compatible bucket.
+
+    Listing pages through ListObjectsV2; dimensions come from a ranged GET
+    of the header, so a file is only downloaded once it's known to be an
+    image.
+    """
+
+    def __init__(self, uri: str, client: S3Client, header_bytes: int = 65536):
+        super().__init__(uri)
+        self.bucket, self.prefix = parse_s3_uri(uri)
+        self.client = client
+        self.header_bytes = header_bytes
+
+    def exists(self) -> bool:
+        return self.client.prefix_exists(self.bucket, self.prefix)
+
+    def list_files(self) -> Iterator[SourceFile]:
+        for obj in self.client.list_objects(self.bucket, self.prefix):
+            name = obj.key[len(self.prefix) :]
+            # Skip the zero-byte "directory" markers some tools create
+            if name:
+                yield SourceFile(name, f"s3://{self.bucket}/{obj.key}", obj.size)
+
+    def read_dimensions(self, file: SourceFile) -> tuple[int, int]:
+        _, key = _split_object_uri(file.uri)
+        reader = RangedReader(
+            self.client, self.bucket, key, file.size, header_bytes=self.header_bytes
+        )
+        with reader, pil_image().open(reader) as img:
+            return img.size
+
+    def fetch(self, file: SourceFile) -> Path:
+        _, key = _split_object_uri(file.uri)
+        return get_image_cache().get(
+            file.uri, lambda out: self.client.download(self.bucket, key, out)
+        )
+
+
+class ImageCache:
+    """
+    Local read-through cache of remote originals.
+
+    Files are named by a hash of their URI. Each use touches a file's mtime,
+    and once the cache grows past max_bytes the least recently used files
+    are removed. Worker processes share the directory: downloads are
+    written to a temporary file and renamed into place, and eviction works
+    from the directory listing rather than in-memory state.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, grace_seconds: float = 60.0):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        # Files used this recently are kept even past max_bytes, as a
+        # request may be about to serve them
+        self.grace_seconds = grace_seconds
+        self._size: Optional[int] = None
+        self._size_lock = threading.Lock()
+        # Striped locks, so one file is downloaded once per process
+        self._locks = [threading.Lock() for _ in range(32)]
+
+    def path_for(self, uri: str) -> Path:
+        """Where a URI's file is cached."""
+        digest = hashlib.sha256(uri.encode()).hexdigest()[:32]
+        return self.directory / f"{digest}{Path(uri).suffix.lower()}"
+
+    def get(self, uri: str, download: Callable[[BinaryIO], object]) -> Path:
+        """
+        Get the cached file of a URI, downloading it on a miss.
+
+        Args:
+            download: Writes the file's contents to the given binary file
+        """
+        path = self.path_for(uri)
+        with self._locks[hash(path.name) % len(self._locks)]:
+            try:
+                os.utime(path)
+                return path
+            except FileNotFoundError:
+                pass
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(
+                f"{path.name}.{os.getpid()}.{threading.get_ident()}.part"
+            )
+            try:
+                with open(partial, "wb") as out:
+                    download(out)
+                os.replace(partial, path)
+            finally:
+                partial.unlink(missing_ok=True)
+
+        self._added(path.stat().st_size)
+        return path
+
+    def _entries(self) -> list[tuple[str, os.stat_result]]:
+        return [
+            (entry.path, entry.stat())
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and not entry.name.endswith(".part")
+        ]
+
+    def _added(self, size: int) -> None:
+        with self._size_lock:
+            if self._size is None:
+                self._size = sum(stat.st_size for _, stat in self._entries())
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used files until the cache fits."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        cutoff = time.time() - self.grace_seconds
+        for path, stat in entries:
+            if total <= self.max_bytes or stat.st_mtime > cutoff:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # Another worker evicted it first
+                pass
+            total -= stat.st_size
+        self._size = total
+
+
+_image_cache: Optional[ImageCache] = None
+_s3_client: Optional[tuple[S3Config, S3Client]] = None
+
+
+def get_image_cache() -> ImageCache:
+    """Get the cache of remote originals configured under images."""
+    global _image_cache
+    config = get_config().images
+    directory = Path(config.cache_dir)
+    if _image_cache is None or _image_cache.directory != directory:
+        _image_cache = ImageCache(directory, config.cache_max_mb * 1024 * 1024)
+    return _image_cache
+
+
+def get_s3_client() -> S3Client:
+    """Get a client for the S3 endpoint configured under images.s3."""
+    global _s3_client
+    config = get_config().images.s3
+    if _s3_client is None or _s3_client[0] is not config:
+        endpoint = config.endpoint_url or os.environ.get("AWS_ENDPOINT_URL")
+        client = S3Client(
+            endpoint or f"https://s3.{config.region}.amazonaws.com",
+            access_key_id=config.access_key_id or os.environ.get("AWS_ACCESS_KEY_ID"),
+            secret_access_key=config.secret_access_key
+            or os.environ.get("AWS_SECRET_ACCESS_KEY"),
+            session_token=config.session_token or os.environ.get("AWS_SESSION_TOKEN"),
+            region=config.region,
+            addressing_style=config.addressing_style,
+            timeout=config.timeout,
+        )
+        _s3_client = (config, client)
+    return _s3_client[1]
+
+
+def open_image_source(images_path: str) -> ImageSource:
+    """Get the source of a project's images_path."""
+    if images_path.startswith("s3://"):
+        return S3Source(
+            images_path, get_s3_client(), get_config().images.s3.header_bytes
+        )
+    return LocalSource(images_path)
+
+
+def local_image_file(filepath: str) -> Optional[Path]:
+    """
+    Get a local path to an image's original, downloading remote ones.
+
+    Returns:
+        The path, or None if the file doesn't exist
+    """
+    if not filepath.startswith("s3://"):
+        path = Path(filepath)
+        return path if path.exists() else None
+
+    bucket, key = _split_object_uri(filepath)
+    client = get_s3_client()
+    try:
+        return get_image_cache().get(
+            filepath, lambda out: client.download(bucket, key, out)
+        )
+    except S3Error as e:
+        if e.status == 404:
+            return None
+        raise
+
+
+def _split_object_uri(uri: str) -> tuple[str, str]:
+    """Split s3://bucket/key into the bucket and the object key."""
+    bucket, _, key = uri[len("s3://") :].partition("/")
+    return bucket, key
@@ -0,0 +1,276 @@
+"""Service for project statistics and spherical coverage heatmaps."""
+
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import TYPE_CHECKING, Optional
+
+from backend.database import get_db
+from backend.models import (
+    AltitudeBin,
+    BoxesPerImageStats,
+    LabelCount,
+    ProjectStatsResponse,
+    SphericalHistogram,
+)
+from backend.services.annotation_service import flush_pending_writes
+from backend.utils.imaging import pil_image
+
+# NumPy is imported when statistics are first computed, not at startup
+if TYPE_CHECKING:
+    import numpy as np
+
+# Control points of the heatmap color ramp (black -> purple -> orange -> yellow)
+_COLORMAP = (
+    (0, 0, 4),
+    (87, 16, 110),
+    (188, 55, 84),
+    (249, 142, 9),
+    (252, 255, 164),
+)
+
+# Smallest bin size served; a 0.25 degree grid has about a million cells
+MIN_BIN_DEG = 0.25
+
+# Entries kept in each cache; the least recently used are dropped first
+MAX_CACHED = 64
+
+# Statistics keyed by (project_id, bin_deg), each stored with the project
+# revision it was computed at
+_stats_cache: OrderedDict[tuple[int, float], tuple[int, ProjectStatsResponse]] = (
+    OrderedDict()
+)
+_heatmap_cache: OrderedDict[tuple[int, float], tuple[int, bytes]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cached(cache: OrderedDict, key: tuple, revision: int):
+    """Get a cached result computed at a revision, or None."""
+    with _cache_lock:
+        entry = cache.get(key)
+        if entry is None or entry[0] != revision:
+            return None
+        cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache(cache: OrderedDict, key: tuple, revision: int, value) -> None:
+    """Cache a result computed at a revision, evicting beyond MAX_CACHED."""
+    with _cache_lock:
+        cache[key] = (revision, value)
+        cache.move_to_end(key)
+        while len(cache) > MAX_CACHED:
+            cache.popitem(last=False)
+
+
+def spherical_histogram(
+    az: "np.ndarray", alt: "np.ndarray", bin_deg: float
+) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    Histogram points on the sphere into an equirectangular grid.
+
+    Args:
+        az: Azimuths in degrees (0-360)
+        alt: Altitudes in degrees (-90 to 90)
+        bin_deg: Bin size in degrees along both axes
+
+    Returns:
+        Tuple of (counts, density) arrays shaped (alt_bins, az_bins), rows
+        ordered from +90 down to -90. Density is counts per steradian, so
+        bins near the poles aren't over-weighted by their small area.
+    """
+    import numpy as np
+
+    az_edges = np.linspace(0.0, 360.0, int(round(360.0 / bin_deg)) + 1)
+    alt_edges = np.linspace(-90.0, 90.0, int(round(180.0 / bin_deg)) + 1)
+
+    counts, _, _ = np.histogram2d(alt, az, bins=[alt_edges, az_edges])
+    counts = counts[::-1]
+
+    # Solid angle of a bin: d_az * (sin(alt_hi) - sin(alt_lo))
+    d_az = np.deg2rad(np.diff(az_edges))
+    band = np.diff(np.sin(np.deg2rad(alt_edges)))[::-1]
+    solid_angle = np.outer(band, d_az)
+
+    return counts, counts / solid_angle
+
+
+def render_heatmap(density: "np.ndarray", scale: int = 2) -> bytes:
+    """Render a density grid as an equirectangular PNG on a log color scale."""
+    import numpy as np
+
+    Image = pil_image()
+    colormap = np.array(_COLORMAP, dtype=np.float64)
+    peak = density.max()
+    values = np.log1p(density) / np.log1p(peak) if peak > 0 else density
+
+    stops = np.linspace(0.0, 1.0, len(colormap))
+    rgb = np.stack(
+        [np.interp(values, stops, colormap[:, c]) for c in range(3)], axis=-1
+    ).astype(np.uint8)
+
+    image = Image.fromarray(rgb, mode="RGB")
+    if scale > 1:
+        image = image.resize(
+            (image.width * scale, image.height * scale), Image.Resampling.NEAREST
+        )
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+class StatsService:
+    """Service for computing project statistics."""
+
+    def __init__(self):
+        self.db = get_db()
+
+    def get_project_revision(self, project_id: int) -> Optional[int]:
+        """Get the project revision that cached statistics are keyed by."""
+        # Buffered updates bump the revision once written
+        flush_pending_writes()
+        row = self.db.fetchone(
+            "SELECT revision FROM projects WHERE id = ?", (project_id,)
+        )
+        return row["revision"] if row else None
+
+    def get_stats(
+        self, project_id: int, bin_deg: float = 5.0
+    ) -> Optional[ProjectStatsResponse]:
+        """
+        Get label, per-image and spherical distribution statistics.
+
+        Results are cached per project and bin size until the project
+        revision changes.
+        """
+        revision = self.get_project_revision(project_id)
+        if revision is None:
+            return None
+
+        key = (project_id, bin_deg)
+        cached = _cached(_stats_cache, key, revision)
+        if cached is not None:
+            return cached
+
+        stats = self._compute_stats(project_id, revision, bin_deg)
+        _cache(_stats_cache, key, revision, stats)
+        return stats
+
+    def get_heatmap_png(self, project_id: int, bin_deg: float = 1.0) -> Optional[bytes]:
+        """Get the box-center density heatmap as an equirectangular PNG."""
+        revision = self.get_project_revision(project_id)
+        if revision is None:
+            return None
+
+        key = (project_id, bin_deg)
+        cached = _cached(_heatmap_cache, key, revision)
+        if cached is not None:
+            return cached
+
+        _, _, az, alt = self._load_annotations(project_id)
+        _, density = spherical_histogram(az, alt, bin_deg)
+        png = render_heatmap(density)
+        _cache(_heatmap_cache, key, revision, png)
+        return png
+
+    def _load_annotations(
+        self, project_id: int
+    ) -> tuple["np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray"]:
+        """
+        Load image ids and annotation columns of a project as arrays.
+
+        Returns:
+            Tuple of (image ids, per-annotation image index, center azimuths,
+            center altitudes)
+        """
+        import numpy as np
+
+        image_ids = np.array(
+            [
+                row[0]
+                for row in self.db.fetchall(
+                    "SELECT id FROM images WHERE project_id = ? ORDER BY id",
+                    (project_id,),
+                )
+            ],
+            dtype=np.int64,
+        )
+
+        rows = self.db.fetchall(
+            """
+            SELECT a.image_id, a.az_min, a.alt_min, a.az_max, a.alt_max
+            FROM annotations a
+            JOIN images i ON i.id = a.image_id
+            WHERE i.project_id = ?
+            """,
+            (project_id,),
+        )
+        data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+
+        image_index = np.searchsorted(image_ids, data[:, 0].astype(np.int64))
+        az = (data[:, 1] + data[:, 3]) / 2.0
+        alt = (data[:, 2] + data[:, 4]) / 2.0
+        return image_ids, image_index, az, alt
+
+    def _compute_stats(
+        self, project_id: int, revision: int, bin_deg: float
+    ) -> ProjectStatsResponse:
+        """Compute statistics with vectorized NumPy over the project's boxes."""
+        import numpy as np
+
+        image_ids, image_index, az, alt = self._load_annotations(project_id)
+
+        label_rows = self.db.fetchall(
+            """
+            SELECT COALESCE(a.label, 'unlabeled') AS label, COUNT(*) AS count
+            FROM annotations a
+            JOIN images i ON i.id = a.image_id
+            WHERE i.project_id = ?
+            GROUP BY COALESCE(a.label, 'unlabeled')
+            ORDER BY count DESC, label
+            """,
+            (project_id,),
+        )
+
+        per_image = np.bincount(image_index, minlength=len(image_ids))
+        boxes_per_image = BoxesPerImageStats(
+            mean=float(per_image.mean()) if len(per_image) else 0.0,
+            median=float(np.median(per_image)) if len(per_image) else 0.0,
+            max=int(per_image.max()) if len(per_image) else 0,
+            histogram=np.bincount(per_image).tolist(),
+        )
+
+        counts, density = spherical_histogram(az, alt, bin_deg)
+
+        # Altitude bands, summed over azimuth; band solid angle is 2*pi*d(sin)
+        band_counts = counts.sum(axis=1)
+        alt_edges = np.linspace(90.0, -90.0, counts.shape[0] + 1)
+        band_area = 2 * np.pi * -np.diff(np.sin(np.deg2rad(alt_edges)))
+        altitude_profile = [
+            AltitudeBin(
+                alt_min=float(alt_edges[i + 1]),
+                alt_max=float(alt_edges[i]),
+                count=int(band_counts[i]),
+                density=float(band_counts[i] / band_area[i]),
+            )
+            for i in range(len(band_counts))
+        ]
+
+        return ProjectStatsResponse(
+            project_id=project_id,
+            revision=revision,
+            image_count=len(image_ids),
+            annotation_count=len(az),
+            label_histogram=[
+                LabelCount(label=row["label"], count=row["count"]) for row in label_rows
+            ],
+            boxes_per_image=boxes_per_image,
+            altitude_profile=altitude_profile,
+            heatmap=SphericalHistogram(
+                bin_deg=bin_deg,
+                az_bins=counts.shape[1],
+                alt_bins=counts.shape[0],
+                density=np.round(density, 6).tolist(),
+            ),
+        )
@@ -0,0 +1,105 @@
+"""GPU-compressed KTX2 textures of panoramas.
+
+A display-level JPEG is decoded on the browser's main thread and uploaded
+as uncompressed RGBA: 128 MB of GPU memory at 8192x4096, plus mipmaps. A
+KTX2 texture in Basis Universal's ETC1S or UASTC format is transcoded in a
+worker to whatever block-compressed format the GPU supports (BC1/BC7,
+ETC, ASTC), taking 4 to 8 times less memory, and carries its mipmaps.
+
+Textures are encoded with the basisu command-line tool on the display
+level and kept in the rendition cache. They are flipped vertically at
+encode time, because compressed textures can't be flipped on upload.
+"""
+
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import BinaryIO
+
+from backend.config import get_config
+from backend.services.rendition_service import (
+    MAX_IMAGE_HEIGHT,
+    MAX_IMAGE_WIDTH,
+    fit_for_display,
+    get_rendition_cache,
+)
+from backend.utils.imaging import pil_image
+
+TEXTURE_MEDIA_TYPE = "image/ktx2"
+
+
+def textures_available() -> bool:
+    """Check whether the basisu tool is installed."""
+    return shutil.which(get_config().images.textures.basisu_path) is not None
+
+
+def basisu_command(input_path: Path, output_path: Path) -> list[str]:
+    """Get the basisu command line encoding an image to a KTX2 texture."""
+    config = get_config().images.textures
+    command = [config.basisu_path, "-ktx2", "-mipmap", "-y_flip"]
+    if config.mode == "uastc":
+        command += ["-uastc", "-uastc_level", str(config.uastc_level)]
+    else:
+        command += ["-q", str(config.etc1s_quality)]
+    return command + ["-output_file", str(output_path), str(input_path)]
+
+
+def get_texture(image_id: int, filepath: str, file_path: Path) -> Path:
+    """
+    Get the KTX2 texture of an image's display level, encoding it on a miss.
+
+    Args:
+        image_id: Image ID
+        filepath: The image's stored filepath, part of the cache key
+        file_path: Local path to the original
+
+    Raises:
+        RuntimeError: If basisu fails or times out
+    """
+    config = get_config().images.textures
+    settings = (
+        f"uastc{config.uastc_level}"
+        if config.mode == "uastc"
+        else f"etc1s{config.etc1s_quality}"
+    )
+    key = (
+        f"texture:{image_id}:{MAX_IMAGE_WIDTH}x{MAX_IMAGE_HEIGHT}:"
+        f"{settings}:{filepath}"
+    )
+    return get_rendition_cache().get(
+        f"{key}.ktx2", lambda out: encode_texture(file_path, out)
+    )
+
+
+def encode_texture(file_path: Path, out: BinaryIO) -> None:
+    """Write the image fitted to the display level as a KTX2 texture."""
+    with tempfile.TemporaryDirectory(prefix="texture-") as directory:
+        input_path = Path(directory) / "input.png"
+        output_path = Path(directory) / "output.ktx2"
+
+        with pil_image().open(file_path) as img:
+            img = fit_for_display(img)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGB")
+            # Lossless hand-off; basisu's own compression dominates
+            img.save(input_path, format="PNG", compress_level=1)
+
+        try:
+            subprocess.run(
+                basisu_command(input_path, output_path),
+                cwd=directory,
+                check=True,
+                capture_output=True,
+                timeout=get_config().images.textures.timeout,
+            )
+        except subprocess.TimeoutExpired as e:
+            raise RuntimeError(f"basisu timed out after {e.timeout:g}s") from e
+        except subprocess.CalledProcessError as e:
+            detail = e.stderr.decode(errors="replace").strip().splitlines()
+            raise RuntimeError(
+                f"basisu failed: {detail[-1] if detail else e.returncode}"
+            ) from e
+
+        with open(output_path, "rb") as texture:
+            shutil.copyfileobj(texture, out)
@@ -0,0 +1,43 @@
+"""Entity tag helpers for conditional GET requests."""
+
+from typing import Optional
+
+from fastapi import Response
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an entity tag.
+
+    Uses the weak comparison required for If-None-Match, so ``W/"x"`` and
+    ``"x"`` match each other.
+
+    Args:
+        if_none_match: Raw If-None-Match header value (may be None)
+        etag: Current entity tag, quoted and optionally prefixed with ``W/``
+
+    Returns:
+        True if the client's cached representation is current
+    """
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    current = opaque(etag)
+    return any(opaque(candidate) == current for candidate in if_none_match.split(","))
+
+
+def make_etag(*parts) -> str:
+    """Build a weak entity tag from revision parts, e.g. ``W/"labels-3-120"``."""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def not_modified(etag: str) -> Response:
+    """Build an empty 304 response for a matching conditional request."""
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,63 @@
+"""Advisory file locks shared by the worker processes of one server."""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows runs a single worker, so there's nothing to lock
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive lock on a file, held until released or the process exits.
+
+    The lock belongs to the open file, so two FileLock objects exclude each
+    other even within one process, and a crashed holder never leaves it
+    stuck.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Take the lock.
+
+        Returns:
+            False if blocking is off and another holder has it
+        """
+        if self._fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(fd, flags)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        # Closing the descriptor drops the lock
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
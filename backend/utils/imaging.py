@@ -0,0 +1,17 @@
+"""Deferred import of Pillow.
+
+Decoding is only needed once an image is scanned or served, so PIL is
+imported on first use instead of slowing down every worker start.
+"""
+
+import functools
+
+
+@functools.cache
+def pil_image():
+    """Return PIL's Image module, configured for large panoramas."""
+    from PIL import Image
+
+    # Disable decompression bomb warning for large panoramic images
+    Image.MAX_IMAGE_PIXELS = None
+    return Image
@@ -0,0 +1,50 @@
+"""Import-time breakdown of the backend, from python -X importtime."""
+
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def parse_importtime(output: str) -> dict[str, int]:
+    """
+    Sum self import time per top-level package.
+
+    Args:
+        output: stderr of a python -X importtime run
+
+    Returns:
+        Microseconds per top-level package, slowest first
+    """
+    totals: dict[str, int] = defaultdict(int)
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # Column header
+            continue
+        package = fields[2].strip().split(".")[0]
+        totals[package] += int(fields[0])
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def profile_startup(module: str = "backend.main", top: int = 15) -> dict[str, int]:
+    """
+    Import a module in a fresh interpreter and print where the time went.
+
+    Returns:
+        Microseconds per top-level package, slowest first
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    totals = parse_importtime(result.stderr)
+
+    total = sum(totals.values())
+    print(f"Importing {module} took {total / 1000:.1f} ms")
+    for package, micros in list(totals.items())[:top]:
+        print(f"  {package:<24} {micros / 1000:8.1f} ms")
+    return totals
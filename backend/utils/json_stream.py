@@ -0,0 +1,114 @@
+"""Incremental parsing of large JSON documents such as COCO files.
+
+Only the top-level object is walked incrementally: array members are
+decoded and yielded one at a time, so memory is bounded by the largest
+single member rather than the whole document.
+"""
+
+import json
+import re
+from typing import Any, Iterator, TextIO
+
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+
+
+class _Reader:
+    """Buffered reader over a text stream with a read position."""
+
+    def __init__(self, fp: TextIO, chunk_size: int):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self) -> bool:
+        """Read another chunk, dropping consumed input. False at end of input."""
+        if self.eof:
+            return False
+
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            match = _NON_WHITESPACE.search(self.buffer, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buffer[self.pos]
+            self.pos = len(self.buffer)
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(
+                f"Expected {char!r} but found {self.buffer[self.pos]!r} in JSON input"
+            )
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+
+            # A number running up to the end of the buffer may be cut short
+            if end == len(self.buffer) and self.fill():
+                continue
+
+            self.pos = end
+            return value
+
+
+def iter_object_members(
+    fp: TextIO, chunk_size: int = 1 << 16
+) -> Iterator[tuple[str, Any]]:
+    """
+    Walk the members of a top-level JSON object.
+
+    Yields:
+        (key, item) for every element of array members, and (key, value)
+        for all other members, in document order
+    """
+    reader = _Reader(fp, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError("Expected an object key in JSON input")
+        reader.expect(":")
+
+        if reader.peek() == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.peek() == "]":
+                        reader.pos += 1
+                        break
+                    reader.expect(",")
+        else:
+            yield key, reader.value()
+
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
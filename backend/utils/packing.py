@@ -0,0 +1,149 @@
+"""Columnar binary packing of annotations.
+
+Layout (all values little-endian, every section 4-byte aligned except the
+trailing UTF-8 string bytes):
+
+    header      magic "SMA1", u16 version, u16 flags,
+                u32 count, u32 string_count, u32 string_bytes
+    int32[n]    id
+    int32[n]    image_id
+    int32[n]    label index into the string table (-1 = null)
+    int32[n]    color index into the string table (-1 = null)
+    uint32[n]   created_at (unix seconds)
+    uint32[n]   updated_at (unix seconds)
+    float32[n]  az_min, alt_min, az_max, alt_max (one column each)
+    uint32[s+1] string offsets into the UTF-8 blob
+    bytes       UTF-8 blob
+"""
+
+import struct
+from typing import TYPE_CHECKING, Sequence
+
+if TYPE_CHECKING:
+    import numpy as np
+
+PACKED_ANNOTATIONS_MEDIA_TYPE = "application/x-spheremark-annotations"
+
+PACKED_MAGIC = b"SMA1"
+PACKED_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHIII")
+
+
+def accepts_packed(accept_header: str | None) -> bool:
+    """Check whether an Accept header asks for the packed representation."""
+    if not accept_header:
+        return False
+    return any(
+        part.split(";")[0].strip() == PACKED_ANNOTATIONS_MEDIA_TYPE
+        for part in accept_header.split(",")
+    )
+
+
+def pack_annotations(rows: Sequence[Sequence]) -> bytes:
+    """
+    Pack annotation rows into the columnar binary format.
+
+    Args:
+        rows: Sequence of rows ordered as (id, image_id, label, color,
+            created_at, updated_at, az_min, alt_min, az_max, alt_max),
+            with timestamps given as unix seconds.
+
+    Returns:
+        Packed bytes
+    """
+    import numpy as np
+
+    count = len(rows)
+    strings: dict[str, int] = {}
+
+    def intern(value) -> int:
+        if value is None:
+            return -1
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    columns = list(zip(*rows)) if count else [()] * 10
+
+    ids = np.asarray(columns[0], dtype="<i4")
+    image_ids = np.asarray(columns[1], dtype="<i4")
+    label_idx = np.fromiter((intern(v) for v in columns[2]), dtype="<i4", count=count)
+    color_idx = np.fromiter((intern(v) for v in columns[3]), dtype="<i4", count=count)
+    created = np.asarray([v or 0 for v in columns[4]], dtype="<u4")
+    updated = np.asarray([v or 0 for v in columns[5]], dtype="<u4")
+    bounds = np.asarray(columns[6:10], dtype="<f4").reshape(4, count)
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    np.cumsum([len(s) for s in encoded], out=offsets[1:])
+    blob = b"".join(encoded)
+
+    header = _HEADER.pack(
+        PACKED_MAGIC, PACKED_VERSION, 0, count, len(encoded), len(blob)
+    )
+
+    return b"".join(
+        [
+            header,
+            ids.tobytes(),
+            image_ids.tobytes(),
+            label_idx.tobytes(),
+            color_idx.tobytes(),
+            created.tobytes(),
+            updated.tobytes(),
+            bounds.tobytes(),
+            offsets.tobytes(),
+            blob,
+        ]
+    )
+
+
+def unpack_annotations(data: bytes) -> list[dict]:
+    """Decode packed annotations back into row dictionaries."""
+    import numpy as np
+
+    magic, version, _flags, count, string_count, string_bytes = _HEADER.unpack_from(
+        data
+    )
+    if magic != PACKED_MAGIC or version != PACKED_VERSION:
+        raise ValueError("Not a packed annotation payload")
+
+    offset = _HEADER.size
+
+    def column(dtype: str, length: int) -> "np.ndarray":
+        nonlocal offset
+        arr = np.frombuffer(data, dtype=dtype, count=length, offset=offset)
+        offset += arr.nbytes
+        return arr
+
+    ids = column("<i4", count)
+    image_ids = column("<i4", count)
+    label_idx = column("<i4", count)
+    color_idx = column("<i4", count)
+    created = column("<u4", count)
+    updated = column("<u4", count)
+    bounds = column("<f4", count * 4).reshape(4, count)
+    offsets = column("<u4", string_count + 1)
+    blob = data[offset : offset + string_bytes]
+
+    strings = [
+        blob[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(string_count)
+    ]
+
+    return [
+        {
+            "id": int(ids[i]),
+            "image_id": int(image_ids[i]),
+            "label": strings[label_idx[i]] if label_idx[i] >= 0 else None,
+            "color": strings[color_idx[i]] if color_idx[i] >= 0 else None,
+            "created_at": int(created[i]),
+            "updated_at": int(updated[i]),
+            "az_min": float(bounds[0, i]),
+            "alt_min": float(bounds[1, i]),
+            "az_max": float(bounds[2, i]),
+            "alt_max": float(bounds[3, i]),
+        }
+        for i in range(count)
+    ]
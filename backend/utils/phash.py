@@ -0,0 +1,135 @@
+"""Perceptual hashing and Hamming-distance lookup for duplicate images.
+
+The hash is a 64-bit DCT hash: the image is decoded at reduced size,
+converted to grayscale and resized to 32x32, and each bit of the hash
+records whether one of the 8x8 lowest-frequency DCT coefficients is above
+their median. Re-encodes, resizes and small edits flip only a few bits, so
+near-duplicates are found by Hamming distance.
+"""
+
+import functools
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+from backend.utils.imaging import pil_image
+
+# NumPy and PIL are imported on first hash, not at startup
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
+
+HASH_BITS = 64
+
+_SAMPLE_SIZE = 32
+_LOW_FREQ = 8
+
+
+@functools.cache
+def _dct_matrix(n: int) -> "np.ndarray":
+    """Orthonormal DCT-II matrix."""
+    import numpy as np
+
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+def perceptual_hash(img: "Image.Image") -> int:
+    """
+    Compute the 64-bit perceptual hash of an image.
+
+    Call on a freshly opened image: for JPEGs the decoder is asked for a
+    reduced-size grayscale draft, so large panoramas aren't fully decoded.
+    """
+    import numpy as np
+
+    img.draft("L", (_SAMPLE_SIZE * 4, _SAMPLE_SIZE * 4))
+    small = img.convert("L").resize(
+        (_SAMPLE_SIZE, _SAMPLE_SIZE), pil_image().Resampling.BILINEAR
+    )
+    pixels = np.asarray(small, dtype=np.float64)
+
+    dct = _dct_matrix(_SAMPLE_SIZE)
+    coefficients = (dct @ pixels @ dct.T)[:_LOW_FREQ, :_LOW_FREQ].ravel()
+    # The DC term only reflects overall brightness
+    bits = coefficients > np.median(coefficients[1:])
+
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+
+def hash_to_db(value: int) -> int:
+    """Convert an unsigned 64-bit hash to SQLite's signed INTEGER range."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hash_from_db(value: int) -> int:
+    """Convert a stored hash back to its unsigned value."""
+    return value & ((1 << 64) - 1)
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over hashes under Hamming distance.
+
+    Queries for all hashes within a small distance visit only the subtrees
+    the triangle inequality can't rule out, instead of every hash.
+    """
+
+    def __init__(self):
+        # Node layout: [hash, items, {distance: child}]
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, item: Any) -> None:
+        """Add an item under a hash."""
+        self._size += 1
+
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, Any]]:
+        """Find items whose hash is within max_distance, nearest first."""
+        matches = list(self._iter_within(value, max_distance))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def _iter_within(self, value: int, max_distance: int) -> Iterator[tuple[int, Any]]:
+        if self._root is None:
+            return
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+
+            if distance <= max_distance:
+                for item in node[1]:
+                    yield distance, item
+
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(
+                child for edge, child in node[2].items() if low <= edge <= high
+            )
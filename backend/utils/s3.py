@@ -0,0 +1,371 @@
+"""Minimal client for S3-compatible object storage.
+
+Covers what image sources need: paginated listing, ranged and streamed
+GETs, signed with AWS Signature Version 4. It speaks plain HTTP(S) through
+the standard library, so AWS S3, MinIO, Ceph RGW and the like work without
+an SDK.
+"""
+
+import hashlib
+import hmac
+import http.client
+import io
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+from urllib.parse import quote, urlsplit
+
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+_XMLNS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+class S3Error(Exception):
+    """An S3 request failed."""
+
+    def __init__(self, status: int, code: str, message: str = ""):
+        super().__init__(
+            f"{status} {code}: {message}" if message else f"{status} {code}"
+        )
+        self.status = status
+        self.code = code
+
+
+class S3Object(NamedTuple):
+    key: str
+    size: int
+    etag: str
+
+
+def parse_s3_uri(uri: str) -> tuple[str, str]:
+    """
+    Split s3://bucket/prefix into the bucket and the key prefix.
+
+    A non-empty prefix always ends with "/", so it names a "directory".
+    """
+    parts = urlsplit(uri)
+    if parts.scheme != "s3" or not parts.netloc:
+        raise ValueError(f"Not an s3:// URI: {uri}")
+    prefix = parts.path.lstrip("/")
+    if prefix and not prefix.endswith("/"):
+        prefix += "/"
+    return parts.netloc, prefix
+
+
+def _query_string(query: dict[str, str]) -> str:
+    """Sorted, URI-encoded query, the canonical form SigV4 signs."""
+    return "&".join(
+        f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}"
+        for k, v in sorted(query.items())
+    )
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def sign_v4(
+    method: str,
+    host: str,
+    path: str,
+    query: dict[str, str],
+    headers: dict[str, str],
+    access_key_id: str,
+    secret_access_key: str,
+    region: str,
+    now: datetime,
+    payload_hash: str = EMPTY_SHA256,
+) -> dict[str, str]:
+    """
+    Sign a request with AWS Signature Version 4.
+
+    Args:
+        path: URI-encoded request path
+        headers: Extra headers to sign, such as Range
+
+    Returns:
+        The headers to send: the given ones plus Host, X-Amz-Date,
+        X-Amz-Content-Sha256 and Authorization
+    """
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    scope = f"{now:%Y%m%d}/{region}/s3/aws4_request"
+
+    signed = {k.lower(): v.strip() for k, v in headers.items()}
+    signed["host"] = host
+    signed["x-amz-date"] = amz_date
+    signed["x-amz-content-sha256"] = payload_hash
+    names = sorted(signed)
+
+    canonical_request = "\n".join(
+        [
+            method,
+            path,
+            _query_string(query),
+            "".join(f"{name}:{signed[name]}\n" for name in names),
+            ";".join(names),
+            payload_hash,
+        ]
+    )
+    string_to_sign = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ]
+    )
+
+    key = _hmac(f"AWS4{secret_access_key}".encode(), f"{now:%Y%m%d}")
+    for part in (region, "s3", "aws4_request"):
+        key = _hmac(key, part)
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    return {
+        **headers,
+        "Host": host,
+        "X-Amz-Date": amz_date,
+        "X-Amz-Content-Sha256": payload_hash,
+        "Authorization": (
+            f"AWS4-HMAC-SHA256 Credential={access_key_id}/{scope}, "
+            f"SignedHeaders={';'.join(names)}, Signature={signature}"
+        ),
+    }
+
+
+class S3Client:
+    """
+    Signed requests against one S3-compatible endpoint.
+
+    Connections are kept alive and reused, one per thread, since scans and
+    ranged reads issue many small requests.
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        region: str = "us-east-1",
+        session_token: Optional[str] = None,
+        addressing_style: str = "path",
+        timeout: float = 30.0,
+    ):
+        endpoint = urlsplit(endpoint_url)
+        if endpoint.scheme not in ("http", "https") or not endpoint.netloc:
+            raise ValueError(f"Invalid S3 endpoint: {endpoint_url}")
+        self.secure = endpoint.scheme == "https"
+        self.netloc = endpoint.netloc
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.session_token = session_token
+        self.addressing_style = addressing_style
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self, host: str) -> http.client.HTTPConnection:
+        connections = self._local.__dict__.setdefault("connections", {})
+        conn = connections.get(host)
+        if conn is None:
+            cls = (
+                http.client.HTTPSConnection
+                if self.secure
+                else http.client.HTTPConnection
+            )
+            conn = connections[host] = cls(host, timeout=self.timeout)
+        return conn
+
+    def _drop_connection(self, host: str) -> None:
+        conn = self._local.__dict__.get("connections", {}).pop(host, None)
+        if conn is not None:
+            conn.close()
+
+    def _target(self, bucket: str, key: str) -> tuple[str, str]:
+        """Host and URI-encoded path of a bucket or object."""
+        if self.addressing_style == "virtual":
+            return f"{bucket}.{self.netloc}", "/" + quote(key, safe="/-_.~")
+        return self.netloc, "/" + quote(f"{bucket}/{key}", safe="/-_.~")
+
+    def request(
+        self,
+        method: str,
+        bucket: str,
+        key: str = "",
+        query: Optional[dict[str, str]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> http.client.HTTPResponse:
+        """
+        Send a signed request and return the response, body unread.
+
+        Raises:
+            S3Error: On an error status
+        """
+        host, path = self._target(bucket, key)
+        query = query or {}
+        headers = dict(headers or {})
+        if self.session_token:
+            headers["X-Amz-Security-Token"] = self.session_token
+        if self.access_key_id and self.secret_access_key:
+            headers = sign_v4(
+                method,
+                host,
+                path,
+                query,
+                headers,
+                self.access_key_id,
+                self.secret_access_key,
+                self.region,
+                datetime.now(timezone.utc),
+            )
+        else:
+            headers["Host"] = host
+        url = f"{path}?{_query_string(query)}" if query else path
+
+        # A kept-alive connection may have been closed by the server; retry
+        # once on a fresh one
+        for attempt in range(2):
+            conn = self._connection(host)
+            try:
+                conn.request(method, url, headers=headers)
+                response = conn.getresponse()
+                break
+            except (http.client.HTTPException, OSError):
+                self._drop_connection(host)
+                if attempt:
+                    raise
+
+        if response.status >= 300:
+            body = response.read()
+            code, message = str(response.status), response.reason
+            try:
+                error = ET.fromstring(body)
+                code = error.findtext("Code") or code
+                message = error.findtext("Message") or message
+            except ET.ParseError:
+                pass
+            raise S3Error(response.status, code, message)
+        return response
+
+    def list_objects(
+        self, bucket: str, prefix: str = "", delimiter: str = "/", page_size=1000
+    ) -> Iterator[S3Object]:
+        """List the objects under a prefix, one ListObjectsV2 page at a time."""
+        token = None
+        while True:
+            query = {
+                "list-type": "2",
+                "prefix": prefix,
+                "delimiter": delimiter,
+                "max-keys": str(page_size),
+            }
+            if token:
+                query["continuation-token"] = token
+            root = ET.fromstring(self.request("GET", bucket, query=query).read())
+
+            for item in root.iter(f"{_XMLNS}Contents"):
+                yield S3Object(
+                    key=item.findtext(f"{_XMLNS}Key"),
+                    size=int(item.findtext(f"{_XMLNS}Size") or 0),
+                    etag=(item.findtext(f"{_XMLNS}ETag") or "").strip('"'),
+                )
+
+            if root.findtext(f"{_XMLNS}IsTruncated") != "true":
+                return
+            token = root.findtext(f"{_XMLNS}NextContinuationToken")
+
+    def prefix_exists(self, bucket: str, prefix: str) -> bool:
+        """Check that the bucket exists and has objects under the prefix."""
+        query = {"list-type": "2", "prefix": prefix, "max-keys": "1"}
+        try:
+            root = ET.fromstring(self.request("GET", bucket, query=query).read())
+        except S3Error as e:
+            if e.status == 404:
+                return False
+            raise
+        return root.find(f"{_XMLNS}Contents") is not None
+
+    def get_range(self, bucket: str, key: str, start: int, end: int) -> bytes:
+        """Read bytes start..end (inclusive) of an object."""
+        response = self.request(
+            "GET", bucket, key, headers={"Range": f"bytes={start}-{end}"}
+        )
+        return response.read()
+
+    def download(self, bucket: str, key: str, file: BinaryIO) -> int:
+        """Stream a whole object into a file; returns its size."""
+        response = self.request("GET", bucket, key)
+        size = 0
+        while chunk := response.read(1 << 20):
+            file.write(chunk)
+            size += len(chunk)
+        return size
+
+
+class RangedReader(io.RawIOBase):
+    """
+    Seekable read-only file over an object, fetched with ranged GETs.
+
+    The first request reads header_bytes, enough for image decoders to
+    find the dimensions; later reads fetch at least block_bytes, so a
+    sequential full read takes few requests.
+    """
+
+    def __init__(
+        self,
+        client: S3Client,
+        bucket: str,
+        key: str,
+        size: int,
+        header_bytes: int = 64 * 1024,
+        block_bytes: int = 4 * 1024 * 1024,
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.header_bytes = header_bytes
+        self.block_bytes = block_bytes
+        self.requests = 0
+        self._pos = 0
+        self._buffer = b""
+        self._buffer_start = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = offset
+        return self._pos
+
+    def readinto(self, b) -> int:
+        if self._pos >= self.size:
+            return 0
+        buffered = self._pos - self._buffer_start
+        if not 0 <= buffered < len(self._buffer):
+            length = self.block_bytes if self.requests else self.header_bytes
+            length = max(length, len(b))
+            end = min(self._pos + length, self.size) - 1
+            self._buffer = self.client.get_range(self.bucket, self.key, self._pos, end)
+            self._buffer_start = self._pos
+            self.requests += 1
+            buffered = 0
+            if not self._buffer:
+                return 0
+
+        n = min(len(b), len(self._buffer) - buffered)
+        b[:n] = self._buffer[buffered : buffered + n]
+        self._pos += n
+        return n
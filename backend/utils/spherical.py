@@ -0,0 +1,130 @@
+"""Vectorized geometry for az/alt boxes on the sphere.
+
+Boxes are arrays of shape (n, 4) holding (az_min, alt_min, az_max, alt_max)
+in degrees. A box with az_max < az_min wraps through the 0/360 seam.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+# Rows per block when comparing all pairs, bounding memory to
+# PAIR_CHUNK_SIZE * n values per intermediate array
+PAIR_CHUNK_SIZE = 512
+
+
+def _as_boxes(boxes) -> np.ndarray:
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+
+def _azimuth_widths(boxes: np.ndarray) -> np.ndarray:
+    """Azimuth extents in degrees, accounting for seam-wrapping boxes."""
+    width = boxes[:, 2] - boxes[:, 0]
+    return np.where(width < 0, width + 360.0, width)
+
+
+def solid_angle(boxes) -> np.ndarray:
+    """
+    Solid angle of each box in steradians.
+
+    A box spanning d_az radians of azimuth between two altitudes covers
+    d_az * (sin(alt_max) - sin(alt_min)) of the unit sphere.
+    """
+    boxes = _as_boxes(boxes)
+    d_az = np.deg2rad(_azimuth_widths(boxes))
+    band = np.sin(np.deg2rad(boxes[:, 3])) - np.sin(np.deg2rad(boxes[:, 1]))
+    return d_az * band
+
+
+def _intersection(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Solid angle of the intersections of every box in a with every box in b."""
+    a_start = a[:, 0][:, None]
+    a_end = a_start + _azimuth_widths(a)[:, None]
+    b_start = b[:, 0][None, :]
+    b_end = b_start + _azimuth_widths(b)[None, :]
+
+    # Compare against b shifted by a full turn either way, so overlaps
+    # across the seam are found whichever side each box starts on
+    d_az = np.zeros((len(a), len(b)))
+    for shift in (-360.0, 0.0, 360.0):
+        overlap = np.minimum(a_end, b_end + shift) - np.maximum(
+            a_start, b_start + shift
+        )
+        d_az += np.clip(overlap, 0.0, None)
+
+    low = np.maximum(a[:, 1][:, None], b[:, 1][None, :])
+    high = np.minimum(a[:, 3][:, None], b[:, 3][None, :])
+    band = np.clip(np.sin(np.deg2rad(high)) - np.sin(np.deg2rad(low)), 0.0, None)
+
+    return np.deg2rad(d_az) * band
+
+
+def pairwise_iou(a, b) -> np.ndarray:
+    """
+    Spherical intersection over union of every box in a with every box in b.
+
+    Returns:
+        Array of shape (len(a), len(b))
+    """
+    a, b = _as_boxes(a), _as_boxes(b)
+    intersection = _intersection(a, b)
+    union = solid_angle(a)[:, None] + solid_angle(b)[None, :] - intersection
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        iou = intersection / union
+    return np.nan_to_num(iou, nan=0.0)
+
+
+def overlapping_pairs(
+    boxes, threshold: float, chunk_size: int = PAIR_CHUNK_SIZE
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find all pairs of boxes whose IoU is at least threshold.
+
+    Pairs are compared in blocks of chunk_size rows, so thousands of boxes
+    don't need an n x n matrix in memory.
+
+    Returns:
+        Tuple of (i, j, iou) arrays with i < j
+    """
+    boxes = _as_boxes(boxes)
+    n = len(boxes)
+    found_i, found_j, found_iou = [], [], []
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        # Only compare against later boxes; each pair is reported once
+        iou = pairwise_iou(boxes[start:stop], boxes[start:])
+        rows, cols = np.nonzero(np.triu(iou, k=1) >= threshold)
+        found_i.append(rows + start)
+        found_j.append(cols + start)
+        found_iou.append(iou[rows, cols])
+
+    if not found_i:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+
+    return np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_iou)
+
+
+def nms(boxes, scores, iou_threshold: float) -> np.ndarray:
+    """
+    Spherical non-maximum suppression.
+
+    Keeps the highest scoring box and drops every remaining box overlapping
+    it by at least iou_threshold, repeating until no boxes remain.
+
+    Returns:
+        Indices of the kept boxes, highest score first
+    """
+    boxes = _as_boxes(boxes)
+    order = np.argsort(-np.asarray(scores, dtype=np.float64), kind="stable")
+    keep = []
+
+    while len(order):
+        best = order[0]
+        keep.append(best)
+        iou = pairwise_iou(boxes[best : best + 1], boxes[order[1:]])[0]
+        order = order[1:][iou < iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Compare encode time and size of display renditions in each format."""
+
+import argparse
+import json
+import time
+from io import BytesIO
+
+from backend.config import load_config
+from backend.services.rendition_service import (
+    available_formats,
+    fit_for_display,
+    rendition_options,
+    save_rendition,
+)
+from backend.utils.imaging import pil_image
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="+", help="Sample panoramas")
+    parser.add_argument(
+        "--quality",
+        action="append",
+        default=[],
+        metavar="FORMAT=Q",
+        help="Encoder quality for a format (default: from config.yaml)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print a JSON report")
+    args = parser.parse_args()
+
+    config = load_config()
+    quality = {
+        fmt: getattr(config.images.renditions, f"{fmt}_quality")
+        for fmt in ("jpeg", "webp", "avif")
+    }
+    for setting in args.quality:
+        fmt, _, value = setting.partition("=")
+        quality[fmt] = int(value)
+    formats = [fmt for fmt in ("jpeg", "webp", "avif") if fmt in available_formats()]
+
+    report = []
+    totals = {fmt: [0.0, 0] for fmt in formats}
+    for file in args.files:
+        start = time.perf_counter()
+        with pil_image().open(file) as img:
+            display = fit_for_display(img)
+            display.load()
+        entry = {
+            "file": file,
+            "size": list(display.size),
+            "decode_seconds": time.perf_counter() - start,
+            "formats": {},
+        }
+        for fmt in formats:
+            options = {**rendition_options(fmt), "quality": quality[fmt]}
+            out = BytesIO()
+            start = time.perf_counter()
+            save_rendition(display, out, fmt, options)
+            seconds = time.perf_counter() - start
+            entry["formats"][fmt] = {
+                "quality": quality[fmt],
+                "encode_seconds": seconds,
+                "bytes": out.tell(),
+            }
+            totals[fmt][0] += seconds
+            totals[fmt][1] += out.tell()
+        report.append(entry)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for entry in report:
+        width, height = entry["size"]
+        print(
+            f"{entry['file']} ({width}x{height}, "
+            f"decoded in {entry['decode_seconds']:.2f}s)"
+        )
+        _print_rows(entry["formats"].items(), entry["formats"]["jpeg"]["bytes"])
+    if len(report) > 1:
+        print("Total")
+        _print_rows(
+            (
+                (fmt, {"quality": quality[fmt], "encode_seconds": s, "bytes": b})
+                for fmt, (s, b) in totals.items()
+            ),
+            totals["jpeg"][1],
+        )
+
+
+def _print_rows(rows, jpeg_bytes: int) -> None:
+    for fmt, result in rows:
+        print(
+            f"  {fmt:<5} q{result['quality']:<3} "
+            f"{result['encode_seconds']:7.2f}s {result['bytes'] / 1024:10.0f} KiB "
+            f"{result['bytes'] / jpeg_bytes:6.0%} of JPEG"
+        )
+
+
+if __name__ == "__main__":
+    main()
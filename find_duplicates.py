@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Report likely duplicate boxes and images for every project."""
+
+import argparse
+import json
+
+from backend.config import load_config
+from backend.database import init_database
+from backend.services.annotation_service import AnnotationService
+from backend.services.image_service import ImageService
+from backend.services.project_service import ProjectService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--project", type=int, help="Only check this project ID")
+    parser.add_argument(
+        "--iou", type=float, default=0.8, help="Minimum box IoU (default: 0.8)"
+    )
+    parser.add_argument(
+        "--any-label", action="store_true", help="Also pair boxes with different labels"
+    )
+    parser.add_argument(
+        "--max-distance",
+        type=int,
+        default=4,
+        help="Maximum image hash distance in bits (default: 4)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print a JSON report")
+    args = parser.parse_args()
+
+    config = load_config()
+    init_database(config.database.path)
+
+    project_ids = (
+        [args.project]
+        if args.project
+        else [project.id for project in ProjectService().list_projects()]
+    )
+
+    annotation_service = AnnotationService()
+    image_service = ImageService()
+    report = []
+
+    for project_id in project_ids:
+        boxes = annotation_service.find_duplicate_boxes(
+            project_id, iou_threshold=args.iou, same_label=not args.any_label
+        )
+        images = image_service.find_duplicate_images(
+            project_id, max_distance=args.max_distance
+        )
+        report.append(
+            {
+                "project_id": project_id,
+                "duplicate_boxes": [box.model_dump() for box in boxes],
+                "duplicate_images": [group.model_dump() for group in images],
+            }
+        )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for entry in report:
+        print(
+            f"Project {entry['project_id']}: "
+            f"{len(entry['duplicate_boxes'])} duplicate box pair(s), "
+            f"{len(entry['duplicate_images'])} image(s) with duplicates"
+        )
+        for box in entry["duplicate_boxes"]:
+            print(
+                f"  image {box['image_id']}: annotation {box['annotation_id']} ~ "
+                f"{box['duplicate_id']} ({box['label']}, IoU {box['iou']:.3f})"
+            )
+        for group in entry["duplicate_images"]:
+            names = ", ".join(d["filename"] for d in group["duplicates"])
+            print(f"  {group['image']['filename']}: {names}")
+
+
+if __name__ == "__main__":
+    main()
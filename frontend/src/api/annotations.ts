@@ -1,11 +1,134 @@
-import { apiFetch } from './client';
-import type { AnnotationResponse, AnnotationCreate, AnnotationUpdate } from '../types';
+import { apiFetch, apiFetchBuffer, getApiUrl } from './client';
+import type {
+  AnnotationChanges,
+  AnnotationResponse,
+  AnnotationCreate,
+  AnnotationUpdate,
+  LiveAnnotationMessage,
+} from '../types';
+
+export const PACKED_ANNOTATIONS_MEDIA_TYPE = 'application/x-spheremark-annotations';
+
+const PACKED_MAGIC = 'SMA1';
+const PACKED_VERSION = 1;
+const PACKED_HEADER_SIZE = 20;
+
+// Columnar annotation payload, see backend/utils/packing.py for the layout.
+// Bounds are float32, so it's for display only; editors load JSON.
+// Typed arrays are views into the response buffer, so decoding copies nothing
+// but the string table.
+export interface PackedAnnotations {
+  count: number;
+  ids: Int32Array;
+  imageIds: Int32Array;
+  labelIndex: Int32Array;
+  colorIndex: Int32Array;
+  createdAt: Uint32Array; // unix seconds
+  updatedAt: Uint32Array; // unix seconds
+  azMin: Float32Array;
+  altMin: Float32Array;
+  azMax: Float32Array;
+  altMax: Float32Array;
+  strings: string[];
+}
+
+export function decodePackedAnnotations(buffer: ArrayBuffer): PackedAnnotations {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(
+    view.getUint8(0),
+    view.getUint8(1),
+    view.getUint8(2),
+    view.getUint8(3)
+  );
+  if (magic !== PACKED_MAGIC || view.getUint16(4, true) !== PACKED_VERSION) {
+    throw new Error('Not a packed annotation payload');
+  }
+
+  const count = view.getUint32(8, true);
+  const stringCount = view.getUint32(12, true);
+  const stringBytes = view.getUint32(16, true);
+
+  // Typed array views use platform byte order, which is little-endian on
+  // every browser we target.
+  let offset = PACKED_HEADER_SIZE;
+  const take = <T>(ctor: new (b: ArrayBuffer, o: number, l: number) => T, length: number): T => {
+    const arr = new ctor(buffer, offset, length);
+    offset += length * 4;
+    return arr;
+  };
+
+  const ids = take(Int32Array, count);
+  const imageIds = take(Int32Array, count);
+  const labelIndex = take(Int32Array, count);
+  const colorIndex = take(Int32Array, count);
+  const createdAt = take(Uint32Array, count);
+  const updatedAt = take(Uint32Array, count);
+  const azMin = take(Float32Array, count);
+  const altMin = take(Float32Array, count);
+  const azMax = take(Float32Array, count);
+  const altMax = take(Float32Array, count);
+  const offsets = take(Uint32Array, stringCount + 1);
+
+  const blob = new Uint8Array(buffer, offset, stringBytes);
+  const decoder = new TextDecoder();
+  const strings: string[] = [];
+  for (let i = 0; i < stringCount; i++) {
+    strings.push(decoder.decode(blob.subarray(offsets[i], offsets[i + 1])));
+  }
+
+  return {
+    count,
+    ids,
+    imageIds,
+    labelIndex,
+    colorIndex,
+    createdAt,
+    updatedAt,
+    azMin,
+    altMin,
+    azMax,
+    altMax,
+    strings,
+  };
+}
+
+const packedHeaders = { Accept: PACKED_ANNOTATIONS_MEDIA_TYPE };
 
 export const annotations = {
   async listForImage(imageId: number): Promise<AnnotationResponse[]> {
     return apiFetch<AnnotationResponse[]>(`/api/images/${imageId}/annotations`);
   },
 
+  async listForImagePacked(imageId: number): Promise<PackedAnnotations> {
+    const buffer = await apiFetchBuffer(`/api/images/${imageId}/annotations`, {
+      headers: packedHeaders,
+    });
+    return decodePackedAnnotations(buffer);
+  },
+
+  async listForProjectPacked(projectId: number): Promise<PackedAnnotations> {
+    const buffer = await apiFetchBuffer(`/api/projects/${projectId}/annotations`, {
+      headers: packedHeaders,
+    });
+    return decodePackedAnnotations(buffer);
+  },
+
+  async changesSince(projectId: number, since: number): Promise<AnnotationChanges> {
+    return apiFetch<AnnotationChanges>(`/api/projects/${projectId}/changes?since=${since}`);
+  },
+
+  subscribe(
+    projectId: number,
+    imageId: number | null,
+    onMessage: (message: LiveAnnotationMessage) => void
+  ): WebSocket {
+    const query = imageId !== null ? `?image_id=${imageId}` : '';
+    const url = getApiUrl(`/api/projects/${projectId}/live${query}`).replace(/^http/, 'ws');
+    const socket = new WebSocket(url);
+    socket.onmessage = (event) => onMessage(JSON.parse(event.data) as LiveAnnotationMessage);
+    return socket;
+  },
+
   async create(imageId: number, data: AnnotationCreate): Promise<AnnotationResponse> {
     return apiFetch<AnnotationResponse>(`/api/images/${imageId}/annotations`, {
       method: 'POST',
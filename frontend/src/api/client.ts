@@ -33,6 +33,27 @@ export async function apiFetch<T>(
   }
 }
 
+export async function apiFetchBuffer(
+  endpoint: string,
+  options: RequestInit = {}
+): Promise<ArrayBuffer> {
+  const url = `${API_BASE_URL}${endpoint}`;
+
+  try {
+    const response = await fetch(url, options);
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      throw new Error(error.detail || `HTTP ${response.status}`);
+    }
+
+    return await response.arrayBuffer();
+  } catch (error) {
+    console.error(`API Error [${endpoint}]:`, error);
+    throw error;
+  }
+}
+
 export function getApiUrl(path: string): string {
   return `${API_BASE_URL}${path}`;
 }
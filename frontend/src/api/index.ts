@@ -1,6 +1,7 @@
-export { apiFetch, getApiUrl } from './client';
+export { apiFetch, apiFetchBuffer, getApiUrl } from './client';
 export { projects } from './projects';
 export { images } from './images';
-export { annotations } from './annotations';
+export { annotations, decodePackedAnnotations } from './annotations';
+export type { PackedAnnotations } from './annotations';
 export { exports } from './exports';
 export type { CocoExport } from './exports';
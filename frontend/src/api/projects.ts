@@ -7,7 +7,7 @@ import type {
   LabelSchemaCreate,
   LabelSchemaUpdate,
 } from '../types/project';
-import type { ImageData, ScanResult } from '../types';
+import type { ImageData, ImageLevel, ImageLevels, ScanResult } from '../types';
 
 export const projects = {
   // Project CRUD
@@ -77,6 +77,31 @@ export const projects = {
     return apiFetch<ImageData>(`/api/projects/${projectId}/images/${imageId}`);
   },
 
+  // Lets the server warm the images likely to be opened next
+  async viewImage(
+    projectId: number,
+    imageId: number,
+    previousImageId: number | null,
+    formats: string[] = []
+  ): Promise<{ prefetching: number[] }> {
+    return apiFetch<{ prefetching: number[] }>(
+      `/api/projects/${projectId}/images/${imageId}/view`,
+      {
+        method: 'POST',
+        body: JSON.stringify({ previous_image_id: previousImageId, formats }),
+      }
+    );
+  },
+
+  // Resolutions of an image, with absolute URLs
+  async getImageLevels(projectId: number, imageId: number): Promise<ImageLevels> {
+    const { levels, texture } = await apiFetch<ImageLevels>(
+      `/api/projects/${projectId}/images/${imageId}/levels`
+    );
+    const withUrl = (level: ImageLevel) => ({ ...level, url: getApiUrl(level.url) });
+    return { levels: levels.map(withUrl), texture: texture && withUrl(texture) };
+  },
+
   getImageFileUrl(projectId: number, imageId: number): string {
     return getApiUrl(`/api/projects/${projectId}/images/${imageId}/file`);
   },
@@ -4,12 +4,18 @@ import {
   useState,
   useCallback,
   useEffect,
+  useRef,
   type ReactNode,
 } from 'react';
 import { annotations as annotationsApi } from '../api';
 import { useImages } from './ImageContext';
 import { generateRandomColor } from '../utils/colors';
-import type { BoundingBox, GeoCoordinate, SaveStatus } from '../types';
+import type {
+  AnnotationResponse,
+  BoundingBox,
+  GeoCoordinate,
+  SaveStatus,
+} from '../types';
 
 interface AnnotationContextValue {
   boxes: BoundingBox[];
@@ -37,9 +43,12 @@ interface AnnotationProviderProps {
 }
 
 export function AnnotationProvider({ children }: AnnotationProviderProps) {
-  const { currentImageId } = useImages();
+  const { currentImageId, currentImage } = useImages();
+  const currentProjectId = currentImage?.project_id ?? null;
   const [boxes, setBoxes] = useState<BoundingBox[]>([]);
   const [selectedBoxId, setSelectedBoxId] = useState<string | number | null>(null);
+  const selectedBoxIdRef = useRef(selectedBoxId);
+  selectedBoxIdRef.current = selectedBoxId;
   const [saveStatus, setSaveStatus] = useState<SaveStatus>('idle');
   const [nextLocalId, setNextLocalId] = useState(0);
 
@@ -47,6 +56,8 @@ export function AnnotationProvider({ children }: AnnotationProviderProps) {
     if (!currentImageId) return;
 
     try {
+      // JSON rather than the packed payload: its float32 bounds would be
+      // written back rounded the first time a box is edited
       const data = await annotationsApi.listForImage(currentImageId);
       const loadedBoxes: BoundingBox[] = data.map((annotation) => ({
         id: annotation.id,
@@ -103,13 +114,15 @@ export function AnnotationProvider({ children }: AnnotationProviderProps) {
           color: newBox.color,
         });
 
-        // Update box with server ID
+        // Update box with server ID, dropping a copy pushed by live updates
         setBoxes((prev) =>
-          prev.map((box) =>
-            box.id === localId
-              ? { ...box, id: savedAnnotation.id, serverId: savedAnnotation.id }
-              : box
-          )
+          prev
+            .filter((box) => box.id === localId || box.serverId !== savedAnnotation.id)
+            .map((box) =>
+              box.id === localId
+                ? { ...box, id: savedAnnotation.id, serverId: savedAnnotation.id }
+                : box
+            )
         );
 
         setSaveStatus('saved');
@@ -251,6 +264,64 @@ export function AnnotationProvider({ children }: AnnotationProviderProps) {
     }
   }, [currentImageId, loadAnnotations, clearAnnotations]);
 
+  // Apply other annotators' edits pushed by the server
+  useEffect(() => {
+    if (!currentProjectId || !currentImageId) return;
+
+    const socket = annotationsApi.subscribe(currentProjectId, currentImageId, (message) => {
+      if (message.type === 'resync' || message.reset) {
+        loadAnnotations();
+        return;
+      }
+
+      const upserts = new Map<number, AnnotationResponse>(
+        message.upserts.map((annotation) => [annotation.id, annotation])
+      );
+      const deleted = new Set(message.deletes.map((tombstone) => tombstone.id));
+
+      setBoxes((prev) => {
+        const next: BoundingBox[] = [];
+        for (const box of prev) {
+          if (box.serverId !== null && deleted.has(box.serverId)) continue;
+
+          const update = box.serverId !== null ? upserts.get(box.serverId) : undefined;
+          if (update) {
+            upserts.delete(update.id);
+            // Don't move a box out from under a local edit in progress
+            if (box.id === selectedBoxIdRef.current) {
+              next.push(box);
+              continue;
+            }
+            next.push({
+              ...box,
+              geoMin: { azimuth: update.az_min, altitude: update.alt_min },
+              geoMax: { azimuth: update.az_max, altitude: update.alt_max },
+              label: update.label ?? '',
+              color: update.color || box.color,
+            });
+          } else {
+            next.push(box);
+          }
+        }
+
+        for (const annotation of upserts.values()) {
+          next.push({
+            id: annotation.id,
+            serverId: annotation.id,
+            geoMin: { azimuth: annotation.az_min, altitude: annotation.alt_min },
+            geoMax: { azimuth: annotation.az_max, altitude: annotation.alt_max },
+            label: annotation.label ?? '',
+            color: annotation.color || generateRandomColor(),
+            createdAt: Date.parse(annotation.created_at),
+          });
+        }
+        return next;
+      });
+    });
+
+    return () => socket.close();
+  }, [currentProjectId, currentImageId, loadAnnotations]);
+
   // Auto-hide save status after delay
   useEffect(() => {
     if (saveStatus === 'saved' || saveStatus === 'error') {
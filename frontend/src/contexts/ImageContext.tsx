@@ -4,11 +4,13 @@ import {
   useState,
   useCallback,
   useEffect,
+  useRef,
   type ReactNode,
 } from 'react';
 import { projects as projectsApi } from '../api';
 import { useProjects } from './ProjectContext';
-import type { ImageData, ScanResult } from '../types';
+import { supportedImageFormats } from '../utils/imageFormats';
+import type { ImageData, ImageLevels, ScanResult } from '../types';
 
 interface ImageContextValue {
   images: ImageData[];
@@ -23,6 +25,7 @@ interface ImageContextValue {
   selectImage: (imageId: number) => void;
   clearImage: () => void;
   getImageFileUrl: (imageId: number) => string;
+  getImageLevels: (imageId: number) => Promise<ImageLevels>;
   getThumbnailUrl: (imageId: number) => string;
 }
 
@@ -41,6 +44,10 @@ export function ImageProvider({ children }: ImageProviderProps) {
   const [isScanning, setIsScanning] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [lastScanResult, setLastScanResult] = useState<ScanResult | null>(null);
+  // Last image reported to the server
+  const lastViewedRef = useRef<{ projectId: number; imageId: number } | null>(
+    null
+  );
 
   const currentImage = currentImageId
     ? images.find((img) => img.id === currentImageId) ?? null
@@ -102,6 +109,14 @@ export function ImageProvider({ children }: ImageProviderProps) {
     [currentProjectId]
   );
 
+  const getImageLevels = useCallback(
+    async (imageId: number): Promise<ImageLevels> => {
+      if (!currentProjectId) return { levels: [], texture: null };
+      return projectsApi.getImageLevels(currentProjectId, imageId);
+    },
+    [currentProjectId]
+  );
+
   const getThumbnailUrl = useCallback(
     (imageId: number) => {
       if (!currentProjectId) return '';
@@ -121,6 +136,31 @@ export function ImageProvider({ children }: ImageProviderProps) {
     }
   }, [currentProjectId, loadImages]);
 
+  // Report each opened image so the next ones are warmed in the background.
+  // The image opened before it gives the server the direction of travel.
+  useEffect(() => {
+    if (!currentProjectId || !currentImageId) return;
+    const last = lastViewedRef.current;
+    const previousImageId =
+      last && last.projectId === currentProjectId ? last.imageId : null;
+    lastViewedRef.current = {
+      projectId: currentProjectId,
+      imageId: currentImageId,
+    };
+    supportedImageFormats()
+      .then((formats) =>
+        projectsApi.viewImage(
+          currentProjectId,
+          currentImageId,
+          previousImageId,
+          formats
+        )
+      )
+      .catch(() => {
+        // Prefetching is best effort
+      });
+  }, [currentProjectId, currentImageId]);
+
   const value: ImageContextValue = {
     images,
     currentImageId,
@@ -134,6 +174,7 @@ export function ImageProvider({ children }: ImageProviderProps) {
     selectImage,
     clearImage,
     getImageFileUrl,
+    getImageLevels,
     getThumbnailUrl,
   };
 
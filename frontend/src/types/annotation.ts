@@ -22,9 +22,29 @@ export interface AnnotationResponse {
   az_max: number;
   alt_max: number;
   color: string;
+  revision: number;
   created_at: string;
 }
 
+export interface AnnotationTombstone {
+  id: number;
+  image_id: number;
+  revision: number;
+}
+
+export interface AnnotationChanges {
+  revision: number; // pass as `since` on the next poll
+  has_more: boolean;
+  reset: boolean; // `since` is too old, reload everything
+  upserts: AnnotationResponse[];
+  deletes: AnnotationTombstone[];
+}
+
+// Messages pushed over /api/projects/{id}/live
+export type LiveAnnotationMessage =
+  | ({ type: 'changes' } & AnnotationChanges) // has_more: another page follows
+  | { type: 'resync' }; // updates were dropped, refetch
+
 export interface AnnotationCreate {
   label: string;
   az_min: number;
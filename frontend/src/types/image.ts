@@ -9,6 +9,21 @@ export interface ImageData {
   created_at: string;
 }
 
+// A resolution an image can be loaded at
+export interface ImageLevel {
+  name: 'preview' | 'display' | 'full';
+  width: number;
+  height: number;
+  url: string;
+}
+
+export interface ImageLevels {
+  // Smallest first
+  levels: ImageLevel[];
+  // The display level as a KTX2 texture, when the server encodes them
+  texture: ImageLevel | null;
+}
+
 export interface ScanResult {
   scanned: number;
   added: number;
@@ -0,0 +1,51 @@
+// One-pixel images, decoded to find the formats this browser supports
+const PROBES: Record<string, string> = {
+  avif:
+    'data:image/avif;base64,AAAAIGZ0eXBhdmlmAAAAAGF2aWZtaWYxbWlhZk1BMUIAAADybWV0YQAAAAAAAAAoaGRscgAAAAAAAAAAcGljdAAAAAAAAAAAAAAAAGxpYmF2aWYAAAAADnBpdG0AAAAAAAEAAAAeaWxvYwAAAABEAAABAAEAAAABAAABGgAAAB8AAAAoaWluZgAAAAAAAQAAABppbmZlAgAAAAABAABhdjAxQ29sb3IAAAAAamlwcnAAAABLaXBjbwAAABRpc3BlAAAAAAAAAAEAAAABAAAAEHBpeGkAAAAAAwgICAAAAAxhdjFDgQAMAAAAABNjb2xybmNseAABAA0ABoAAAAAXaXBtYQAAAAAAAAABAAEEAQKDBAAAACdtZGF0EgAKCBgABggIaDQgMhEWQAYYYYQAAHlM26RWWap6Rg==',
+  webp: 'data:image/webp;base64,UklGRjoAAABXRUJQVlA4IC4AAADQAQCdASoBAAEAAoBCJaACdLoB+AADsAD+73bX/hVuGIZqv/vYL7sF92C/1sAA',
+};
+
+function decodes(src: string): Promise<boolean> {
+  return new Promise((resolve) => {
+    const img = new Image();
+    img.onload = () => resolve(img.width > 0);
+    img.onerror = () => resolve(false);
+    img.src = src;
+  });
+}
+
+// Block-compressed formats a KTX2 texture can be transcoded to
+const COMPRESSED_TEXTURE_EXTENSIONS = [
+  'EXT_texture_compression_bptc',
+  'WEBGL_compressed_texture_s3tc',
+  'WEBGL_compressed_texture_astc',
+  'WEBGL_compressed_texture_etc',
+  'WEBGL_compressed_texture_etc1',
+];
+
+// KTX2 textures only save GPU memory when the GPU takes a compressed format
+function supportsCompressedTextures(): boolean {
+  const gl = document.createElement('canvas').getContext('webgl2');
+  if (!gl) return false;
+  const supported = COMPRESSED_TEXTURE_EXTENSIONS.some((name) => gl.getExtension(name));
+  gl.getExtension('WEBGL_lose_context')?.loseContext();
+  return supported;
+}
+
+let supported: Promise<string[]> | null = null;
+
+// Image formats this browser decodes besides JPEG, named as the server names
+// them; "ktx2" when the viewer loads compressed textures
+export function supportedImageFormats(): Promise<string[]> {
+  if (!supported) {
+    supported = Promise.all(
+      Object.entries(PROBES).map(async ([format, src]) =>
+        (await decodes(src)) ? format : null
+      )
+    ).then((formats) => {
+      const names = formats.filter((format): format is string => format !== null);
+      return supportsCompressedTextures() ? [...names, 'ktx2'] : names;
+    });
+  }
+  return supported;
+}
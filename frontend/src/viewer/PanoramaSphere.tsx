@@ -1,11 +1,98 @@
-import { useRef, useEffect } from 'react';
-import { useLoader } from '@react-three/fiber';
+import { useRef, useEffect, useState } from 'react';
+import { useThree } from '@react-three/fiber';
 import * as THREE from 'three';
+import { KTX2Loader } from 'three/examples/jsm/loaders/KTX2Loader.js';
 import { useImages, useInteraction } from '../hooks';
 import { uvToGeo } from '../utils/coordinates';
+import { supportedImageFormats } from '../utils/imageFormats';
 import type { ThreeEvent } from '@react-three/fiber';
 import type { GeoCoordinate } from '../types';
 
+// Shared, as each KTX2 loader keeps its own pool of transcoder workers
+let ktx2Loader: KTX2Loader | null = null;
+
+function getKTX2Loader(renderer: THREE.WebGLRenderer): KTX2Loader {
+  if (!ktx2Loader) {
+    ktx2Loader = new KTX2Loader()
+      .setTranscoderPath(`${import.meta.env.BASE_URL}basis/`)
+      .detectSupport(renderer);
+  }
+  return ktx2Loader;
+}
+
+// Loads every resolution level of an image at once and shows each as it
+// arrives, so a small preview appears first and is swapped for the display
+// image; a level never replaces a higher one. Where the GPU takes
+// compressed textures, the display level is loaded as a KTX2 texture,
+// transcoded off the main thread and 4-8x smaller in GPU memory.
+function useProgressiveTexture(imageId: number | null): THREE.Texture | null {
+  const { getImageLevels, getImageFileUrl } = useImages();
+  const gl = useThree((state) => state.gl);
+  const [texture, setTexture] = useState<THREE.Texture | null>(null);
+
+  useEffect(() => {
+    if (!imageId) return;
+    let cancelled = false;
+    let shownRank = -1;
+    const loaded: THREE.Texture[] = [];
+    const loader = new THREE.TextureLoader();
+
+    const show = (tex: THREE.Texture, rank: number) => {
+      if (cancelled) {
+        tex.dispose();
+        return;
+      }
+      loaded.push(tex);
+      if (rank < shownRank) return;
+      shownRank = rank;
+      setTexture(tex);
+    };
+
+    const load = (url: string, rank: number) => {
+      loader.load(url, (tex) => {
+        tex.colorSpace = THREE.SRGBColorSpace;
+        tex.minFilter = THREE.LinearFilter;
+        tex.magFilter = THREE.LinearFilter;
+        show(tex, rank);
+      });
+    };
+
+    // Compressed textures carry their color space and mipmaps
+    const loadCompressed = (url: string, fallbackUrl: string, rank: number) => {
+      getKTX2Loader(gl).load(
+        url,
+        (tex) => show(tex, rank),
+        undefined,
+        () => load(fallbackUrl, rank)
+      );
+    };
+
+    Promise.all([getImageLevels(imageId), supportedImageFormats()])
+      .then(([{ levels, texture: compressed }, formats]) => {
+        const ktx2 = formats.includes('ktx2') ? compressed : null;
+        // The full-size original can exceed GPU texture limits
+        levels
+          .filter((level) => level.name !== 'full')
+          .forEach((level, rank) => {
+            if (level.name === 'display' && ktx2) {
+              loadCompressed(ktx2.url, level.url, rank);
+            } else {
+              load(level.url, rank);
+            }
+          });
+      })
+      .catch(() => load(getImageFileUrl(imageId), 0));
+
+    return () => {
+      cancelled = true;
+      setTexture(null);
+      loaded.forEach((tex) => tex.dispose());
+    };
+  }, [imageId, gl, getImageLevels, getImageFileUrl]);
+
+  return texture;
+}
+
 interface PanoramaSphereProps {
   onPointerDown?: (geo: GeoCoordinate) => void;
   onPointerMove?: (geo: GeoCoordinate) => void;
@@ -17,27 +104,11 @@ export function PanoramaSphere({
   onPointerMove,
   onPointerUp,
 }: PanoramaSphereProps) {
-  const { currentImageId, getImageFileUrl } = useImages();
+  const { currentImageId } = useImages();
   const { drawState, resizeState, middleMousePressed } = useInteraction();
   const meshRef = useRef<THREE.Mesh>(null);
 
-  const textureUrl = currentImageId ? getImageFileUrl(currentImageId) : null;
-
-  // Load texture conditionally
-  const texture = useLoader(
-    THREE.TextureLoader,
-    textureUrl || '/placeholder.png',
-    undefined,
-    () => {} // Error handler - silent fail for placeholder
-  );
-
-  useEffect(() => {
-    if (texture && textureUrl) {
-      texture.colorSpace = THREE.SRGBColorSpace;
-      texture.minFilter = THREE.LinearFilter;
-      texture.magFilter = THREE.LinearFilter;
-    }
-  }, [texture, textureUrl]);
+  const texture = useProgressiveTexture(currentImageId);
 
   const getGeoFromEvent = (event: ThreeEvent<PointerEvent>): GeoCoordinate | null => {
     if (!event.uv) return null;
@@ -72,7 +143,7 @@ export function PanoramaSphere({
     if (geo) onPointerUp?.(geo);
   };
 
-  if (!textureUrl) {
+  if (!texture) {
     return null;
   }
 
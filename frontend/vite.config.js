@@ -1,9 +1,39 @@
 import { defineConfig } from 'vite';
 import react from '@vitejs/plugin-react';
 import tailwindcss from '@tailwindcss/vite';
+import fs from 'fs';
 import path from 'path';
+// Serves three's Basis Universal transcoder at /basis/, where the viewer's
+// KTX2 loader fetches it, and copies it into builds
+function basisTranscoder() {
+    var dir = path.resolve(__dirname, 'node_modules/three/examples/jsm/libs/basis');
+    var files = ['basis_transcoder.js', 'basis_transcoder.wasm'];
+    return {
+        name: 'basis-transcoder',
+        configureServer: function (server) {
+            server.middlewares.use('/basis', function (req, res, next) {
+                var _a;
+                var name = (_a = req.url) === null || _a === void 0 ? void 0 : _a.slice(1).split('?')[0];
+                if (!name || !files.includes(name))
+                    return next();
+                res.setHeader('Content-Type', name.endsWith('.wasm') ? 'application/wasm' : 'text/javascript');
+                fs.createReadStream(path.join(dir, name)).pipe(res);
+            });
+        },
+        generateBundle: function () {
+            for (var _i = 0, files_1 = files; _i < files_1.length; _i++) {
+                var name_1 = files_1[_i];
+                this.emitFile({
+                    type: 'asset',
+                    fileName: "basis/".concat(name_1),
+                    source: fs.readFileSync(path.join(dir, name_1)),
+                });
+            }
+        },
+    };
+}
 export default defineConfig({
-    plugins: [react(), tailwindcss()],
+    plugins: [react(), tailwindcss(), basisTranscoder()],
     resolve: {
         alias: {
             '@': path.resolve(__dirname, './src'),
@@ -1,9 +1,40 @@
-import { defineConfig } from 'vite';
+import { defineConfig, type Plugin } from 'vite';
 import react from '@vitejs/plugin-react';
+import fs from 'fs';
 import path from 'path';
 
+// Serves three's Basis Universal transcoder at /basis/, where the viewer's
+// KTX2 loader fetches it, and copies it into builds
+function basisTranscoder(): Plugin {
+  const dir = path.resolve(__dirname, 'node_modules/three/examples/jsm/libs/basis');
+  const files = ['basis_transcoder.js', 'basis_transcoder.wasm'];
+  return {
+    name: 'basis-transcoder',
+    configureServer(server) {
+      server.middlewares.use('/basis', (req, res, next) => {
+        const name = req.url?.slice(1).split('?')[0];
+        if (!name || !files.includes(name)) return next();
+        res.setHeader(
+          'Content-Type',
+          name.endsWith('.wasm') ? 'application/wasm' : 'text/javascript'
+        );
+        fs.createReadStream(path.join(dir, name)).pipe(res);
+      });
+    },
+    generateBundle() {
+      for (const name of files) {
+        this.emitFile({
+          type: 'asset',
+          fileName: `basis/${name}`,
+          source: fs.readFileSync(path.join(dir, name)),
+        });
+      }
+    },
+  };
+}
+
 export default defineConfig({
-  plugins: [react()],
+  plugins: [react(), basisTranscoder()],
   resolve: {
     alias: {
       '@': path.resolve(__dirname, './src'),
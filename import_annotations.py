@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Bulk import annotations into a project from a COCO JSON or CSV file."""
+
+import argparse
+import json
+import time
+
+from backend.config import load_config
+from backend.database import init_database
+from backend.services.import_service import ImportService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("project_id", type=int, help="Project to import into")
+    parser.add_argument("file", help="COCO JSON or CSV file")
+    parser.add_argument(
+        "--format",
+        choices=["coco", "csv"],
+        help="File format (default: from the file extension)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report without writing anything"
+    )
+    parser.add_argument(
+        "--no-create-labels",
+        action="store_true",
+        help="Don't add imported labels to the project's label schema",
+    )
+    args = parser.parse_args()
+
+    file_format = args.format or (
+        "csv" if args.file.lower().endswith(".csv") else "coco"
+    )
+
+    config = load_config()
+    init_database(config.database.path)
+
+    service = ImportService()
+    importer = service.import_csv if file_format == "csv" else service.import_coco
+
+    start = time.perf_counter()
+    with open(args.file, encoding="utf-8-sig", newline="") as fp:
+        result = importer(
+            args.project_id,
+            fp,
+            dry_run=args.dry_run,
+            create_labels=not args.no_create_labels,
+        )
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps(result.model_dump(), indent=2))
+    action = "Would import" if args.dry_run else "Imported"
+    print(f"{action} {result.imported} annotation(s) in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Fixtures shared by the tests."""
+
+import pytest
+import yaml
+
+from backend.config import load_config
+from backend.database import init_database
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """
+    Load a config.yaml written to the test's directory.
+
+    Keyword arguments are config sections, whose settings override the
+    defaults. The database and export cache default to files in tmp_path.
+    """
+
+    def make(**sections):
+        values = {
+            "server": {},
+            "images": {},
+            "thumbnails": {},
+            "database": {"path": str(tmp_path / "test.db")},
+            "export": {"cache_dir": str(tmp_path / "exports")},
+        }
+        for name, settings in sections.items():
+            values[name] = {**values.get(name, {}), **settings}
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(yaml.safe_dump(values))
+        return load_config(str(config_path))
+
+    return make
+
+
+@pytest.fixture
+def make_db(make_config):
+    """Load a config like make_config and open its empty database."""
+
+    def make(**sections):
+        config = make_config(**sections)
+        return init_database(config.database.path)
+
+    return make
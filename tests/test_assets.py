@@ -0,0 +1,175 @@
+"""Test the derived asset queue and its worker processes."""
+
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from backend.database import get_db, init_database
+from backend.services.asset_service import AssetQueue
+from backend.services.asset_worker_service import AssetWorker, AssetWorkerPool
+from backend.services.image_service import ImageService
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch, make_config):
+    """A project of two panoramas, one larger than its preview."""
+    monkeypatch.chdir(tmp_path)
+    panos = tmp_path / "panos"
+    panos.mkdir()
+    Image.new("RGB", (2048, 1024), (0, 128, 0)).save(panos / "big.jpg")
+    Image.new("RGB", (512, 256), (0, 0, 128)).save(panos / "small.jpg")
+
+    def load(**assets):
+        return make_config(
+            images={
+                "rendition_dir": str(tmp_path / "renditions"),
+                "renditions": {"formats": ["webp"]},
+            },
+            assets={"enabled": True, "poll_interval": 0.05, **assets},
+        )
+
+    db = init_database(load().database.path)
+    db.execute(
+        "INSERT INTO projects (name, images_path) VALUES ('P', ?)", (str(panos),)
+    )
+    return load
+
+
+def _jobs():
+    return {
+        (row["image_id"], row["asset"]): row["status"]
+        for row in get_db().fetchall("SELECT * FROM asset_jobs")
+    }
+
+
+def _image_id(filename: str) -> int:
+    return next(i.id for i in ImageService().list_images(1) if i.filename == filename)
+
+
+def test_scan_queues_assets_for_the_workers(env, tmp_path):
+    assert ImageService().scan_images(1).added == 2
+    big, small = _image_id("big.jpg"), _image_id("small.jpg")
+
+    # Nothing is built during the scan
+    assert not (tmp_path / "renditions").exists()
+    assert not any(
+        Path(i.thumbnail_path).exists() for i in ImageService().list_images(1)
+    )
+    # Originals within the display size are served as is to JPEG clients
+    assert _jobs() == {
+        (big, "thumbnail"): "queued",
+        (big, "preview"): "queued",
+        (big, "display:webp"): "queued",
+        (small, "thumbnail"): "queued",
+        (small, "display:webp"): "queued",
+    }
+
+    # Thumbnails first, then previews, then display renditions
+    worker = AssetWorker("test")
+    built = []
+    while job := worker.run_next():
+        built.append(job.asset)
+    assert built == [
+        "thumbnail",
+        "thumbnail",
+        "preview",
+        "display:webp",
+        "display:webp",
+    ]
+    assert set(_jobs().values()) == {"done"}
+    assert all(Path(i.thumbnail_path).exists() for i in ImageService().list_images(1))
+    assert len(list((tmp_path / "renditions").iterdir())) == 3
+
+    status = AssetQueue().status()
+    assert [(c.asset, c.done) for c in status.assets] == [
+        ("thumbnail", 2),
+        ("preview", 1),
+        ("display:webp", 2),
+    ]
+
+    # Built assets are only queued again on purpose
+    assert AssetQueue().enqueue_project(1) == 0
+    assert AssetQueue().enqueue_project(1, ["thumbnail"], rebuild=True) == 2
+
+    # Deleting an image drops its jobs
+    ImageService().delete_image(big)
+    assert set(_jobs()) == {(small, "thumbnail"), (small, "display:webp")}
+
+
+def test_enqueue_deduplicates_and_raises_priority(env):
+    queue = AssetQueue()
+    assert queue.enqueue([(1, "display:jpeg"), (2, "display:jpeg"), (1, "texture")])
+    assert queue.enqueue([(1, "display:jpeg")]) == 1
+    assert queue.pending() == 3
+
+    # Requeueing with a higher priority moves a job ahead
+    queue.enqueue([(2, "display:jpeg")], priority=100)
+    assert queue.claim("a")[1:] == (2, "display:jpeg", 1)
+    assert queue.claim("b")[1:] == (1, "display:jpeg", 1)
+
+    with pytest.raises(ValueError, match="Unknown asset"):
+        queue.enqueue([(1, "display:gif")])
+
+
+def test_failed_jobs_are_retried_with_backoff(env):
+    env(max_attempts=2, retry_delay=60)
+    queue = AssetQueue()
+    # The image doesn't exist
+    queue.enqueue([(1, "preview")])
+
+    job = queue.claim("a")
+    assert queue.fail(job, "boom")
+    # Not due until the delay is over
+    assert queue.claim("a") is None
+    get_db().execute("UPDATE asset_jobs SET run_after = 0")
+
+    job = queue.claim("a")
+    assert job.attempts == 2
+    assert not queue.fail(job, "boom again")
+    [failed] = queue.status().failed
+    assert (failed.asset, failed.attempts, failed.error) == ("preview", 2, "boom again")
+
+    assert queue.retry_failed() == 1
+    assert queue.claim("a").attempts == 1
+
+
+def test_jobs_of_dead_workers_are_requeued(env):
+    env(max_attempts=2, lease_seconds=-1)
+    queue = AssetQueue()
+    queue.enqueue([(1, "thumbnail"), (2, "thumbnail")])
+
+    # An expired lease counts as an attempt
+    first = queue.claim("a")
+    assert queue.claim("b") == first._replace(attempts=2)
+    assert queue.status().failed == []
+    second = queue.claim("c")
+    assert second.image_id == 2
+    assert queue.status().failed[0].error == "Worker stopped responding"
+
+    # Stopping a worker on purpose doesn't count the attempt
+    env()
+    assert queue.release("c") == 1
+    assert AssetQueue().claim("d") == second
+
+
+def test_worker_pool_builds_the_queue(env, tmp_path):
+    ImageService().scan_images(1)
+    pool = AssetWorkerPool(2, str(tmp_path / "config.yaml"))
+    # Only one pool per database runs its processes
+    other = AssetWorkerPool(1, str(tmp_path / "config.yaml"))
+    pool.start()
+    other.start()
+    try:
+        assert pool.running
+        assert not other.running
+        deadline = time.monotonic() + 60
+        while AssetQueue().pending() and time.monotonic() < deadline:
+            time.sleep(0.1)
+    finally:
+        other.stop(10)
+        pool.stop(10)
+
+    assert set(_jobs().values()) == {"done"}
+    assert all(Path(i.thumbnail_path).exists() for i in ImageService().list_images(1))
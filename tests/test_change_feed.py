@@ -0,0 +1,183 @@
+"""Test annotation revision tracking and the change feed."""
+
+import sqlite3
+import tempfile
+
+import pytest
+
+from backend.database import init_database
+from backend.migrations.migration_manager import MigrationManager
+from backend.services.annotation_service import AnnotationService
+
+
+def _insert_annotation(cursor, image_id, label="car"):
+    cursor.execute(
+        """
+        INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+        VALUES (?, ?, 10.0, -5.0, 20.0, 5.0)
+        """,
+        (image_id, label),
+    )
+    return cursor.lastrowid
+
+
+@pytest.fixture
+def db_path():
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        MigrationManager(tmp.name).apply_migrations()
+
+        with sqlite3.connect(tmp.name) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO projects (name, images_path) VALUES ('P1', '/p1')"
+            )
+            cursor.execute(
+                "INSERT INTO projects (name, images_path) VALUES ('P2', '/p2')"
+            )
+            cursor.execute("""
+                INSERT INTO images (project_id, filename, filepath, width, height)
+                VALUES (1, 'a.jpg', '/p1/a.jpg', 100, 50),
+                       (2, 'b.jpg', '/p2/b.jpg', 100, 50)
+                """)
+            conn.commit()
+
+        yield tmp.name
+
+
+def _current_revision(cursor):
+    cursor.execute("SELECT value FROM sync_state WHERE key = 'revision'")
+    return cursor.fetchone()[0]
+
+
+def test_writes_stamp_increasing_revisions(db_path):
+    """Test that inserts and updates assign the next global revision."""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        base = _current_revision(cursor)
+        first = _insert_annotation(cursor, 1)
+        second = _insert_annotation(cursor, 1)
+        cursor.execute("UPDATE annotations SET label = 'bus' WHERE id = ?", (first,))
+        conn.commit()
+
+        cursor.execute("SELECT id, revision FROM annotations ORDER BY id")
+        assert cursor.fetchall() == [(first, base + 3), (second, base + 2)]
+        assert _current_revision(cursor) == base + 3
+
+
+def test_delete_leaves_tombstone(db_path):
+    """Test that deleting an annotation records a tombstone with its project."""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        base = _current_revision(cursor)
+        annotation_id = _insert_annotation(cursor, 1)
+        cursor.execute("DELETE FROM annotations WHERE id = ?", (annotation_id,))
+        conn.commit()
+
+        cursor.execute(
+            "SELECT annotation_id, image_id, project_id, revision FROM annotation_tombstones"
+        )
+        assert cursor.fetchall() == [(annotation_id, 1, 1, base + 2)]
+
+
+def test_writes_touch_image_and_project_revisions(db_path):
+    """Test that annotation, image and label writes bump the owning revisions."""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+
+        def revisions():
+            cursor.execute("SELECT revision FROM projects ORDER BY id")
+            projects = [row[0] for row in cursor.fetchall()]
+            cursor.execute("SELECT revision FROM images ORDER BY id")
+            return projects, [row[0] for row in cursor.fetchall()]
+
+        (p1, p2), (i1, i2) = revisions()
+
+        annotation_id = _insert_annotation(cursor, 1)
+        (p1_new, p2_new), (i1_new, i2_new) = revisions()
+        assert p1_new > p1 and i1_new > i1
+        assert (p2_new, i2_new) == (p2, i2)
+
+        cursor.execute("DELETE FROM annotations WHERE id = ?", (annotation_id,))
+        (p1_del, _), (i1_del, _) = revisions()
+        assert p1_del > p1_new and i1_del > i1_new
+
+        cursor.execute(
+            "INSERT INTO label_schemas (project_id, label_name) VALUES (2, 'car')"
+        )
+        (_, p2_label), _ = revisions()
+        assert p2_label > p2_new
+
+        cursor.execute("UPDATE projects SET name = 'renamed' WHERE id = 1")
+        (p1_renamed, _), _ = revisions()
+        assert p1_renamed > p1_del
+
+        before = _current_revision(cursor)
+        cursor.execute("DELETE FROM projects WHERE id = 2")
+        assert _current_revision(cursor) > before
+
+
+def test_get_changes_since(db_path):
+    """Test that the change feed returns only changes after the given revision."""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        kept = _insert_annotation(cursor, 1)
+        deleted = _insert_annotation(cursor, 1)
+        _insert_annotation(cursor, 2)  # other project
+        conn.commit()
+
+    init_database(db_path)
+    service = AnnotationService()
+
+    full = service.get_changes(1)
+    assert [a.id for a in full.upserts] == [kept, deleted]
+    assert full.deletes == []
+    assert not full.has_more
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DELETE FROM annotations WHERE id = ?", (deleted,))
+        conn.execute("UPDATE annotations SET label = 'bus' WHERE id = ?", (kept,))
+        conn.commit()
+
+    delta = service.get_changes(1, since=full.revision)
+    assert [d.id for d in delta.deletes] == [deleted]
+    assert [a.id for a in delta.upserts] == [kept]
+    assert delta.upserts[0].label == "bus"
+
+    assert service.get_changes(1, since=delta.revision).upserts == []
+
+
+def test_get_changes_paginates(db_path):
+    """Test that limits split the feed without skipping changes."""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        ids = [_insert_annotation(cursor, 1) for _ in range(5)]
+        cursor.execute("DELETE FROM annotations WHERE id = ?", (ids[1],))
+        conn.commit()
+
+    init_database(db_path)
+    service = AnnotationService()
+
+    seen_upserts, seen_deletes, since = [], [], 0
+    while True:
+        page = service.get_changes(1, since=since, limit=2)
+        seen_upserts += [a.id for a in page.upserts]
+        seen_deletes += [d.id for d in page.deletes]
+        since = page.revision
+        if not page.has_more:
+            break
+
+    assert seen_upserts == [ids[0], ids[2], ids[3], ids[4]]
+    assert seen_deletes == [ids[1]]
+
+
+def test_get_changes_requests_reset_before_tombstone_floor(db_path):
+    """Test that clients behind pruned tombstones are told to reload."""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE sync_state SET value = 10 WHERE key = 'tombstone_floor'")
+        conn.commit()
+
+    init_database(db_path)
+    service = AnnotationService()
+
+    assert service.get_changes(1, since=5).reset
+    assert not service.get_changes(1, since=0).reset
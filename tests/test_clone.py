@@ -0,0 +1,205 @@
+"""Test set-based project clone and merge."""
+
+import tempfile
+
+import pytest
+
+from backend.database import init_database
+from backend.models import ProjectClone, ProjectMerge
+from backend.services.project_service import ProjectService
+
+
+def _add_project(conn, name, filenames):
+    project_id = conn.execute(
+        "INSERT INTO projects (name, description, images_path) VALUES (?, 'd', '/a')",
+        (name,),
+    ).lastrowid
+    conn.executemany(
+        """
+        INSERT INTO images
+            (project_id, filename, filepath, width, height, thumbnail_path, phash)
+        VALUES (?, ?, ?, 3600, 1800, ?, 42)
+        """,
+        [(project_id, f, f"/a/{f}", f"/thumbs/{f}") for f in filenames],
+    )
+    return project_id
+
+
+def _add_box(conn, project_id, filename, label, az_min=10.0):
+    conn.execute(
+        """
+        INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+        SELECT id, ?, ?, -10, ?, 10 FROM images
+        WHERE project_id = ? AND filename = ?
+        """,
+        (label, az_min, az_min + 20, project_id, filename),
+    )
+
+
+@pytest.fixture
+def db():
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        db = init_database(tmp.name)
+        with db.get_connection() as conn:
+            project_id = _add_project(conn, "Source", ["a.jpg", "b.jpg"])
+            conn.execute(
+                """
+                INSERT INTO label_schemas (project_id, label_name, color, sort_order)
+                VALUES (?, 'car', '#f00', 1)
+                """,
+                (project_id,),
+            )
+            _add_box(conn, project_id, "a.jpg", "car")
+            _add_box(conn, project_id, "a.jpg", "person", az_min=50.0)
+            _add_box(conn, project_id, "b.jpg", None)
+            conn.commit()
+        yield db
+
+
+def _boxes(db, project_id):
+    return db.fetchall(
+        """
+        SELECT i.filename, a.label, a.az_min, a.alt_min, a.az_max, a.alt_max
+        FROM annotations a JOIN images i ON i.id = a.image_id
+        WHERE i.project_id = ?
+        ORDER BY i.filename, a.az_min
+        """,
+        (project_id,),
+    )
+
+
+def test_clone_copies_everything(db):
+    service = ProjectService()
+    clone = service.clone_project(1, ProjectClone())
+
+    assert clone.id != 1
+    assert clone.name == "Source (copy)"
+    assert clone.description == "d"
+    assert [tuple(r) for r in _boxes(db, clone.id)] == [tuple(r) for r in _boxes(db, 1)]
+
+    images = db.fetchall(
+        "SELECT thumbnail_path, phash FROM images WHERE project_id = ? ORDER BY id",
+        (clone.id,),
+    )
+    assert [tuple(r) for r in images] == [
+        ("/thumbs/a.jpg", 42),
+        ("/thumbs/b.jpg", 42),
+    ]
+    labels = service.get_label_schema(clone.id)
+    assert [(l.label_name, l.color, l.sort_order) for l in labels] == [
+        ("car", "#f00", 1)
+    ]
+
+    # The source is untouched and the search index covers the copies
+    assert len(_boxes(db, 1)) == 3
+    assert (
+        db.fetchone(
+            "SELECT COUNT(*) FROM annotations_fts WHERE annotations_fts MATCH 'car'"
+        )[0]
+        == 2
+    )
+
+
+def test_clone_without_annotations(db):
+    service = ProjectService()
+    clone = service.clone_project(
+        1, ProjectClone(name="Empty", include_annotations=False)
+    )
+
+    assert clone.name == "Empty"
+    assert _boxes(db, clone.id) == []
+    assert (
+        db.fetchone("SELECT COUNT(*) FROM images WHERE project_id = ?", (clone.id,))[0]
+        == 2
+    )
+
+
+def test_clone_stamps_revisions(db):
+    service = ProjectService()
+    before = service.get_projects_revision()
+    clone = service.clone_project(1, ProjectClone())
+
+    revisions = db.fetchall(
+        """
+        SELECT a.revision FROM annotations a JOIN images i ON i.id = a.image_id
+        WHERE i.project_id = ?
+        """,
+        (clone.id,),
+    )
+    assert len({r[0] for r in revisions}) == 3
+    assert all(r[0] > before for r in revisions)
+    assert service.get_revision(clone.id) == service.get_projects_revision()
+
+
+def test_clone_leaves_schema_and_triggers_alone(db):
+    """Bulk writes skip the row triggers without dropping them."""
+    schema_version = db.fetchone("PRAGMA schema_version")[0]
+    clone = ProjectService().clone_project(1, ProjectClone())
+
+    assert db.fetchone("PRAGMA schema_version")[0] == schema_version
+    assert db.fetchone("SELECT value FROM sync_state WHERE key = 'bulk'")[0] == 0
+    # The label index is kept by its trigger
+    labels = db.fetchall(
+        """
+        SELECT a.label FROM annotations_fts f
+        JOIN annotations a ON a.id = f.rowid
+        JOIN images i ON i.id = a.image_id
+        WHERE annotations_fts MATCH 'person' AND i.project_id = ?
+        """,
+        (clone.id,),
+    )
+    assert [row[0] for row in labels] == ["person"]
+
+    # Single-row writes still stamp revisions
+    _add_box(db, clone.id, "b.jpg", "bus")
+    row = db.fetchone("SELECT MAX(revision) FROM annotations")
+    assert row[0] == ProjectService().get_projects_revision()
+
+
+def test_clone_unknown_project(db):
+    assert ProjectService().clone_project(99, ProjectClone()) is None
+
+
+def test_merge(db):
+    service = ProjectService()
+    with db.get_connection() as conn:
+        target = _add_project(conn, "Target", ["a.jpg", "c.jpg"])
+        conn.execute(
+            "INSERT INTO label_schemas (project_id, label_name) VALUES (?, 'car')",
+            (target,),
+        )
+        _add_box(conn, target, "a.jpg", "car")
+        conn.commit()
+
+    result = service.merge_project(target, ProjectMerge(source_project_id=1))
+
+    assert result.labels_added == 0
+    assert result.images_added == 1
+    assert result.images_matched == 1
+    assert result.annotations_added == 2
+    assert result.annotations_skipped == 1
+    assert [(r["filename"], r["label"]) for r in _boxes(db, target)] == [
+        ("a.jpg", "car"),
+        ("a.jpg", "person"),
+        ("b.jpg", None),
+    ]
+
+    # Merging again adds nothing new
+    again = service.merge_project(target, ProjectMerge(source_project_id=1))
+    assert again.images_added == 0
+    assert again.annotations_added == 0
+    assert again.annotations_skipped == 3
+
+    keep_all = service.merge_project(
+        target, ProjectMerge(source_project_id=1, skip_duplicates=False)
+    )
+    assert keep_all.annotations_added == 3
+
+
+def test_merge_rejects_bad_source(db):
+    service = ProjectService()
+    with pytest.raises(ValueError):
+        service.merge_project(1, ProjectMerge(source_project_id=1))
+    with pytest.raises(ValueError):
+        service.merge_project(1, ProjectMerge(source_project_id=99))
+    assert service.merge_project(99, ProjectMerge(source_project_id=1)) is None
@@ -0,0 +1,135 @@
+"""Test Parquet and Arrow exports round-trip through pyarrow."""
+
+import io
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services.export_service import ExportService
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture
+def project(make_db):
+    # Several batches per table
+    db = make_db(export={"batch_size": 2})
+
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO projects (name, images_path) VALUES ('P', '/p')")
+        conn.executemany(
+            """
+            INSERT INTO images (project_id, filename, filepath, width, height)
+            VALUES (1, ?, ?, 360, 180)
+            """,
+            [(f"{i}.jpg", f"/p/{i}.jpg") for i in range(3)],
+        )
+        conn.execute(
+            "INSERT INTO label_schemas (project_id, label_name, sort_order) VALUES (1, 'car', 0)"
+        )
+        conn.executemany(
+            """
+            INSERT INTO annotations
+                (image_id, label, az_min, alt_min, az_max, alt_max, color)
+            VALUES (?, ?, ?, -5.0, 20.0, 5.0, '#ff0000')
+            """,
+            [(1, "car", 10.0), (1, "tree", 12.5), (2, "car", 0.1), (3, None, 3.0)],
+        )
+        conn.commit()
+
+
+def _read(path_or_bytes, file_format: str):
+    if file_format == "parquet":
+        return pq.read_table(pa.BufferReader(path_or_bytes))
+    return pa.ipc.open_file(pa.BufferReader(path_or_bytes)).read_all()
+
+
+def _check_tables(tables: dict, pixel_bounds: bool) -> None:
+    images = tables["images"]
+    assert images.schema.names == ["id", "file_name", "width", "height"]
+    assert images.to_pylist() == [
+        {"id": i + 1, "file_name": f"{i}.jpg", "width": 360, "height": 180}
+        for i in range(3)
+    ]
+
+    annotations = tables["annotations"]
+    names = [
+        "id",
+        "image_id",
+        "category_id",
+        "label",
+        "az_min",
+        "alt_min",
+        "az_max",
+        "alt_max",
+        "color",
+    ]
+    if pixel_bounds:
+        names += ["x_min", "y_min", "x_max", "y_max"]
+    assert annotations.schema.names == names
+    assert annotations.schema.field("category_id").type == pa.int32()
+    rows = annotations.to_pylist()
+    assert [(r["image_id"], r["label"], r["category_id"]) for r in rows] == [
+        (1, "car", 1),
+        (1, "tree", 2),
+        (2, "car", 1),
+        (3, None, 3),
+    ]
+    # Bounds keep full precision
+    assert [r["az_min"] for r in rows] == [10.0, 12.5, 0.1, 3.0]
+    if pixel_bounds:
+        assert (rows[1]["x_min"], rows[1]["y_min"]) == (12.5, 85.0)
+        assert (rows[1]["x_max"], rows[1]["y_max"]) == (20.0, 95.0)
+
+    assert tables["categories"].to_pylist() == [
+        {"id": 1, "name": "car"},
+        {"id": 2, "name": "tree"},
+        {"id": 3, "name": "unlabeled"},
+    ]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_export_columnar_round_trip(project, tmp_path, file_format):
+    paths = ExportService().export_columnar(
+        1, tmp_path / "out", file_format=file_format, include_pixel_bounds=True
+    )
+
+    tables = {
+        name: _read(path.read_bytes(), file_format) for name, path in paths.items()
+    }
+    _check_tables(tables, pixel_bounds=True)
+
+
+def test_arrow_export_is_compressed(project, tmp_path):
+    paths = ExportService().export_columnar(1, tmp_path / "out", file_format="arrow")
+
+    reader = pa.ipc.open_file(str(paths["annotations"]))
+    assert reader.num_record_batches == 2
+    # zstd frames start with this magic number
+    assert b"\x28\xb5\x2f\xfd" in paths["annotations"].read_bytes()
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_export_route_round_trip(project, file_format):
+    response = TestClient(app).get(f"/api/projects/1/export/{file_format}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    suffix = ".parquet" if file_format == "parquet" else ".arrow"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+        assert sorted(zf.namelist()) == [
+            f"{name}{suffix}" for name in ("annotations", "categories", "images")
+        ]
+        tables = {
+            name: _read(zf.read(f"{name}{suffix}"), file_format)
+            for name in ("images", "annotations", "categories")
+        }
+    _check_tables(tables, pixel_bounds=False)
+
+
+def test_export_route_unknown_project(project):
+    response = TestClient(app).get("/api/projects/99/export/parquet")
+    assert response.status_code == 404
@@ -0,0 +1,114 @@
+"""Test set-based deletes and background cleanup of derived files."""
+
+import pytest
+
+from backend.models import ProjectClone
+from backend.services.annotation_service import AnnotationService
+from backend.services.cleanup_service import get_file_cleaner
+from backend.services.image_service import ImageService
+from backend.services.project_service import ProjectService
+
+
+@pytest.fixture
+def env(tmp_path, make_db):
+    db = make_db()
+
+    thumbs = tmp_path / "thumbnails" / "project_1"
+    thumbs.mkdir(parents=True)
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO projects (name, images_path) VALUES ('P', '/p')")
+        for i in range(3):
+            (thumbs / f"thumb_{i}.jpg").write_bytes(b"jpeg")
+            conn.execute(
+                """
+                INSERT INTO images
+                    (project_id, filename, filepath, width, height, thumbnail_path)
+                VALUES (1, ?, ?, 200, 100, ?)
+                """,
+                (f"{i}.jpg", f"/p/{i}.jpg", str(thumbs / f"thumb_{i}.jpg")),
+            )
+        conn.execute(
+            "INSERT INTO label_schemas (project_id, label_name) VALUES (1, 'car')"
+        )
+        conn.executemany(
+            """
+            INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+            VALUES (?, 'car', 10.0, -5.0, 20.0, 5.0)
+            """,
+            [(1,), (1,), (2,), (3,)],
+        )
+        conn.commit()
+
+    export_dir = tmp_path / "exports" / "project_1" / "coco"
+    export_dir.mkdir(parents=True)
+    (export_dir / "export.json").write_text("{}")
+
+    return db, thumbs, export_dir
+
+
+def _count(db, table, where="1", params=()):
+    return db.fetchone(f"SELECT COUNT(*) FROM {table} WHERE {where}", params)[0]
+
+
+def test_delete_project_removes_rows_and_files(env):
+    db, thumbs, export_dir = env
+
+    assert ProjectService().delete_project(1)
+    get_file_cleaner().join()
+
+    for table in ("projects", "images", "annotations", "label_schemas"):
+        assert _count(db, table) == 0
+    assert _count(db, "annotation_tombstones") == 0
+    assert _count(db, "annotations_fts", "annotations_fts MATCH 'car'") == 0
+    assert not thumbs.exists()
+    assert not export_dir.parent.exists()
+
+    # Triggers are restored for later writes
+    triggers = db.fetchall(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'annotations_%'"
+    )
+    assert {"annotations_revision_delete", "annotations_fts_delete"} <= {
+        row[0] for row in triggers
+    }
+
+
+def test_delete_project_keeps_thumbnails_shared_with_clone(env):
+    db, thumbs, _ = env
+    service = ProjectService()
+    clone = service.clone_project(1, ProjectClone())
+
+    assert service.delete_project(1)
+    get_file_cleaner().join()
+
+    assert len(list(thumbs.iterdir())) == 3
+    assert _count(db, "annotations") == 4
+    assert len(AnnotationService().get_changes(clone.id).upserts) == 4
+
+    assert service.delete_project(clone.id)
+    get_file_cleaner().join()
+    assert not thumbs.exists()
+
+
+def test_delete_image_records_tombstones(env):
+    db, thumbs, _ = env
+    service = AnnotationService()
+    before = service.get_changes(1).revision
+
+    assert ImageService().delete_image(1)
+    get_file_cleaner().join()
+
+    assert _count(db, "images") == 2
+    assert _count(db, "annotations") == 2
+    assert not (thumbs / "thumb_0.jpg").exists()
+    assert (thumbs / "thumb_1.jpg").exists()
+
+    changes = service.get_changes(1, since=before)
+    assert sorted(d.image_id for d in changes.deletes) == [1, 1]
+    assert len({d.revision for d in changes.deletes}) == 2
+    assert _count(db, "annotations_fts", "annotations_fts MATCH 'car'") == 2
+
+    assert not ImageService().delete_image(1)
+
+
+def test_delete_unknown_project(env):
+    assert not ProjectService().delete_project(99)
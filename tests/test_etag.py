@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import annotation_service
+from backend.services.annotation_service import init_write_buffer
+from backend.utils.etag import etag_matches, make_etag
+
+
+def test_make_etag():
+    """Test that entity tags are weak and encode all parts."""
+    assert make_etag("labels", 3, 120) == 'W/"labels-3-120"'
+
+
+def test_etag_matches():
+    """Test weak comparison of If-None-Match headers."""
+    etag = make_etag("images", 1, 42)
+
+    assert etag_matches(etag, etag)
+    assert etag_matches('"images-1-42"', etag)
+    assert etag_matches(f'W/"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(make_etag("images", 1, 43), etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+
+
+def test_conditional_get_sees_buffered_update(monkeypatch, make_db):
+    """A GET right after a buffered PUT doesn't get a stale 304."""
+    monkeypatch.setattr(annotation_service, "_write_buffer", None)
+    db = make_db()
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO projects (name, images_path) VALUES ('P', '/a')")
+        conn.execute("""
+            INSERT INTO images (project_id, filename, filepath, width, height)
+            VALUES (1, 'a.jpg', '/a/a.jpg', 100, 50)
+            """)
+        conn.execute("""
+            INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+            VALUES (1, 'car', 10, -5, 20, 5)
+            """)
+        conn.commit()
+    init_write_buffer(flush_interval=60)
+    client = TestClient(app)
+
+    urls = [
+        "/api/projects",
+        "/api/projects/1",
+        "/api/projects/1/annotations",
+        "/api/images/1/annotations",
+    ]
+    etags = {url: client.get(url).headers["etag"] for url in urls}
+
+    assert client.put("/api/annotations/1", json={"label": "bus"}).status_code == 200
+
+    for url in urls:
+        response = client.get(url, headers={"If-None-Match": etags[url]})
+        assert response.status_code == 200, url
+        assert response.headers["etag"] != etags[url]
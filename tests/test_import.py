@@ -0,0 +1,190 @@
+"""Test streaming bulk import of annotations."""
+
+import io
+import json
+import tempfile
+
+import pytest
+
+from backend.database import init_database
+from backend.services.import_service import ImportService
+from backend.utils.json_stream import iter_object_members
+
+
+def test_iter_object_members_small_chunks():
+    """Members are parsed correctly even when split across every chunk."""
+    document = {
+        "info": {"year": 2024, "version": "1.0"},
+        "images": [{"id": 1, "file_name": "a.jpg"}, {"id": 2, "file_name": "b é.jpg"}],
+        "empty": [],
+        "count": 12345,
+        "annotations": [{"id": i, "bbox": [1.5, 2.25, 3, 4]} for i in range(5)],
+    }
+    text = json.dumps(document, indent=1)
+
+    for chunk_size in (1, 3, 7, 1 << 16):
+        members = list(iter_object_members(io.StringIO(text), chunk_size))
+        assert members == [
+            ("info", document["info"]),
+            ("images", document["images"][0]),
+            ("images", document["images"][1]),
+            ("count", 12345),
+            *[("annotations", a) for a in document["annotations"]],
+        ]
+
+
+def test_iter_object_members_rejects_malformed():
+    with pytest.raises(ValueError):
+        list(iter_object_members(io.StringIO('{"images": [{"id": 1} {"id": 2}]}')))
+    with pytest.raises(ValueError):
+        list(iter_object_members(io.StringIO('{"images": [{"id": 1}')))
+
+
+@pytest.fixture
+def service():
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        db = init_database(tmp.name)
+        with db.get_connection() as conn:
+            conn.execute("INSERT INTO projects (name, images_path) VALUES ('P', '/a')")
+            conn.executemany(
+                """
+                INSERT INTO images (project_id, filename, filepath, width, height)
+                VALUES (1, ?, ?, 3600, 1800)
+                """,
+                [("a.jpg", "/a/a.jpg"), ("b.jpg", "/a/b.jpg")],
+            )
+            conn.execute(
+                "INSERT INTO label_schemas (project_id, label_name) VALUES (1, 'car')"
+            )
+            conn.commit()
+        yield ImportService()
+
+
+def _coco() -> io.StringIO:
+    # Annotations before images, as allowed by the format
+    return io.StringIO(
+        json.dumps(
+            {
+                "annotations": [
+                    {
+                        "image_id": 10,
+                        "category_id": 1,
+                        "bbox_geo": {
+                            "az_min": 10,
+                            "alt_min": -5,
+                            "az_max": 20,
+                            "alt_max": 5,
+                        },
+                        "color": "#ff0000",
+                    },
+                    # Pixels on a 3600x1800 image: 0.1 degree per pixel
+                    {"image_id": 11, "category_id": 2, "bbox": [100, 850, 200, 100]},
+                    {"image_id": 12, "category_id": 1, "bbox": [0, 0, 10, 10]},
+                    {"image_id": 10, "category_id": 1, "bbox": [-50, 0, 10, 10]},
+                ],
+                "images": [
+                    {"id": 10, "file_name": "a.jpg", "width": 3600, "height": 1800},
+                    {"id": 11, "file_name": "b.jpg", "width": 3600, "height": 1800},
+                    {"id": 12, "file_name": "missing.jpg"},
+                ],
+                "categories": [{"id": 1, "name": "car"}, {"id": 2, "name": "person"}],
+            }
+        )
+    )
+
+
+def test_import_coco(service):
+    result = service.import_coco(1, _coco())
+
+    assert result.images_in_file == 3
+    assert result.images_matched == 2
+    assert result.unmatched_images == ["missing.jpg"]
+    assert result.annotations_in_file == 4
+    assert result.imported == 2
+    assert result.skipped_unmatched == 1
+    assert result.skipped_invalid == 1
+    assert result.new_labels == ["person"]
+
+    rows = service.db.fetchall(
+        "SELECT image_id, label, az_min, alt_min, az_max, alt_max, color "
+        "FROM annotations ORDER BY id"
+    )
+    assert [tuple(r) for r in rows] == [
+        (1, "car", 10, -5, 20, 5, "#ff0000"),
+        (2, "person", 10, -5, 30, 5, None),
+    ]
+    labels = service.db.fetchall(
+        "SELECT label_name FROM label_schemas WHERE project_id = 1 ORDER BY label_name"
+    )
+    assert [r[0] for r in labels] == ["car", "person"]
+
+
+def test_dry_run_writes_nothing(service):
+    result = service.import_coco(1, _coco(), dry_run=True)
+
+    assert result.dry_run
+    assert result.imported == 2
+    assert service.db.fetchone("SELECT COUNT(*) FROM annotations")[0] == 0
+    assert service.db.fetchone("SELECT COUNT(*) FROM label_schemas")[0] == 1
+
+
+def test_import_csv(service):
+    text = (
+        "filename,label,az_min,alt_min,az_max,alt_max,x,y,width,height\n"
+        "a.jpg,car,10,-5,20,5,,,,\n"
+        "b.jpg,,,,,,100,850,200,100\n"
+        "c.jpg,car,10,-5,20,5,,,,\n"
+    )
+    result = service.import_csv(1, io.StringIO(text), create_labels=False)
+
+    assert result.imported == 2
+    assert result.unmatched_images == ["c.jpg"]
+    rows = service.db.fetchall("SELECT label, az_max FROM annotations ORDER BY id")
+    assert [tuple(r) for r in rows] == [("car", 20), (None, 30)]
+
+
+def test_malformed_file_rolls_back(service):
+    text = json.dumps({"annotations": [{"image_id": 1}]})
+
+    with pytest.raises(ValueError, match="Malformed"):
+        service.import_coco(1, io.StringIO(text))
+    assert service.db.fetchone("SELECT COUNT(*) FROM annotations")[0] == 0
+
+
+def test_unknown_project(service):
+    with pytest.raises(ValueError):
+        service.import_coco(99, _coco())
+
+
+def test_import_keeps_revisions_and_search_index(service):
+    """Bulk inserts stamp revisions and index labels like row inserts do."""
+    from backend.services.annotation_service import AnnotationService
+    from backend.services.search_service import SearchService
+
+    before = service.db.fetchone("SELECT revision FROM projects WHERE id = 1")[0]
+    service.import_coco(1, _coco())
+
+    revisions = [
+        r[0]
+        for r in service.db.fetchall("SELECT revision FROM annotations ORDER BY id")
+    ]
+    assert len(set(revisions)) == 2
+    assert service.db.fetchone("SELECT revision FROM projects WHERE id = 1")[0] == max(
+        revisions
+    )
+    assert service.db.fetchone("SELECT value FROM sync_state WHERE key = 'revision'")[
+        0
+    ] == max(revisions)
+
+    changes = AnnotationService().get_changes(1, since=before, limit=1)
+    assert changes.has_more and len(changes.upserts) == 1
+
+    hits = SearchService().search("person", kind="annotations")
+    assert hits.total == 1
+
+    # Triggers are back in place for regular writes
+    service.db.execute("""
+        INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+        VALUES (1, 'bicycle', 1, 1, 2, 2)
+        """)
+    assert SearchService().search("bicycle", kind="annotations").total == 1
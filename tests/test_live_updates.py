@@ -0,0 +1,162 @@
+"""Test the live annotation update hub."""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import live_service
+from backend.services.live_service import LiveUpdateHub
+
+
+@pytest.fixture
+def db(make_db):
+    db = make_db()
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO projects (name, images_path) VALUES ('P', '/a')")
+        conn.executemany(
+            """
+            INSERT INTO images (project_id, filename, filepath, width, height)
+            VALUES (1, ?, ?, 100, 50)
+            """,
+            [("a.jpg", "/a/a.jpg"), ("b.jpg", "/a/b.jpg")],
+        )
+        conn.commit()
+    return db
+
+
+def _add_annotation(db, image_id: int, label: str) -> int:
+    cursor = db.execute(
+        """
+        INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+        VALUES (?, ?, 10, -5, 20, 5)
+        """,
+        (image_id, label),
+    )
+    return cursor.lastrowid
+
+
+async def _receive(subscriber, timeout: float = 5.0) -> dict:
+    _, message = await asyncio.wait_for(subscriber.queue.get(), timeout)
+    return json.loads(message)
+
+
+def test_burst_coalesced_into_one_delta(db):
+    """Writes within the coalescing window arrive as a single message."""
+
+    async def scenario():
+        hub = LiveUpdateHub()
+        subscriber = hub.subscribe(1)
+
+        first = _add_annotation(db, 1, "car")
+        _add_annotation(db, 1, "bus")
+        db.execute("UPDATE annotations SET label = 'van' WHERE id = ?", (first,))
+        hub.notify()
+
+        message = await _receive(subscriber)
+        drained = subscriber.queue.empty()
+        await hub.close()
+        return message, drained
+
+    message, drained = asyncio.run(scenario())
+
+    assert message["type"] == "changes"
+    assert sorted(a["label"] for a in message["upserts"]) == ["bus", "van"]
+    assert drained
+
+
+def test_image_filter(db):
+    """Image subscribers only receive changes to their image."""
+
+    async def scenario():
+        hub = LiveUpdateHub()
+        watching_a = hub.subscribe(1, image_id=1)
+        watching_b = hub.subscribe(1, image_id=2)
+
+        annotation_id = _add_annotation(db, 2, "car")
+        db.execute("DELETE FROM annotations WHERE id = ?", (annotation_id,))
+        _add_annotation(db, 2, "bus")
+        hub.notify()
+
+        message = await _receive(watching_b)
+        await hub.close()
+        return message, watching_a
+
+    message, watching_a = asyncio.run(scenario())
+
+    assert [a["label"] for a in message["upserts"]] == ["bus"]
+    assert [d["image_id"] for d in message["deletes"]] == [2]
+    # Closing the hub only queued the disconnect for the idle subscriber
+    assert watching_a.queue.get_nowait() is None
+
+
+def test_slow_subscriber_told_to_resync(db, monkeypatch):
+    """A subscriber whose queue overflows gets a single resync message."""
+    monkeypatch.setattr(live_service, "MAX_QUEUED_MESSAGES", 2)
+
+    async def scenario():
+        hub = LiveUpdateHub()
+        subscriber = hub.subscribe(1)
+
+        for label in ("a", "b", "c"):
+            _add_annotation(db, 1, label)
+            hub.notify()
+            await asyncio.sleep(live_service.COALESCE_WINDOW * 4)
+
+        messages = [await _receive(subscriber)]
+        while not subscriber.queue.empty():
+            messages.append(json.loads(subscriber.queue.get_nowait()[1]))
+        await hub.close()
+        return messages
+
+    assert asyncio.run(scenario()) == [{"type": "resync"}]
+
+
+def test_unsubscribe_drops_channel(db):
+    async def scenario():
+        hub = LiveUpdateHub()
+        subscriber = hub.subscribe(1)
+        hub.unsubscribe(subscriber)
+        channels = dict(hub._channels)
+        await hub.close()
+        return channels
+
+    assert asyncio.run(scenario()) == {}
+
+
+def test_skip_through_drops_covered_deltas(db):
+    """Deltas a catch-up already covered are dropped from the queue."""
+
+    async def scenario():
+        subscriber = live_service.Subscriber(project_id=1, image_id=None)
+        live_service._offer(subscriber, (3, "old"))
+        live_service._offer(subscriber, (5, "new"))
+        subscriber.skip_through(4)
+        return [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())]
+
+    assert asyncio.run(scenario()) == [(5, "new")]
+
+
+def test_websocket_catches_up_in_pages(db):
+    """A client further behind than one page gets every change since."""
+    with db.get_connection() as conn:
+        conn.executemany(
+            """
+            INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+            VALUES (1, ?, 10, -5, 20, 5)
+            """,
+            [(str(i),) for i in range(1500)],
+        )
+        conn.commit()
+    current = db.fetchone("SELECT value FROM sync_state WHERE key = 'revision'")[0]
+
+    with TestClient(app).websocket_connect("/api/projects/1/live?since=0") as ws:
+        pages = [ws.receive_json()]
+        while pages[-1]["has_more"]:
+            pages.append(ws.receive_json())
+
+    assert len(pages) == 2
+    assert pages[-1]["revision"] == current
+    assert len({a["id"] for page in pages for a in page["upserts"]}) == 1500
@@ -0,0 +1,141 @@
+"""Test database maintenance and garbage collection."""
+
+import os
+import time
+
+import pytest
+
+from backend.services import maintenance_service
+from backend.services.annotation_service import AnnotationService
+from backend.services.maintenance_service import (
+    MaintenanceBusyError,
+    MaintenanceService,
+)
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch, make_db):
+    db = make_db(maintenance={"tombstone_retention_days": 7})
+    thumbnails = tmp_path / "thumbnails"
+    monkeypatch.setattr(maintenance_service, "THUMBNAILS_DIR", thumbnails)
+
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO projects (name, images_path) VALUES ('P', '/p')")
+        conn.executemany(
+            """
+            INSERT INTO images
+                (project_id, filename, filepath, width, height, thumbnail_path)
+            VALUES (?, ?, '/p/x.jpg', 200, 100, ?)
+            """,
+            [
+                (1, "a.jpg", str(thumbnails / "project_1" / "a.jpg")),
+                # Left behind by a delete from before deletes were explicit
+                (2, "b.jpg", str(thumbnails / "project_2" / "b.jpg")),
+            ],
+        )
+        conn.execute(
+            "INSERT INTO label_schemas (project_id, label_name) VALUES (2, 'car')"
+        )
+        conn.executemany(
+            """
+            INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+            VALUES (?, 'car', 10.0, -5.0, 20.0, 5.0)
+            """,
+            [(1,), (1,), (2,), (99,)],
+        )
+        conn.commit()
+
+    return db, thumbnails
+
+
+def _write_old(path, size=100):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    old = time.time() - 24 * 3600
+    os.utime(path, (old, old))
+
+
+def _count(db, table):
+    return db.fetchone(f"SELECT COUNT(*) FROM {table}")[0]
+
+
+def test_orphans_and_files(env, tmp_path):
+    db, thumbnails = env
+    _write_old(thumbnails / "project_1" / "a.jpg")
+    _write_old(thumbnails / "project_2" / "b.jpg")
+    _write_old(tmp_path / "exports" / "project_2" / "coco" / "export.json", 50)
+    _write_old(tmp_path / "exports" / "project_1" / "coco" / "export.json", 50)
+    # Recent files may belong to a scan that hasn't inserted its rows yet
+    (thumbnails / "project_1" / "new.jpg").write_bytes(b"x")
+
+    report = MaintenanceService().run()
+
+    assert report.steps == list(maintenance_service.MAINTENANCE_STEPS)
+    assert report.orphan_images == 1
+    assert report.orphan_annotations == 1
+    assert report.orphan_labels == 1
+    assert _count(db, "images") == 1
+    assert _count(db, "annotations") == 2
+    assert _count(db, "label_schemas") == 0
+
+    assert report.orphan_files == 2
+    assert report.reclaimed_file_bytes == 150
+    assert (thumbnails / "project_1" / "a.jpg").exists()
+    assert (thumbnails / "project_1" / "new.jpg").exists()
+    assert not (thumbnails / "project_2").exists()
+    assert not (tmp_path / "exports" / "project_2").exists()
+    assert (tmp_path / "exports" / "project_1").exists()
+
+    assert report.auto_vacuum == "incremental"
+    assert MaintenanceService().get_last_report() == report
+
+
+def test_tombstone_pruning_resets_stale_clients(env):
+    db, _ = env
+    service = AnnotationService()
+    service.delete_annotation(1)
+    since = service.get_changes(1).revision
+    service.delete_annotation(2)
+    db.execute("""
+        UPDATE annotation_tombstones SET deleted_at = datetime('now', '-8 days')
+        WHERE annotation_id = 1
+        """)
+
+    report = MaintenanceService().run(["tombstones"])
+
+    assert report.steps == ["tombstones"]
+    assert report.pruned_tombstones == 1
+    assert _count(db, "annotation_tombstones") == 1
+    # A client that saw the pruned delete keeps syncing incrementally
+    assert not service.get_changes(1, since=since).reset
+    assert service.get_changes(1, since=since - 1).reset
+
+
+def test_vacuum_reclaims_space(env):
+    db, _ = env
+    with db.get_connection() as conn:
+        conn.execute("CREATE TABLE filler (data BLOB)")
+        conn.executemany(
+            "INSERT INTO filler VALUES (?)", [(b"x" * 4000,) for _ in range(500)]
+        )
+        conn.commit()
+        conn.execute("DROP TABLE filler")
+        conn.commit()
+
+    report = MaintenanceService().run(["vacuum", "checkpoint"])
+
+    assert report.vacuumed_pages > 400
+    assert report.reclaimed_db_bytes > 0
+    assert db.fetchone("PRAGMA freelist_count")[0] == 0
+
+
+def test_rejects_unknown_and_concurrent_runs(env):
+    with pytest.raises(ValueError):
+        MaintenanceService().run(["defrag"])
+
+    maintenance_service._run_lock.acquire()
+    try:
+        with pytest.raises(MaintenanceBusyError):
+            MaintenanceService().run()
+    finally:
+        maintenance_service._run_lock.release()
@@ -0,0 +1,145 @@
+"""Test materialized, incrementally maintained COCO exports."""
+
+import json
+import threading
+
+import pytest
+
+from backend.services.export_service import ExportService
+from backend.utils.file_lock import FileLock
+
+
+@pytest.fixture
+def export_env(tmp_path, make_db):
+    db = make_db()
+
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO projects (name, images_path) VALUES ('P', '/p')")
+        conn.executemany(
+            """
+            INSERT INTO images (project_id, filename, filepath, width, height)
+            VALUES (1, ?, ?, 200, 100)
+            """,
+            [(f"{i}.jpg", f"/p/{i}.jpg") for i in range(3)],
+        )
+        conn.execute(
+            "INSERT INTO label_schemas (project_id, label_name, sort_order) VALUES (1, 'car', 0)"
+        )
+        conn.executemany(
+            """
+            INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+            VALUES (?, ?, 10.0, -5.0, 20.0, 5.0)
+            """,
+            [(1, "car"), (1, "tree"), (2, "car"), (3, None)],
+        )
+        conn.commit()
+
+    return db, tmp_path / "exports" / "project_1" / "coco"
+
+
+def _content(coco: dict) -> dict:
+    return {key: coco[key] for key in ("images", "annotations", "categories")}
+
+
+def test_materialized_export_matches_full_export(export_env):
+    """Test that the stitched artifact equals a from-scratch export."""
+    service = ExportService()
+    path, _ = service.materialize_coco(1)
+
+    assert _content(json.loads(path.read_text())) == _content(service.export_coco(1))
+
+
+def test_unchanged_project_reuses_artifact(export_env):
+    """Test that an unchanged project is served without rewriting anything."""
+    service = ExportService()
+    path, key = service.materialize_coco(1)
+    mtime = path.stat().st_mtime_ns
+
+    path_again, key_again = service.materialize_coco(1)
+
+    assert key_again == key
+    assert path_again.stat().st_mtime_ns == mtime
+
+
+def test_only_changed_images_are_regenerated(export_env):
+    """Test that edits rebuild only the affected image fragments."""
+    db, export_dir = export_env
+    service = ExportService()
+    _, key = service.materialize_coco(1)
+    fragments = export_dir / "images"
+    before = {f.name: f.stat().st_mtime_ns for f in fragments.iterdir()}
+
+    with db.get_connection() as conn:
+        conn.execute("UPDATE annotations SET label = 'bus' WHERE id = 3")
+        conn.execute("DELETE FROM annotations WHERE id = 4")
+        conn.commit()
+
+    path, new_key = service.materialize_coco(1)
+    after = {f.name: f.stat().st_mtime_ns for f in fragments.iterdir()}
+
+    assert new_key != key
+    assert sorted(name for name in before if before[name] != after[name]) == [
+        "2.json",
+        "3.json",
+    ]
+    assert _content(json.loads(path.read_text())) == _content(service.export_coco(1))
+
+
+def test_removed_images_drop_fragments(export_env):
+    """Test that fragments of images no longer in the project are removed."""
+    db, export_dir = export_env
+    service = ExportService()
+    service.materialize_coco(1)
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM annotations WHERE image_id = 3")
+        conn.execute("DELETE FROM images WHERE id = 3")
+        conn.commit()
+
+    path, _ = service.materialize_coco(1)
+
+    assert sorted(f.name for f in (export_dir / "images").iterdir()) == [
+        "1.json",
+        "2.json",
+    ]
+    assert _content(json.loads(path.read_text())) == _content(service.export_coco(1))
+
+
+def test_label_schema_change_changes_key(export_env):
+    """Test that category changes invalidate the stitched artifact."""
+    db, _ = export_env
+    service = ExportService()
+    _, key = service.materialize_coco(1)
+
+    with db.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO label_schemas (project_id, label_name, sort_order) VALUES (1, 'tree', 1)"
+        )
+        conn.commit()
+
+    assert service.get_coco_export_key(1) != key
+    path, _ = service.materialize_coco(1)
+    assert _content(json.loads(path.read_text())) == _content(service.export_coco(1))
+
+
+def test_materialization_waits_for_other_processes(export_env):
+    """Test that a rebuild waits for the export directory's lock file."""
+    _, export_dir = export_env
+    service = ExportService()
+    # Held as another worker process would hold it
+    other = FileLock(export_dir / "materialize.lock")
+    other.acquire()
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(service.materialize_coco(1)))
+    thread.start()
+    thread.join(0.5)
+    assert thread.is_alive()
+    assert not (export_dir / "export.json").exists()
+
+    other.release()
+    thread.join(10)
+    path, _ = result[0]
+    assert _content(json.loads(path.read_text())) == _content(service.export_coco(1))
+    # Temporary files were all renamed into place
+    assert not list(export_dir.glob("*.part"))
@@ -737,6 +737,7 @@ class TestDatabaseMigrationIntegration:
             # Mock MigrationManager to track calls
             with patch("backend.database.MigrationManager") as MockManager:
                 mock_manager = MagicMock()
+                mock_manager.is_up_to_date.return_value = False
                 mock_manager.apply_migrations.return_value = ["001_initial_schema"]
                 MockManager.return_value = mock_manager
 
@@ -750,6 +751,24 @@ class TestDatabaseMigrationIntegration:
         finally:
             cleanup_test_database(db_path)
 
+    def test_database_init_skips_current_schema(self):
+        """Test that an up-to-date database doesn't load migrations."""
+        from backend.database import Database
+
+        db_path = create_test_database()
+        try:
+            with patch("backend.database.MigrationManager") as MockManager:
+                mock_manager = MagicMock()
+                mock_manager.is_up_to_date.return_value = True
+                MockManager.return_value = mock_manager
+
+                _db = Database(db_path)
+
+                mock_manager.apply_migrations.assert_not_called()
+
+        finally:
+            cleanup_test_database(db_path)
+
     def test_database_connection_after_migrations(self):
         """Test that database connections work after migrations."""
         from backend.database import Database
@@ -850,5 +869,121 @@ class TestDatabaseMigrationIntegration:
             get_db()
 
 
+class TestAtomicMigrations:
+    """Test transactional migrations, backups and chunked copies."""
+
+    def test_failed_migration_is_rolled_back(self, tmp_path):
+        """A migration failing halfway leaves none of its changes behind."""
+        db_path = tmp_path / "test.db"
+        manager = MigrationManager(str(db_path))
+
+        def half_done(conn):
+            conn.execute("CREATE TABLE half (id INTEGER)")
+            conn.execute("INSERT INTO half VALUES (1)")
+            conn.commit()
+            raise sqlite3.Error("Interrupted")
+
+        with patch.object(manager, "get_available_migrations") as mock_available:
+            mock_available.return_value = ["001_half"]
+            with patch.object(manager, "load_migration_module") as mock_load:
+                mock_load.return_value = MagicMock(upgrade=half_done)
+                with pytest.raises(sqlite3.Error, match="Interrupted"):
+                    manager.apply_migrations()
+
+        with sqlite3.connect(db_path) as conn:
+            assert not table_exists(conn, "half")
+            assert manager.get_applied_migrations(conn) == []
+
+        # Running again resumes from the failed migration
+        with patch.object(manager, "get_available_migrations") as mock_available:
+            mock_available.return_value = ["001_half"]
+            with patch.object(manager, "load_migration_module") as mock_load:
+                mock_load.return_value = CreateTableMigration
+                assert manager.apply_migrations() == ["001_half"]
+
+    def test_backup_before_migrating_existing_database(self, tmp_path):
+        """An existing database is backed up before pending migrations run."""
+        db_path = tmp_path / "test.db"
+        manager = MigrationManager(str(db_path))
+
+        with patch.object(manager, "get_available_migrations") as mock_available:
+            mock_available.return_value = ["001_create"]
+            with patch.object(manager, "load_migration_module") as mock_load:
+                mock_load.return_value = CreateTableMigration
+                manager.apply_migrations()
+                # Nothing to back up on a fresh database
+                assert list(tmp_path.glob("*.bak")) == []
+
+            mock_available.return_value = ["001_create", "002_second"]
+            with patch.object(manager, "load_migration_module") as mock_load:
+                mock_load.return_value = MagicMock(
+                    upgrade=lambda conn: conn.execute("CREATE TABLE second (id)")
+                )
+                manager.apply_migrations()
+
+        backup = tmp_path / "test.db.before-002_second.bak"
+        with sqlite3.connect(backup) as conn:
+            assert manager.get_applied_migrations(conn) == ["001_create"]
+
+    def test_copy_rows_in_chunks(self, tmp_path):
+        """Chunked copies handle sparse rowids and transform columns."""
+        from backend.migrations.helpers import copy_rows
+
+        with sqlite3.connect(tmp_path / "test.db") as conn:
+            conn.execute("CREATE TABLE source (id INTEGER PRIMARY KEY, value REAL)")
+            conn.execute("CREATE TABLE target (id INTEGER PRIMARY KEY, doubled REAL)")
+            ids = list(range(1, 50)) + [1000, 5000, 10**9]
+            conn.executemany("INSERT INTO source VALUES (?, ?)", [(i, i) for i in ids])
+
+            copied = copy_rows(
+                conn, "source", "target", ["id", "doubled"], ["id", "value * 2"], 7
+            )
+
+            assert copied == len(ids)
+            rows = conn.execute("SELECT id, doubled FROM target ORDER BY id").fetchall()
+            assert rows == [(i, i * 2) for i in ids]
+
+            conn.execute("DELETE FROM source")
+            assert copy_rows(conn, "source", "target", ["id"]) == 0
+
+
+class TestSchemaCurrency:
+    """Test the single-query startup check against the migration manifest."""
+
+    def test_is_up_to_date(self, tmp_path):
+        """Only a database with every available migration is current."""
+        db_path = tmp_path / "test.db"
+        manager = MigrationManager(str(db_path))
+
+        with patch.object(manager, "get_available_migrations") as mock_available:
+            mock_available.return_value = ["001_create"]
+            # No migrations table yet, and checking doesn't create one
+            assert not manager.is_up_to_date()
+            with sqlite3.connect(db_path) as conn:
+                assert not table_exists(conn, "migrations")
+
+            with patch.object(manager, "load_migration_module") as mock_load:
+                mock_load.return_value = CreateTableMigration
+                manager.apply_migrations()
+            assert manager.is_up_to_date()
+
+            mock_available.return_value = ["001_create", "002_second"]
+            assert not manager.is_up_to_date()
+
+    def test_current_database_skips_migration_modules(self, tmp_path):
+        """Reopening a migrated database loads no migration module."""
+        from backend.database import Database
+
+        db_path = str(tmp_path / "test.db")
+        Database(db_path)
+
+        with patch.object(MigrationManager, "load_migration_module") as mock_load:
+            with patch.object(MigrationManager, "apply_migrations") as mock_apply:
+                Database(db_path)
+
+        mock_load.assert_not_called()
+        mock_apply.assert_not_called()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,86 @@
+import struct
+
+import pytest
+
+from backend.utils.packing import (
+    PACKED_ANNOTATIONS_MEDIA_TYPE,
+    accepts_packed,
+    pack_annotations,
+    unpack_annotations,
+)
+
+
+def _row(id, image_id, label, color, az_min=10.0, alt_min=-5.0, az_max=20.0, alt_max=5.0):
+    return (id, image_id, label, color, 1700000000, 1700000100, az_min, alt_min, az_max, alt_max)
+
+
+def test_roundtrip():
+    """Test that packing and unpacking preserves annotation values."""
+    rows = [
+        _row(1, 7, "car", "#ff0000", 0.0, -90.0, 360.0, 90.0),
+        _row(2, 7, "pedestrian", "#00ff00"),
+        _row(3, 8, "car", None),
+        _row(4, 8, None, "#ff0000"),
+    ]
+
+    decoded = unpack_annotations(pack_annotations(rows))
+
+    assert [d["id"] for d in decoded] == [1, 2, 3, 4]
+    assert [d["image_id"] for d in decoded] == [7, 7, 8, 8]
+    assert [d["label"] for d in decoded] == ["car", "pedestrian", "car", None]
+    assert [d["color"] for d in decoded] == ["#ff0000", "#00ff00", None, "#ff0000"]
+    assert decoded[0]["az_max"] == 360.0
+    assert decoded[0]["alt_min"] == -90.0
+    assert decoded[1]["created_at"] == 1700000000
+    assert decoded[1]["updated_at"] == 1700000100
+    assert abs(decoded[1]["az_min"] - 10.0) < 1e-5
+
+
+def test_string_table_is_deduplicated():
+    """Test that repeated labels and colors are stored once."""
+    rows = [_row(i, 1, "car", "#ff0000") for i in range(100)]
+    data = pack_annotations(rows)
+
+    _, _, _, count, string_count, string_bytes = struct.unpack_from("<4sHHIII", data)
+    assert count == 100
+    assert string_count == 2
+    assert string_bytes == len("car") + len("#ff0000")
+
+
+def test_unicode_labels():
+    """Test that non-ASCII labels survive the string table."""
+    rows = [_row(1, 1, "Straßenschild", None), _row(2, 1, "标志", None)]
+    decoded = unpack_annotations(pack_annotations(rows))
+    assert [d["label"] for d in decoded] == ["Straßenschild", "标志"]
+
+
+def test_empty():
+    """Test packing an image without annotations."""
+    data = pack_annotations([])
+    assert unpack_annotations(data) == []
+    assert len(data) % 4 == 0
+
+
+def test_columns_are_aligned():
+    """Test that every column starts on a 4-byte boundary for typed array views."""
+    rows = [_row(i, 1, f"label{i}", None) for i in range(3)]
+    data = pack_annotations(rows)
+    # header + 10 columns of 4-byte values + offsets table
+    string_offsets_end = 20 + 10 * 4 * 3 + 4 * 4
+    assert string_offsets_end % 4 == 0
+    assert len(data) == string_offsets_end + sum(len(f"label{i}") for i in range(3))
+
+
+def test_rejects_invalid_payload():
+    """Test that unknown payloads are rejected."""
+    with pytest.raises(ValueError):
+        unpack_annotations(b"JSON" + bytes(16))
+
+
+def test_accepts_packed():
+    """Test Accept header negotiation."""
+    assert accepts_packed(PACKED_ANNOTATIONS_MEDIA_TYPE)
+    assert accepts_packed(f"application/json;q=0.5, {PACKED_ANNOTATIONS_MEDIA_TYPE}")
+    assert not accepts_packed("application/json")
+    assert not accepts_packed("*/*")
+    assert not accepts_packed(None)
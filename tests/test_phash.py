@@ -0,0 +1,139 @@
+"""Test perceptual hashing and duplicate image detection."""
+
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from backend.config import load_config
+from backend.database import init_database
+from backend.services.image_service import ImageService
+from backend.utils.phash import (
+    BKTree,
+    hamming_distance,
+    hash_from_db,
+    hash_to_db,
+    perceptual_hash,
+)
+
+
+def _panorama(seed: int, size=(400, 200)) -> Image.Image:
+    """Draw a random equirectangular-shaped test image."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, (rng.randrange(256),) * 3)
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        w, h = rng.randrange(20, 150), rng.randrange(20, 100)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle([x, y, x + w, y + h], fill=color)
+    return img
+
+
+def test_hash_stable_under_reencode_and_resize(tmp_path):
+    """Re-exported copies hash within a few bits of the original."""
+    original = _panorama(1)
+    original.save(tmp_path / "a.png")
+    original.resize((200, 100)).save(tmp_path / "b.jpg", quality=70)
+
+    with Image.open(tmp_path / "a.png") as a, Image.open(tmp_path / "b.jpg") as b:
+        distance = hamming_distance(perceptual_hash(a), perceptual_hash(b))
+
+    assert distance <= 4
+
+
+def test_hash_differs_for_different_images():
+    """Unrelated images are far apart."""
+    distances = [
+        hamming_distance(perceptual_hash(_panorama(i)), perceptual_hash(_panorama(j)))
+        for i, j in [(1, 2), (3, 4), (5, 6)]
+    ]
+    assert min(distances) > 10
+
+
+def test_db_roundtrip():
+    """Hashes survive conversion to SQLite's signed integers."""
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        stored = hash_to_db(value)
+        assert -(1 << 63) <= stored < 1 << 63
+        assert hash_from_db(stored) == value
+
+
+def test_bktree_matches_linear_scan():
+    """BK-tree search returns exactly the hashes a linear scan would."""
+    rng = np.random.default_rng(0)
+    hashes = [int(h) for h in rng.integers(0, 1 << 63, 2000, dtype=np.int64)]
+    # Add near copies so there is something to find
+    hashes += [h ^ (1 << int(rng.integers(64))) for h in hashes[:200]]
+
+    tree = BKTree()
+    for i, h in enumerate(hashes):
+        tree.add(h, i)
+    assert len(tree) == len(hashes)
+
+    for query in hashes[:50]:
+        expected = {i for i, h in enumerate(hashes) if hamming_distance(h, query) <= 3}
+        found = tree.search(query, 3)
+        assert {i for _, i in found} == expected
+        assert [d for d, _ in found] == sorted(d for d, _ in found)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("config.yaml").write_text(
+        "server: {}\n"
+        "images:\n  skip_duplicates: true\n"
+        "thumbnails: {}\ndatabase: {}\nexport: {}\n"
+    )
+    load_config("config.yaml")
+
+    images = tmp_path / "images"
+    images.mkdir()
+    _panorama(1).save(images / "pano_1.jpg", quality=90)
+    _panorama(2).save(images / "pano_2.jpg", quality=90)
+
+    db = init_database(str(tmp_path / "test.db"))
+    db.execute(
+        "INSERT INTO projects (name, images_path) VALUES ('P', ?)", (str(images),)
+    )
+    return images
+
+
+def test_scan_skips_duplicates(project):
+    """A re-exported panorama is skipped and reported."""
+    service = ImageService()
+    first = service.scan_images(1)
+    assert first.added == 2
+
+    _panorama(1).resize((300, 150)).save(project / "pano_1_copy.jpg", quality=60)
+    second = service.scan_images(1)
+
+    assert second.added == 0
+    assert second.skipped == 3
+    assert second.duplicates == ["pano_1_copy.jpg: duplicate of pano_1.jpg"]
+
+
+def test_find_duplicate_images(project):
+    """Duplicates are listed once, including across projects."""
+    service = ImageService()
+    service.config.images.skip_duplicates = False
+
+    _panorama(1).save(project / "pano_1_copy.png")
+    service.scan_images(1)
+
+    groups = service.find_duplicate_images(1)
+    assert len(groups) == 1
+    assert groups[0].image.filename == "pano_1.jpg"
+    assert [d.filename for d in groups[0].duplicates] == ["pano_1_copy.png"]
+
+    service.db.execute(
+        "INSERT INTO projects (name, images_path) VALUES ('Q', ?)", (str(project),)
+    )
+    service.scan_images(2)
+
+    across = service.find_duplicate_images(1, across_projects=True)
+    assert len(across) == 2
+    assert {d.project_id for d in across[0].duplicates} == {1, 2}
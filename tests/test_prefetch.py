@@ -0,0 +1,211 @@
+"""Test prefetching of the next images an annotator steps to."""
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.main import app
+from backend.models import AnnotationCreate
+from backend.repositories import get_repository
+from backend.services import prefetch_service
+from backend.services.annotation_service import AnnotationService
+from backend.services.prefetch_service import Prefetcher, warm_image
+from backend.services.rendition_service import (
+    MAX_IMAGE_WIDTH,
+    get_rendition_cache,
+    needs_rendition,
+)
+
+
+@pytest.fixture
+def image_ids(tmp_path, monkeypatch, make_db):
+    """Eight images of one project, in the order of the image list."""
+    monkeypatch.chdir(tmp_path)
+    db = make_db(images={"rendition_dir": str(tmp_path / "renditions")})
+    db.execute(
+        "INSERT INTO projects (name, images_path) VALUES ('P', ?)", (str(tmp_path),)
+    )
+
+    repo = get_repository()
+    for i in range(8):
+        # The first image is too wide to be served as is
+        size = (MAX_IMAGE_WIDTH + 8, 16) if i == 0 else (64, 32)
+        path = tmp_path / f"{i}.jpg"
+        Image.new("RGB", size, (i * 30, 0, 0)).save(path)
+        repo.add_image(
+            {
+                "project_id": 1,
+                "filename": path.name,
+                "filepath": str(path),
+                "width": size[0],
+                "height": size[1],
+                "thumbnail_path": None,
+                "phash": None,
+            }
+        )
+    return repo.list_image_ids(1)
+
+
+class _Warmed(list):
+    """Warmed image IDs, and a stand-in for the image job pool."""
+
+    # Image jobs of requests; prefetching waits while there are any
+    pending = 0
+
+
+@pytest.fixture
+def warmed(monkeypatch):
+    """Record warmed images instead of warming them."""
+    calls = _Warmed()
+    monkeypatch.setattr(
+        prefetch_service, "warm_image", lambda image_id, fmt: calls.append(image_id)
+    )
+    monkeypatch.setattr(prefetch_service, "get_image_jobs", lambda: calls)
+    return calls
+
+
+def test_next_images_follow_direction_of_travel(image_ids, warmed):
+    prefetcher = Prefetcher(depth=3)
+    warmed.pending = 1
+
+    assert prefetcher.visit(1, image_ids[4]) == image_ids[5:8]
+    assert prefetcher.visit(1, image_ids[5], image_ids[4]) == image_ids[6:8]
+    # Stepping back turns the prefetch around
+    assert prefetcher.visit(1, image_ids[4], image_ids[5]) == image_ids[3:0:-1]
+    assert prefetcher.visit(1, image_ids[3], image_ids[4]) == image_ids[2::-1]
+
+    warmed.pending = 0
+    prefetcher.join()
+    prefetcher.stop()
+    # Images already queued aren't queued again
+    assert sorted(warmed) == sorted(image_ids[:4] + image_ids[5:])
+
+
+def test_direction_needs_no_earlier_visit(image_ids, warmed):
+    # Each step of a client may land on a different worker
+    first, second = Prefetcher(depth=2), Prefetcher(depth=2)
+
+    assert first.visit(1, image_ids[5], image_ids[6]) == [image_ids[4], image_ids[3]]
+    assert second.visit(1, image_ids[4], image_ids[5]) == [image_ids[3], image_ids[2]]
+    for prefetcher in (first, second):
+        prefetcher.join()
+        prefetcher.stop()
+
+
+def test_jump_cancels_queued_work(image_ids, warmed):
+    prefetcher = Prefetcher(depth=3)
+    warmed.pending = 1
+
+    prefetcher.visit(1, image_ids[0])
+    prefetcher.visit(1, image_ids[4], image_ids[0])
+    warmed.pending = 0
+
+    prefetcher.join()
+    prefetcher.stop()
+    assert warmed == image_ids[5:8]
+
+
+def test_image_list_is_read_once_per_project_revision(
+    image_ids, warmed, tmp_path, monkeypatch
+):
+    repo = get_repository()
+    reads = []
+    list_image_ids = repo.list_image_ids
+    monkeypatch.setattr(
+        repo,
+        "list_image_ids",
+        lambda project_id: reads.append(project_id) or list_image_ids(project_id),
+    )
+    prefetcher = Prefetcher(depth=1)
+
+    prefetcher.visit(1, image_ids[0])
+    prefetcher.visit(1, image_ids[1], image_ids[0])
+    assert reads == [1]
+
+    # A new image changes the project's revision, and goes first in the list
+    path = tmp_path / "new.jpg"
+    Image.new("RGB", (64, 32)).save(path)
+    new_id = repo.add_image(
+        {
+            "project_id": 1,
+            "filename": path.name,
+            "filepath": str(path),
+            "width": 64,
+            "height": 32,
+            "thumbnail_path": None,
+            "phash": None,
+        }
+    )
+    assert prefetcher.visit(1, new_id) == [image_ids[0]]
+    assert reads == [1, 1]
+
+    prefetcher.join()
+    prefetcher.stop()
+
+
+def test_unknown_image_is_ignored(image_ids, warmed):
+    prefetcher = Prefetcher()
+    assert prefetcher.visit(2, image_ids[0]) == []
+    prefetcher.stop()
+
+
+def test_warm_image_prepares_rendition_and_annotations(image_ids, monkeypatch):
+    wide = image_ids[-1]
+    AnnotationService().create_annotation(
+        AnnotationCreate(
+            image_id=wide, label="car", az_min=1, alt_min=-1, az_max=2, alt_max=1
+        )
+    )
+    row = get_repository().get_image(wide)
+    assert needs_rendition(row["width"], row["height"])
+
+    warm_image(wide)
+
+    widths = []
+    for rendition in get_rendition_cache().directory.iterdir():
+        with Image.open(rendition) as img:
+            widths.append(img.width)
+    # The preview and display levels
+    assert sorted(widths) == [1024, MAX_IMAGE_WIDTH]
+
+    # Requests after warming are served without touching the database
+    revision = get_repository().get_image_revision(wide)
+    monkeypatch.setattr(
+        AnnotationService, "get_annotations_for_image", pytest.fail, raising=True
+    )
+    payload = AnnotationService().get_image_payload(wide, revision, packed=False)
+    assert b'"label":"car"' in payload
+
+
+def test_stop_waits_for_the_running_prefetch(image_ids, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_warm(image_id, fmt):
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(prefetch_service, "warm_image", slow_warm)
+    prefetcher = Prefetcher(depth=2)
+    prefetcher.visit(1, image_ids[0])
+    assert started.wait(5)
+
+    release.set()
+    prefetcher.stop(timeout=5)
+    assert not prefetcher._thread.is_alive()
+
+
+def test_view_route_passes_previous_image(image_ids, warmed, monkeypatch):
+    prefetcher = Prefetcher(depth=2)
+    monkeypatch.setattr(prefetch_service, "_prefetcher", prefetcher)
+
+    response = TestClient(app).post(
+        f"/api/projects/1/images/{image_ids[3]}/view",
+        json={"previous_image_id": image_ids[4], "formats": []},
+    )
+    prefetcher.join()
+    prefetcher.stop()
+
+    assert response.status_code == 202
+    assert response.json() == {"prefetching": [image_ids[2], image_ids[1]]}
@@ -0,0 +1,177 @@
+"""Test display renditions and their format negotiation."""
+
+import pytest
+from PIL import Image
+
+from backend.database import init_database
+from backend.services import rendition_service
+from backend.services.image_service import ImageService
+from backend.services.rendition_service import (
+    MAX_IMAGE_WIDTH,
+    accepted_formats,
+    available_formats,
+    get_rendition,
+    image_levels,
+    media_type_of,
+    negotiate_format,
+    uses_rendition,
+)
+
+CHROME_ACCEPT = "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8"
+
+
+@pytest.fixture
+def config(tmp_path, make_config):
+    def load(**renditions):
+        return make_config(
+            images={
+                "rendition_dir": str(tmp_path / "renditions"),
+                "renditions": renditions,
+            }
+        )
+
+    load()
+    return load
+
+
+def test_accept_header_lists_formats():
+    assert accepted_formats(CHROME_ACCEPT) == {"avif", "webp"}
+    assert accepted_formats("image/webp;q=0.5, image/avif;q=0") == {"webp"}
+    # Wildcards don't count
+    assert accepted_formats("image/*,*/*;q=0.8") == set()
+    assert accepted_formats(None) == set()
+
+
+def test_negotiation_follows_configured_preference(config, monkeypatch):
+    monkeypatch.setattr(
+        rendition_service, "available_formats", lambda: {"jpeg", "webp", "avif"}
+    )
+    assert negotiate_format({"avif", "webp"}) == "avif"
+    assert negotiate_format({"webp"}) == "webp"
+    assert negotiate_format(set()) == "jpeg"
+
+    config(formats=["webp"])
+    assert negotiate_format({"avif", "webp"}) == "webp"
+    assert negotiate_format({"avif"}) == "jpeg"
+
+    # Formats Pillow can't encode are skipped
+    config()
+    monkeypatch.setattr(rendition_service, "available_formats", lambda: {"jpeg"})
+    assert negotiate_format({"avif", "webp"}) == "jpeg"
+
+
+def test_originals_are_served_as_is_to_jpeg_clients(tmp_path):
+    assert not uses_rendition(6000, 3000, "jpeg")
+    assert uses_rendition(MAX_IMAGE_WIDTH + 1, 3000, "jpeg")
+    assert uses_rendition(6000, 3000, "webp")
+
+    assert media_type_of(tmp_path / "pano.PNG") == "image/png"
+    assert media_type_of(tmp_path / "pano.jpeg") == "image/jpeg"
+
+
+@pytest.mark.parametrize("fmt", ["webp", "avif"])
+def test_rendition_in_negotiated_format(config, tmp_path, fmt):
+    if fmt not in available_formats():
+        pytest.skip(f"Pillow can't encode {fmt} here")
+    original = tmp_path / "pano.png"
+    Image.new("RGBA", (64, 32), (200, 10, 10, 128)).save(original)
+
+    path = get_rendition(1, str(original), original, fmt)
+    assert path.suffix == f".{fmt}"
+    with Image.open(path) as img:
+        assert img.format == fmt.upper()
+        assert img.size == (64, 32)
+        assert img.mode == "RGBA"
+
+    # Cached per format and quality
+    assert get_rendition(1, str(original), original, fmt) == path
+    assert get_rendition(1, str(original), original, "jpeg") != path
+    config(**{f"{fmt}_quality": 30})
+    assert get_rendition(1, str(original), original, fmt) != path
+
+
+def test_jpeg_rendition_is_scaled_and_flattened(config, tmp_path):
+    original = tmp_path / "wide.png"
+    Image.new("RGBA", (MAX_IMAGE_WIDTH * 2, 64), (0, 0, 255, 0)).save(original)
+
+    with Image.open(get_rendition(1, str(original), original)) as img:
+        assert img.format == "JPEG"
+        assert img.size == (MAX_IMAGE_WIDTH, 32)
+        assert img.mode == "RGB"
+        assert img.info.get("progressive")
+
+    config(progressive_jpeg=False)
+    with Image.open(get_rendition(1, str(original), original)) as img:
+        assert not img.info.get("progressive")
+
+
+def test_image_levels(config):
+    assert image_levels(16384, 8192) == [
+        ("preview", 1024, 512),
+        ("display", 8192, 4096),
+        ("full", 16384, 8192),
+    ]
+    assert image_levels(6000, 3000) == [("preview", 1024, 512), ("display", 6000, 3000)]
+    assert image_levels(800, 400) == [("display", 800, 400)]
+
+    config(preview_width=512)
+    assert image_levels(800, 400)[0] == ("preview", 512, 256)
+
+
+def test_scan_creates_previews(config, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    panos = tmp_path / "panos"
+    panos.mkdir()
+    Image.new("RGB", (2048, 1024), (0, 128, 0)).save(panos / "big.jpg")
+    Image.new("RGB", (512, 256), (0, 128, 0)).save(panos / "small.jpg")
+    db = init_database(config().database.path)
+    db.execute(
+        "INSERT INTO projects (name, images_path) VALUES ('P', ?)", (str(panos),)
+    )
+
+    assert ImageService().scan_images(1).added == 2
+
+    [preview] = (tmp_path / "renditions").iterdir()
+    with Image.open(preview) as img:
+        assert img.size == (1024, 512)
+    image = next(i for i in ImageService().list_images(1) if i.filename == "big.jpg")
+    # Served from the cache without decoding the original again
+    monkeypatch.setattr(rendition_service, "encode_rendition", pytest.fail)
+    assert (
+        get_rendition(
+            image.id, str(panos / "big.jpg"), panos / "big.jpg", level="preview"
+        )
+        == preview
+    )
+
+
+def test_scan_decodes_once_for_thumbnail_and_preview(config, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    panos = tmp_path / "panos"
+    panos.mkdir()
+    Image.new("RGB", (2048, 1024), (0, 128, 0)).save(panos / "big.jpg")
+    db = init_database(config().database.path)
+    db.execute(
+        "INSERT INTO projects (name, images_path) VALUES ('P', ?)", (str(panos),)
+    )
+
+    opened = []
+    open_image = Image.open
+    monkeypatch.setattr(
+        Image,
+        "open",
+        lambda *args, **kwargs: opened.append(args) or open_image(*args, **kwargs),
+    )
+    # A failed preview leaves the image added, its preview built on request
+    monkeypatch.setattr(rendition_service, "save_rendition", pytest.fail)
+
+    result = ImageService().scan_images(1)
+
+    assert (result.added, result.errors) == (1, [])
+    # The header, the perceptual hash, then one decode for both the
+    # thumbnail and the preview
+    assert len(opened) == 3
+    [image] = ImageService().list_images(1)
+    with open_image(image.thumbnail_path) as thumbnail:
+        assert thumbnail.size == (256, 128)
+    assert not [p for p in (tmp_path / "renditions").rglob("*") if p.is_file()]
@@ -0,0 +1,237 @@
+"""Test the storage backends through the services.
+
+The postgres cases run against SPHEREMARK_TEST_POSTGRES_URL, each in a
+schema of its own, and are skipped when it isn't set.
+"""
+
+import os
+import uuid
+from datetime import timezone
+
+import pytest
+
+from backend.database import UnsupportedBackendError
+from backend.models import (
+    AnnotationCreate,
+    AnnotationUpdate,
+    LabelSchemaCreate,
+    LabelSchemaUpdate,
+    ProjectCreate,
+    ProjectUpdate,
+)
+from backend.repositories import close_repository, get_repository, init_repository
+from backend.services import annotation_service
+from backend.services.annotation_service import AnnotationService, init_write_buffer
+from backend.services.image_service import ImageService
+from backend.services.project_service import ProjectService
+from backend.utils.packing import unpack_annotations
+
+POSTGRES_URL = os.environ.get("SPHEREMARK_TEST_POSTGRES_URL")
+
+
+def _postgres_schema(url, statement):
+    asyncpg = pytest.importorskip("asyncpg")
+    import asyncio
+
+    async def run():
+        conn = await asyncpg.connect(url)
+        try:
+            await conn.execute(statement)
+        finally:
+            await conn.close()
+
+    asyncio.run(run())
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def backend(request, make_config):
+    database = {}
+    schema = None
+    if request.param == "postgres":
+        if not POSTGRES_URL:
+            pytest.skip("SPHEREMARK_TEST_POSTGRES_URL is not set")
+        schema = f"test_{uuid.uuid4().hex[:12]}"
+        _postgres_schema(POSTGRES_URL, f"CREATE SCHEMA {schema}")
+        separator = "&" if "?" in POSTGRES_URL else "?"
+        database = {
+            "backend": "postgres",
+            "url": f"{POSTGRES_URL}{separator}search_path={schema}",
+        }
+
+    config = make_config(database=database)
+    init_repository(config.database)
+
+    yield request.param
+
+    annotation_service._write_buffer = None
+    close_repository()
+    if schema:
+        _postgres_schema(POSTGRES_URL, f"DROP SCHEMA {schema} CASCADE")
+
+
+@pytest.fixture
+def image(backend, tmp_path):
+    project = ProjectService().create_project(
+        ProjectCreate(name="Survey", images_path=str(tmp_path))
+    )
+    repo = get_repository()
+    image_id = repo.add_image(
+        {
+            "project_id": project.id,
+            "filename": "a.jpg",
+            "filepath": str(tmp_path / "a.jpg"),
+            "width": 200,
+            "height": 100,
+            "thumbnail_path": "thumbs/a.jpg",
+            "phash": None,
+        }
+    )
+    return project.id, image_id
+
+
+def _box(image_id, label="car", az=10.0):
+    return AnnotationCreate(
+        image_id=image_id,
+        label=label,
+        az_min=az,
+        alt_min=-5.0,
+        az_max=az + 10,
+        alt_max=5.0,
+    )
+
+
+def test_project_and_label_crud(backend, tmp_path):
+    projects = ProjectService()
+    project = projects.create_project(
+        ProjectCreate(name="Survey", description="North", images_path=str(tmp_path))
+    )
+    revision = projects.get_revision(project.id)
+
+    updated = projects.update_project(project.id, ProjectUpdate(name="Survey 2"))
+    assert updated.name == "Survey 2"
+    assert updated.description == "North"
+    assert projects.get_revision(project.id) > revision
+
+    label = projects.add_label(
+        project.id, LabelSchemaCreate(label_name="car", color="#ff0000")
+    )
+    projects.add_label(project.id, LabelSchemaCreate(label_name="bus", sort_order=-1))
+    names = [entry.label_name for entry in projects.get_label_schema(project.id)]
+    assert names == ["bus", "car"]
+    updated = projects.update_label(label.id, LabelSchemaUpdate(color="#00ff00"))
+    assert updated.color == "#00ff00"
+    assert projects.delete_label(label.id)
+    assert not projects.delete_label(label.id)
+
+    [listed] = projects.list_projects()
+    assert listed.id == project.id
+    assert listed.image_count == listed.annotation_count == 0
+
+
+def test_annotation_crud_stamps_revisions(image):
+    project_id, image_id = image
+    annotations = AnnotationService()
+    images = ImageService()
+    repo = get_repository()
+
+    base = repo.get_revision()
+    created = annotations.create_annotation(_box(image_id))
+    assert created.revision == base + 1
+    assert images.get_revision(image_id) == base + 1
+    assert ProjectService().get_revision(project_id) == base + 1
+
+    updated = annotations.update_annotation(created.id, AnnotationUpdate(label="bus"))
+    assert (updated.label, updated.revision) == ("bus", base + 2)
+    assert [a.id for a in annotations.get_annotations_for_image(image_id)] == [
+        created.id
+    ]
+    assert images.list_images(project_id)[0].annotation_count == 1
+
+    assert annotations.delete_annotation(created.id)
+    assert not annotations.delete_annotation(created.id)
+    assert annotations.get_annotation(created.id) is None
+    assert repo.get_revision() == base + 3
+
+
+def test_changes_feed_reports_upserts_and_deletes(image):
+    project_id, image_id = image
+    annotations = AnnotationService()
+    since = get_repository().get_revision()
+
+    kept = annotations.create_annotation(_box(image_id))
+    dropped = annotations.create_annotation(_box(image_id, az=50.0))
+    annotations.delete_annotation(dropped.id)
+
+    changes = annotations.get_changes(project_id, since)
+    assert [a.id for a in changes.upserts] == [kept.id]
+    assert [(d.id, d.image_id) for d in changes.deletes] == [(dropped.id, image_id)]
+    assert changes.revision == get_repository().get_revision()
+
+    first = annotations.get_changes(project_id, since, limit=1)
+    assert first.has_more
+    assert annotations.get_changes(project_id, first.revision).deletes
+
+
+def test_packed_annotations_round_trip(image):
+    project_id, image_id = image
+    annotations = AnnotationService()
+    created = annotations.create_annotation(_box(image_id, label="tree", az=120.0))
+
+    for packed in (
+        annotations.get_packed_annotations_for_image(image_id),
+        annotations.get_packed_annotations_for_project(project_id),
+    ):
+        [row] = unpack_annotations(packed)
+        assert row["id"] == created.id
+        assert row["label"] == "tree"
+        assert row["az_min"] == pytest.approx(120.0)
+        created_at = created.created_at.replace(tzinfo=timezone.utc)
+        assert row["created_at"] == int(created_at.timestamp())
+
+
+def test_buffered_updates_flush_in_one_batch(image):
+    _, image_id = image
+    annotations = AnnotationService()
+    first = annotations.create_annotation(_box(image_id))
+    second = annotations.create_annotation(_box(image_id, az=50.0))
+
+    buffer = init_write_buffer(60)
+    annotations.update_annotation(first.id, AnnotationUpdate(label="bus"))
+    annotations.update_annotation(second.id, AnnotationUpdate(az_max=80.0))
+    assert buffer.flush() == 2
+
+    annotation_service._write_buffer = None
+    assert annotations.get_annotation(first.id).label == "bus"
+    assert annotations.get_annotation(second.id).az_max == 80.0
+
+
+def test_delete_image_and_project(image):
+    project_id, image_id = image
+    annotations = AnnotationService()
+    images = ImageService()
+    projects = ProjectService()
+    annotations.create_annotation(_box(image_id))
+    annotations.create_annotation(_box(image_id, az=50.0))
+
+    assert annotations.delete_annotations_for_image(image_id) == 2
+    assert len(annotations.get_changes(project_id).deletes) == 2
+
+    annotations.create_annotation(_box(image_id))
+    assert images.delete_image(image_id)
+    assert images.get_image(image_id) is None
+    assert not images.delete_image(image_id)
+
+    assert projects.delete_project(project_id)
+    assert projects.get_project(project_id) is None
+    assert get_repository().deleted_annotations(project_id, 0, 10) == []
+    assert not projects.delete_project(project_id)
+
+
+def test_sqlite_only_features_are_refused_on_postgres(backend):
+    if backend != "postgres":
+        pytest.skip("SQLite serves every feature")
+
+    from backend.services.search_service import SearchService
+
+    with pytest.raises(UnsupportedBackendError):
+        SearchService().search("car")
@@ -0,0 +1,118 @@
+"""Test FTS5-backed search."""
+
+import tempfile
+
+import pytest
+
+from backend.database import init_database
+from backend.services.search_service import SearchService, build_fts_query
+
+
+@pytest.fixture
+def service():
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        db = init_database(tmp.name)
+
+        with db.get_connection() as conn:
+            conn.execute("""
+                INSERT INTO projects (name, description, images_path)
+                VALUES ('Street survey', 'Downtown traffic', '/a'),
+                       ('Forest', 'Trail cameras', '/b')
+                """)
+            conn.executemany(
+                """
+                INSERT INTO images (project_id, filename, filepath, width, height)
+                VALUES (?, ?, ?, 100, 50)
+                """,
+                [
+                    (1, "cam3_001.jpg", "/a/cam3_001.jpg"),
+                    (1, "cam3_002.jpg", "/a/cam3_002.jpg"),
+                    (1, "cam4_001.jpg", "/a/cam4_001.jpg"),
+                    (2, "trail_001.jpg", "/b/trail_001.jpg"),
+                ],
+            )
+            conn.executemany(
+                """
+                INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+                VALUES (?, ?, 10.0, -5.0, 20.0, 5.0)
+                """,
+                [
+                    (1, "pedestrian"),
+                    (1, "pedestrian"),
+                    (3, "pedestrian"),
+                    (3, "traffic_sign"),
+                    (4, "pedestrian"),
+                    (4, "deer"),
+                ],
+            )
+            conn.commit()
+
+        yield SearchService()
+
+
+def test_build_fts_query():
+    """Test that user input is quoted and prefix stars are kept."""
+    assert build_fts_query("cam3_*") == '"cam3_"*'
+    assert build_fts_query('car OR "bus"') == '"car" "OR" "bus"'
+    with pytest.raises(ValueError):
+        build_fts_query('  " * ')
+
+
+def test_images_by_label(service):
+    """Test finding all images that contain a labelled box."""
+    response = service.search("pedestrian")
+
+    assert response.total == 3
+    assert [hit.title for hit in response.results] == [
+        "cam3_001.jpg",
+        "cam4_001.jpg",
+        "trail_001.jpg",
+    ]
+    assert {(f.id, f.count) for f in response.facets["projects"]} == {(1, 2), (2, 1)}
+    assert [(f.value, f.count) for f in response.facets["labels"]] == [
+        ("pedestrian", 4)
+    ]
+
+
+def test_images_by_filename_prefix(service):
+    """Test prefix matching on filenames."""
+    response = service.search("cam3_*")
+    assert sorted(hit.title for hit in response.results) == [
+        "cam3_001.jpg",
+        "cam3_002.jpg",
+    ]
+
+
+def test_images_filtered_by_project_and_paginated(service):
+    """Test project filter and pagination."""
+    response = service.search("pedestrian", project_id=1, limit=1, offset=1)
+
+    assert response.total == 2
+    assert [hit.title for hit in response.results] == ["cam4_001.jpg"]
+
+
+def test_annotations_with_label_facets(service):
+    """Test annotation search and per-label facets."""
+    response = service.search("traffic", kind="annotations")
+
+    assert response.total == 1
+    assert response.results[0].label == "traffic_sign"
+    assert response.results[0].image_id == 3
+
+
+def test_projects(service):
+    """Test project search over names and descriptions."""
+    response = service.search("trail", kind="projects")
+    assert [hit.title for hit in response.results] == ["Forest"]
+
+
+def test_index_follows_updates_and_deletes(service):
+    """Test that triggers keep the index in sync with the tables."""
+    with service.db.get_connection() as conn:
+        conn.execute("UPDATE annotations SET label = 'cyclist' WHERE id = 6")
+        conn.execute("DELETE FROM annotations WHERE id = 4")
+        conn.commit()
+
+    assert service.search("deer").total == 0
+    assert [hit.title for hit in service.search("cyclist").results] == ["trail_001.jpg"]
+    assert service.search("traffic", kind="annotations").total == 0
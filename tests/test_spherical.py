@@ -0,0 +1,106 @@
+"""Test spherical box geometry."""
+
+import tempfile
+
+import numpy as np
+import pytest
+
+from backend.database import init_database
+from backend.services.annotation_service import AnnotationService
+from backend.utils.spherical import nms, overlapping_pairs, pairwise_iou, solid_angle
+
+
+def test_solid_angle_full_sphere():
+    """The whole sphere covers 4*pi steradians."""
+    assert solid_angle([[0, -90, 360, 90]])[0] == pytest.approx(4 * np.pi)
+
+
+def test_solid_angle_shrinks_towards_poles():
+    """Equal az/alt extents cover less of the sphere near the poles."""
+    horizon, polar = solid_angle([[0, 0, 10, 10], [0, 80, 10, 90]])
+    assert polar < horizon / 5
+
+
+def test_iou_identical_and_disjoint():
+    boxes = [[10, -5, 20, 5], [10, -5, 20, 5], [100, -5, 110, 5]]
+    iou = pairwise_iou(boxes, boxes)
+
+    assert iou[0, 1] == pytest.approx(1.0)
+    assert iou[0, 2] == 0.0
+    assert np.allclose(np.diag(iou), 1.0)
+
+
+def test_iou_half_overlap():
+    """Boxes sharing half their azimuth range have IoU 1/3."""
+    iou = pairwise_iou([[0, 0, 10, 10]], [[5, 0, 15, 10]])
+    assert iou[0, 0] == pytest.approx(1 / 3)
+
+
+def test_iou_across_seam():
+    """A box wrapping through 0/360 overlaps boxes on both sides of the seam."""
+    wrapping = [[355, 0, 5, 10]]
+    iou = pairwise_iou(wrapping, [[0, 0, 5, 10], [355, 0, 360, 10], [10, 0, 20, 10]])
+
+    assert iou[0, 0] == pytest.approx(0.5)
+    assert iou[0, 1] == pytest.approx(0.5)
+    assert iou[0, 2] == 0.0
+    assert solid_angle(wrapping)[0] == pytest.approx(solid_angle([[0, 0, 10, 10]])[0])
+
+
+def test_overlapping_pairs_matches_full_matrix():
+    """Chunked pair search finds the same pairs as the full IoU matrix."""
+    rng = np.random.default_rng(0)
+    az = rng.uniform(0, 350, 300)
+    alt = rng.uniform(-80, 70, 300)
+    boxes = np.stack([az, alt, az + rng.uniform(5, 20, 300), alt + 10], axis=1)
+
+    i, j, iou = overlapping_pairs(boxes, 0.3, chunk_size=64)
+
+    full = np.triu(pairwise_iou(boxes, boxes), k=1)
+    expected_i, expected_j = np.nonzero(full >= 0.3)
+    assert sorted(zip(i, j)) == sorted(zip(expected_i, expected_j))
+    assert np.allclose(iou, full[i, j])
+
+
+def test_nms_keeps_best_of_overlapping_boxes():
+    boxes = [[10, 0, 20, 10], [11, 0, 21, 10], [100, 0, 110, 10]]
+    keep = nms(boxes, [0.5, 0.9, 0.1], iou_threshold=0.5)
+    assert keep.tolist() == [1, 2]
+
+
+def test_find_duplicate_boxes():
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        db = init_database(tmp.name)
+        with db.get_connection() as conn:
+            conn.execute("INSERT INTO projects (name, images_path) VALUES ('P', '/a')")
+            conn.executemany(
+                """
+                INSERT INTO images (project_id, filename, filepath, width, height)
+                VALUES (1, ?, ?, 100, 50)
+                """,
+                [("a.jpg", "/a/a.jpg"), ("b.jpg", "/a/b.jpg")],
+            )
+            conn.executemany(
+                """
+                INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (1, "car", 10, 0, 20, 10),
+                    (1, "car", 10.2, 0, 20.2, 10),
+                    (1, "bus", 10, 0, 20, 10),
+                    (2, "car", 10.2, 0, 20.2, 10),
+                ],
+            )
+            conn.commit()
+
+        service = AnnotationService()
+        same_label = service.find_duplicate_boxes(1, iou_threshold=0.9)
+        any_label = service.find_duplicate_boxes(1, iou_threshold=0.9, same_label=False)
+
+    assert [(d.annotation_id, d.duplicate_id) for d in same_label] == [(1, 2)]
+    assert [(d.annotation_id, d.duplicate_id) for d in any_label] == [
+        (1, 3),
+        (1, 2),
+        (2, 3),
+    ]
@@ -0,0 +1,40 @@
+"""Test that startup stays cheap."""
+
+import subprocess
+import sys
+
+from backend.utils.import_profile import parse_importtime
+
+
+def test_heavy_imports_are_deferred():
+    """Importing the app doesn't pull in NumPy or PIL."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, backend.main; "
+            "print(sorted(m for m in ('numpy', 'PIL') if m in sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_parse_importtime():
+    output = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   _io",
+            "import time:      3000 |       3000 |     numpy.core",
+            "import time:       500 |       3500 |   numpy",
+            "import time:        80 |        200 | backend.utils",
+            "unrelated output",
+        ]
+    )
+
+    totals = parse_importtime(output)
+
+    assert totals == {"numpy": 3500, "_io": 120, "backend": 80}
+    assert list(totals) == ["numpy", "_io", "backend"]
@@ -0,0 +1,134 @@
+"""Test project statistics and spherical heatmaps."""
+
+import tempfile
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend.database import init_database
+from backend.services import stats_service
+from backend.services.stats_service import StatsService, spherical_histogram
+
+
+@pytest.fixture
+def service():
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        db = init_database(tmp.name)
+
+        with db.get_connection() as conn:
+            conn.execute("""
+                INSERT INTO projects (name, images_path) VALUES ('Survey', '/a')
+                """)
+            conn.executemany(
+                """
+                INSERT INTO images (project_id, filename, filepath, width, height)
+                VALUES (1, ?, ?, 100, 50)
+                """,
+                [(f"img_{i}.jpg", f"/a/img_{i}.jpg") for i in range(3)],
+            )
+            conn.executemany(
+                """
+                INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (1, "car", 10.0, -5.0, 20.0, 5.0),
+                    (1, "car", 30.0, -5.0, 40.0, 5.0),
+                    (1, "person", 100.0, 60.0, 110.0, 70.0),
+                    (2, None, 200.0, -30.0, 210.0, -20.0),
+                ],
+            )
+            conn.commit()
+
+        yield StatsService()
+
+
+def test_spherical_histogram_weights_by_solid_angle():
+    """Equal counts near the pole have higher density than at the horizon."""
+    az = np.array([45.0, 45.0])
+    alt = np.array([1.0, 89.0])
+
+    counts, density = spherical_histogram(az, alt, 10.0)
+
+    assert counts.shape == (18, 36)
+    assert counts.sum() == 2
+    assert counts[0, 4] == 1  # top row holds +80..+90
+    assert counts[8, 4] == 1  # +0..+10
+    assert density[0, 4] > density[8, 4] * 10
+
+
+def test_spherical_histogram_uniform_sphere():
+    """Points spread uniformly over the sphere give a flat density."""
+    rng = np.random.default_rng(0)
+    az = rng.uniform(0, 360, 1_000_000)
+    alt = np.rad2deg(np.arcsin(rng.uniform(-1, 1, 1_000_000)))
+
+    counts, density = spherical_histogram(az, alt, 30.0)
+
+    assert counts.sum() == 1_000_000
+    expected = 1_000_000 / (4 * np.pi)
+    assert np.allclose(density, expected, rtol=0.05)
+
+
+def test_stats_histograms(service):
+    """Label and boxes-per-image distributions are computed."""
+    stats = service.get_stats(1)
+
+    assert stats.image_count == 3
+    assert stats.annotation_count == 4
+    assert [(lc.label, lc.count) for lc in stats.label_histogram] == [
+        ("car", 2),
+        ("person", 1),
+        ("unlabeled", 1),
+    ]
+    # img_0: 3 boxes, img_1: 1 box, img_2: none
+    assert stats.boxes_per_image.histogram == [1, 1, 0, 1]
+    assert stats.boxes_per_image.max == 3
+    assert stats.boxes_per_image.median == 1.0
+    assert sum(b.count for b in stats.altitude_profile) == 4
+    assert stats.heatmap.az_bins == 72
+    assert stats.heatmap.alt_bins == 36
+
+
+def test_stats_missing_project(service):
+    """Unknown projects return None."""
+    assert service.get_stats(99) is None
+    assert service.get_heatmap_png(99) is None
+
+
+def test_stats_cached_until_revision_changes(service):
+    """Cached stats are reused until the project changes."""
+    first = service.get_stats(1)
+    assert service.get_stats(1) is first
+
+    service.db.execute("DELETE FROM annotations WHERE label = 'person'")
+
+    updated = service.get_stats(1)
+    assert updated is not first
+    assert updated.revision > first.revision
+    assert updated.annotation_count == 3
+
+
+def test_cache_drops_least_recently_used(service, monkeypatch):
+    """Each cache keeps only the most recently used results."""
+    monkeypatch.setattr(stats_service, "MAX_CACHED", 2)
+    monkeypatch.setattr(stats_service, "_stats_cache", stats_service.OrderedDict())
+
+    first = service.get_stats(1, bin_deg=5.0)
+    service.get_stats(1, bin_deg=10.0)
+    assert service.get_stats(1, bin_deg=5.0) is first
+    service.get_stats(1, bin_deg=15.0)
+
+    assert list(stats_service._stats_cache) == [(1, 5.0), (1, 15.0)]
+    assert service.get_stats(1, bin_deg=5.0) is first
+
+
+def test_heatmap_png(service):
+    """The heatmap is an equirectangular PNG."""
+    png = service.get_heatmap_png(1, bin_deg=1.0)
+
+    image = Image.open(BytesIO(png))
+    assert image.format == "PNG"
+    assert image.size == (720, 360)
@@ -0,0 +1,77 @@
+"""Test KTX2 texture encoding with the basisu tool."""
+
+import shutil
+
+import pytest
+from PIL import Image
+
+from backend.services.texture_service import (
+    basisu_command,
+    get_texture,
+    textures_available,
+)
+
+KTX2_MAGIC = b"\xabKTX 20\xbb\r\n\x1a\n"
+
+
+@pytest.fixture
+def config(tmp_path, make_config):
+    def load(**textures):
+        return make_config(
+            images={
+                "rendition_dir": str(tmp_path / "renditions"),
+                "textures": textures,
+            }
+        )
+
+    load()
+    return load
+
+
+@pytest.fixture
+def original(tmp_path):
+    path = tmp_path / "pano.jpg"
+    Image.new("RGB", (256, 128), (0, 90, 200)).save(path)
+    return path
+
+
+def test_command_line(config, tmp_path):
+    assert basisu_command(tmp_path / "in.png", tmp_path / "out.ktx2") == [
+        "basisu",
+        "-ktx2",
+        "-mipmap",
+        "-y_flip",
+        "-q",
+        "128",
+        "-output_file",
+        str(tmp_path / "out.ktx2"),
+        str(tmp_path / "in.png"),
+    ]
+
+    config(mode="uastc", uastc_level=3, basisu_path="/opt/basisu")
+    command = basisu_command(tmp_path / "in.png", tmp_path / "out.ktx2")
+    assert command[0] == "/opt/basisu"
+    assert command[4:7] == ["-uastc", "-uastc_level", "3"]
+
+
+def test_missing_tool_disables_textures(config):
+    config(basisu_path="no-such-basisu")
+    assert not textures_available()
+
+
+def test_encoder_failure_is_reported(config, original):
+    config(basisu_path=shutil.which("false"))
+    with pytest.raises(RuntimeError, match="basisu failed"):
+        get_texture(1, str(original), original)
+    # Nothing half-written is left in the cache
+    assert not any((original.parent / "renditions").iterdir())
+
+
+@pytest.mark.skipif(shutil.which("basisu") is None, reason="basisu not installed")
+def test_texture_is_encoded_once(config, original):
+    path = get_texture(1, str(original), original)
+    assert path.read_bytes()[:12] == KTX2_MAGIC
+
+    assert get_texture(1, str(original), original) == path
+    config(mode="uastc")
+    assert get_texture(1, str(original), original) != path
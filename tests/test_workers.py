@@ -0,0 +1,143 @@
+"""Test running several worker processes against one database."""
+
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from backend.database import init_database
+from backend import main
+from backend.main import buffers_updates, server_options
+from backend.migrations.migration_manager import MigrationManager
+from backend.services.job_service import ImageJobPool
+from backend.services.maintenance_service import (
+    MaintenanceBusyError,
+    MaintenanceService,
+)
+from backend.utils.file_lock import FileLock
+
+
+@pytest.fixture
+def config(make_config):
+    return make_config(server={"workers": 4, "limit_concurrency": 100})
+
+
+def test_file_lock_excludes_other_holders(tmp_path):
+    first = FileLock(tmp_path / "a.lock")
+    second = FileLock(tmp_path / "a.lock")
+
+    with first:
+        assert first.held
+        assert not second.acquire(blocking=False)
+    assert second.acquire(blocking=False)
+    second.release()
+
+
+def test_concurrent_startup_migrates_once(tmp_path):
+    """Workers starting together on a new database all come up."""
+    db_path = tmp_path / "test.db"
+    workers = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "import sys; from backend.database import init_database; "
+                "init_database(sys.argv[1])",
+                str(db_path),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(4)
+    ]
+    for worker in workers:
+        _, stderr = worker.communicate(timeout=60)
+        assert worker.returncode == 0, stderr
+
+    manager = MigrationManager(str(db_path))
+    assert manager.is_up_to_date()
+    assert manager.get_pending_migrations() == []
+
+
+def test_maintenance_runs_in_one_worker(config):
+    db = init_database(config.database.path)
+
+    # Held by a run in another worker process
+    with FileLock(db.lock_path("maintenance")):
+        with pytest.raises(MaintenanceBusyError):
+            MaintenanceService().run(["analyze"])
+
+    assert MaintenanceService().run(["analyze"]).steps == ["analyze"]
+
+
+def test_image_jobs_drain_before_shutdown():
+    pool = ImageJobPool(max_jobs=1)
+    release = threading.Event()
+    finished = []
+
+    def job(n):
+        release.wait()
+        finished.append(n)
+        return n
+
+    async def submit():
+        return await asyncio.gather(pool.run(job, 1), pool.run(job, 2))
+
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(asyncio.run(submit())))
+    thread.start()
+    while pool.pending < 2:
+        time.sleep(0.01)
+
+    assert not pool.drain(timeout=0.05)
+    release.set()
+    # Queued jobs run too, so nothing half-done is left behind
+    assert pool.drain(timeout=5)
+    thread.join()
+    assert finished == [1, 2]
+    assert results == [1, 2]
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(pool.run(job, 3))
+    assert pool.pending == 0
+
+
+def test_server_options(config):
+    development = server_options(config)
+    assert development["reload"] is True
+    assert "workers" not in development
+
+    production = server_options(config, production=True)
+    assert "reload" not in production
+    assert production["workers"] == 4
+    assert production["limit_concurrency"] == 100
+    assert production["timeout_graceful_shutdown"] == 30.0
+
+    assert server_options(config, production=True, workers=8)["workers"] == 8
+
+
+def test_updates_are_written_through_with_several_workers(config):
+    config.writes.buffer_updates = True
+    assert buffers_updates(config, workers=1)
+    assert not buffers_updates(config, workers=4)
+    # Not started by the launcher, so the worker count is unknown
+    assert not buffers_updates(config, workers=None)
+
+    # API nodes on PostgreSQL share the database
+    config.database.backend = "postgres"
+    assert not buffers_updates(config, workers=1)
+
+    config.database.backend = "sqlite"
+    config.writes.buffer_updates = False
+    assert not buffers_updates(config, workers=1)
+
+
+def test_worker_count_comes_from_the_launcher(monkeypatch):
+    monkeypatch.delenv(main.WORKERS_ENV, raising=False)
+    assert main.server_workers() is None
+    monkeypatch.setenv(main.WORKERS_ENV, "1")
+    assert main.server_workers() == 1
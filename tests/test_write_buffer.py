@@ -0,0 +1,156 @@
+"""Test write-behind buffering of annotation updates."""
+
+import tempfile
+import threading
+import time
+
+import pytest
+
+from backend.database import init_database
+from backend.models import AnnotationUpdate
+from backend.services import annotation_service
+from backend.services.annotation_service import (
+    AnnotationService,
+    get_write_buffer,
+    init_write_buffer,
+)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(annotation_service, "_write_buffer", None)
+
+    with tempfile.NamedTemporaryFile(suffix=".db") as tmp:
+        db = init_database(tmp.name)
+        with db.get_connection() as conn:
+            conn.execute("INSERT INTO projects (name, images_path) VALUES ('P', '/a')")
+            conn.execute("""
+                INSERT INTO images (project_id, filename, filepath, width, height)
+                VALUES (1, 'a.jpg', '/a/a.jpg', 100, 50)
+                """)
+            conn.execute("""
+                INSERT INTO annotations (image_id, label, az_min, alt_min, az_max, alt_max)
+                VALUES (1, 'car', 10, -5, 20, 5), (1, 'bus', 30, -5, 40, 5)
+                """)
+            conn.commit()
+        yield db
+
+
+def _stored(db, annotation_id: int):
+    return db.fetchone("SELECT * FROM annotations WHERE id = ?", (annotation_id,))
+
+
+def test_updates_acknowledged_from_memory(db):
+    """Buffered updates return the new state before it's written."""
+    init_write_buffer(flush_interval=60)
+    service = AnnotationService()
+    revision = db.fetchone("SELECT value FROM sync_state WHERE key = 'revision'")[0]
+
+    for step in range(10):
+        response = service.update_annotation(
+            1, AnnotationUpdate(az_min=11 + step, az_max=21 + step)
+        )
+    response = service.update_annotation(1, AnnotationUpdate(label="van"))
+
+    assert (response.label, response.az_min, response.az_max) == ("van", 20, 30)
+    assert _stored(db, 1)["az_min"] == 10
+    assert len(get_write_buffer()) == 1
+
+    assert get_write_buffer().flush() == 1
+    row = _stored(db, 1)
+    assert (row["label"], row["az_min"], row["az_max"]) == ("van", 20, 30)
+    # Eleven acknowledged updates became one write, bumping the revision once
+    assert row["revision"] == revision + 1
+    assert len(get_write_buffer()) == 0
+
+
+def test_flush_writes_only_changed_columns(db):
+    """Columns changed concurrently elsewhere aren't overwritten."""
+    init_write_buffer(flush_interval=60)
+    service = AnnotationService()
+
+    service.update_annotation(1, AnnotationUpdate(az_min=12))
+    db.execute("UPDATE annotations SET label = 'truck' WHERE id = 1")
+    get_write_buffer().flush()
+
+    row = _stored(db, 1)
+    assert (row["label"], row["az_min"]) == ("truck", 12)
+
+
+def test_update_during_flush_sees_batch_being_written(db, monkeypatch):
+    """An update arriving mid-flush builds on the batch, not the stored row."""
+    init_write_buffer(flush_interval=60)
+    service = AnnotationService()
+    service.update_annotation(1, AnnotationUpdate(az_min=12, az_max=22))
+
+    repository = service.repo
+    writing, release = threading.Event(), threading.Event()
+    update_annotations = repository.update_annotations
+
+    def slow_update_annotations(updates):
+        writing.set()
+        release.wait(5)
+        update_annotations(updates)
+
+    monkeypatch.setattr(repository, "update_annotations", slow_update_annotations)
+    flusher = threading.Thread(target=get_write_buffer().flush)
+    flusher.start()
+    assert writing.wait(5)
+
+    response = service.update_annotation(1, AnnotationUpdate(label="van"))
+    release.set()
+    flusher.join()
+
+    assert (response.label, response.az_min, response.az_max) == ("van", 12, 22)
+    get_write_buffer().flush()
+    row = _stored(db, 1)
+    assert (row["label"], row["az_min"], row["az_max"]) == ("van", 12, 22)
+
+
+def test_reads_flush_first(db):
+    init_write_buffer(flush_interval=60)
+    service = AnnotationService()
+
+    service.update_annotation(2, AnnotationUpdate(label="coach"))
+
+    labels = [a.label for a in service.get_annotations_for_image(1)]
+    assert labels == ["car", "coach"]
+    assert len(get_write_buffer()) == 0
+
+
+def test_delete_discards_pending_update(db):
+    init_write_buffer(flush_interval=60)
+    service = AnnotationService()
+
+    service.update_annotation(1, AnnotationUpdate(label="van"))
+    assert service.delete_annotation(1)
+
+    assert len(get_write_buffer()) == 0
+    assert service.get_annotation(1) is None
+
+
+def test_missing_annotation(db):
+    init_write_buffer(flush_interval=60)
+    assert (
+        AnnotationService().update_annotation(99, AnnotationUpdate(label="x")) is None
+    )
+
+
+def test_flushes_on_interval(db):
+    """Pending updates are written once the interval elapses."""
+    flushed = []
+    init_write_buffer(flush_interval=0.05, on_flush=lambda: flushed.append(True))
+
+    AnnotationService().update_annotation(1, AnnotationUpdate(label="van"))
+
+    deadline = time.monotonic() + 5
+    while not flushed and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert flushed
+    assert _stored(db, 1)["label"] == "van"
+
+
+def test_write_through_without_buffer(db):
+    AnnotationService().update_annotation(1, AnnotationUpdate(label="van"))
+    assert _stored(db, 1)["label"] == "van"